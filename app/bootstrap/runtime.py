@@ -41,6 +41,9 @@ try:
         AV_CLAMD_PORT,
         AV_SCAN_TIMEOUT_SECONDS,
         AV_SCANNER,
+        AV_SIGNATURE_VERSION_TTL_SECONDS,
+        AV_VERDICT_CACHE_ENABLED,
+        AV_VERDICT_RETENTION_DAYS,
         FEATURE_AV_SCAN_ENABLED,
         FEATURE_OIDC_ENABLED,
         FEATURE_REDIS_ENABLED,
@@ -62,11 +65,37 @@ try:
         PING_TIMEOUT,
         RATE_LIMIT_STORAGE_URI,
         RETENTION_DAYS,
+        MESSAGE_CHANGE_RETENTION_DAYS,
+        ROOM_KEY_ROTATION_DEFER_SECONDS,
+        PRESENCE_OFFLINE_GRACE_SECONDS,
+        PRESENCE_FLUSH_INTERVAL_SECONDS,
+        PRESENCE_HEARTBEAT_SECONDS,
+        TYPING_TTL_SECONDS,
+        TYPING_BROADCAST_INTERVAL_MS,
+        READ_RECEIPT_FLUSH_INTERVAL_SECONDS,
+        DB_QUERY_PROFILING,
+        DB_SLOW_QUERY_MS,
+        METRICS_ENABLED,
+        BCRYPT_ROUNDS,
+        ASSET_BUNDLES_ENABLED,
+        COMPRESS_MIN_SIZE_BY_MIMETYPE,
+        PASSWORD_HASH_WORKERS,
         SESSION_TIMEOUT_HOURS,
         SOCKETIO_CORS_ALLOWED_ORIGINS,
         SOCKET_PIN_UPDATED_PER_MINUTE,
         SOCKET_SEND_MESSAGE_PER_MINUTE,
+        MAX_CONNECTIONS,
+        SOCKET_CONNECT_RATE_PER_SECOND,
+        SOCKET_CONNECT_BURST,
+        SOCKET_RETRY_AFTER_SECONDS,
+        SOCKET_RECONNECT_DELAY_MS,
+        SOCKET_RECONNECT_DELAY_MAX_MS,
         STATE_STORE_REDIS_URL,
+        THUMBNAIL_PROCESS_WORKERS,
+        THUMBNAILS_ENABLED,
+        UPLOAD_ACCEL_REDIRECT_PREFIX,
+        UPLOAD_AUTHZ_CACHE_SECONDS,
+        UPLOAD_SENDFILE_MODE,
         USE_HTTPS,
     )
 except ImportError:
@@ -113,6 +142,7 @@ def build_flask_app():
     app.config["RATELIMIT_STORAGE_URI"] = RATE_LIMIT_STORAGE_URI
     app.config["STATE_STORE_REDIS_URL"] = STATE_STORE_REDIS_URL
     app.config["RETENTION_DAYS"] = RETENTION_DAYS
+    app.config["MESSAGE_CHANGE_RETENTION_DAYS"] = MESSAGE_CHANGE_RETENTION_DAYS
     app.config["MAINTENANCE_INTERVAL_SECONDS"] = MAINTENANCE_INTERVAL_SECONDS
     app.config["FEATURE_OIDC_ENABLED"] = FEATURE_OIDC_ENABLED
     app.config["FEATURE_AV_SCAN_ENABLED"] = FEATURE_AV_SCAN_ENABLED
@@ -132,8 +162,40 @@ def build_flask_app():
     app.config["AV_CLAMD_HOST"] = AV_CLAMD_HOST
     app.config["AV_CLAMD_PORT"] = AV_CLAMD_PORT
     app.config["AV_SCAN_TIMEOUT_SECONDS"] = AV_SCAN_TIMEOUT_SECONDS
+    app.config["AV_VERDICT_CACHE_ENABLED"] = AV_VERDICT_CACHE_ENABLED
+    app.config["AV_SIGNATURE_VERSION_TTL_SECONDS"] = AV_SIGNATURE_VERSION_TTL_SECONDS
+    app.config["AV_VERDICT_RETENTION_DAYS"] = AV_VERDICT_RETENTION_DAYS
     app.config["UPLOAD_QUARANTINE_FOLDER"] = upload_quarantine_folder
+    app.config["THUMBNAILS_ENABLED"] = THUMBNAILS_ENABLED
+    app.config["THUMBNAIL_PROCESS_WORKERS"] = THUMBNAIL_PROCESS_WORKERS
+    app.config["UPLOAD_AUTHZ_CACHE_SECONDS"] = UPLOAD_AUTHZ_CACHE_SECONDS
+    app.config["UPLOAD_SENDFILE_MODE"] = UPLOAD_SENDFILE_MODE
+    app.config["UPLOAD_ACCEL_REDIRECT_PREFIX"] = UPLOAD_ACCEL_REDIRECT_PREFIX
+    app.config["ROOM_KEY_ROTATION_DEFER_SECONDS"] = ROOM_KEY_ROTATION_DEFER_SECONDS
+    app.config["PRESENCE_OFFLINE_GRACE_SECONDS"] = PRESENCE_OFFLINE_GRACE_SECONDS
+    app.config["PRESENCE_FLUSH_INTERVAL_SECONDS"] = PRESENCE_FLUSH_INTERVAL_SECONDS
+    app.config["PRESENCE_HEARTBEAT_SECONDS"] = PRESENCE_HEARTBEAT_SECONDS
+    app.config["TYPING_TTL_SECONDS"] = TYPING_TTL_SECONDS
+    app.config["TYPING_BROADCAST_INTERVAL_MS"] = TYPING_BROADCAST_INTERVAL_MS
+    app.config["READ_RECEIPT_FLUSH_INTERVAL_SECONDS"] = READ_RECEIPT_FLUSH_INTERVAL_SECONDS
+    app.config["DB_QUERY_PROFILING"] = DB_QUERY_PROFILING
+    app.config["DB_SLOW_QUERY_MS"] = DB_SLOW_QUERY_MS
+    app.config["METRICS_ENABLED"] = METRICS_ENABLED
+    app.config["BCRYPT_ROUNDS"] = BCRYPT_ROUNDS
+    app.config["ASSET_BUNDLES_ENABLED"] = ASSET_BUNDLES_ENABLED
+    app.config["COMPRESS_MIN_SIZE_BY_MIMETYPE"] = dict(COMPRESS_MIN_SIZE_BY_MIMETYPE)
+    app.config["COMPRESS_MIMETYPES"] = list(COMPRESS_MIN_SIZE_BY_MIMETYPE)
+    app.config["COMPRESS_MIN_SIZE"] = 0  # thresholds live in the per-type policy
+    # streamed bodies (send_file) are static files or uploads: never compress them per request
+    app.config["COMPRESS_STREAMS"] = False
+    app.config["PASSWORD_HASH_WORKERS"] = PASSWORD_HASH_WORKERS
     app.config["SOCKET_SEND_MESSAGE_PER_MINUTE"] = SOCKET_SEND_MESSAGE_PER_MINUTE
+    app.config["MAX_CONNECTIONS"] = MAX_CONNECTIONS
+    app.config["SOCKET_CONNECT_RATE_PER_SECOND"] = SOCKET_CONNECT_RATE_PER_SECOND
+    app.config["SOCKET_CONNECT_BURST"] = SOCKET_CONNECT_BURST
+    app.config["SOCKET_RETRY_AFTER_SECONDS"] = SOCKET_RETRY_AFTER_SECONDS
+    app.config["SOCKET_RECONNECT_DELAY_MS"] = SOCKET_RECONNECT_DELAY_MS
+    app.config["SOCKET_RECONNECT_DELAY_MAX_MS"] = SOCKET_RECONNECT_DELAY_MAX_MS
     app.config["SOCKET_PIN_UPDATED_PER_MINUTE"] = SOCKET_PIN_UPDATED_PER_MINUTE
     app.config["APP_NAME"] = APP_NAME
     app.config["ASYNC_MODE"] = ASYNC_MODE
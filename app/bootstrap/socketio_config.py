@@ -9,8 +9,19 @@ from importlib import import_module
 
 from flask_socketio import SocketIO
 
+from app.services.metrics import install_socket_metrics
+from app.services.socket_admission import install_outbound_queue_limit
+
 try:
-    from config import ASYNC_MODE, MAX_HTTP_BUFFER_SIZE, MESSAGE_QUEUE, PING_INTERVAL, PING_TIMEOUT, SOCKETIO_CORS_ALLOWED_ORIGINS
+    from config import (
+        ASYNC_MODE,
+        MAX_HTTP_BUFFER_SIZE,
+        MESSAGE_QUEUE,
+        PING_INTERVAL,
+        PING_TIMEOUT,
+        SOCKET_OUTBOUND_QUEUE_LIMIT,
+        SOCKETIO_CORS_ALLOWED_ORIGINS,
+    )
 except ImportError:
     from config import *  # type: ignore  # noqa: F403,F401
 
@@ -66,5 +77,8 @@ def create_socketio(app, *, gevent_available: bool, logger):
     except ValueError as exc:
         logger.warning(f"Socket.IO 초기화 경고: {exc}, 기본 모드로 재시도")
         socketio = SocketIO(app, logger=False, engineio_logger=False)
+    if install_outbound_queue_limit(socketio, SOCKET_OUTBOUND_QUEUE_LIMIT):
+        logger.info(f"Socket.IO 송신 큐 제한: 연결당 {SOCKET_OUTBOUND_QUEUE_LIMIT}개 패킷")
+    install_socket_metrics(socketio)
     return socketio
 
@@ -8,27 +8,65 @@ from __future__ import annotations
 import os
 import time
 
-from app.models import cleanup_empty_rooms, cleanup_old_access_logs, cleanup_retention_data, close_expired_polls, init_db
+from app.models import (
+    cleanup_empty_rooms,
+    cleanup_message_changes,
+    cleanup_old_access_logs,
+    cleanup_retention_data,
+    close_expired_polls,
+    configure_query_profiling,
+    init_db,
+)
+from app.services import metrics
+from app.services.metrics import MAINTENANCE_FAILURES, MAINTENANCE_SECONDS
+from app.services.presence import flush_presence, reconcile_presence, run_presence_heartbeat
+from app.services.read_receipts import flush_read_receipts
+from app.services.room_key_rotation import flush_deferred_room_security_pushes
+from app.socket_events.state import cleanup_old_cache
+from app.thumbnails import purge_orphan_thumbnails
+from app.upload_scan import purge_stale_scan_verdicts
 from app.upload_tokens import purge_expired_upload_tokens
 
 
 def initialize_runtime(app, socketio, logger):
+    configure_query_profiling(bool(app.config.get("DB_QUERY_PROFILING")), app.config.get("DB_SLOW_QUERY_MS"))
+    metrics.configure(bool(app.config.get("METRICS_ENABLED", True)))
     init_db()
+    # status rows left 'online' by a crash have no connection behind them
+    reconcile_presence()
 
     def _maintenance_worker():
         interval = max(30, int(app.config.get("MAINTENANCE_INTERVAL_SECONDS", 300)))
         retention_days = int(app.config.get("RETENTION_DAYS", 0) or 0)
+        verdict_retention_days = int(app.config.get("AV_VERDICT_RETENTION_DAYS", 30) or 0)
+        change_retention_days = int(app.config.get("MESSAGE_CHANGE_RETENTION_DAYS", 14) or 0)
+        jobs = [
+            ("close_expired_polls", close_expired_polls),
+            ("cleanup_old_access_logs", cleanup_old_access_logs),
+            ("cleanup_empty_rooms", cleanup_empty_rooms),
+            ("purge_expired_upload_tokens", purge_expired_upload_tokens),
+            ("purge_stale_scan_verdicts", lambda: purge_stale_scan_verdicts(verdict_retention_days)),
+            ("purge_orphan_thumbnails", purge_orphan_thumbnails),
+            ("flush_deferred_room_security_pushes", flush_deferred_room_security_pushes),
+            ("flush_presence", flush_presence),
+            ("flush_read_receipts", flush_read_receipts),
+            ("cleanup_old_cache", cleanup_old_cache),
+            ("cleanup_message_changes", lambda: cleanup_message_changes(change_retention_days)),
+        ]
+        if retention_days > 0:
+            jobs.append(("cleanup_retention_data", lambda: cleanup_retention_data(retention_days)))
         logger.info(f"Maintenance worker started (interval={interval}s, retention_days={retention_days})")
         while True:
-            try:
-                close_expired_polls()
-                cleanup_old_access_logs()
-                cleanup_empty_rooms()
-                purge_expired_upload_tokens()
-                if retention_days > 0:
-                    cleanup_retention_data(retention_days)
-            except Exception as exc:
-                logger.warning(f"Maintenance worker error: {exc}")
+            for name, job in jobs:
+                # one failing job no longer skips the rest of the pass
+                started = time.perf_counter()
+                try:
+                    job()
+                except Exception as exc:
+                    MAINTENANCE_FAILURES.inc(name)
+                    logger.warning(f"Maintenance worker error ({name}): {exc}")
+                finally:
+                    MAINTENANCE_SECONDS.observe(time.perf_counter() - started, name)
             time.sleep(interval)
 
     is_testing_runtime = bool(app.config.get("TESTING")) or ("PYTEST_CURRENT_TEST" in os.environ)
@@ -37,6 +75,7 @@ def initialize_runtime(app, socketio, logger):
         return
 
     socketio.start_background_task(_maintenance_worker)
+    socketio.start_background_task(run_presence_heartbeat, app)
     try:
         from app.upload_scan import init_upload_scan_worker
 
@@ -8,7 +8,7 @@ import logging
 import os
 import secrets
 from collections import deque
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 
 from app.services.runtime_paths import get_base_dir, get_control_token_path
 
@@ -57,13 +57,21 @@ def _is_localhost(addr: str | None) -> bool:
 
 
 def require_control_auth():
-    """localhost + token header 인증."""
+    """localhost + token header 인증.
+
+    토큰은 X-Control-Token 또는 Authorization: Bearer 헤더로 받는다 (Prometheus 스크레이프용).
+    """
     if not _is_localhost(request.remote_addr):
         return jsonify({'error': 'forbidden'}), 403
 
     expected = get_or_create_control_token()
     provided = request.headers.get('X-Control-Token', '')
-    if not provided or provided != expected:
+    if not provided:
+        scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() == 'bearer':
+            provided = credentials.strip()
+    # constant-time: the token is the only secret guarding the control API
+    if not provided or not secrets.compare_digest(provided.encode('utf-8'), expected.encode('utf-8')):
         return jsonify({'error': 'unauthorized'}), 401
     return None
 
@@ -104,12 +112,49 @@ def get_stats():
     """서버 통계 조회"""
     try:
         from app.models import get_server_stats
+        from app.services.compression_stats import get_compression_stats
+        from app.services.password_hashing import get_password_hash_stats
+        from app.services.presence import get_presence_stats
+        from app.services.query_profiler import get_query_profile_stats
+        from app.services.read_receipts import get_read_receipt_stats
+        from app.services.socket_admission import get_admission_stats
+        from app.services.typing_indicators import get_typing_stats
         stats = get_server_stats()
+        stats['password_hashing'] = get_password_hash_stats()
+        stats['compression'] = get_compression_stats()
+        stats['presence'] = get_presence_stats()
+        stats['typing'] = get_typing_stats()
+        stats['read_receipts'] = get_read_receipt_stats()
+        stats['socket_admission'] = get_admission_stats()
+        stats['db_queries'] = get_query_profile_stats()
         return jsonify(stats)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@control_bp.route('/queries', methods=['GET'])
+def get_queries():
+    """Heaviest SQL statements and the recent slow-query log (DB_QUERY_PROFILING)."""
+    from app.services.query_profiler import get_query_profile_stats, get_slow_queries, get_top_queries
+
+    limit = max(1, min(200, request.args.get('limit', 20, type=int)))
+    sort = request.args.get('sort', 'total')
+    return jsonify({
+        **get_query_profile_stats(),
+        'sort': sort,
+        'top': get_top_queries(limit, sort),
+        'slow': get_slow_queries(limit),
+    })
+
+
+@control_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of the in-process metrics registry."""
+    from app.services.metrics import render_text
+
+    return Response(render_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @control_bp.route('/logs', methods=['GET'])
 def get_logs():
     """최신 로그 조회"""
@@ -5,12 +5,16 @@ Compression is optional and should not prevent application boot in minimal
 environments (for example Windows ARM without brotli wheels).
 """
 
+import time
 from typing import Any, Protocol
 
+from flask import current_app
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_wtf.csrf import CSRFProtect
 
+from app.services.compression_stats import record_dynamic, record_skipped
+
 
 class _CompressLike(Protocol):
     def init_app(self, app: Any) -> None: ...
@@ -26,7 +30,36 @@ try:
 except Exception:  # pragma: no cover - exercised only in env without brotli
     compress: _CompressLike = _FallbackCompress()
 else:
-    compress: _CompressLike = _CompressClass()
+
+    class _PolicyCompress(_CompressClass):
+        """Flask-Compress gated by ``COMPRESS_MIN_SIZE_BY_MIMETYPE`` and metered per content type.
+
+        Types missing from the policy are never compressed on the fly; static
+        files are expected to ship pre-compressed siblings instead.
+        """
+
+        def after_request(self, response):
+            if not response or "Content-Encoding" in response.headers:
+                return super().after_request(response)
+
+            policy = current_app.config.get("COMPRESS_MIN_SIZE_BY_MIMETYPE")
+            if policy is not None:
+                min_size = policy.get(response.mimetype)
+                if min_size is None:
+                    return response
+                if response.content_length is not None and response.content_length < min_size:
+                    record_skipped("below_threshold")
+                    return response
+
+            bytes_in = response.content_length
+            cpu_started = time.thread_time()
+            response = super().after_request(response)
+            cpu_seconds = time.thread_time() - cpu_started
+            if response.status_code == 200 and bytes_in and response.headers.get("Content-Encoding"):
+                record_dynamic(response.mimetype, bytes_in, response.content_length or 0, cpu_seconds)
+            return response
+
+    compress: _CompressLike = _PolicyCompress()
 
 
 limiter = Limiter(key_func=get_remote_address)
@@ -5,6 +5,7 @@ HTTP blueprint registration.
 
 from __future__ import annotations
 
+from app.http.assets import assets_bp
 from app.http.auth import auth_bp
 from app.http.public import public_bp
 from app.http.rooms import rooms_bp
@@ -17,6 +18,7 @@ def register_routes(app):
     from app.http.uploads import uploads_bp
 
     for blueprint in (
+        assets_bp,
         public_bp,
         auth_bp,
         rooms_bp,
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Static file serving with build-time compressed siblings.
+
+Replaces Flask's default ``static`` view so that ``foo.js`` is answered from
+``foo.js.br``/``foo.js.gz`` when the client accepts it, with a strong content
+ETag per representation. Nothing under ``/static`` is compressed per request.
+The build manifest and the compressed siblings themselves are build artifacts
+and are not served on direct request.
+``/sw.js`` serves the service worker from the site root so it can control the
+whole app; its ``?v=`` query is the build version used for cache names.
+"""
+
+from __future__ import annotations
+
+import mimetypes
+import os
+
+from flask import Blueprint, abort, current_app, jsonify, request, send_file
+from werkzeug.security import safe_join
+
+from app.services.asset_bundles import (
+    DIST_DIRNAME,
+    MANIFEST_NAME,
+    SERVICE_WORKER_FILE,
+    asset_scripts,
+    is_bundle_current,
+    load_manifest,
+    service_worker_version,
+)
+from app.services.compression_stats import record_precompressed
+from app.services.upload_access import get_file_etag
+
+assets_bp = Blueprint("assets", __name__)
+
+_ENCODING_SUFFIXES = (("br", ".br"), ("gzip", ".gz"))
+_IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _static_folder() -> str:
+    return current_app.static_folder or ""
+
+
+@assets_bp.app_context_processor
+def _inject_asset_helpers():
+    use_bundles = bool(current_app.config.get("ASSET_BUNDLES_ENABLED", True))
+    return {
+        "asset_scripts": lambda name: asset_scripts(_static_folder(), name, use_bundles=use_bundles),
+        "service_worker_url": lambda: f"/sw.js?v={service_worker_version(_static_folder())}",
+    }
+
+
+def _precompressed_sibling(file_path: str) -> tuple[str, str] | tuple[None, None]:
+    source_mtime = os.stat(file_path).st_mtime_ns
+    for encoding, suffix in _ENCODING_SUFFIXES:
+        if not request.accept_encodings[encoding]:
+            continue
+        sibling = file_path + suffix
+        # a sibling older than its source is stale (source edited without a rebuild)
+        if os.path.isfile(sibling) and os.stat(sibling).st_mtime_ns >= source_mtime:
+            return sibling, encoding
+    return None, None
+
+
+def _has_sibling(file_path: str) -> bool:
+    return any(os.path.isfile(file_path + suffix) for _, suffix in _ENCODING_SUFFIXES)
+
+
+def _is_build_artifact(filename: str, file_path: str) -> bool:
+    if filename.replace("\\", "/") == f"{DIST_DIRNAME}/{MANIFEST_NAME}":
+        return True
+    # foo.js.gz next to foo.js is only ever served as foo.js with Content-Encoding
+    return any(file_path.endswith(suffix) and os.path.isfile(file_path[: -len(suffix)]) for _, suffix in _ENCODING_SUFFIXES)
+
+
+def serve_static(filename: str):
+    file_path = safe_join(_static_folder(), filename)
+    if file_path is None or not os.path.isfile(file_path) or _is_build_artifact(filename, file_path):
+        abort(404)
+
+    sibling, encoding = _precompressed_sibling(file_path)
+    served_path = sibling or file_path
+    etag = get_file_etag(file_path)
+    if encoding:
+        etag = f"{etag}-{encoding}"
+
+    immutable = filename.startswith(f"{DIST_DIRNAME}/")
+    response = send_file(
+        served_path,
+        mimetype=mimetypes.guess_type(file_path)[0] or "application/octet-stream",
+        etag=etag,
+        conditional=True,
+        max_age=None if immutable else current_app.get_send_file_max_age(filename),
+    )
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+        if response.status_code == 200:
+            record_precompressed(os.path.getsize(file_path), os.path.getsize(sibling))
+    if encoding or _has_sibling(file_path):
+        response.vary.add("Accept-Encoding")
+    if immutable:
+        response.headers["Cache-Control"] = _IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+@assets_bp.get("/sw.js")
+def service_worker():
+    file_path = os.path.join(_static_folder(), SERVICE_WORKER_FILE)
+    if not os.path.isfile(file_path):
+        abort(404)
+    response = send_file(
+        file_path,
+        mimetype="text/javascript",
+        etag=get_file_etag(file_path),
+        conditional=True,
+        max_age=0,
+    )
+    # browsers re-check the worker script on navigation; never serve it stale
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["Service-Worker-Allowed"] = "/"
+    return response
+
+
+@assets_bp.get("/sw-precache.json")
+def service_worker_precache():
+    """Hashed bundle URLs for the service worker to precache on install."""
+    static_folder = _static_folder()
+    urls = [
+        f"/static/{DIST_DIRNAME}/{entry['file']}"
+        for name, entry in sorted(load_manifest(static_folder).items())
+        if isinstance(entry, dict) and entry.get("file") and is_bundle_current(static_folder, name, entry)
+    ]
+    response = jsonify(urls)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@assets_bp.record_once
+def _replace_static_view(state):
+    if "static" in state.app.view_functions:
+        state.app.view_functions["static"] = serve_static
@@ -11,11 +11,11 @@ from flask_wtf.csrf import generate_csrf
 from app.extensions import csrf, limiter
 from app.http.common import parse_json_payload, require_login
 from app.models import authenticate_user, change_password, create_user, delete_user, get_db, get_room_members, log_access
+from app.services.room_key_rotation import defer_room_security_push
 from app.services.socket_broadcasts import (
     emit_room_access_revoked,
     emit_room_list_updated,
     emit_room_members_updated,
-    emit_room_security_updated,
     sync_user_room_membership,
 )
 
@@ -139,14 +139,17 @@ def delete_account():
         return jsonify({"error": error}), 400
 
     deleted_user_id = session["user_id"]
+    rotated_room_ids = []
     for room_id in affected_room_ids:
         sync_user_room_membership(room_id, deleted_user_id, joined=False)
         emit_room_access_revoked(deleted_user_id, room_id, "deleted")
         emit_room_members_updated(room_id)
         remaining_user_ids = [member["id"] for member in get_room_members(room_id)]
         if remaining_user_ids:
-            emit_room_security_updated(room_id, remaining_user_ids)
+            rotated_room_ids.append(room_id)
             emit_room_list_updated(remaining_user_ids, "membership_changed")
+    # 키는 delete_user 트랜잭션에서 이미 회전됨; 보안 payload 전송만 방 단위로 병합해 지연 처리
+    defer_room_security_push(rotated_room_ids)
 
     log_access(session["user_id"], "delete_account", request.remote_addr, request.user_agent.string)
     session.clear()
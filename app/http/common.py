@@ -5,9 +5,9 @@ Common HTTP helpers shared across blueprints.
 
 from __future__ import annotations
 
-from typing import Any, cast
+from typing import Any, Callable, cast
 
-from flask import jsonify, request, session
+from flask import jsonify, make_response, request, session
 
 
 def json_error(message: str, status: int = 400, code: str | None = None):
@@ -58,3 +58,29 @@ def require_login():
 
 def truthy_param(value) -> bool:
     return str(value or "").lower() in ("1", "true", "yes")
+
+
+def not_modified(etag: str | None):
+    """304 response when the request's ``If-None-Match`` matches ``etag``, else None."""
+    if not etag or not request.if_none_match.contains_weak(etag):
+        return None
+    response = make_response("", 304)
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def conditional_json(etag: str | None, build: Callable[[], Any]):
+    """JSON response revalidated by ``etag``: 304 without calling ``build()`` on a match.
+
+    Tags are weak so response compression keeps them intact. ``etag=None`` (tag
+    lookup failed) always builds the full response.
+    """
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    response = jsonify(build())
+    if etag:
+        response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
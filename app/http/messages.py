@@ -18,21 +18,70 @@ from app.models import (
     can_user_see_message,
     delete_message,
     edit_message,
+    get_message_change_watermark,
     get_message_reactions,
     get_message_room_id,
     get_room_last_reads,
+    get_room_message_delta,
     get_room_members,
     get_room_messages,
     get_room_security_bundle,
     is_room_member,
     toggle_reaction,
 )
+from app.services.read_receipts import flush_read_receipts
 
 logger = logging.getLogger(__name__)
 
 messages_bp = Blueprint("messages", __name__)
 
 
+def _attach_unread_counts(room_id: int, messages: list[dict], members: list[dict] | None) -> None:
+    if not messages:
+        return
+    if members:
+        for message in messages:
+            message_version = int(message.get("key_version") or 1)
+            unread = 0
+            for member in members:
+                if int(member.get("joined_key_version") or 1) > message_version:
+                    continue
+                if member.get("id") == message["sender_id"]:
+                    continue
+                if (member.get("last_read_message_id") or 0) < message["id"]:
+                    unread += 1
+            message["unread_count"] = unread
+        return
+
+    user_last_read = {}
+    last_read_ids = []
+    for last_read, uid in get_room_last_reads(room_id):
+        value = last_read or 0
+        user_last_read[uid] = value
+        last_read_ids.append(value)
+
+    last_read_ids.sort()
+    for message in messages:
+        sender_id = message["sender_id"]
+        message_id = message["id"]
+        unread = bisect_left(last_read_ids, message_id)
+        sender_last_read = user_last_read.get(sender_id, 0)
+        if sender_last_read < message_id:
+            unread -= 1
+        message["unread_count"] = max(unread, 0)
+
+
+def _room_meta(room_id: int, members: list[dict] | None) -> dict[str, object]:
+    security = get_room_security_bundle(room_id, session["user_id"])
+    return {
+        "members": members,
+        "encryption_key": security.get("encryption_key") if security else None,
+        "encryption_keys": security.get("encryption_keys") if security else {},
+        "key_version": security.get("key_version") if security else 1,
+        "member_key_version": security.get("member_key_version") if security else 1,
+    }
+
+
 @messages_bp.get("/api/rooms/<int:room_id>/messages")
 def get_messages(room_id: int):
     login_error = require_login()
@@ -46,55 +95,71 @@ def get_messages(room_id: int):
         limit = request.args.get("limit", type=int) or 50
         limit = max(1, min(limit, 200))
         include_meta = str(request.args.get("include_meta", "1")).lower() in ("1", "true", "yes")
+        # unread counts below must include this room's read positions still buffered
+        flush_read_receipts(room_id=room_id)
 
+        # Journal position is read before the page so a racing edit is re-sent by the next sync.
+        change_id = None if before_id else get_message_change_watermark()[0]
         messages = get_room_messages(room_id, viewer_user_id=session["user_id"], before_id=before_id, limit=limit)
         members = get_room_members(room_id) if include_meta else None
-        security = get_room_security_bundle(room_id, session["user_id"]) if include_meta else None
-
-        if messages:
-            if include_meta and members:
-                for message in messages:
-                    message_version = int(message.get("key_version") or 1)
-                    unread = 0
-                    for member in members:
-                        if int(member.get("joined_key_version") or 1) > message_version:
-                            continue
-                        if member.get("id") == message["sender_id"]:
-                            continue
-                        if (member.get("last_read_message_id") or 0) < message["id"]:
-                            unread += 1
-                    message["unread_count"] = unread
-            else:
-                user_last_read = {}
-                last_read_ids = []
-                for last_read, uid in get_room_last_reads(room_id):
-                    value = last_read or 0
-                    user_last_read[uid] = value
-                    last_read_ids.append(value)
-
-                last_read_ids.sort()
-                for message in messages:
-                    sender_id = message["sender_id"]
-                    message_id = message["id"]
-                    unread = bisect_left(last_read_ids, message_id)
-                    sender_last_read = user_last_read.get(sender_id, 0)
-                    if sender_last_read < message_id:
-                        unread -= 1
-                    message["unread_count"] = max(unread, 0)
+        _attach_unread_counts(room_id, messages, members)
 
         response: dict[str, object] = {"messages": messages}
+        if change_id is not None:
+            response["sync"] = {
+                "message_id": messages[-1]["id"] if messages else 0,
+                "change_id": change_id,
+            }
         if include_meta:
-            response["members"] = members
-            response["encryption_key"] = security.get("encryption_key") if security else None
-            response["encryption_keys"] = security.get("encryption_keys") if security else {}
-            response["key_version"] = security.get("key_version") if security else 1
-            response["member_key_version"] = security.get("member_key_version") if security else 1
+            response.update(_room_meta(room_id, members))
         return jsonify(response)
     except Exception as exc:
         logger.error(f"메시지 로드 오류: {exc}")
         return jsonify({"error": "메시지 로드 실패"}), 500
 
 
+@messages_bp.get("/api/rooms/<int:room_id>/messages/sync")
+def sync_messages(room_id: int):
+    """Delta since a client watermark (``after_id`` + ``after_change``) for the offline cache."""
+    login_error = require_login()
+    if login_error:
+        return login_error
+    if not is_room_member(room_id, session["user_id"]):
+        return jsonify({"error": "방 접근 권한이 없습니다."}), 403
+
+    after_id = request.args.get("after_id", type=int)
+    after_change = request.args.get("after_change", type=int)
+    if after_id is None or after_change is None or after_id < 0 or after_change < 0:
+        return jsonify({"error": "after_id와 after_change가 필요합니다."}), 400
+
+    try:
+        limit = request.args.get("limit", type=int) or 200
+        limit = max(1, min(limit, 200))
+        include_meta = str(request.args.get("include_meta", "1")).lower() in ("1", "true", "yes")
+        flush_read_receipts(room_id=room_id)
+
+        delta = get_room_message_delta(room_id, session["user_id"], after_id, after_change, limit=limit)
+        if delta is None:
+            return jsonify({"error": "메시지 동기화 실패"}), 500
+
+        members = get_room_members(room_id) if include_meta else None
+        _attach_unread_counts(room_id, delta["messages"] + delta["updated"], members)
+        response: dict[str, object] = {
+            "messages": delta["messages"],
+            "updated": delta["updated"],
+            "removed_ids": delta["removed_ids"],
+            "sync": delta["watermark"],
+            "has_more": delta["has_more"],
+            "reset": delta["reset"],
+        }
+        if include_meta:
+            response.update(_room_meta(room_id, members))
+        return jsonify(response)
+    except Exception as exc:
+        logger.error(f"메시지 동기화 오류: {exc}")
+        return jsonify({"error": "메시지 동기화 실패"}), 500
+
+
 @messages_bp.delete("/api/messages/<int:message_id>")
 def delete_message_route(message_id: int):
     login_error = require_login()
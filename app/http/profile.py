@@ -13,7 +13,7 @@ from datetime import datetime
 from flask import Blueprint, current_app, jsonify, request, session
 
 from app.http.common import parse_json_payload, require_login
-from app.models import get_user_by_id, safe_file_delete, update_user_profile
+from app.models import get_user_by_id, get_user_by_id_cached, safe_file_delete, update_user_profile
 from app.utils import sanitize_input, validate_file_header
 
 try:
@@ -31,7 +31,7 @@ def get_profile():
     login_error = require_login()
     if login_error:
         return login_error
-    user = get_user_by_id(session["user_id"])
+    user = get_user_by_id_cached(session["user_id"])
     if user:
         return jsonify(user)
     return jsonify({"error": "사용자를 찾을 수 없습니다."}), 404
@@ -102,6 +102,7 @@ def upload_profile_image():
     profile_folder = os.path.join(upload_folder, "profiles")
     os.makedirs(profile_folder, exist_ok=True)
 
+    # 삭제할 이전 파일 경로는 캐시가 아닌 DB 값 기준
     user = get_user_by_id(session["user_id"])
     if user and user.get("profile_image"):
         try:
@@ -132,6 +133,7 @@ def delete_profile_image():
     if login_error:
         return login_error
 
+    # 삭제할 파일 경로는 캐시가 아닌 DB 값 기준
     user = get_user_by_id(session["user_id"])
     upload_folder = current_app.config.get("UPLOAD_FOLDER", UPLOAD_FOLDER)
     if user and user.get("profile_image"):
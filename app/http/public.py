@@ -10,7 +10,7 @@ import logging
 from flask import Blueprint, current_app, jsonify, redirect, render_template, request, session, url_for
 
 from app.http.common import require_login
-from app.models import get_or_create_oidc_user, get_user_by_id, log_access
+from app.models import get_or_create_oidc_user, get_user_by_id_cached, log_access
 from app.oidc import (
     build_authorize_redirect,
     exchange_code_for_userinfo,
@@ -38,7 +38,7 @@ def index():
 @public_bp.get("/api/me")
 def get_current_user():
     if "user_id" in session:
-        user = get_user_by_id(session["user_id"])
+        user = get_user_by_id_cached(session["user_id"])
         if user:
             return jsonify({"logged_in": True, "user": user})
     return jsonify({"logged_in": False})
@@ -11,18 +11,20 @@ import logging
 
 from flask import Blueprint, jsonify, make_response, request, session
 
-from app.http.common import parse_json_payload, require_login, truthy_param
+from app.http.common import conditional_json, not_modified, parse_json_payload, require_login, truthy_param
 from app.models import (
-    add_room_member,
+    apply_room_membership_batch,
     create_room,
     get_admin_audit_logs,
     get_all_users,
-    get_online_users,
     get_room_admins,
     get_room_by_id,
+    get_room_info_version,
+    get_room_list_version,
     get_room_members,
-    get_user_by_id,
+    get_user_directory_version,
     get_user_rooms,
+    get_users_by_ids,
     is_room_admin,
     is_room_member,
     kick_member as kick_member_db,
@@ -31,9 +33,12 @@ from app.models import (
     mute_room,
     pin_room,
     rotate_room_key,
+    search_users,
     set_room_admin,
     update_room_name,
 )
+from app.services.presence import get_online_user_ids, get_presence_changes_since
+from app.services.read_receipts import flush_read_receipts
 from app.services.socket_broadcasts import (
     emit_admin_updated,
     emit_room_access_revoked,
@@ -49,6 +54,10 @@ logger = logging.getLogger(__name__)
 
 rooms_bp = Blueprint("rooms", __name__)
 
+DIRECTORY_PAGE_DEFAULT = 50
+DIRECTORY_PAGE_MAX = 100
+USERS_BY_IDS_MAX = 200
+
 
 def _room_member_ids(room_id: int) -> list[int]:
     return [member["id"] for member in get_room_members(room_id)]
@@ -64,13 +73,109 @@ def _rotate_and_emit_room_security(room_id: int, user_ids: list[int]) -> None:
     emit_room_security_updated(room_id, user_ids)
 
 
+def _existing_user_ids(user_ids: list[int]) -> list[int]:
+    """Filter to ids of existing users, keeping order (one cached batch lookup)."""
+    found = get_users_by_ids(user_ids)
+    return [uid for uid in user_ids if uid in found]
+
+
+def _parse_user_id_list(values) -> list[int] | None:
+    if values is None:
+        return []
+    if not isinstance(values, list):
+        return None
+    user_ids: list[int] = []
+    seen = set()
+    for value in values:
+        try:
+            user_id = int(value)
+        except (TypeError, ValueError):
+            continue
+        if user_id <= 0 or user_id in seen:
+            continue
+        seen.add(user_id)
+        user_ids.append(user_id)
+    return user_ids
+
+
+def _emit_membership_batch(room_id: int, added_user_ids: list[int], removed_user_ids: list[int]) -> None:
+    """One socket sync/notification pass for a batch, including a single security push per member."""
+    for user_id in added_user_ids:
+        sync_user_room_membership(room_id, user_id, joined=True)
+    for user_id in removed_user_ids:
+        sync_user_room_membership(room_id, user_id, joined=False)
+        emit_room_access_revoked(user_id, room_id, "kicked")
+    if removed_user_ids:
+        emit_room_list_updated(removed_user_ids, "room_kicked")
+    emit_room_members_updated(room_id)
+    current_member_ids = _room_member_ids(room_id)
+    if current_member_ids:
+        emit_room_security_updated(room_id, current_member_ids)
+    if added_user_ids:
+        emit_room_list_updated(added_user_ids, "room_invited")
+    remaining_user_ids = [uid for uid in current_member_ids if uid not in added_user_ids]
+    if remaining_user_ids:
+        emit_room_list_updated(remaining_user_ids, "membership_changed")
+
+
 @rooms_bp.get("/api/users")
 def get_users():
     login_error = require_login()
     if login_error:
         return login_error
-    users = get_all_users()
-    return jsonify([user for user in users if user["id"] != session["user_id"]])
+    user_id = session["user_id"]
+    return conditional_json(
+        get_user_directory_version(user_id),
+        lambda: [user for user in get_all_users() if user["id"] != user_id],
+    )
+
+
+@rooms_bp.get("/api/users/directory")
+def get_user_directory():
+    """Page of the user directory: ``q`` is a username/nickname prefix or bare initials (ㄱㅊ)."""
+    login_error = require_login()
+    if login_error:
+        return login_error
+    user_id = session["user_id"]
+    query = (request.args.get("q") or "").strip()[:50]
+    limit = request.args.get("limit", type=int)
+    limit = min(max(limit if limit is not None else DIRECTORY_PAGE_DEFAULT, 1), DIRECTORY_PAGE_MAX)
+    offset = request.args.get("offset", type=int)
+    offset = max(offset if offset is not None else 0, 0)
+
+    def _page():
+        users, has_more = search_users(query, limit=limit, offset=offset, exclude_user_id=user_id)
+        return {
+            "users": users,
+            "limit": limit,
+            "offset": offset,
+            "has_more": has_more,
+            "next_offset": offset + len(users) if has_more else None,
+        }
+
+    return conditional_json(get_user_directory_version(user_id), _page)
+
+
+@rooms_bp.get("/api/users/by-ids")
+def get_users_by_ids_route():
+    """Profiles for ``ids=1,2,3`` in request order; unknown ids are omitted."""
+    login_error = require_login()
+    if login_error:
+        return login_error
+    user_ids = []
+    for value in (request.args.get("ids") or "").split(","):
+        value = value.strip()
+        if value.isdigit() and int(value) > 0:
+            user_ids.append(int(value))
+    user_ids = list(dict.fromkeys(user_ids))
+    if len(user_ids) > USERS_BY_IDS_MAX:
+        return jsonify({"error": f"한 번에 최대 {USERS_BY_IDS_MAX}명까지 조회할 수 있습니다."}), 400
+
+    def _users():
+        found = get_users_by_ids(user_ids)
+        return {"users": [found[uid] for uid in user_ids if uid in found]}
+
+    return conditional_json(get_user_directory_version(session["user_id"]), _users)
 
 
 @rooms_bp.get("/api/rooms")
@@ -78,8 +183,14 @@ def get_rooms():
     login_error = require_login()
     if login_error:
         return login_error
+    user_id = session["user_id"]
     include_members = truthy_param(request.args.get("include_members"))
-    return jsonify(get_user_rooms(session["user_id"], include_members=include_members))
+    # unread counts must include this user's read positions still buffered
+    flush_read_receipts(user_id=user_id)
+    return conditional_json(
+        get_room_list_version(user_id, include_members=include_members),
+        lambda: get_user_rooms(user_id, include_members=include_members),
+    )
 
 
 @rooms_bp.post("/api/rooms")
@@ -114,7 +225,7 @@ def create_room_route():
         normalized_members.append(session["user_id"])
         seen.add(session["user_id"])
 
-    member_ids = [uid for uid in normalized_members if get_user_by_id(uid)]
+    member_ids = _existing_user_ids(normalized_members)
     if session["user_id"] not in member_ids:
         member_ids.append(session["user_id"])
 
@@ -155,47 +266,71 @@ def invite_member(room_id: int):
     if user_id:
         user_ids = [user_id]
 
-    candidate_user_ids = []
-    seen = set()
-    for uid in user_ids or []:
-        try:
-            candidate = int(uid)
-        except (TypeError, ValueError):
-            continue
-        if candidate in seen or candidate <= 0:
-            continue
-        seen.add(candidate)
-        if get_user_by_id(candidate) and not is_room_member(room_id, candidate):
-            candidate_user_ids.append(candidate)
-
+    candidate_user_ids = _existing_user_ids(_parse_user_id_list(user_ids) or [])
     if not candidate_user_ids:
         return jsonify({"error": "이미 참여 중인 사용자입니다."}), 400
 
-    rotation = rotate_room_key(room_id)
-    if not rotation:
+    result = apply_room_membership_batch(room_id, add_user_ids=candidate_user_ids)
+    if result is None:
         return jsonify({"error": "방 보안 갱신에 실패했습니다."}), 500
+    if not result["added"]:
+        return jsonify({"error": "이미 참여 중인 사용자입니다."}), 400
 
-    added_user_ids: list[int] = []
-    for invitee_id in candidate_user_ids:
-        if add_room_member(room_id, invitee_id, joined_key_version=rotation["key_version"]):
-            added_user_ids.append(invitee_id)
+    _emit_membership_batch(room_id, result["added"], [])
+    return jsonify({"success": True, "added_count": len(result["added"])})
 
-    if not added_user_ids:
-        current_member_ids = _room_member_ids(room_id)
-        if current_member_ids:
-            emit_room_security_updated(room_id, current_member_ids)
-        return jsonify({"error": "이미 참여 중인 사용자입니다."}), 400
 
-    for invitee_id in added_user_ids:
-        sync_user_room_membership(room_id, invitee_id, joined=True)
-    emit_room_members_updated(room_id)
-    current_member_ids = _room_member_ids(room_id)
-    emit_room_security_updated(room_id, current_member_ids)
-    emit_room_list_updated(added_user_ids, "room_invited")
-    remaining_user_ids = [uid for uid in current_member_ids if uid not in added_user_ids]
-    if remaining_user_ids:
-        emit_room_list_updated(remaining_user_ids, "membership_changed")
-    return jsonify({"success": True, "added_count": len(added_user_ids)})
+@rooms_bp.post("/api/rooms/<int:room_id>/members/batch")
+def batch_update_members(room_id: int):
+    """Apply many invites/kicks with one key rotation and one security push per member."""
+    login_error = require_login()
+    if login_error:
+        return login_error
+    if not is_room_member(room_id, session["user_id"]):
+        return jsonify({"error": "방 접근 권한이 없습니다."}), 403
+
+    data, error_response = parse_json_payload()
+    if error_response:
+        return error_response
+
+    add_user_ids = _parse_user_id_list(data.get("add_user_ids"))
+    remove_user_ids = _parse_user_id_list(data.get("remove_user_ids"))
+    if add_user_ids is None or remove_user_ids is None:
+        return jsonify({"error": "add_user_ids와 remove_user_ids는 배열이어야 합니다."}), 400
+    if not add_user_ids and not remove_user_ids:
+        return jsonify({"error": "변경할 멤버가 없습니다."}), 400
+
+    if remove_user_ids:
+        if not is_room_admin(room_id, session["user_id"]):
+            return jsonify({"error": "관리자만 멤버를 강퇴할 수 있습니다."}), 403
+        if session["user_id"] in remove_user_ids:
+            return jsonify({"error": "자신은 강퇴할 수 없습니다."}), 400
+        if any(is_room_admin(room_id, uid) for uid in remove_user_ids):
+            return jsonify({"error": "관리자는 강퇴할 수 없습니다."}), 403
+
+    add_user_ids = _existing_user_ids([uid for uid in add_user_ids if uid not in remove_user_ids])
+    result = apply_room_membership_batch(room_id, add_user_ids=add_user_ids, remove_user_ids=remove_user_ids)
+    if result is None:
+        return jsonify({"error": "멤버 변경에 실패했습니다."}), 500
+
+    if result["added"] or result["removed"]:
+        _emit_membership_batch(room_id, result["added"], result["removed"])
+    for target_user_id in result["removed"]:
+        log_admin_action(
+            room_id=room_id,
+            actor_user_id=session["user_id"],
+            target_user_id=target_user_id,
+            action="kick_member",
+            metadata={"source": "api_batch"},
+        )
+    return jsonify(
+        {
+            "success": True,
+            "added_user_ids": result["added"],
+            "removed_user_ids": result["removed"],
+            "key_version": result["key_version"],
+        }
+    )
 
 
 @rooms_bp.post("/api/rooms/<int:room_id>/leave")
@@ -320,8 +455,32 @@ def get_online_users_route():
     login_error = require_login()
     if login_error:
         return login_error
-    users = get_online_users()
-    return jsonify([user for user in users if user["id"] != session["user_id"]])
+    user_id = session["user_id"]
+    if "since" not in request.args:
+        return jsonify(_online_user_profiles(user_id))
+
+    # ?since=<version>: only what changed, or reset with the full list
+    version, changes = get_presence_changes_since(request.args.get("since"))
+    if changes is None:
+        return jsonify({"version": version, "reset": True, "changes": [], "users": _online_user_profiles(user_id)})
+    changes = [change for change in changes if change["user_id"] != user_id]
+    came_online = [change["user_id"] for change in changes if change["status"] == "online"]
+    profiles = get_users_by_ids(came_online)
+    return jsonify(
+        {
+            "version": version,
+            "reset": False,
+            "changes": changes,
+            "users": [profiles[uid] for uid in came_online if uid in profiles],
+        }
+    )
+
+
+def _online_user_profiles(exclude_user_id: int) -> list[dict]:
+    """Profiles of everyone in the presence set, by id; no table scan over users.status."""
+    ids = sorted(get_online_user_ids() - {exclude_user_id})
+    profiles = get_users_by_ids(ids)
+    return [profiles[uid] for uid in ids if uid in profiles]
 
 
 @rooms_bp.get("/api/rooms/<int:room_id>/info")
@@ -332,13 +491,18 @@ def get_room_info(room_id: int):
     if not is_room_member(room_id, session["user_id"]):
         return jsonify({"error": "방 접근 권한이 없습니다."}), 403
 
+    etag = get_room_info_version(room_id)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
     room = get_room_by_id(room_id)
     if not room:
         return jsonify({"error": "방을 찾을 수 없습니다."}), 404
 
     room["members"] = get_room_members(room_id)
     room.pop("encryption_key", None)
-    return jsonify(room)
+    return conditional_json(etag, lambda: room)
 
 
 @rooms_bp.get("/api/rooms/<int:room_id>/admins")
@@ -348,7 +512,7 @@ def get_admins(room_id: int):
         return login_error
     if not is_room_member(room_id, session["user_id"]):
         return jsonify({"error": "접근 권한이 없습니다."}), 403
-    return jsonify(get_room_admins(room_id))
+    return conditional_json(get_room_info_version(room_id, "admins"), lambda: get_room_admins(room_id))
 
 
 @rooms_bp.post("/api/rooms/<int:room_id>/admins")
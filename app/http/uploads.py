@@ -6,9 +6,14 @@ Upload, scan-job, file-storage, and download HTTP endpoints.
 from __future__ import annotations
 
 import logging
+import mimetypes
 import os
+import shutil
+import time
+import unicodedata
 import uuid
 from datetime import datetime
+from urllib.parse import quote
 
 from flask import Blueprint, current_app, jsonify, request, send_from_directory, session
 from werkzeug.utils import secure_filename
@@ -26,10 +31,18 @@ from app.models import (
     log_admin_action,
     safe_file_delete,
 )
+from app.services.metrics import UPLOAD_SECONDS
 from app.services.runtime_config import get_max_upload_size
 from app.services.socket_broadcasts import emit_message_deleted, emit_pin_updated
+from app.services.upload_access import get_cached_file_access, get_file_etag, store_file_access
 from app.services.uploads import normalize_stored_path
-from app.upload_scan import get_scan_job
+from app.thumbnails import (
+    THUMBNAIL_VARIANTS,
+    schedule_thumbnails,
+    source_name_from_thumbnail,
+    thumbnail_rel_path,
+)
+from app.upload_scan import build_scan_job_payload, get_scan_job
 from app.upload_tokens import issue_upload_token
 from app.utils import allowed_file, validate_file_header
 
@@ -43,10 +56,24 @@ logger = logging.getLogger(__name__)
 
 uploads_bp = Blueprint("uploads", __name__)
 
+_INLINE_IMAGE_EXTS = {"png", "jpg", "jpeg", "gif", "webp", "bmp", "ico"}
+
 
 @uploads_bp.post("/api/upload")
 @limiter.limit("10 per minute")
 def upload_file():
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        response = _handle_upload()
+        status = response[1] if isinstance(response, tuple) else response.status_code
+        outcome = "ok" if status < 400 else ("rejected" if status < 500 else "error")
+        return response
+    finally:
+        UPLOAD_SECONDS.observe(time.perf_counter() - started, outcome)
+
+
+def _handle_upload():
     login_error = require_login()
     if login_error:
         return login_error
@@ -92,6 +119,48 @@ def upload_file():
 
         temp_rel_path = normalize_stored_path(upload_folder, temp_abs_path)
         final_rel_path = unique_filename.replace("\\", "/")
+
+        verdict_lookup = routes_shim.lookup_cached_scan_verdict(current_app, temp_abs_path)
+        cached_verdict = verdict_lookup.get("verdict") or {}
+        if cached_verdict.get("verdict") == "infected":
+            safe_file_delete(temp_abs_path)
+            logger.warning(f"Upload rejected by cached AV verdict: {filename}")
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "scan_status": "infected",
+                        "error": cached_verdict.get("result") or "악성 코드가 탐지되어 업로드가 차단되었습니다.",
+                    }
+                ),
+                400,
+            )
+        if cached_verdict.get("verdict") == "clean":
+            try:
+                shutil.move(temp_abs_path, os.path.join(upload_folder, final_rel_path))
+            except Exception as exc:
+                logger.error(f"Move cached-clean upload failed: {exc}")
+                safe_file_delete(temp_abs_path)
+                return jsonify({"error": "업로드 준비에 실패했습니다."}), 500
+            upload_token = issue_upload_token(
+                user_id=session["user_id"],
+                room_id=room_id,
+                file_path=final_rel_path,
+                file_name=filename,
+                file_type=file_type,
+                file_size=file_size,
+            )
+            return jsonify(
+                {
+                    "success": True,
+                    "scan_status": "clean",
+                    "scan_cached": True,
+                    "file_path": final_rel_path,
+                    "file_name": filename,
+                    "upload_token": upload_token,
+                }
+            )
+
         try:
             job_id = routes_shim.create_scan_job(
                 user_id=session["user_id"],
@@ -101,6 +170,8 @@ def upload_file():
                 file_name=filename,
                 file_type=file_type,
                 file_size=file_size,
+                content_sha256=verdict_lookup.get("content_sha256"),
+                signature_version=verdict_lookup.get("signature_version"),
             )
         except Exception as exc:
             logger.error(f"Create upload scan job failed: {exc}")
@@ -146,19 +217,117 @@ def get_upload_job_status(job_id: str):
     if int(job.get("user_id") or 0) != int(session["user_id"]):
         return jsonify({"error": "접근 권한이 없습니다."}), 403
 
-    status = (job.get("status") or "pending").lower()
-    payload = {"job_id": job_id, "scan_status": status}
-    if status == "clean":
-        payload.update(
-            {
-                "upload_token": job.get("token"),
-                "file_path": job.get("final_path"),
-                "file_name": job.get("file_name"),
-            }
+    return jsonify(build_scan_job_payload(job))
+
+
+def _authorize_room_file(stored_path: str):
+    """Return ``(room_files row, None)`` if the session user may read the file, else ``(None, error response)``."""
+    user_id = session["user_id"]
+    lookup_path = stored_path.replace("\\", "/")
+    cached = get_cached_file_access(user_id, lookup_path)
+    if cached is not None:
+        return cached, None
+
+    try:
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT room_id, file_name, message_id FROM room_files WHERE file_path = ? ORDER BY id DESC LIMIT 1",
+            (lookup_path,),
         )
-    elif status in ("infected", "error"):
-        payload.update({"error": job.get("result") or "스캔 실패"})
-    return jsonify(payload)
+        row = cursor.fetchone()
+    except Exception as exc:
+        logger.warning(f"Upload auth lookup failed: {exc}")
+        row = None
+
+    if not row:
+        return None, (jsonify({"error": "파일을 찾을 수 없습니다."}), 404)
+    room_id = row["room_id"]
+    if not is_room_member(room_id, user_id):
+        return None, (jsonify({"error": "접근 권한이 없습니다."}), 403)
+    message_id = row["message_id"]
+    if message_id and not can_user_see_message(room_id, user_id, int(message_id)):
+        return None, (jsonify({"error": "접근 권한이 없습니다."}), 403)
+
+    allowed = {"room_id": room_id, "file_name": row["file_name"], "message_id": message_id}
+    store_file_access(
+        user_id,
+        lookup_path,
+        allowed,
+        float(current_app.config.get("UPLOAD_AUTHZ_CACHE_SECONDS", 30) or 0),
+    )
+    return allowed, None
+
+
+def _content_disposition_options(download_name: str) -> dict:
+    try:
+        download_name.encode("ascii")
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", download_name).encode("ascii", "ignore").decode("ascii")
+        return {"filename": simple, "filename*": f"UTF-8''{quote(download_name, safe='!#$&+-.^_`|~')}"}
+    return {"filename": download_name}
+
+
+def _offloaded_file_response(full_path: str, stored_path: str, etag: str, as_attachment: bool, download_name: str):
+    """Let the front proxy stream the file (nginx ``X-Accel-Redirect`` / Apache ``X-Sendfile``).
+
+    The proxy handles Range requests itself; the app only answers authorization and
+    If-None-Match. Returns ``None`` when offload is not configured.
+    """
+    mode = str(current_app.config.get("UPLOAD_SENDFILE_MODE") or "").lower()
+    if mode not in ("x-accel", "x-sendfile"):
+        return None
+
+    response = current_app.response_class(status=200)
+    response.mimetype = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    response.set_etag(etag)
+    response.make_conditional(request.environ)
+    if response.status_code == 304:
+        return response
+
+    if mode == "x-accel":
+        prefix = str(current_app.config.get("UPLOAD_ACCEL_REDIRECT_PREFIX") or "/_protected_uploads/")
+        response.headers["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + quote(stored_path.replace("\\", "/"))
+    else:
+        response.headers["X-Sendfile"] = full_path
+    if as_attachment:
+        response.headers.set("Content-Disposition", "attachment", **_content_disposition_options(download_name))
+    return response
+
+
+@uploads_bp.get("/uploads/thumbs/<variant>/<name>")
+def uploaded_thumbnail(variant: str, name: str):
+    login_error = require_login()
+    if login_error:
+        return login_error
+
+    source_name = source_name_from_thumbnail(secure_filename(name))
+    if variant not in THUMBNAIL_VARIANTS or not source_name:
+        return jsonify({"error": "파일을 찾을 수 없습니다."}), 404
+    if os.path.splitext(source_name)[1].lower().lstrip(".") not in _INLINE_IMAGE_EXTS:
+        return jsonify({"error": "파일을 찾을 수 없습니다."}), 404
+
+    _row, auth_error = _authorize_room_file(source_name)
+    if auth_error:
+        return auth_error
+
+    upload_folder = os.path.realpath(current_app.config.get("UPLOAD_FOLDER", UPLOAD_FOLDER))
+    thumb_path = os.path.join(upload_folder, thumbnail_rel_path(source_name, variant))
+    if os.path.isfile(thumb_path):
+        response = send_from_directory(os.path.dirname(thumb_path), os.path.basename(thumb_path))
+        # 썸네일 이름은 고유한 원본 경로에서 파생되고 재작성되지 않으므로 영구 캐시 가능
+        response.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+        return response
+
+    # 아직 생성되지 않았거나(비동기 처리 중) 과거 업로드인 경우: 생성 예약 후 원본으로 대체
+    source_path = os.path.join(upload_folder, source_name)
+    if not os.path.isfile(source_path):
+        return jsonify({"error": "파일을 찾을 수 없습니다."}), 404
+    schedule_thumbnails(source_name, upload_folder=upload_folder)
+    response = send_from_directory(upload_folder, source_name)
+    response.headers["Cache-Control"] = "private, no-store"
+    response.headers["Content-Disposition"] = "inline"
+    return response
 
 
 @uploads_bp.get("/uploads/<path:filename>")
@@ -195,41 +364,30 @@ def uploaded_file(filename: str):
 
     download_name = safe_filename
     if not is_profile:
-        try:
-            conn = get_db()
-            cursor = conn.cursor()
-            lookup_path = safe_path.replace("\\", "/")
-            cursor.execute(
-                "SELECT room_id, file_name, message_id FROM room_files WHERE file_path = ? ORDER BY id DESC LIMIT 1",
-                (lookup_path,),
-            )
-            row = cursor.fetchone()
-        except Exception as exc:
-            logger.warning(f"Upload auth lookup failed: {exc}")
-            row = None
-
-        if not row:
-            return jsonify({"error": "파일을 찾을 수 없습니다."}), 404
-        room_id = row["room_id"]
+        row, auth_error = _authorize_room_file(safe_path)
+        if auth_error:
+            return auth_error
         download_name = row["file_name"] or download_name
-        if not is_room_member(room_id, session["user_id"]):
-            return jsonify({"error": "접근 권한이 없습니다."}), 403
-        message_id = row["message_id"]
-        if message_id and not can_user_see_message(room_id, session["user_id"], int(message_id)):
-            return jsonify({"error": "접근 권한이 없습니다."}), 403
 
     ext = os.path.splitext(safe_filename)[1].lower().lstrip(".")
-    inline_exts = {"png", "jpg", "jpeg", "gif", "webp", "bmp", "ico"}
-    as_attachment = (not is_profile) and (ext not in inline_exts)
-    response = send_from_directory(
-        os.path.dirname(full_path),
-        os.path.basename(full_path),
-        as_attachment=as_attachment,
-        download_name=download_name if as_attachment else None,
-    )
-    response.headers["Cache-Control"] = "private, max-age=3600" if is_profile else "private, no-store"
+    as_attachment = (not is_profile) and (ext not in _INLINE_IMAGE_EXTS)
+    etag = get_file_etag(full_path)
+    # 파일 메타데이터(크기·mtime·inode) ETag로 재검증(304)만 허용, 내용 해시는 아님; 권한 확인을 위해 no-cache 유지
+    cache_control = "private, max-age=3600" if is_profile else "private, no-cache"
+
+    response = _offloaded_file_response(full_path, safe_path, etag, as_attachment, download_name)
+    if response is None:
+        response = send_from_directory(
+            os.path.dirname(full_path),
+            os.path.basename(full_path),
+            as_attachment=as_attachment,
+            download_name=download_name if as_attachment else None,
+            etag=etag,
+            conditional=True,
+        )
+    response.headers["Cache-Control"] = cache_control
     response.headers["Vary"] = "Accept-Encoding"
-    if not as_attachment and ext in inline_exts:
+    if not as_attachment and ext in _INLINE_IMAGE_EXTS:
         response.headers["Content-Disposition"] = "inline"
     return response
 
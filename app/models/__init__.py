@@ -22,6 +22,8 @@ from app.models.base import (
     cleanup_old_access_logs,
     cleanup_empty_rooms,
     cleanup_retention_data,
+    cleanup_message_changes,
+    configure_query_profiling,
 )
 
 # Users - 사용자 관리
@@ -32,9 +34,13 @@ from app.models.users import (
     get_user_by_id_cached,
     invalidate_user_cache,
     get_all_users,
+    search_users,
+    get_users_by_ids,
     update_user_status,
+    set_user_statuses,
     update_user_profile,
     get_online_users,
+    get_users_marked_online,
     log_access,
     change_password,
     get_user_session_token,
@@ -49,10 +55,14 @@ from app.models.rooms import (
     get_room_keyring,
     get_room_member_key_version,
     get_room_security_bundle,
+    get_room_security_bundles,
     get_user_rooms,
     get_room_members,
+    get_room_peer_ids,
+    get_member_room_ids,
     is_room_member,
     add_room_member,
+    apply_room_membership_batch,
     leave_room_db,
     rotate_room_key,
     update_room_name,
@@ -70,8 +80,11 @@ from app.models.messages import (
     create_message,
     get_room_messages,
     update_last_read,
+    update_last_read_batch,
     get_unread_count,
     get_room_last_reads,
+    get_room_message_delta,
+    get_message_change_watermark,
     get_message_room_id,
     can_user_see_message,
     delete_message,
@@ -117,24 +130,34 @@ from app.models.admin_audit import (
     log_admin_action,
     get_admin_audit_logs,
 )
+
+# Conditional GET version tags
+from app.models.versions import (
+    get_room_list_version,
+    get_user_directory_version,
+    get_room_info_version,
+)
 
 __all__ = [
     # Base
     'get_db', 'close_thread_db', 'get_db_context', 'init_db', 'safe_file_delete',
     'close_expired_polls', 'cleanup_old_access_logs', 'cleanup_empty_rooms', 'cleanup_retention_data',
+    'cleanup_message_changes', 'configure_query_profiling',
     # Users
     'create_user', 'authenticate_user', 'get_user_by_id', 'get_user_by_id_cached',
-    'invalidate_user_cache', 'get_all_users', 'update_user_status', 'update_user_profile',
-    'get_online_users', 'log_access', 'change_password', 'get_user_session_token', 'get_or_create_oidc_user', 'delete_user',
+    'invalidate_user_cache', 'get_all_users', 'search_users', 'get_users_by_ids', 'update_user_status', 'set_user_statuses', 'update_user_profile',
+    'get_online_users', 'get_users_marked_online', 'log_access', 'change_password', 'get_user_session_token', 'get_or_create_oidc_user', 'delete_user',
     # Rooms
     'create_room', 'get_room_key', 'get_room_keyring', 'get_room_member_key_version', 'get_room_security_bundle',
-    'get_user_rooms', 'get_room_members',
-    'is_room_member', 'add_room_member', 'leave_room_db', 'rotate_room_key', 'update_room_name',
+    'get_room_security_bundles', 'get_user_rooms', 'get_room_members', 'get_room_peer_ids', 'get_member_room_ids',
+    'is_room_member', 'add_room_member', 'apply_room_membership_batch', 'leave_room_db', 'rotate_room_key',
+    'update_room_name',
     'get_room_by_id', 'pin_room', 'mute_room', 'kick_member',
     'set_room_admin', 'is_room_admin', 'get_room_admins',
     # Messages
-    'create_message', 'get_room_messages', 'update_last_read', 'get_unread_count',
+    'create_message', 'get_room_messages', 'update_last_read', 'update_last_read_batch', 'get_unread_count',
     'get_room_last_reads', 'get_message_room_id', 'can_user_see_message', 'delete_message', 'edit_message',
+    'get_room_message_delta', 'get_message_change_watermark',
     'search_messages', 'advanced_search', 'pin_message', 'unpin_message', 'get_pinned_messages',
     'server_stats', 'update_server_stats', 'get_server_stats',
     # Polls
@@ -146,4 +169,6 @@ __all__ = [
     'get_message_reactions', 'get_messages_reactions',
     # Admin audit
     'log_admin_action', 'get_admin_audit_logs',
+    # Version tags
+    'get_room_list_version', 'get_user_directory_version', 'get_room_info_version',
 ]
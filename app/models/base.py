@@ -12,6 +12,9 @@ from contextlib import contextmanager
 from datetime import datetime, timedelta
 from typing import Iterator
 
+from app.services import metrics, query_profiler
+from app.services.hangul import hangul_initials
+
 # config 임포트 (PyInstaller 호환)
 try:
     from config import DATABASE_PATH, UPLOAD_FOLDER, RETENTION_DAYS
@@ -38,14 +41,76 @@ class _ConnectionLocal(threading.local):
 _db_local = _ConnectionLocal()
 
 
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that times every statement's ``execute`` for the per-verb latency metric."""
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._record(sql, parameters, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._record(sql, None, time.perf_counter() - started)
+
+    def _record(self, sql, parameters, elapsed_s):
+        query_profiler.observe_query(sql, elapsed_s)
+
+
+class ProfiledCursor(TimedCursor):
+    """Cursor that reports every statement's ``execute`` time to the query profiler."""
+
+    def _record(self, sql, parameters, elapsed_s):
+        query_profiler.record_query(self.connection, sql, parameters, elapsed_s)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors (including ``conn.execute`` shortcuts) are :class:`TimedCursor`."""
+
+    cursor_class = TimedCursor
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or self.cursor_class)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ProfiledConnection(TimedConnection):
+    """Connection whose cursors are :class:`ProfiledCursor`."""
+
+    cursor_class = ProfiledCursor
+
+
+def _connection_class() -> type[sqlite3.Connection]:
+    if query_profiler.is_enabled():
+        return ProfiledConnection
+    # the always-on latency metric costs one timer per statement; none at all with metrics off
+    return TimedConnection if metrics.is_enabled() else sqlite3.Connection
+
+
+def configure_query_profiling(enabled: bool, slow_query_ms: float | None = None) -> None:
+    """Switch statement profiling; each thread's connection is reopened with the matching class on its next ``get_db()``."""
+    query_profiler.configure(enabled, slow_query_ms)
+
+
 def _create_connection() -> sqlite3.Connection:
     """새 데이터베이스 연결 생성 (재시도 로직 포함)"""
     max_retries = 3
     retry_delay = 0.1
+    factory = _connection_class()
     
     for attempt in range(max_retries):
         try:
-            conn = sqlite3.connect(DATABASE_PATH, timeout=30, check_same_thread=False)
+            conn = sqlite3.connect(DATABASE_PATH, timeout=30, check_same_thread=False, factory=factory)
             conn.row_factory = sqlite3.Row
             
             # 성능 최적화 설정
@@ -72,9 +137,14 @@ def get_db() -> sqlite3.Connection:
     """데이터베이스 연결 - 스레드별 연결 재사용 (성능 최적화)"""
     if _db_local.connection is None:
         _db_local.connection = _create_connection()
+    elif type(_db_local.connection) is not _connection_class():
+        # profiling or metrics were switched since this thread connected
+        close_thread_db()
+        _db_local.connection = _create_connection()
     else:
         try:
-            _db_local.connection.execute('SELECT 1')
+            # unprofiled: the liveness probe would otherwise top every profile
+            sqlite3.Connection.execute(_db_local.connection, 'SELECT 1')
         except (sqlite3.ProgrammingError, sqlite3.OperationalError):
             try:
                 if _db_local.connection is not None:
@@ -133,6 +203,101 @@ def safe_file_delete(file_path: str, max_retries: int = 3) -> bool:
     return False
 
 
+def _bump_version_sql(scope: str, id_expr: str) -> str:
+    return (
+        f"INSERT INTO change_versions(scope, scope_id, version) VALUES ('{scope}', {id_expr}, 1) "
+        "ON CONFLICT(scope, scope_id) DO UPDATE SET version = version + 1;"
+    )
+
+
+def _create_change_version_triggers(cursor) -> None:
+    """Triggers feeding ``change_versions``.
+
+    Scopes: ``room`` (anything every member sees in the room list: messages, room row,
+    membership, roles), ``room_members`` (any member row change, incl. read positions),
+    ``user_rooms`` (a user's own member rows: read position, pin, mute, join/leave),
+    ``user`` (one user's public profile), ``directory`` (scope_id 0, any public profile)
+    and ``presence`` (one user's online status, kept out of ``user``/``directory`` so
+    connect/disconnect churn does not invalidate the directory).
+    """
+    triggers = {
+        "change_versions_message_ai": (
+            "AFTER INSERT ON messages",
+            [_bump_version_sql("room", "new.room_id")],
+        ),
+        "change_versions_message_au": (
+            "AFTER UPDATE ON messages",
+            [_bump_version_sql("room", "new.room_id")],
+        ),
+        "change_versions_message_ad": (
+            "AFTER DELETE ON messages",
+            [_bump_version_sql("room", "old.room_id")],
+        ),
+        "change_versions_room_au": (
+            "AFTER UPDATE ON rooms",
+            [_bump_version_sql("room", "new.id")],
+        ),
+        "change_versions_room_ad": (
+            "AFTER DELETE ON rooms",
+            [_bump_version_sql("room", "old.id")],
+        ),
+        "change_versions_member_ai": (
+            "AFTER INSERT ON room_members",
+            [
+                _bump_version_sql("room", "new.room_id"),
+                _bump_version_sql("room_members", "new.room_id"),
+                _bump_version_sql("user_rooms", "new.user_id"),
+            ],
+        ),
+        "change_versions_member_ad": (
+            "AFTER DELETE ON room_members",
+            [
+                _bump_version_sql("room", "old.room_id"),
+                _bump_version_sql("room_members", "old.room_id"),
+                _bump_version_sql("user_rooms", "old.user_id"),
+            ],
+        ),
+        "change_versions_member_au": (
+            "AFTER UPDATE ON room_members",
+            [
+                _bump_version_sql("room_members", "new.room_id"),
+                _bump_version_sql("user_rooms", "new.user_id"),
+            ],
+        ),
+        # role/key generation show up in every member's room list, read positions do not
+        "change_versions_member_role_au": (
+            "AFTER UPDATE OF role, joined_key_version ON room_members "
+            "WHEN old.role IS NOT new.role OR old.joined_key_version IS NOT new.joined_key_version",
+            [_bump_version_sql("room", "new.room_id")],
+        ),
+        "change_versions_user_ai": (
+            "AFTER INSERT ON users",
+            [_bump_version_sql("user", "new.id"), _bump_version_sql("directory", "0")],
+        ),
+        "change_versions_user_ad": (
+            "AFTER DELETE ON users",
+            [_bump_version_sql("user", "old.id"), _bump_version_sql("directory", "0")],
+        ),
+        # session tokens / password hashes are not part of any listing
+        "change_versions_user_au": (
+            "AFTER UPDATE OF username, nickname, profile_image, status_message ON users "
+            "WHEN old.username IS NOT new.username OR old.nickname IS NOT new.nickname "
+            "OR old.profile_image IS NOT new.profile_image "
+            "OR old.status_message IS NOT new.status_message",
+            [_bump_version_sql("user", "new.id"), _bump_version_sql("directory", "0")],
+        ),
+        "change_versions_user_status_au": (
+            "AFTER UPDATE OF status ON users WHEN old.status IS NOT new.status",
+            [_bump_version_sql("presence", "new.id")],
+        ),
+    }
+    for name, (event, statements) in triggers.items():
+        body = "\n".join(statements)
+        # recreated on every start so existing databases pick up changed trigger bodies
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(f"CREATE TRIGGER {name} {event} BEGIN\n{body}\nEND;")
+
+
 def init_db():
     """데이터베이스 초기화"""
     global _db_initialized
@@ -367,6 +532,20 @@ def init_db():
             )
         ''')
 
+        # Upload AV verdict cache (identical content + same signatures => same verdict)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS upload_scan_verdicts (
+                content_sha256 TEXT NOT NULL,
+                signature_version TEXT NOT NULL,
+                verdict TEXT NOT NULL CHECK(verdict IN ('clean', 'infected')),
+                result TEXT,
+                hit_count INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (content_sha256, signature_version)
+            )
+        ''')
+
         # Structured admin audit log table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS admin_audit_logs (
@@ -383,6 +562,30 @@ def init_db():
             )
         ''')
         
+        # Change journal for client delta sync (edits, deletes, reaction changes).
+        # New messages are found by id; this only records rows that changed after insert.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS message_changes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                room_id INTEGER NOT NULL,
+                message_id INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        # Holds a row only inside a bulk maintenance delete, whose rows the journal triggers skip.
+        cursor.execute('CREATE TABLE IF NOT EXISTS message_changes_paused (id INTEGER PRIMARY KEY)')
+        
+        # Change counters for conditional GETs (ETag/304 on room list, directory, room info).
+        # Maintained by triggers so every write path bumps them; readers only do keyed lookups.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS change_versions (
+                scope TEXT NOT NULL,
+                scope_id INTEGER NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (scope, scope_id)
+            ) WITHOUT ROWID
+        ''')
+        
         # Auto-migration
         required_columns = {
             'rooms': {
@@ -390,7 +593,8 @@ def init_db():
             },
             'users': {
                 'status_message': 'TEXT',
-                'session_token': 'TEXT'
+                'session_token': 'TEXT',
+                'nickname_initials': 'TEXT'
             },
             'room_members': {
                 'role': 'TEXT DEFAULT "member"',
@@ -402,6 +606,10 @@ def init_db():
             'messages': {
                 'reply_to': 'INTEGER',
                 'key_version': 'INTEGER DEFAULT 1'
+            },
+            'upload_scan_jobs': {
+                'content_sha256': 'TEXT',
+                'signature_version': 'TEXT'
             }
         }
 
@@ -429,6 +637,14 @@ def init_db():
             ''')
         except Exception as e:
             logger.error(f"Key version backfill failed: {e}")
+
+        try:
+            cursor.execute("SELECT id, nickname FROM users WHERE nickname_initials IS NULL AND nickname IS NOT NULL")
+            pending = [(hangul_initials(row[1]), row[0]) for row in cursor.fetchall()]
+            if pending:
+                cursor.executemany("UPDATE users SET nickname_initials = ? WHERE id = ?", pending)
+        except Exception as e:
+            logger.error(f"Nickname initials backfill failed: {e}")
         
         # 인덱스 생성
         try:
@@ -446,10 +662,50 @@ def init_db():
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_room_keys_room_version ON room_keys(room_id, version)')
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_status ON users(status)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_session_token ON users(session_token)")
+            # NOCASE so directory prefix LIKE queries can range-scan these
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_username_nocase ON users(username COLLATE NOCASE)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_nickname_nocase ON users(nickname COLLATE NOCASE)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_nickname_initials ON users(nickname_initials COLLATE NOCASE)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_sso_provider_subject ON sso_identities(provider, subject)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_upload_scan_jobs_status ON upload_scan_jobs(status)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_upload_scan_jobs_user ON upload_scan_jobs(user_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_upload_scan_verdicts_updated ON upload_scan_verdicts(updated_at)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_admin_audit_logs_room_created ON admin_audit_logs(room_id, created_at DESC)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_message_changes_room_id ON message_changes(room_id, id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_message_changes_created_at ON message_changes(created_at)")
+
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS message_changes_au
+                AFTER UPDATE OF content, encrypted, key_version, file_path, file_name ON messages BEGIN
+                    INSERT INTO message_changes(room_id, message_id) VALUES (new.room_id, new.id);
+                END;
+            """)
+            # recreated so existing databases pick up the pause check
+            cursor.execute("DROP TRIGGER IF EXISTS message_changes_ad")
+            cursor.execute("""
+                CREATE TRIGGER message_changes_ad
+                AFTER DELETE ON messages WHEN NOT EXISTS (SELECT 1 FROM message_changes_paused) BEGIN
+                    INSERT INTO message_changes(room_id, message_id) VALUES (old.room_id, old.id);
+                END;
+            """)
+            cursor.execute("DROP TRIGGER IF EXISTS message_changes_reaction_ai")
+            cursor.execute("""
+                CREATE TRIGGER message_changes_reaction_ai
+                AFTER INSERT ON message_reactions WHEN NOT EXISTS (SELECT 1 FROM message_changes_paused) BEGIN
+                    INSERT INTO message_changes(room_id, message_id)
+                    SELECT room_id, id FROM messages WHERE id = new.message_id;
+                END;
+            """)
+            cursor.execute("DROP TRIGGER IF EXISTS message_changes_reaction_ad")
+            cursor.execute("""
+                CREATE TRIGGER message_changes_reaction_ad
+                AFTER DELETE ON message_reactions WHEN NOT EXISTS (SELECT 1 FROM message_changes_paused) BEGIN
+                    INSERT INTO message_changes(room_id, message_id)
+                    SELECT room_id, id FROM messages WHERE id = old.message_id;
+                END;
+            """)
+
+            _create_change_version_triggers(cursor)
 
             # Full-text search (FTS5) for plaintext (encrypted=0) text/system messages.
             # If this SQLite build doesn't support FTS5, skip silently.
@@ -577,6 +833,48 @@ def cleanup_old_access_logs(days_to_keep=90):
         close_thread_db()
 
 
+def pause_message_changes(cursor):
+    """Stop journaling message deletes/reactions until ``resume_message_changes``.
+
+    Both calls must sit in the same transaction as the bulk delete: the flag row is
+    never committed, so other connections keep journaling.
+    """
+    cursor.execute('INSERT INTO message_changes_paused DEFAULT VALUES')
+
+
+def resume_message_changes(cursor):
+    cursor.execute('DELETE FROM message_changes_paused')
+
+
+def reset_message_changes(cursor):
+    """Empty the journal past its current head so every client watermark reloads."""
+    # the placeholder advances the id sequence even when the journal is already empty
+    cursor.execute('INSERT INTO message_changes(room_id, message_id) VALUES (0, 0)')
+    cursor.execute('DELETE FROM message_changes')
+
+
+def cleanup_message_changes(days_to_keep: int = 14):
+    """Prune the delta-sync change journal; older client watermarks fall back to a full reload."""
+    if days_to_keep <= 0:
+        return 0
+
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        cutoff_date = (datetime.now() - timedelta(days=days_to_keep)).strftime('%Y-%m-%d %H:%M:%S')
+        cursor.execute('DELETE FROM message_changes WHERE created_at < ?', (cutoff_date,))
+        count = cursor.rowcount
+        conn.commit()
+        if count > 0:
+            logger.info(f"Pruned {count} message change journal rows")
+        return count
+    except Exception as e:
+        logger.error(f"Cleanup message changes error: {e}")
+        return 0
+    finally:
+        close_thread_db()
+
+
 def cleanup_retention_data(days_to_keep: int):
     """Apply retention policy to message/file data."""
     if days_to_keep <= 0:
@@ -604,8 +902,13 @@ def cleanup_retention_data(days_to_keep: int):
         if old_msg_ids:
             placeholders = ",".join(["?"] * len(old_msg_ids))
             cursor.execute(f'DELETE FROM pinned_messages WHERE message_id IN ({placeholders})', old_msg_ids)
+            # one journal row per purged message would flood message_changes; clients reload instead
+            pause_message_changes(cursor)
             cursor.execute(f'DELETE FROM messages WHERE id IN ({placeholders})', old_msg_ids)
             deleted_messages = cursor.rowcount
+            resume_message_changes(cursor)
+            if deleted_messages:
+                reset_message_changes(cursor)
 
         conn.commit()
         if deleted_messages or deleted_files:
@@ -636,6 +939,8 @@ def cleanup_empty_rooms():
         if not empty_rooms:
             return 0
         
+        # no members left to sync these rooms, so their deletes are not journaled
+        pause_message_changes(cursor)
         for room_id in empty_rooms:
             cursor.execute('SELECT file_path FROM room_files WHERE room_id = ?', (room_id,))
             files = cursor.fetchall()
@@ -648,6 +953,7 @@ def cleanup_empty_rooms():
             cursor.execute('DELETE FROM polls WHERE room_id = ?', (room_id,))
             cursor.execute('DELETE FROM room_files WHERE room_id = ?', (room_id,))
             cursor.execute('DELETE FROM rooms WHERE id = ?', (room_id,))
+        resume_message_changes(cursor)
         
         conn.commit()
         logger.info(f"Cleaned up {len(empty_rooms)} empty rooms: {empty_rooms}")
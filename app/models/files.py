@@ -34,7 +34,12 @@ def add_room_file(
             (room_id, uploaded_by, file_path, file_name, file_size, file_type, message_id),
         )
         conn.commit()
-        return cursor.lastrowid
+        file_id = cursor.lastrowid
+        if file_type == 'image':
+            from app.thumbnails import schedule_thumbnails
+
+            schedule_thumbnails(file_path)
+        return file_id
     except Exception as exc:
         logger.error(f"Add room file error: {exc}")
         return None
@@ -76,7 +81,9 @@ def get_room_files(room_id: int, file_type: str | None = None, viewer_user_id: i
             ''',
             join_params + where_params,
         )
-        return [dict(file_row) for file_row in cursor.fetchall()]
+        from app.thumbnails import attach_thumbnail_urls
+
+        return [attach_thumbnail_urls(dict(file_row), type_key='file_type') for file_row in cursor.fetchall()]
     except Exception as exc:
         logger.error(f"Get room files error: {exc}")
         return []
@@ -123,7 +123,15 @@ def create_message(
         message = cursor.fetchone()
 
         update_server_stats('total_messages')
-        return dict(message) if message else None
+        if not message:
+            return None
+        message = dict(message)
+        if message_type == 'image' and file_path:
+            from app.thumbnails import attach_thumbnail_urls, schedule_thumbnails
+
+            schedule_thumbnails(file_path)
+            attach_thumbnail_urls(message)
+        return message
     except Exception as exc:
         try:
             conn.rollback()
@@ -133,8 +141,17 @@ def create_message(
         return None
 
 
-def get_room_messages(room_id, viewer_user_id=None, limit=50, before_id=None, include_reactions=True):
+def get_room_messages(
+    room_id,
+    viewer_user_id=None,
+    limit=50,
+    before_id=None,
+    include_reactions=True,
+    after_id=None,
+    message_ids=None,
+):
     from app.models.reactions import get_messages_reactions
+    from app.thumbnails import attach_thumbnail_urls
 
     conn = get_db()
     cursor = conn.cursor()
@@ -169,7 +186,17 @@ def get_room_messages(room_id, viewer_user_id=None, limit=50, before_id=None, in
         if before_id:
             conditions.append('m.id < ?')
             where_params.append(before_id)
+        if after_id is not None:
+            conditions.append('m.id > ?')
+            where_params.append(after_id)
+        if message_ids is not None:
+            if not message_ids:
+                return []
+            conditions.append(f"m.id IN ({','.join(['?'] * len(message_ids))})")
+            where_params.extend(message_ids)
         conditions.append(_HIDDEN_DELETED_ATTACHMENT_WHERE)
+        # after_id pages forward from a known message; everything else pages back from the newest
+        order = 'ASC' if after_id is not None else 'DESC'
 
         cursor.execute(
             f'''
@@ -179,13 +206,15 @@ def get_room_messages(room_id, viewer_user_id=None, limit=50, before_id=None, in
                 FROM messages m
                 {' '.join(joins)}
                 WHERE {' AND '.join(conditions)}
-                ORDER BY m.id DESC
+                ORDER BY m.id {order}
                 LIMIT ?
             ''',
             join_params + where_params + [limit],
         )
         messages = cursor.fetchall()
-        message_list = [dict(row) for row in reversed(messages)]
+        if order == 'DESC':
+            messages = reversed(messages)
+        message_list = [attach_thumbnail_urls(dict(row)) for row in messages]
 
         if include_reactions and message_list:
             message_ids = [message['id'] for message in message_list]
@@ -199,6 +228,88 @@ def get_room_messages(room_id, viewer_user_id=None, limit=50, before_id=None, in
         return []
 
 
+def get_message_change_watermark(cursor=None) -> tuple[int, int]:
+    """Return ``(latest_change_id, pruned_up_to)`` for the ``message_changes`` journal."""
+    if cursor is None:
+        cursor = get_db().cursor()
+    try:
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'message_changes'")
+        row = cursor.fetchone()
+        latest = int(row[0]) if row else 0
+        cursor.execute('SELECT MIN(id) FROM message_changes')
+        oldest = cursor.fetchone()[0]
+    except Exception as exc:
+        logger.error(f"Get message change watermark error: {exc}")
+        return 0, 0
+    # ids are assigned contiguously, so everything below the oldest surviving row was pruned
+    pruned_up_to = int(oldest) - 1 if oldest is not None else latest
+    return latest, pruned_up_to
+
+
+def get_room_message_delta(room_id, viewer_user_id, after_id, after_change, limit=200, max_changes=500):
+    """
+    Messages a client holding ``(after_id, after_change)`` is missing.
+
+    Returns new messages (``id > after_id``), current rows for messages edited, deleted or
+    re-reacted since ``after_change`` (``updated``/``removed_ids``, limited to ids the client
+    already has) and the watermark to store next. ``reset`` means the journal no longer
+    covers the client's watermark and it should reload the room from scratch.
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        # Read the journal position first: changes racing this call are re-sent next time, never lost.
+        latest_change, pruned_up_to = get_message_change_watermark(cursor)
+        watermark = {'message_id': after_id, 'change_id': latest_change}
+        result = {
+            'messages': [],
+            'updated': [],
+            'removed_ids': [],
+            'watermark': watermark,
+            'has_more': False,
+            'reset': False,
+        }
+        if after_change < pruned_up_to or after_change > latest_change:
+            result['reset'] = True
+            return result
+
+        cursor.execute(
+            '''
+                SELECT DISTINCT message_id FROM message_changes
+                WHERE room_id = ? AND id > ? AND id <= ? AND message_id <= ?
+                LIMIT ?
+            ''',
+            (room_id, after_change, latest_change, after_id, max_changes + 1),
+        )
+        changed_ids = [row[0] for row in cursor.fetchall()]
+        if len(changed_ids) > max_changes:
+            result['reset'] = True
+            return result
+
+        messages = get_room_messages(room_id, viewer_user_id=viewer_user_id, limit=limit + 1, after_id=after_id)
+        if len(messages) > limit:
+            messages = messages[:limit]
+            result['has_more'] = True
+        if messages:
+            watermark['message_id'] = messages[-1]['id']
+        result['messages'] = messages
+
+        if changed_ids:
+            updated = get_room_messages(
+                room_id,
+                viewer_user_id=viewer_user_id,
+                limit=len(changed_ids),
+                message_ids=changed_ids,
+            )
+            visible = {message['id'] for message in updated}
+            result['updated'] = updated
+            result['removed_ids'] = sorted(message_id for message_id in changed_ids if message_id not in visible)
+        return result
+    except Exception as exc:
+        logger.error(f"Get room message delta error: {exc}")
+        return None
+
+
 def update_last_read(room_id, user_id, message_id):
     conn = get_db()
     cursor = conn.cursor()
@@ -215,6 +326,35 @@ def update_last_read(room_id, user_id, message_id):
         logger.error(f"Update last read error: {exc}")
 
 
+def update_last_read_batch(positions) -> int | None:
+    """Advance many (room_id, user_id, message_id) read positions in one transaction.
+
+    Returns the rows advanced, or None if the write failed and was rolled back.
+    """
+    rows = [(message_id, room_id, user_id, message_id) for room_id, user_id, message_id in positions]
+    if not rows:
+        return 0
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(
+            '''
+                UPDATE room_members SET last_read_message_id = ?
+                WHERE room_id = ? AND user_id = ? AND last_read_message_id < ?
+            ''',
+            rows,
+        )
+        conn.commit()
+        return max(0, cursor.rowcount)
+    except Exception as exc:
+        logger.error(f"Update last read batch error: {exc}")
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        return None
+
+
 def get_unread_count(room_id, message_id, sender_id=None):
     conn = get_db()
     cursor = conn.cursor()
@@ -7,12 +7,23 @@ from __future__ import annotations
 
 import logging
 import sqlite3
+import threading
+from collections import OrderedDict
 
 from app.models.base import get_db
+from app.services.metrics import record_cache
+from app.services.upload_access import invalidate_file_access
 from app.utils import E2ECrypto
 
 logger = logging.getLogger(__name__)
 
+# Decrypted keyrings keyed by room_id; each entry is tagged with the room's current
+# (key_version, encrypted current key) so a rotation in this or another process,
+# or a different database, is detected by the cheap rooms lookup alone.
+_KEYRING_CACHE_MAX_ROOMS = 2048
+_keyring_cache_lock = threading.Lock()
+_keyring_cache: "OrderedDict[int, tuple[int, str, dict[str, str]]]" = OrderedDict()
+
 _HIDDEN_DELETED_ATTACHMENT_WHERE = "NOT (m.message_type IN ('file', 'image') AND m.file_path IS NULL AND m.content = '[삭제된 메시지]')"
 
 
@@ -49,6 +60,56 @@ def _get_room_key_version(cursor, room_id: int) -> int:
     return int((row['key_version'] if row else 1) or 1)
 
 
+def invalidate_room_keyring_cache(room_id: int | None = None) -> None:
+    with _keyring_cache_lock:
+        if room_id is None:
+            _keyring_cache.clear()
+        else:
+            _keyring_cache.pop(int(room_id), None)
+
+
+def _load_room_keyring(cursor, room_id: int) -> tuple[int, dict[str, str]] | None:
+    """Return ``(current_version, {version: raw_key})`` for every stored key version."""
+    cursor.execute(
+        'SELECT COALESCE(key_version, 1) AS key_version, encryption_key FROM rooms WHERE id = ?',
+        (room_id,),
+    )
+    room = cursor.fetchone()
+    if not room:
+        return None
+    current_version = int(room['key_version'] or 1)
+    current_encrypted = room['encryption_key'] or ''
+
+    with _keyring_cache_lock:
+        cached = _keyring_cache.get(room_id)
+        if cached and cached[0] == current_version and cached[1] == current_encrypted:
+            _keyring_cache.move_to_end(room_id)
+            record_cache("room_keyring", True)
+            return current_version, cached[2]
+    record_cache("room_keyring", False)
+
+    cursor.execute(
+        'SELECT version, encryption_key FROM room_keys WHERE room_id = ? ORDER BY version ASC',
+        (room_id,),
+    )
+    rows = [(int(row['version']), row['encryption_key']) for row in cursor.fetchall()]
+    if current_encrypted and all(version != current_version for version, _ in rows):
+        rows.append((current_version, current_encrypted))
+
+    keyring = {}
+    for version, encrypted_key in rows:
+        raw_key = _decrypt_room_key(encrypted_key)
+        if raw_key:
+            keyring[str(version)] = raw_key
+    if keyring:
+        with _keyring_cache_lock:
+            _keyring_cache[room_id] = (current_version, current_encrypted, keyring)
+            _keyring_cache.move_to_end(room_id)
+            while len(_keyring_cache) > _KEYRING_CACHE_MAX_ROOMS:
+                _keyring_cache.popitem(last=False)
+    return current_version, keyring
+
+
 def create_room(name, room_type, created_by, member_ids):
     """Create a room and seed key version 1."""
     conn = get_db()
@@ -101,11 +162,11 @@ def get_room_key(room_id):
     conn = get_db()
     cursor = conn.cursor()
     try:
-        cursor.execute('SELECT encryption_key FROM rooms WHERE id = ?', (room_id,))
-        result = cursor.fetchone()
-        if not result:
+        loaded = _load_room_keyring(cursor, room_id)
+        if not loaded:
             return None
-        return _decrypt_room_key(result['encryption_key'])
+        current_version, keyring = loaded
+        return keyring.get(str(current_version))
     except Exception as exc:
         logger.error(f"Get room key error: {exc}")
         return None
@@ -141,34 +202,58 @@ def get_room_keyring(room_id: int, user_id: int | None = None):
                 return {}
             min_version = max(1, member_version)
 
+        loaded = _load_room_keyring(cursor, room_id)
+        if not loaded:
+            return {}
+        current_version, full_keyring = loaded
+        keyring = {version: key for version, key in full_keyring.items() if int(version) >= min_version}
+        if not keyring and str(current_version) in full_keyring:
+            keyring = {str(current_version): full_keyring[str(current_version)]}
+        return keyring
+    except Exception as exc:
+        logger.error(f"Get room keyring error: {exc}")
+        return {}
+
+
+def get_room_security_bundles(room_id: int, user_ids) -> dict[int, dict]:
+    """Security payloads for many current members with one keyring and one member lookup."""
+    target_ids = sorted({int(uid) for uid in user_ids if int(uid) > 0})
+    if not target_ids:
+        return {}
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        loaded = _load_room_keyring(cursor, room_id)
+        if not loaded:
+            return {}
+        current_version, full_keyring = loaded
+        current_key = full_keyring.get(str(current_version))
+
+        placeholders = ','.join('?' for _ in target_ids)
         cursor.execute(
-            '''
-                SELECT version, encryption_key
-                FROM room_keys
-                WHERE room_id = ? AND version >= ?
-                ORDER BY version ASC
+            f'''
+                SELECT user_id, COALESCE(joined_key_version, 1) AS joined_key_version
+                FROM room_members
+                WHERE room_id = ? AND user_id IN ({placeholders})
             ''',
-            (room_id, min_version),
+            [room_id, *target_ids],
         )
-        rows = cursor.fetchall()
-        if not rows:
-            cursor.execute(
-                'SELECT COALESCE(key_version, 1) AS version, encryption_key FROM rooms WHERE id = ?',
-                (room_id,),
-            )
-            row = cursor.fetchone()
-            if not row or not row['encryption_key']:
-                return {}
-            rows = [row]
-
-        keyring = {}
-        for row in rows:
-            raw_key = _decrypt_room_key(row['encryption_key'])
-            if raw_key:
-                keyring[str(int(row['version']))] = raw_key
-        return keyring
+        bundles = {}
+        for row in cursor.fetchall():
+            member_version = max(1, int(row['joined_key_version']))
+            keyring = {version: key for version, key in full_keyring.items() if int(version) >= member_version}
+            if current_key:
+                keyring.setdefault(str(current_version), current_key)
+            bundles[int(row['user_id'])] = {
+                'room_id': room_id,
+                'key_version': current_version,
+                'member_key_version': member_version,
+                'encryption_key': current_key,
+                'encryption_keys': keyring,
+            }
+        return bundles
     except Exception as exc:
-        logger.error(f"Get room keyring error: {exc}")
+        logger.error(f"Get room security bundles error: {exc}")
         return {}
 
 
@@ -224,6 +309,7 @@ def rotate_room_key(room_id: int, conn=None):
         )
         if own_conn:
             conn.commit()
+        invalidate_room_keyring_cache(room_id)
         return {'room_id': room_id, 'key_version': next_version, 'encryption_key': raw_key}
     except Exception as exc:
         if own_conn:
@@ -391,6 +477,45 @@ def get_room_members(room_id):
         return []
 
 
+def get_member_room_ids(user_id) -> list[int]:
+    """Ids of the rooms a user belongs to (index-only; no room list aggregation)."""
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT room_id FROM room_members WHERE user_id = ?', (user_id,))
+        return [row[0] for row in cursor.fetchall()]
+    except Exception as exc:
+        logger.error(f"Get member room ids error: {exc}")
+        return []
+
+
+def get_room_peer_ids(user_ids) -> dict[int, set[int]]:
+    """For each user, the other users sharing at least one room with them (one self-join query)."""
+    ids = sorted({int(uid) for uid in user_ids if isinstance(uid, int) and uid > 0})
+    if not ids:
+        return {}
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        placeholders = ','.join('?' * len(ids))
+        cursor.execute(
+            f'''
+                SELECT DISTINCT me.user_id, peer.user_id
+                FROM room_members me
+                JOIN room_members peer ON peer.room_id = me.room_id AND peer.user_id != me.user_id
+                WHERE me.user_id IN ({placeholders})
+            ''',
+            ids,
+        )
+        peers: dict[int, set[int]] = {}
+        for user_id, peer_id in cursor.fetchall():
+            peers.setdefault(user_id, set()).add(peer_id)
+        return peers
+    except Exception as exc:
+        logger.error(f"Get room peers error: {exc}")
+        return {}
+
+
 def is_room_member(room_id, user_id):
     conn = get_db()
     cursor = conn.cursor()
@@ -432,6 +557,68 @@ def add_room_member(room_id, user_id, joined_key_version: int | None = None, con
         return False
 
 
+def apply_room_membership_batch(room_id: int, add_user_ids=(), remove_user_ids=()):
+    """Apply membership additions/removals atomically with a single key rotation.
+
+    Removals happen first, then the key is rotated once, then additions join at the
+    new key version. Returns ``{'added', 'removed', 'key_version'}`` or ``None`` on failure.
+    Nothing is rotated when no membership actually changes.
+    """
+    conn = get_db()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+    except Exception:
+        pass
+
+    cursor = conn.cursor()
+    try:
+        removed: list[int] = []
+        for user_id in dict.fromkeys(int(uid) for uid in remove_user_ids):
+            cursor.execute('DELETE FROM room_members WHERE room_id = ? AND user_id = ?', (room_id, user_id))
+            if cursor.rowcount > 0:
+                removed.append(user_id)
+
+        candidates = [uid for uid in dict.fromkeys(int(uid) for uid in add_user_ids) if uid not in removed]
+        if candidates:
+            placeholders = ','.join('?' for _ in candidates)
+            cursor.execute(
+                f'SELECT user_id FROM room_members WHERE room_id = ? AND user_id IN ({placeholders})',
+                [room_id, *candidates],
+            )
+            existing = {int(row['user_id']) for row in cursor.fetchall()}
+            candidates = [uid for uid in candidates if uid not in existing]
+
+        if not removed and not candidates:
+            conn.rollback()
+            return {'added': [], 'removed': [], 'key_version': _get_room_key_version(cursor, room_id)}
+
+        rotation = rotate_room_key(room_id, conn=conn)
+        if not rotation:
+            conn.rollback()
+            return None
+
+        added: list[int] = []
+        for user_id in candidates:
+            cursor.execute(
+                'INSERT OR IGNORE INTO room_members (room_id, user_id, joined_key_version) VALUES (?, ?, ?)',
+                (room_id, user_id, rotation['key_version']),
+            )
+            if cursor.rowcount > 0:
+                added.append(user_id)
+
+        conn.commit()
+        if removed:
+            invalidate_file_access(removed)
+        return {'added': added, 'removed': removed, 'key_version': rotation['key_version']}
+    except Exception as exc:
+        logger.error(f"Apply room membership batch error: {exc}")
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        return None
+
+
 def leave_room_db(room_id, user_id):
     conn = get_db()
     try:
@@ -472,8 +659,10 @@ def leave_room_db(room_id, user_id):
                     logger.info(f"Admin auto-delegated: room {room_id}")
 
         cursor.execute('DELETE FROM room_members WHERE room_id = ? AND user_id = ?', (room_id, user_id))
+        left = cursor.rowcount > 0
         conn.commit()
-        return cursor.rowcount > 0
+        invalidate_file_access([user_id])
+        return left
     except Exception as exc:
         logger.error(f"Leave room error: {exc}")
         try:
@@ -542,8 +731,10 @@ def kick_member(room_id, target_user_id):
     cursor = conn.cursor()
     try:
         cursor.execute('DELETE FROM room_members WHERE room_id = ? AND user_id = ?', (room_id, target_user_id))
+        kicked = cursor.rowcount > 0
         conn.commit()
-        return cursor.rowcount > 0
+        invalidate_file_access([target_user_id])
+        return kicked
     except Exception as exc:
         logger.error(f"Kick member error: {exc}")
         return False
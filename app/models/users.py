@@ -9,18 +9,26 @@ import threading
 import time
 import secrets
 import re
+from collections import OrderedDict
 
 from app.models.base import get_db, close_thread_db
 from app.services.runtime_paths import get_upload_folder
-from app.utils import hash_password, verify_password
+from app.services.password_hashing import hash_password, needs_rehash, verify_password
+from app.services.hangul import hangul_initials, is_initials_query
+from app.services.metrics import record_cache
+from app.services.upload_access import invalidate_file_access
 
 logger = logging.getLogger(__name__)
 
-# 사용자 정보 메모리 캐시
-_user_cache = {}
+# 사용자 정보 메모리 캐시 (LRU + TTL): user_id -> (cached_at, profile)
+# OrderedDict 순서 = 최근 사용 순서 -> 조회/삽입/퇴출 모두 O(1)
+_user_cache: "OrderedDict[int, tuple[float, dict]]" = OrderedDict()
 _user_cache_lock = threading.Lock()
+# 무효화 세대: 조회 도중 무효화가 일어나면 그 조회 결과(이전 값일 수 있음)는 캐시에 넣지 않음
+_user_cache_generation = 0
 USER_CACHE_TTL = 60
 USER_CACHE_MAX_SIZE = 500
+_USER_PROFILE_COLUMNS = 'id, username, nickname, profile_image, status, status_message'
 
 
 def create_user(username: str, password: str, nickname: str | None = None) -> int | None:
@@ -29,8 +37,8 @@ def create_user(username: str, password: str, nickname: str | None = None) -> in
     cursor = conn.cursor()
     try:
         cursor.execute(
-            'INSERT INTO users (username, password_hash, nickname) VALUES (?, ?, ?)',
-            (username, hash_password(password), nickname or username)
+            'INSERT INTO users (username, password_hash, nickname, nickname_initials) VALUES (?, ?, ?, ?)',
+            (username, hash_password(password), nickname or username, hangul_initials(nickname or username))
         )
         conn.commit()
         return cursor.lastrowid
@@ -54,14 +62,14 @@ def authenticate_user(username: str, password: str) -> dict | None:
         user = cursor.fetchone()
         
         if user and verify_password(password, user['password_hash']):
-            # SHA-256 해시 -> bcrypt 마이그레이션
-            if not user['password_hash'].startswith('$2'):
+            # SHA-256 해시 -> bcrypt 마이그레이션, BCRYPT_ROUNDS 변경 시 재해시
+            if needs_rehash(user['password_hash']):
                 try:
                     new_hash = hash_password(password)
                     if new_hash.startswith('$2'):
                         cursor.execute('UPDATE users SET password_hash = ? WHERE id = ?', (new_hash, user['id']))
                         conn.commit()
-                        logger.info(f"User {username} password migrated to bcrypt")
+                        logger.info(f"User {username} password rehashed with bcrypt")
                 except Exception as e:
                     logger.error(f"Password migration failed for {username}: {e}")
             
@@ -91,7 +99,7 @@ def get_user_by_id(user_id: int) -> dict | None:
     conn = get_db()
     cursor = conn.cursor()
     try:
-        cursor.execute('SELECT id, username, nickname, profile_image, status, status_message FROM users WHERE id = ?', (user_id,))
+        cursor.execute(f'SELECT {_USER_PROFILE_COLUMNS} FROM users WHERE id = ?', (user_id,))
         user = cursor.fetchone()
         return dict(user) if user else None
     except Exception as e:
@@ -100,30 +108,19 @@ def get_user_by_id(user_id: int) -> dict | None:
 
 
 def get_user_by_id_cached(user_id: int) -> dict | None:
-    """캐시된 사용자 조회"""
-    with _user_cache_lock:
-        cached = _user_cache.get(user_id)
-        if cached and (time.time() - cached['_cached_at']) < USER_CACHE_TTL:
-            return cached['data']
-    
-    user = get_user_by_id(user_id)
-    if user:
-        with _user_cache_lock:
-            _user_cache[user_id] = {'data': user, '_cached_at': time.time()}
-            if len(_user_cache) > USER_CACHE_MAX_SIZE:
-                oldest = min(_user_cache.items(), key=lambda x: x[1]['_cached_at'])
-                del _user_cache[oldest[0]]
-    
-    return user
+    """캐시된 사용자 조회 (없는 사용자는 None)"""
+    return get_users_by_ids([user_id]).get(int(user_id))
 
 
 def invalidate_user_cache(user_id: int | None = None):
     """사용자 캐시 무효화"""
+    global _user_cache_generation
     with _user_cache_lock:
+        _user_cache_generation += 1
         if user_id is None:
             _user_cache.clear()
-        elif user_id in _user_cache:
-            del _user_cache[user_id]
+        else:
+            _user_cache.pop(int(user_id), None)
 
 
 def get_all_users():
@@ -139,6 +136,97 @@ def get_all_users():
         return []
 
 
+def _like_prefix(text: str) -> str:
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return escaped + '%'
+
+
+def search_users(query: str = '', limit: int = 50, offset: int = 0, exclude_user_id: int | None = None):
+    """디렉터리 검색: 아이디/닉네임 접두어 또는 초성(ㄱㅊ) 접두어, 닉네임 순 페이지.
+
+    Returns ``(users, has_more)``.
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        query = (query or '').strip()
+        where = []
+        params: list = []
+        if query and is_initials_query(query):
+            where.append("nickname_initials LIKE ? ESCAPE '\\'")
+            params.append(_like_prefix(query))
+        elif query:
+            where.append("(username LIKE ? ESCAPE '\\' OR nickname LIKE ? ESCAPE '\\')")
+            params.extend([_like_prefix(query), _like_prefix(query)])
+        if exclude_user_id is not None:
+            where.append('id != ?')
+            params.append(exclude_user_id)
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ''
+        cursor.execute(
+            f"""
+            SELECT id, username, nickname, profile_image, status, status_message
+            FROM users
+            {where_sql}
+            ORDER BY nickname COLLATE NOCASE, id
+            LIMIT ? OFFSET ?
+            """,
+            params + [limit + 1, offset],
+        )
+        users = [dict(u) for u in cursor.fetchall()]
+        return users[:limit], len(users) > limit
+    except Exception as e:
+        logger.error(f"Search users error: {e}")
+        return [], False
+
+
+def get_users_by_ids(user_ids) -> dict[int, dict]:
+    """ID 목록으로 사용자 일괄 조회 (캐시 우선, 미스만 IN 쿼리 1회). 없는 ID는 결과에서 빠짐."""
+    ids = list(dict.fromkeys(int(uid) for uid in user_ids))
+    if not ids:
+        return {}
+
+    found: dict[int, dict] = {}
+    now = time.time()
+    with _user_cache_lock:
+        generation = _user_cache_generation
+        for uid in ids:
+            entry = _user_cache.get(uid)
+            if entry is None:
+                continue
+            if now - entry[0] >= USER_CACHE_TTL:
+                del _user_cache[uid]
+                continue
+            _user_cache.move_to_end(uid)
+            found[uid] = dict(entry[1])
+
+    misses = [uid for uid in ids if uid not in found]
+    record_cache("user", True, len(found))
+    record_cache("user", False, len(misses))
+    if not misses:
+        return found
+
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        placeholders = ','.join('?' * len(misses))
+        cursor.execute(f'SELECT {_USER_PROFILE_COLUMNS} FROM users WHERE id IN ({placeholders})', misses)
+        loaded = [dict(row) for row in cursor.fetchall()]
+    except Exception as e:
+        logger.error(f"Get users by ids error: {e}")
+        return found
+
+    with _user_cache_lock:
+        fresh = generation == _user_cache_generation
+        for user in loaded:
+            found[user['id']] = dict(user)
+            if fresh:
+                _user_cache[user['id']] = (now, user)
+                _user_cache.move_to_end(user['id'])
+        while len(_user_cache) > USER_CACHE_MAX_SIZE:
+            _user_cache.popitem(last=False)
+    return found
+
+
 def update_user_status(user_id, status):
     """사용자 상태 업데이트"""
     conn = get_db()
@@ -151,6 +239,29 @@ def update_user_status(user_id, status):
         logger.error(f"Update user status error: {e}")
 
 
+def set_user_statuses(statuses):
+    """여러 사용자 상태를 한 트랜잭션으로 기록 ({user_id: status}), 갱신된 행 수 반환"""
+    rows = [(status, int(user_id)) for user_id, status in statuses.items()]
+    if not rows:
+        return 0
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        # status가 이미 같은 행은 건너뛰어 버전 트리거/쓰기를 만들지 않음
+        cursor.executemany('UPDATE users SET status = ? WHERE id = ? AND status IS NOT ?', [(s, u, s) for s, u in rows])
+        conn.commit()
+        for _, user_id in rows:
+            invalidate_user_cache(user_id)
+        return max(0, cursor.rowcount)
+    except Exception as e:
+        logger.error(f"Set user statuses error: {e}")
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        return 0
+
+
 def update_user_profile(user_id, nickname=None, profile_image=None, status_message=None):
     """사용자 프로필 업데이트"""
     conn = get_db()
@@ -162,6 +273,8 @@ def update_user_profile(user_id, nickname=None, profile_image=None, status_messa
         if nickname is not None:
             updates.append('nickname = ?')
             values.append(nickname)
+            updates.append('nickname_initials = ?')
+            values.append(hangul_initials(nickname))
         if profile_image is not None:
             updates.append('profile_image = ?')
             values.append(profile_image)
@@ -202,6 +315,18 @@ def get_online_users():
         return []
 
 
+def get_users_marked_online():
+    """users.status가 'online'으로 남아 있는 사용자 id 집합 (재시작 시 정합성 점검용)"""
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT id FROM users WHERE status = 'online'")
+        return {row[0] for row in cursor.fetchall()}
+    except Exception as e:
+        logger.error(f"Get users marked online error: {e}")
+        return set()
+
+
 def log_access(user_id, action, ip_address, user_agent):
     """접속 로그 기록"""
     conn = get_db()
@@ -330,10 +455,10 @@ def get_or_create_oidc_user(
 
         cursor.execute(
             """
-            INSERT INTO users (username, password_hash, nickname, status, session_token)
-            VALUES (?, ?, ?, 'offline', ?)
+            INSERT INTO users (username, password_hash, nickname, nickname_initials, status, session_token)
+            VALUES (?, ?, ?, ?, 'offline', ?)
             """,
-            (username, hash_password(secrets.token_urlsafe(24)), local_nickname, session_token),
+            (username, hash_password(secrets.token_urlsafe(24)), local_nickname, hangul_initials(local_nickname), session_token),
         )
         user_id = cursor.lastrowid
         cursor.execute(
@@ -363,7 +488,7 @@ def delete_user(user_id, password):
     """회원 탈퇴"""
     import os
 
-    from app.models.base import safe_file_delete
+    from app.models.base import pause_message_changes, resume_message_changes, safe_file_delete
     from app.models.rooms import rotate_room_key
     upload_folder = get_upload_folder()
     
@@ -417,12 +542,15 @@ def delete_user(user_id, password):
                         safe_file_delete(os.path.join(upload_folder, rf['file_path']))
                     except Exception as e:
                         logger.warning(f"Room file delete failed during room cleanup: {e}")
+                # nobody is left to sync this room; keep its rows out of the change journal
+                pause_message_changes(cursor)
                 cursor.execute("DELETE FROM message_reactions WHERE message_id IN (SELECT id FROM messages WHERE room_id = ?)", (room_id,))
                 cursor.execute("DELETE FROM pinned_messages WHERE room_id = ?", (room_id,))
                 cursor.execute("DELETE FROM poll_votes WHERE poll_id IN (SELECT id FROM polls WHERE room_id = ?)", (room_id,))
                 cursor.execute("DELETE FROM polls WHERE room_id = ?", (room_id,))
                 cursor.execute("DELETE FROM room_files WHERE room_id = ?", (room_id,))
                 cursor.execute("DELETE FROM messages WHERE room_id = ?", (room_id,))
+                resume_message_changes(cursor)
                 cursor.execute("DELETE FROM room_members WHERE room_id = ?", (room_id,))
                 try:
                     cursor.execute("DELETE FROM admin_audit_logs WHERE room_id = ?", (room_id,))
@@ -469,17 +597,16 @@ def delete_user(user_id, password):
         cursor.execute("DELETE FROM message_reactions WHERE user_id = ?", (user_id,))
         cursor.execute("DELETE FROM pinned_messages WHERE pinned_by = ?", (user_id,))
         cursor.execute("DELETE FROM room_members WHERE user_id = ?", (user_id,))
+        # 남은 멤버가 있는 방은 같은 트랜잭션에서 키 회전 (보안 push만 호출 측에서 지연/병합)
         for room_id in affected_membership_rooms:
-            cursor.execute("SELECT 1 FROM rooms WHERE id = ?", (room_id,))
-            if not cursor.fetchone():
-                continue
             cursor.execute("SELECT COUNT(*) FROM room_members WHERE room_id = ?", (room_id,))
-            if cursor.fetchone()[0] > 0:
-                rotate_room_key(room_id, conn=conn)
+            if cursor.fetchone()[0] > 0 and not rotate_room_key(room_id, conn=conn):
+                raise RuntimeError(f"room key rotation failed: room_id={room_id}")
         cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
         
         conn.commit()
         invalidate_user_cache(user_id)
+        invalidate_file_access([user_id])
         logger.info(f"User {user_id} deleted with all related data cleaned up")
         return True, None
     except Exception as e:
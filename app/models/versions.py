@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Version tags for conditional GETs.
+
+Counters in ``change_versions`` are bumped by triggers (see ``init_db``), so a tag
+is a handful of keyed lookups instead of the listing query it stands in for.
+Tags are computed before the body is built: a concurrent write can only make the
+body newer than its tag, which costs the client one extra full response, never a
+stale 304.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+
+from app.models.base import get_db
+
+logger = logging.getLogger(__name__)
+
+
+def _digest(*parts) -> str:
+    return hashlib.blake2b("|".join(str(part) for part in parts).encode("utf-8"), digest_size=10).hexdigest()
+
+
+def _scope_version(cursor, scope: str, scope_id: int) -> int:
+    cursor.execute(
+        "SELECT version FROM change_versions WHERE scope = ? AND scope_id = ?",
+        (scope, scope_id),
+    )
+    row = cursor.fetchone()
+    return int(row[0]) if row else 0
+
+
+def get_room_list_version(user_id: int, include_members: bool = False) -> str | None:
+    """Tag for ``get_user_rooms(user_id, include_members)``; None if it cannot be computed."""
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT rm.room_id,
+                   COALESCE(rv.version, 0) AS room_version,
+                   CASE WHEN r.type = 'direct' THEN (
+                       SELECT COALESCE(SUM(uv.version), 0)
+                       FROM room_members o
+                       JOIN change_versions uv ON uv.scope IN ('user', 'presence') AND uv.scope_id = o.user_id
+                       WHERE o.room_id = rm.room_id AND o.user_id != rm.user_id
+                   ) WHEN ? THEN (
+                       SELECT COALESCE(SUM(uv.version), 0)
+                       FROM room_members o
+                       JOIN change_versions uv ON uv.scope = 'presence' AND uv.scope_id = o.user_id
+                       WHERE o.room_id = rm.room_id AND o.user_id != rm.user_id
+                   ) ELSE 0 END AS partner_version
+            FROM room_members rm
+            JOIN rooms r ON r.id = rm.room_id
+            LEFT JOIN change_versions rv ON rv.scope = 'room' AND rv.scope_id = rm.room_id
+            WHERE rm.user_id = ?
+            ORDER BY rm.room_id
+            """,
+            (int(include_members), user_id),
+        )
+        rooms = ",".join(f"{row[0]}:{row[1]}:{row[2]}" for row in cursor.fetchall())
+        own_version = _scope_version(cursor, "user_rooms", user_id)
+        directory_version = _scope_version(cursor, "directory", 0) if include_members else 0
+        return "rooms-" + _digest(user_id, int(include_members), own_version, directory_version, rooms)
+    except Exception as e:
+        logger.error(f"Room list version error: {e}")
+        return None
+
+
+def get_user_directory_version(viewer_user_id: int) -> str | None:
+    """Tag for the user directory as seen by ``viewer_user_id`` (who is excluded from it).
+
+    Online status is not part of the tag: ``status`` in a directory page is as of the
+    last profile change, and live presence comes from ``/api/users/online``.
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        return "users-" + _digest(viewer_user_id, _scope_version(cursor, "directory", 0))
+    except Exception as e:
+        logger.error(f"User directory version error: {e}")
+        return None
+
+
+def get_room_info_version(room_id: int, kind: str = "info") -> str | None:
+    """Tag for room metadata endpoints (``info``: room + members, ``admins``)."""
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        room_version = _scope_version(cursor, "room", room_id)
+        members_version = _scope_version(cursor, "room_members", room_id) if kind == "info" else 0
+        directory_version = _scope_version(cursor, "directory", 0)
+        presence_version = 0
+        if kind == "info":
+            cursor.execute(
+                """
+                SELECT COALESCE(SUM(pv.version), 0)
+                FROM room_members rm
+                JOIN change_versions pv ON pv.scope = 'presence' AND pv.scope_id = rm.user_id
+                WHERE rm.room_id = ?
+                """,
+                (room_id,),
+            )
+            presence_version = int(cursor.fetchone()[0])
+        return f"{kind}-" + _digest(room_id, room_version, members_version, directory_version, presence_version)
+    except Exception as e:
+        logger.error(f"Room info version error: {e}")
+        return None
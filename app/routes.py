@@ -11,7 +11,7 @@ from __future__ import annotations
 
 from app.http import register_routes
 from app.models import advanced_search
-from app.upload_scan import create_scan_job, get_scan_job, is_scan_enabled
+from app.upload_scan import create_scan_job, get_scan_job, is_scan_enabled, lookup_cached_scan_verdict
 
 __all__ = [
     "register_routes",
@@ -19,4 +19,5 @@ __all__ = [
     "create_scan_job",
     "get_scan_job",
     "is_scan_enabled",
+    "lookup_cached_scan_verdict",
 ]
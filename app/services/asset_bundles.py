@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Fingerprinted, pre-compressed frontend bundles.
+
+``build_bundles()`` concatenates the runtime-split scripts (in load order) into
+content-hashed files under ``static/dist/`` and writes ``.br``/``.gz`` siblings
+plus ``manifest.json``. Templates call ``asset_scripts(name)``, which returns the
+bundle URL when a manifest exists and the individual source URLs otherwise, so
+development keeps working without a build. The manifest records each source's
+mtime; a source edited after the build also falls back to the source URLs (with
+a warning) instead of hiding behind the old bundle. ``precompress_static()`` writes the
+same siblings for the remaining text assets (CSS, unbundled JS).
+``service_worker_version()`` ties the service worker's cache names to the
+manifest so a new build invalidates every client's precache.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DIST_DIRNAME = "dist"
+MANIFEST_NAME = "manifest.json"
+SERVICE_WORKER_FILE = "sw.js"
+SOURCE_VERSION = "5.0"
+PRECOMPRESS_EXTENSIONS = (".js", ".css", ".svg", ".json", ".html")
+PRECOMPRESS_MIN_SIZE = 1024
+
+# Load order matters: later files read globals defined by earlier ones.
+BUNDLE_SOURCES: dict[str, tuple[str, ...]] = {
+    "vendor": (
+        "js/socket.io.min.js",
+        "js/crypto-js.min.js",
+    ),
+    "app": (
+        "js/core/namespace.js",
+        "js/core/state-store.js",
+        "js/runtime/utils.js",
+        "js/services/toast-runtime.js",
+        "js/features/settings/runtime.js",
+        "js/services/storage-runtime.js",
+        "js/services/notification-runtime.js",
+        "js/services/decrypt-pool.js",
+        "js/services/message-window.js",
+        "js/services/upload-service.js",
+        "js/features/auth/runtime.js",
+        "js/features/profile/runtime.js",
+        "js/features/chat/runtime.js",
+        "js/features/rooms/runtime.js",
+        "js/features/messages/runtime.js",
+        "js/services/socket/runtime.js",
+        "js/bootstrap/runtime.js",
+        "js/utils.js",
+        "js/toast.js",
+        "js/theme.js",
+        "js/auth.js",
+        "js/profile.js",
+        "js/features.js",
+        "js/rooms.js",
+        "js/message-upload.js",
+        "js/messages.js",
+        "js/socket-handlers.js",
+        "js/storage.js",
+        "js/notification.js",
+        "js/app.js",
+    ),
+}
+
+# Vendor files are served unversioned today; keep that for the unbundled fallback.
+_UNVERSIONED_BUNDLES = {"vendor"}
+
+_manifest_lock = threading.Lock()
+_manifest_cache: dict[str, tuple[int, dict]] = {}
+# (bundle name, bundle file) already reported stale, so each page render does not log again
+_stale_warned: set[tuple[str, str]] = set()
+
+
+def _concat_sources(static_folder: str, sources: tuple[str, ...]) -> bytes:
+    parts = []
+    for rel_path in sources:
+        with open(os.path.join(static_folder, rel_path), "rb") as handle:
+            body = handle.read().rstrip()
+        # `;` guards against a file ending in an expression without a semicolon
+        parts.append(f"/* {rel_path} */\n".encode("utf-8") + body + b"\n;\n")
+    return b"".join(parts)
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(data)
+    os.replace(tmp_path, path)
+
+
+def _write_compressed_siblings(file_path: str, body: bytes, brotli_quality: int) -> list[str]:
+    """Write ``.br`` (when brotli is available) and ``.gz`` next to ``file_path``."""
+    encodings = []
+    if brotli is not None:
+        _write_atomic(f"{file_path}.br", brotli.compress(body, quality=brotli_quality))
+        encodings.append("br")
+    _write_atomic(f"{file_path}.gz", gzip.compress(body, compresslevel=9, mtime=0))
+    encodings.append("gzip")
+    return encodings
+
+
+def build_bundles(static_folder: str, *, brotli_quality: int = 11) -> dict:
+    """Write hashed bundles, compressed siblings and the manifest. Returns the manifest."""
+    dist_dir = os.path.join(static_folder, DIST_DIRNAME)
+    os.makedirs(dist_dir, exist_ok=True)
+
+    manifest: dict[str, dict] = {}
+    keep = {MANIFEST_NAME}
+    for name, sources in BUNDLE_SOURCES.items():
+        body = _concat_sources(static_folder, sources)
+        digest = hashlib.sha256(body).hexdigest()
+        file_name = f"{name}.{digest[:12]}.js"
+        file_path = os.path.join(dist_dir, file_name)
+
+        _write_atomic(file_path, body)
+        encodings = _write_compressed_siblings(file_path, body, brotli_quality)
+        keep.update({file_name, f"{file_name}.gz", f"{file_name}.br"})
+
+        manifest[name] = {
+            "file": file_name,
+            "sha256": digest,
+            "size": len(body),
+            "encodings": encodings,
+            "sources": list(sources),
+            "source_mtimes": {
+                rel_path: os.stat(os.path.join(static_folder, rel_path)).st_mtime_ns for rel_path in sources
+            },
+        }
+
+    _write_atomic(os.path.join(dist_dir, MANIFEST_NAME), json.dumps(manifest, indent=2).encode("utf-8"))
+
+    for entry in os.scandir(dist_dir):
+        if entry.is_file() and entry.name not in keep:
+            try:
+                os.remove(entry.path)
+            except OSError as exc:
+                logger.warning(f"Stale bundle cleanup failed({entry.name}): {exc}")
+    return manifest
+
+
+def precompress_static(static_folder: str, *, brotli_quality: int = 11) -> int:
+    """Refresh ``.br``/``.gz`` siblings for text assets outside ``dist/``. Returns files written."""
+    written = 0
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.samefile(root, static_folder) and DIST_DIRNAME in dirs:
+            dirs.remove(DIST_DIRNAME)
+        for name in files:
+            if not name.endswith(PRECOMPRESS_EXTENSIONS):
+                continue
+            file_path = os.path.join(root, name)
+            source_mtime = os.stat(file_path).st_mtime_ns
+            siblings = [f"{file_path}.gz"] + ([f"{file_path}.br"] if brotli is not None else [])
+            if all(os.path.isfile(s) and os.stat(s).st_mtime_ns >= source_mtime for s in siblings):
+                continue
+            with open(file_path, "rb") as handle:
+                body = handle.read()
+            if len(body) < PRECOMPRESS_MIN_SIZE:
+                continue
+            _write_compressed_siblings(file_path, body, brotli_quality)
+            written += 1
+    return written
+
+
+def load_manifest(static_folder: str) -> dict:
+    """Return the bundle manifest, re-reading it only when the file changes."""
+    path = os.path.join(static_folder, DIST_DIRNAME, MANIFEST_NAME)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+
+    with _manifest_lock:
+        cached = _manifest_cache.get(path)
+        if cached and cached[0] == mtime_ns:
+            return cached[1]
+
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            manifest = json.load(handle)
+    except (OSError, ValueError) as exc:
+        logger.warning(f"Asset manifest unreadable({path}): {exc}")
+        manifest = {}
+
+    with _manifest_lock:
+        _manifest_cache[path] = (mtime_ns, manifest)
+    return manifest
+
+
+def _mtime_ns(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def is_bundle_current(static_folder: str, name: str, entry: dict) -> bool:
+    """True if bundle ``name`` exists and its sources are unchanged since the build."""
+    if not os.path.isfile(os.path.join(static_folder, DIST_DIRNAME, entry["file"])):
+        return False
+    sources = BUNDLE_SOURCES.get(name, ())
+    recorded = entry.get("source_mtimes") or {}
+    stale = list(entry.get("sources") or ()) != list(sources) or any(
+        _mtime_ns(os.path.join(static_folder, rel_path)) != recorded.get(rel_path) for rel_path in sources
+    )
+    if stale:
+        with _manifest_lock:
+            first = (name, entry["file"]) not in _stale_warned
+            _stale_warned.add((name, entry["file"]))
+        if first:
+            logger.warning(
+                f"Bundle {entry['file']} is older than its sources; serving them individually "
+                f"until `python scripts/build_assets.py` is rerun"
+            )
+    return not stale
+
+
+def asset_scripts(static_folder: str, name: str, *, use_bundles: bool = True) -> list[str]:
+    """Script URLs for bundle ``name``: the hashed bundle if built and current, else each source."""
+    if use_bundles:
+        entry = load_manifest(static_folder).get(name)
+        if entry and is_bundle_current(static_folder, name, entry):
+            return [f"/static/{DIST_DIRNAME}/{entry['file']}"]
+
+    suffix = "" if name in _UNVERSIONED_BUNDLES else f"?v={SOURCE_VERSION}"
+    return [f"/static/{rel_path}{suffix}" for rel_path in BUNDLE_SOURCES.get(name, ())]
+
+
+def service_worker_version(static_folder: str) -> str:
+    """Short digest of the service worker script and the bundle manifest."""
+    digest = hashlib.sha256(SOURCE_VERSION.encode("utf-8"))
+    sw_path = os.path.join(static_folder, SERVICE_WORKER_FILE)
+    if os.path.isfile(sw_path):
+        with open(sw_path, "rb") as handle:
+            digest.update(handle.read())
+    for name, entry in sorted(load_manifest(static_folder).items()):
+        digest.update(f"{name}:{entry.get('sha256', '')}".encode("utf-8"))
+    return digest.hexdigest()[:12]
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Response compression accounting.
+
+Two paths are tracked separately:
+- ``precompressed``: static files answered from a build-time ``.br``/``.gz``
+  sibling (no CPU spent per request).
+- ``dynamic``: responses compressed on the fly by Flask-Compress, per content
+  type, with the CPU time the compressor used.
+"""
+
+from __future__ import annotations
+
+import threading
+
+_lock = threading.Lock()
+_precompressed = {"responses": 0, "bytes_original": 0, "bytes_sent": 0}
+_dynamic: dict[str, dict] = {}
+_skipped: dict[str, int] = {}
+
+
+def record_precompressed(bytes_original: int, bytes_sent: int) -> None:
+    with _lock:
+        _precompressed["responses"] += 1
+        _precompressed["bytes_original"] += int(bytes_original)
+        _precompressed["bytes_sent"] += int(bytes_sent)
+
+
+def record_dynamic(mimetype: str, bytes_in: int, bytes_out: int, cpu_seconds: float) -> None:
+    with _lock:
+        entry = _dynamic.setdefault(mimetype, {"responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_ms": 0.0})
+        entry["responses"] += 1
+        entry["bytes_in"] += int(bytes_in)
+        entry["bytes_out"] += int(bytes_out)
+        entry["cpu_ms"] += cpu_seconds * 1000
+
+
+def record_skipped(reason: str) -> None:
+    with _lock:
+        _skipped[reason] = _skipped.get(reason, 0) + 1
+
+
+def get_compression_stats() -> dict:
+    with _lock:
+        precompressed = dict(_precompressed)
+        dynamic = {mimetype: dict(entry) for mimetype, entry in _dynamic.items()}
+        skipped = dict(_skipped)
+
+    precompressed["bytes_saved"] = precompressed["bytes_original"] - precompressed["bytes_sent"]
+    totals = {"responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_ms": 0.0}
+    for entry in dynamic.values():
+        entry["bytes_saved"] = entry["bytes_in"] - entry["bytes_out"]
+        entry["cpu_ms"] = round(entry["cpu_ms"], 3)
+        for key in ("responses", "bytes_in", "bytes_out", "cpu_ms"):
+            totals[key] += entry[key]
+    totals["bytes_saved"] = totals["bytes_in"] - totals["bytes_out"]
+    totals["cpu_ms"] = round(totals["cpu_ms"], 3)
+    return {
+        "precompressed": precompressed,
+        "dynamic": totals,
+        "dynamic_by_mimetype": dynamic,
+        "skipped": skipped,
+    }
+
+
+def reset_compression_stats() -> None:
+    with _lock:
+        for key in _precompressed:
+            _precompressed[key] = 0
+        _dynamic.clear()
+        _skipped.clear()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+Hangul initial-consonant (초성) helpers for directory search.
+
+``hangul_initials("김철수")`` is ``"ㄱㅊㅅ"``; the result is stored next to the
+nickname so a query typed as bare consonants ("ㄱㅊ") becomes an indexed prefix
+match instead of a per-row decomposition.
+"""
+
+from __future__ import annotations
+
+_SYLLABLE_FIRST = 0xAC00
+_SYLLABLE_LAST = 0xD7A3
+_SYLLABLES_PER_INITIAL = 21 * 28
+# compatibility jamo, i.e. what a keyboard produces when typing a lone consonant
+_INITIALS = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_INITIALS_SET = frozenset(_INITIALS)
+
+
+def hangul_initials(text: str | None) -> str:
+    """Replace each Hangul syllable with its initial consonant; other characters are lower-cased."""
+    if not text:
+        return ""
+    out = []
+    for ch in text:
+        code = ord(ch)
+        if _SYLLABLE_FIRST <= code <= _SYLLABLE_LAST:
+            out.append(_INITIALS[(code - _SYLLABLE_FIRST) // _SYLLABLES_PER_INITIAL])
+        else:
+            out.append(ch.lower())
+    return "".join(out)
+
+
+def is_initials_query(text: str | None) -> bool:
+    """True when ``text`` consists only of initial consonants (spaces allowed)."""
+    stripped = (text or "").replace(" ", "")
+    return bool(stripped) and all(ch in _INITIALS_SET for ch in stripped)
@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""
+In-process metrics registry with Prometheus text exposition.
+
+Instrumented code holds module-level :class:`Counter`, :class:`Gauge` and
+:class:`Histogram` objects (created once with :func:`counter` and friends) and
+updates them inline; ``GET /control/metrics`` renders the registry in the text
+format (version 0.0.4) Prometheus scrapes. An update is one dict lookup and a
+few additions under the metric's own lock; histograms use fixed buckets, so
+memory is bounded by label cardinality. Label values must come from a closed
+set (event names, job names, cache names), never from user input.
+
+Existing ``get_*_stats()`` dicts are not duplicated: collectors registered with
+:func:`register_collector` run at scrape time and expose them as gauges.
+``METRICS_ENABLED`` off turns every update into a single flag check.
+
+Socket.IO is hooked by :func:`install_socket_metrics`: handled events per type
+with their handler time, and per emitted event the number of recipients. The
+fan-out is counted from this process's room membership; with a message queue
+each node only sees its own share of a broadcast it did not originate.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+# seconds; handler, upload and maintenance latencies
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# recipients of one emit
+FANOUT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_registry_lock = threading.Lock()
+_metrics: dict[str, "_Metric"] = {}
+_collectors: list[Callable[[], Iterable[tuple]]] = []
+_settings = {"enabled": True}
+
+
+def configure(enabled: bool) -> None:
+    _settings["enabled"] = bool(enabled)
+
+
+def is_enabled() -> bool:
+    return _settings["enabled"]
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> list[tuple[str, tuple, float]]:
+        with self._lock:
+            return [("", labels, value) for labels, value in self._values.items()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        if not _settings["enabled"]:
+            return
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        with self._lock:
+            return self._values.get(labelvalues, 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        if not _settings["enabled"]:
+            return
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        if not _settings["enabled"]:
+            return
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues: str, amount: float = 1) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+    def value(self, *labelvalues: str) -> float:
+        with self._lock:
+            return self._values.get(labelvalues, 0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        if not _settings["enabled"]:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                # per-bucket counts (the last one is +Inf), then sum
+                entry = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def time(self, *labelvalues: str) -> "_Timer":
+        """Context manager observing the elapsed seconds of its block."""
+        return _Timer(self, labelvalues)
+
+    def count(self, *labelvalues: str) -> int:
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            return sum(entry[0]) if entry else 0
+
+    def samples(self) -> list[tuple[str, tuple, float]]:
+        with self._lock:
+            entries = [(labels, list(entry[0]), entry[1]) for labels, entry in self._values.items()]
+        bounds = [_format_value(b) for b in self.buckets] + ["+Inf"]
+        samples = []
+        for labels, counts, total in entries:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                samples.append(("_bucket", labels + (("le", bound),), cumulative))
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, cumulative))
+        return samples
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_labelvalues", "_started")
+
+    def __init__(self, histogram: Histogram, labelvalues: tuple):
+        self._histogram = histogram
+        self._labelvalues = labelvalues
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._started, *self._labelvalues)
+        return False
+
+
+def _get_or_create(cls, name: str, documentation: str, labelnames, **kwargs):
+    with _registry_lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = cls(name, documentation, tuple(labelnames), **kwargs)
+        elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"metric {name} already registered as {metric.kind}{metric.labelnames}")
+        return metric
+
+
+def counter(name: str, documentation: str, labelnames=()) -> Counter:
+    return _get_or_create(Counter, name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames=()) -> Gauge:
+    return _get_or_create(Gauge, name, documentation, labelnames)
+
+
+def histogram(name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+
+def register_collector(collector: Callable[[], Iterable[tuple]]) -> None:
+    """Add a scrape-time source yielding ``(name, kind, documentation, [(labels_dict, value), ...])``."""
+    with _registry_lock:
+        if collector not in _collectors:
+            _collectors.append(collector)
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(int(value))
+
+
+def _format_labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in pairs) + "}"
+
+
+def _render_family(lines: list[str], name: str, kind: str, documentation: str, samples) -> None:
+    lines.append(f"# HELP {name} {_escape_help(documentation)}")
+    lines.append(f"# TYPE {name} {kind}")
+    for suffix, pairs, value in samples:
+        lines.append(f"{name}{suffix}{_format_labels(pairs)} {_format_value(value)}")
+
+
+def render_text() -> str:
+    """The whole registry plus collector output in Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = sorted(_metrics.values(), key=lambda metric: metric.name)
+        collectors = list(_collectors)
+    lines: list[str] = []
+    for metric in metrics:
+        samples = [
+            (suffix, tuple(zip(metric.labelnames, labels[: len(metric.labelnames)])) + labels[len(metric.labelnames):], value)
+            for suffix, labels, value in metric.samples()
+        ]
+        _render_family(lines, metric.name, metric.kind, metric.documentation, samples)
+    for collector in collectors:
+        try:
+            families = list(collector())
+        except Exception as exc:
+            logger.warning(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {exc}")
+            continue
+        for name, kind, documentation, values in families:
+            samples = [("", tuple(labels.items()), value) for labels, value in values]
+            _render_family(lines, name, kind, documentation, samples)
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    """Zero every registered metric (tests); registrations and collectors stay."""
+    with _registry_lock:
+        metrics = list(_metrics.values())
+    for metric in metrics:
+        metric.clear()
+
+
+# Shared instruments. Defined here rather than next to each call site so the
+# exposition lists one family per name regardless of which modules are loaded.
+
+SOCKET_EVENTS = counter("messenger_socket_events_total", "Socket.IO events handled, by event name.", ("event",))
+SOCKET_EVENT_ERRORS = counter(
+    "messenger_socket_event_errors_total", "Socket.IO handlers that raised, by event name.", ("event",)
+)
+SOCKET_EVENT_SECONDS = histogram(
+    "messenger_socket_event_duration_seconds", "Socket.IO handler time, by event name.", ("event",)
+)
+SOCKET_EMITS = counter("messenger_socket_emits_total", "Socket.IO emits issued, by event name.", ("event",))
+SOCKET_EMIT_FANOUT = histogram(
+    "messenger_socket_emit_recipients",
+    "Local recipients of one Socket.IO emit, by event name.",
+    ("event",),
+    buckets=FANOUT_BUCKETS,
+)
+DB_QUERY_SECONDS = histogram(
+    "messenger_db_query_duration_seconds",
+    "SQLite execute time by statement verb.",
+    ("verb",),
+)
+CACHE_REQUESTS = counter(
+    "messenger_cache_requests_total", "In-process cache lookups, by cache and hit/miss.", ("cache", "result")
+)
+UPLOAD_SECONDS = histogram(
+    "messenger_upload_duration_seconds", "POST /api/upload handling time, by outcome.", ("outcome",)
+)
+SCAN_SECONDS = histogram(
+    "messenger_upload_scan_duration_seconds",
+    "Antivirus scan job time from dequeue to verdict, by status.",
+    ("status",),
+)
+MAINTENANCE_SECONDS = histogram(
+    "messenger_maintenance_job_duration_seconds", "Maintenance worker job run time, by job.", ("job",)
+)
+MAINTENANCE_FAILURES = counter(
+    "messenger_maintenance_job_failures_total", "Maintenance worker jobs that raised, by job.", ("job",)
+)
+STATE_STORE_OPS = counter(
+    "messenger_state_store_operations_total", "State store operations, by backend and operation.", ("backend", "op")
+)
+STATE_STORE_SECONDS = histogram(
+    "messenger_state_store_operation_duration_seconds",
+    "State store operation time, by backend.",
+    ("backend",),
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5),
+)
+
+
+def record_cache(cache: str, hit: bool, count: int = 1) -> None:
+    if count:
+        CACHE_REQUESTS.inc(cache, "hit" if hit else "miss", amount=count)
+
+
+def _recipient_count(manager, namespace: str, room, skip_sid) -> int:
+    rooms = manager.rooms.get(namespace) or {}
+    # every sid is also in the None room, so a namespace-wide emit is covered too
+    targets = room if hasattr(room, "__len__") and not isinstance(room, str) else (room,)
+    count = sum(len(rooms.get(target) or ()) for target in targets)
+    if skip_sid is not None:
+        count -= len(skip_sid) if isinstance(skip_sid, list) else 1
+    return max(0, count)
+
+
+def install_socket_metrics(socketio) -> bool:
+    """Count handled events and emit fan-out on this ``SocketIO`` instance."""
+    server = getattr(socketio, "server", None)
+    manager = getattr(server, "manager", None)
+    if manager is None:
+        return False
+
+    handle_event = socketio._handle_event
+
+    def _handle_event(handler, message, namespace, sid, *args):
+        if not _settings["enabled"]:
+            return handle_event(handler, message, namespace, sid, *args)
+        event = message or "<callback>"
+        started = time.perf_counter()
+        try:
+            return handle_event(handler, message, namespace, sid, *args)
+        except Exception:
+            SOCKET_EVENT_ERRORS.inc(event)
+            raise
+        finally:
+            SOCKET_EVENTS.inc(event)
+            SOCKET_EVENT_SECONDS.observe(time.perf_counter() - started, event)
+
+    manager_emit = manager.emit
+
+    def _emit(event, data, namespace, room=None, skip_sid=None, callback=None, to=None, **kwargs):
+        if _settings["enabled"]:
+            try:
+                recipients = _recipient_count(manager, namespace, to or room, skip_sid)
+            except Exception:
+                recipients = 0
+            SOCKET_EMITS.inc(event)
+            SOCKET_EMIT_FANOUT.observe(recipients, event)
+        return manager_emit(event, data, namespace, room=room, skip_sid=skip_sid, callback=callback, to=to, **kwargs)
+
+    socketio._handle_event = _handle_event
+    manager.emit = _emit
+    return True
+
+
+def _service_stats_collector():
+    from app.services.compression_stats import get_compression_stats
+    from app.services.password_hashing import get_password_hash_stats
+    from app.services.presence import get_presence_stats
+    from app.services.query_profiler import get_query_profile_stats
+    from app.services.read_receipts import get_read_receipt_stats
+    from app.services.socket_admission import get_admission_stats
+    from app.services.typing_indicators import get_typing_stats
+
+    sources = {
+        "password_hashing": get_password_hash_stats,
+        "compression": get_compression_stats,
+        "presence": get_presence_stats,
+        "typing": get_typing_stats,
+        "read_receipts": get_read_receipt_stats,
+        "socket_admission": get_admission_stats,
+        "db_queries": get_query_profile_stats,
+    }
+    values = []
+    for service, get_stats in sources.items():
+        try:
+            stats = get_stats()
+        except Exception as exc:
+            logger.warning(f"Metrics: {service} stats unavailable: {exc}")
+            continue
+        for stat, value in _flatten(stats):
+            values.append(({"service": service, "stat": stat}, value))
+    yield (
+        "messenger_service_stat",
+        "gauge",
+        "Counters and levels reported by the services' get_*_stats() (see /control/stats).",
+        values,
+    )
+
+
+def _flatten(stats: dict, prefix: str = ""):
+    for key, value in stats.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{name}_")
+        elif isinstance(value, (int, float)):
+            yield name, float(value)
+
+
+register_collector(_service_stats_collector)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Password hashing off the request loop.
+
+bcrypt is CPU-bound and would stall every gevent greenlet (and so every socket)
+while it runs. Hash/verify calls are handed to a bounded pool of real OS threads
+(bcrypt releases the GIL); under gevent the caller yields to the hub while it
+waits. Queue/latency counters are exposed through ``get_password_hash_stats()``.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, has_app_context
+
+from app.utils import hash_password as _hash_password_sync
+from app.utils import verify_password as _verify_password_sync
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BCRYPT_ROUNDS = 12
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {
+    "submitted": 0,
+    "completed": 0,
+    "inline": 0,
+    "queued": 0,
+    "running": 0,
+    "max_queued": 0,
+    "wait_ms_total": 0.0,
+    "wait_ms_max": 0.0,
+    "run_ms_total": 0.0,
+    "run_ms_max": 0.0,
+}
+
+
+def _config_value(name: str, default):
+    if has_app_context():
+        return current_app.config.get(name, default)
+    return default
+
+
+def get_bcrypt_rounds() -> int:
+    try:
+        rounds = int(_config_value("BCRYPT_ROUNDS", DEFAULT_BCRYPT_ROUNDS))
+    except (TypeError, ValueError):
+        rounds = DEFAULT_BCRYPT_ROUNDS
+    # bcrypt accepts 4..31
+    return max(4, min(31, rounds))
+
+
+def _gevent_patched() -> bool:
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("threading")
+
+
+class _GeventPool:
+    """Adapter so gevent's native-thread pool looks like an executor."""
+
+    def __init__(self, workers: int):
+        from gevent.threadpool import ThreadPool
+
+        self._pool = ThreadPool(workers)
+
+    def run(self, fn, *args):
+        # AsyncResult.get() parks only the calling greenlet
+        return self._pool.spawn(fn, *args).get()
+
+
+class _ThreadPool:
+    def __init__(self, workers: int):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash")
+
+    def run(self, fn, *args):
+        return self._pool.submit(fn, *args).result()
+
+
+def _get_pool(workers: int):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            _pool = _GeventPool(workers) if _gevent_patched() else _ThreadPool(workers)
+            _pool_workers = workers
+        return _pool
+
+
+def _run_timed(fn, args, enqueued_at: float):
+    started_at = time.perf_counter()
+    wait_ms = (started_at - enqueued_at) * 1000
+    with _stats_lock:
+        _stats["queued"] -= 1
+        _stats["running"] += 1
+        _stats["wait_ms_total"] += wait_ms
+        _stats["wait_ms_max"] = max(_stats["wait_ms_max"], wait_ms)
+    try:
+        return fn(*args)
+    finally:
+        run_ms = (time.perf_counter() - started_at) * 1000
+        with _stats_lock:
+            _stats["running"] -= 1
+            _stats["completed"] += 1
+            _stats["run_ms_total"] += run_ms
+            _stats["run_ms_max"] = max(_stats["run_ms_max"], run_ms)
+
+
+def _dispatch(fn, *args):
+    workers = int(_config_value("PASSWORD_HASH_WORKERS", 2) or 0)
+    if workers <= 0:
+        with _stats_lock:
+            _stats["inline"] += 1
+        return fn(*args)
+
+    with _stats_lock:
+        _stats["submitted"] += 1
+        _stats["queued"] += 1
+        _stats["max_queued"] = max(_stats["max_queued"], _stats["queued"])
+    return _get_pool(workers).run(_run_timed, fn, args, time.perf_counter())
+
+
+def hash_password(password: str) -> str:
+    """bcrypt-hash ``password`` in the worker pool at the configured work factor."""
+    return _dispatch(_hash_password_sync, password, get_bcrypt_rounds())
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    """Verify ``password`` against ``hashed`` in the worker pool."""
+    return _dispatch(_verify_password_sync, password, hashed)
+
+
+def needs_rehash(hashed: str) -> bool:
+    """True for legacy SHA-256 hashes and bcrypt hashes at a different work factor."""
+    if not hashed or not hashed.startswith("$2"):
+        return True
+    try:
+        return int(hashed.split("$")[2]) != get_bcrypt_rounds()
+    except (IndexError, ValueError):
+        return False
+
+
+def get_password_hash_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    completed = stats["completed"]
+    stats["wait_ms_avg"] = round(stats["wait_ms_total"] / completed, 2) if completed else 0.0
+    stats["run_ms_avg"] = round(stats["run_ms_total"] / completed, 2) if completed else 0.0
+    for key in ("wait_ms_total", "wait_ms_max", "run_ms_total", "run_ms_max"):
+        stats[key] = round(stats[key], 2)
+    stats["workers"] = _pool_workers
+    stats["bcrypt_rounds"] = get_bcrypt_rounds()
+    return stats
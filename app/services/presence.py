@@ -0,0 +1,433 @@
+# -*- coding: utf-8 -*-
+"""
+Presence: who is online, with debounced transitions and batched side effects.
+
+Each worker ("node") counts its own sockets per user and publishes the users it
+has online as a set in ``state_store`` (``presence:node:<node id>``), listed in
+``presence:nodes``. A node refreshes its ``presence:alive:<node id>`` key every
+``PRESENCE_HEARTBEAT_SECONDS``; a node whose key expired (a crashed worker) is
+swept by the next live heartbeat and its users go offline unless another node
+still has them. A last disconnect does not go offline immediately: the user is
+parked for ``PRESENCE_OFFLINE_GRACE_SECONDS`` and a reconnect inside that window
+cancels it (a flapping client produces no write and no broadcast). Transitions
+are collected and flushed together: one ``executemany`` for the status column,
+then one ``presence_diff`` frame per recipient listing every change among the
+users they share a room with, instead of one ``user_status`` emit per (user,
+room). A frame that carries every change of its flush also carries ``base``, the
+version it follows, so a client holding exactly that version applies it locally
+instead of refetching the list.
+
+The union of the node sets is what ``/api/users/online`` lists; ``users.status``
+is only a persisted copy, reconciled at startup. Each transition also lands in a
+bounded change log in ``state_store`` under a shared version counter, so clients
+can ask any worker for "what changed since version X" instead of the whole list.
+"""
+
+from __future__ import annotations
+
+import logging
+import secrets
+import threading
+import time
+
+from flask import current_app, has_app_context
+
+from app.models import get_room_peer_ids, get_users_by_ids, get_users_marked_online, set_user_statuses
+from app.services.socket_broadcasts import emit_presence_diff, get_socketio
+from app.state_store import state_store
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_connections: dict[int, int] = {}
+_online: set[int] = set()
+_pending_offline: dict[int, float] = {}
+_dirty: dict[int, str] = {}
+_dirty_versions: list[int] = []
+# this process' entry in the shared node registry
+_node_id = secrets.token_hex(4)
+_CHANGE_LOG_SIZE = 1000
+# a version missing from the change log is skipped once newer entries are this old
+_LOG_GAP_GRACE_SECONDS = 2.0
+_flush_scheduled = False
+_stats = {
+    "connects": 0,
+    "disconnects": 0,
+    "flaps_absorbed": 0,
+    "status_rows_written": 0,
+    "write_batches": 0,
+    "diff_frames": 0,
+    "dead_nodes_swept": 0,
+}
+
+
+_NODES_KEY = "presence:nodes"
+_VERSION_KEY = "presence:version"
+_CHANGES_KEY = "presence:changes"
+# identifies the shared version sequence; a token from another epoch cannot be diffed
+_EPOCH_KEY = "presence:epoch"
+
+
+def _node_key(node_id: str) -> str:
+    return f"presence:node:{node_id}"
+
+
+def _alive_key(node_id: str) -> str:
+    return f"presence:alive:{node_id}"
+
+
+def _settings() -> tuple[object | None, float, float, bool]:
+    """(app, grace, flush interval, inline) — inline flushes synchronously (tests, no socket server)."""
+    app = current_app._get_current_object() if has_app_context() else None
+    grace = float(app.config.get("PRESENCE_OFFLINE_GRACE_SECONDS", 5) if app else 0)
+    interval = float(app.config.get("PRESENCE_FLUSH_INTERVAL_SECONDS", 1) if app else 0)
+    inline = app is None or bool(app.config.get("TESTING")) or get_socketio() is None
+    return app, grace, interval, inline
+
+
+def _heartbeat_interval() -> float:
+    app = current_app._get_current_object() if has_app_context() else None
+    return max(1.0, float(app.config.get("PRESENCE_HEARTBEAT_SECONDS", 10) if app else 10))
+
+
+def _mark(user_id: int, status: str) -> None:
+    """Record a transition in the shared change log; caller holds ``_lock``."""
+    version = state_store.incr(_VERSION_KEY)
+    state_store.push_capped(_CHANGES_KEY, f"{version}:{user_id}:{status}:{time.time():.3f}", _CHANGE_LOG_SIZE)
+    _dirty[user_id] = status
+    _dirty_versions.append(version)
+
+
+def _touch_node() -> None:
+    state_store.set_value(_alive_key(_node_id), "1", ttl_seconds=int(_heartbeat_interval() * 3))
+    state_store.add_member(_NODES_KEY, _node_id)
+
+
+def presence_connected(user_id: int) -> bool:
+    """Register a new connection. Returns True if the user was offline before it."""
+    user_id = int(user_id)
+    with _lock:
+        _stats["connects"] += 1
+        _connections[user_id] = _connections.get(user_id, 0) + 1
+        if _pending_offline.pop(user_id, None) is not None:
+            _stats["flaps_absorbed"] += 1
+            return False
+        went_online = user_id not in _online
+        _online.add(user_id)
+        if went_online:
+            _mark(user_id, "online")
+    if went_online:
+        state_store.add_member(_node_key(_node_id), str(user_id))
+        _touch_node()
+        _schedule_flush()
+    return went_online
+
+
+def presence_disconnected(user_id: int, *, grace_seconds: float | None = None, now: float | None = None) -> bool:
+    """Drop a connection. Returns True if it was the user's last one here (offline is pending)."""
+    user_id = int(user_id)
+    _, default_grace, _, inline = _settings()
+    if grace_seconds is None:
+        grace_seconds = 0.0 if inline else default_grace
+    with _lock:
+        _stats["disconnects"] += 1
+        remaining = _connections.get(user_id, 0) - 1
+        if remaining > 0:
+            _connections[user_id] = remaining
+            return False
+        _connections.pop(user_id, None)
+        if user_id not in _online:
+            return False
+        _pending_offline[user_id] = (now if now is not None else time.time()) + max(0.0, grace_seconds)
+    _schedule_flush()
+    return True
+
+
+def _schedule_flush() -> None:
+    global _flush_scheduled
+    app, _, interval, inline = _settings()
+    if inline:
+        flush_presence()
+        return
+    with _lock:
+        if _flush_scheduled:
+            return
+        _flush_scheduled = True
+    get_socketio().start_background_task(_flush_loop, app, max(0.05, interval))
+
+
+def _flush_loop(app, interval: float) -> None:
+    """Flush every ``interval`` until nothing is pending (offline deadlines included)."""
+    global _flush_scheduled
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                flush_presence()
+            except Exception as exc:
+                logger.warning(f"Presence flush error: {exc}")
+        with _lock:
+            if not _dirty and not _pending_offline:
+                _flush_scheduled = False
+                return
+
+
+def _online_ids_on_nodes(node_ids) -> set[int]:
+    ids = set()
+    for node_id in node_ids:
+        for member in state_store.get_members(_node_key(node_id)):
+            try:
+                ids.add(int(member))
+            except (TypeError, ValueError):
+                continue
+    return ids
+
+
+def flush_presence(now: float | None = None) -> int:
+    """Apply expired offline deadlines, write statuses in one batch, push diffs. Returns changes flushed."""
+    now = time.time() if now is None else now
+    left = []
+    with _lock:
+        for user_id, deadline in list(_pending_offline.items()):
+            if deadline <= now:
+                del _pending_offline[user_id]
+                _online.discard(user_id)
+                left.append(user_id)
+    # leave this node's set before reading the others': two nodes dropping the same user
+    # at once then at worst both mark it offline, never both see it held by the other
+    for user_id in left:
+        state_store.remove_member(_node_key(_node_id), str(user_id))
+    # another node may hold a connection (or its own grace window) for these users
+    elsewhere = _online_ids_on_nodes(state_store.get_members(_NODES_KEY) - {_node_id}) if left else set()
+
+    returned = []
+    with _lock:
+        for user_id in left:
+            if user_id in _online:
+                # reconnected here meanwhile; presence_connected already recorded it
+                returned.append(user_id)
+                continue
+            if user_id in elsewhere:
+                _stats["flaps_absorbed"] += 1
+                continue
+            _mark(user_id, "offline")
+        changes = dict(_dirty)
+        versions = sorted(_dirty_versions)
+        _dirty.clear()
+        _dirty_versions.clear()
+        online_now = set(_online)
+
+    for user_id in returned:
+        state_store.add_member(_node_key(_node_id), str(user_id))
+    if not changes:
+        return 0
+
+    written = set_user_statuses(changes)
+    peers = get_room_peer_ids(list(changes))
+    frames: dict[int, list[dict]] = {}
+    for user_id, status in changes.items():
+        for peer_id in peers.get(user_id, ()):
+            # without a shared store, peers that are not connected here have nobody to receive it
+            if not state_store.redis_enabled and peer_id not in online_now:
+                continue
+            frames.setdefault(peer_id, []).append({"user_id": user_id, "status": status})
+    epoch = _shared_epoch()
+    # another node's transition in between means this flush is not one step from base
+    contiguous = versions == list(range(versions[0], versions[-1] + 1))
+    profiles = get_users_by_ids([uid for uid, status in changes.items() if status == "online"]) if frames else {}
+    payloads = {}
+    for peer_id, peer_changes in frames.items():
+        payloads[peer_id] = {
+            "version": f"{epoch}.{versions[-1]}",
+            # a frame filtered down to this peer's rooms is not a complete step either
+            "base": f"{epoch}.{versions[0] - 1}" if contiguous and len(peer_changes) == len(changes) else None,
+            "changes": peer_changes,
+            "users": [
+                profiles[ch["user_id"]] for ch in peer_changes
+                if ch["status"] == "online" and ch["user_id"] in profiles
+            ],
+        }
+    emit_presence_diff(payloads)
+
+    with _lock:
+        _stats["status_rows_written"] += written
+        _stats["write_batches"] += 1
+        _stats["diff_frames"] += len(frames)
+    return len(changes)
+
+
+def sweep_dead_presence_nodes() -> int:
+    """Take users of nodes that stopped heartbeating offline. Returns the number of users swept."""
+    nodes = state_store.get_members(_NODES_KEY)
+    dead = {node_id for node_id in nodes - {_node_id} if state_store.get_value(_alive_key(node_id)) is None}
+    if not dead:
+        return 0
+    orphaned = _online_ids_on_nodes(dead)
+    still_online = _online_ids_on_nodes(nodes - dead)
+    for node_id in dead:
+        state_store.delete(_node_key(node_id))
+        state_store.remove_member(_NODES_KEY, node_id)
+
+    with _lock:
+        gone = orphaned - still_online - _online
+        for user_id in sorted(gone):
+            _mark(user_id, "offline")
+        _stats["dead_nodes_swept"] += len(dead)
+    if gone:
+        logger.info(f"Presence sweep: {len(dead)} dead node(s), {len(gone)} user(s) offline")
+        flush_presence()
+    return len(gone)
+
+
+def presence_heartbeat() -> int:
+    """Refresh this node's liveness and sweep dead nodes. Returns the number of users swept offline."""
+    _touch_node()
+    return sweep_dead_presence_nodes()
+
+
+def run_presence_heartbeat(app) -> None:
+    """Background loop calling ``presence_heartbeat`` every ``PRESENCE_HEARTBEAT_SECONDS``."""
+    with app.app_context():
+        interval = _heartbeat_interval()
+    while True:
+        with app.app_context():
+            try:
+                presence_heartbeat()
+            except Exception as exc:
+                logger.warning(f"Presence heartbeat error: {exc}")
+        time.sleep(interval)
+
+
+def is_user_online(user_id: int) -> bool:
+    with _lock:
+        return int(user_id) in _online
+
+
+def get_online_user_ids() -> set[int]:
+    """Online user ids across all workers (the union of the node sets)."""
+    return _online_ids_on_nodes(state_store.get_members(_NODES_KEY) | {_node_id})
+
+
+def _shared_epoch() -> str:
+    epoch = state_store.get_value(_EPOCH_KEY)
+    if not epoch:
+        epoch = secrets.token_hex(4)
+        state_store.set_value(_EPOCH_KEY, epoch)
+    return epoch
+
+
+def _read_change_log() -> tuple[int, int, int, dict[int, tuple[int, str]]]:
+    """(floor, settled version, head version, entries by version).
+
+    ``floor`` is the newest version the log no longer covers (0 until it wraps).
+    ``settled`` is the newest version below which nothing is still missing: a
+    node bumps the counter before appending its entry, so a hole right behind
+    newer entries is a write in flight until those entries are a moment old.
+    """
+    head = int(state_store.get_value(_VERSION_KEY) or 0)
+    raw_entries = state_store.get_list(_CHANGES_KEY)
+    entries: dict[int, tuple[int, str]] = {}
+    stamps: dict[int, float] = {}
+    for raw in raw_entries:
+        try:
+            version, user_id, status, stamp = raw.split(":")
+            entries[int(version)] = (int(user_id), status)
+            stamps[int(version)] = float(stamp)
+        except ValueError:
+            continue
+
+    now = time.time()
+    floor = min(entries) - 1 if entries and len(raw_entries) >= _CHANGE_LOG_SIZE else 0
+    expected = floor + 1
+    for version in sorted(entries):
+        if version > expected and now - stamps[version] < _LOG_GAP_GRACE_SECONDS:
+            return floor, expected - 1, head, entries
+        expected = version + 1
+    # versions above the last entry are still being appended
+    return floor, min(expected - 1, head), head, entries
+
+
+def presence_version() -> str:
+    """Opaque token for the current presence state, ``<epoch>.<version>``."""
+    _, settled, _, _ = _read_change_log()
+    return f"{_shared_epoch()}.{settled}"
+
+
+def get_presence_changes_since(token: str | None) -> tuple[str, list[dict] | None]:
+    """(current token, changes since ``token``), latest status per user in version order.
+
+    Changes are ``None`` when the caller must reload the full list instead: no or
+    unknown token, or a token older than the change log.
+    """
+    epoch = _shared_epoch()
+    floor, settled, head, entries = _read_change_log()
+    current = f"{epoch}.{settled}"
+    if not token:
+        return current, None
+    token_epoch, _, raw_version = token.partition(".")
+    try:
+        since = int(raw_version)
+    except ValueError:
+        return current, None
+    if token_epoch != epoch or since < 0 or since > head:
+        return current, None
+    if since < floor:
+        return current, None
+    latest: dict[int, tuple[int, str]] = {}
+    for version in sorted(entries):
+        if since < version <= settled:
+            user_id, status = entries[version]
+            latest[user_id] = (version, status)
+    ordered = sorted(latest.items(), key=lambda item: item[1][0])
+    # a token from a frame may already be past the settled version
+    return f"{epoch}.{max(settled, since)}", [
+        {"user_id": user_id, "status": status} for user_id, (_, status) in ordered
+    ]
+
+
+def reconcile_presence() -> int:
+    """Mark ``users.status = 'online'`` rows offline unless the presence set has them.
+
+    A crash leaves rows online with nobody connected; run once at startup.
+    Returns the number of rows corrected.
+    """
+    sweep_dead_presence_nodes()
+    stale = get_users_marked_online() - get_online_user_ids()
+    if not stale:
+        return 0
+    written = set_user_statuses({user_id: "offline" for user_id in stale})
+    if written:
+        logger.info(f"Presence reconciliation marked {written} stale user(s) offline")
+    return written
+
+
+def get_presence_stats() -> dict:
+    version = int(state_store.get_value(_VERSION_KEY) or 0)
+    with _lock:
+        stats = dict(_stats)
+        stats.update(
+            online_users=len(_online),
+            pending_offline=len(_pending_offline),
+            pending_changes=len(_dirty),
+            version=version,
+        )
+    return stats
+
+
+def reset_presence() -> None:
+    """Forget all presence state, this node's and the shared keys (tests, or a fresh database)."""
+    global _flush_scheduled
+    with _lock:
+        for node_id in state_store.get_members(_NODES_KEY) | {_node_id}:
+            state_store.delete(_node_key(node_id))
+            state_store.delete(_alive_key(node_id))
+        for key in (_NODES_KEY, _VERSION_KEY, _CHANGES_KEY, _EPOCH_KEY):
+            state_store.delete(key)
+        _connections.clear()
+        _online.clear()
+        _pending_offline.clear()
+        _dirty.clear()
+        _dirty_versions.clear()
+        _flush_scheduled = False
+        for key in _stats:
+            _stats[key] = 0
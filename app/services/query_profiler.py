@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+SQL statement profiling.
+
+With ``DB_QUERY_PROFILING`` on, ``app.models.base`` opens its connections with
+profiled connection/cursor classes that report every ``execute`` here. Timings
+are aggregated per normalized statement (literals and ``IN (?, ?, …)`` lists
+collapsed) into a fixed-bucket latency histogram. Statements at or above
+``DB_SLOW_QUERY_MS`` are logged with their ``EXPLAIN QUERY PLAN`` and the model
+function that ran them, and kept in a short ring for ``GET /control/queries``.
+Each statement is also observed in the ``messenger_db_query_duration_seconds``
+metric by verb.
+
+The time measured is ``execute`` itself: for a SELECT that is planning plus the
+first row; rows fetched afterwards are not included. With profiling off (and
+metrics on) connections only time each statement for that per-verb metric via
+``observe_query``; with metrics off as well they are plain ``sqlite3.Connection``
+objects and nothing here runs.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from functools import lru_cache
+
+from app.services.metrics import DB_QUERY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# histogram upper bounds in ms; the last bucket is everything slower
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+_MAX_STATEMENTS = 500
+_OTHER_KEY = "<other>"
+_SLOW_LOG_SIZE = 100
+
+_lock = threading.Lock()
+_settings = {"enabled": False, "slow_query_ms": 200.0}
+_statements: dict[str, dict] = {}
+_slow: deque = deque(maxlen=_SLOW_LOG_SIZE)
+_stats = {"queries": 0, "slow_queries": 0}
+
+_SPACE_RE = re.compile(r"\s+")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+# statement verbs get their own metrics label; anything else is "OTHER"
+_VERBS = frozenset({"SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE", "BEGIN", "COMMIT", "ROLLBACK", "PRAGMA"})
+# frames in these files are the plumbing between the model function and sqlite
+_SKIP_FILES = (os.path.normcase(os.path.join("app", "models", "base.py")), os.path.normcase(__file__))
+
+
+@lru_cache(maxsize=4096)
+def normalize_sql(sql: str) -> str:
+    """Statement shape used as the aggregation key: whitespace, literals and placeholder lists collapsed."""
+    text = _SPACE_RE.sub(" ", sql).strip()
+    text = _STRING_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    return _IN_LIST_RE.sub("(?…)", text)
+
+
+def configure(enabled: bool, slow_query_ms: float | None = None) -> None:
+    with _lock:
+        _settings["enabled"] = bool(enabled)
+        if slow_query_ms is not None:
+            _settings["slow_query_ms"] = max(0.0, float(slow_query_ms))
+
+
+def is_enabled() -> bool:
+    return _settings["enabled"]
+
+
+@lru_cache(maxsize=4096)
+def statement_verb(sql: str) -> str:
+    """Metrics label for a statement: its leading keyword, or ``OTHER``."""
+    head = sql.lstrip()[:10].split(None, 1)
+    verb = head[0].upper() if head else ""
+    return verb if verb in _VERBS else "OTHER"
+
+
+def observe_query(sql: str, elapsed_s: float) -> None:
+    """Always-on accounting of one ``execute``: the per-verb latency metric only."""
+    DB_QUERY_SECONDS.observe(elapsed_s, statement_verb(sql))
+
+
+def record_query(conn, sql: str, parameters, elapsed_s: float) -> None:
+    """Account one ``execute``; ``parameters`` is None for ``executemany``."""
+    elapsed_ms = elapsed_s * 1000
+    key = normalize_sql(sql)
+    bucket = bisect_left(BUCKETS_MS, elapsed_ms)
+    observe_query(sql, elapsed_s)
+    with _lock:
+        entry = _statements.get(key)
+        if entry is None:
+            if len(_statements) >= _MAX_STATEMENTS:
+                key = _OTHER_KEY
+                entry = _statements.get(key)
+            if entry is None:
+                entry = _statements[key] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "buckets": [0] * (len(BUCKETS_MS) + 1)}
+        entry["count"] += 1
+        entry["total_ms"] += elapsed_ms
+        if elapsed_ms > entry["max_ms"]:
+            entry["max_ms"] = elapsed_ms
+        entry["buckets"][bucket] += 1
+        _stats["queries"] += 1
+        slow = elapsed_ms >= _settings["slow_query_ms"]
+        if slow:
+            _stats["slow_queries"] += 1
+    if slow:
+        _record_slow(conn, sql, parameters, key, elapsed_ms)
+
+
+def _caller() -> str:
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.normcase(frame.f_code.co_filename)
+        if not filename.endswith(_SKIP_FILES) and "sqlite3" not in filename:
+            parts = filename.replace("\\", "/").split("/")
+            return f"{'/'.join(parts[-3:])}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def explain(conn, sql: str, parameters=()) -> list[str]:
+    """``EXPLAIN QUERY PLAN`` details for one statement, bypassing profiling; empty if it cannot be explained."""
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return []
+    try:
+        rows = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", parameters or ())
+        return [row[3] for row in rows.fetchall()]
+    except Exception as exc:
+        return [f"<explain failed: {exc}>"]
+
+
+def _record_slow(conn, sql: str, parameters, key: str, elapsed_ms: float) -> None:
+    caller = _caller()
+    plan = explain(conn, sql, parameters) if parameters is not None else []
+    entry = {
+        "sql": key,
+        "ms": round(elapsed_ms, 3),
+        "caller": caller,
+        "plan": plan,
+        "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    with _lock:
+        _slow.append(entry)
+    logger.warning(f"Slow query {elapsed_ms:.1f}ms at {caller}: {key[:300]} | plan: {'; '.join(plan) or '-'}")
+
+
+def _percentile_ms(entry: dict, pct: float) -> float:
+    """Upper bound of the bucket holding the ``pct`` rank (the max for the overflow bucket)."""
+    rank = max(1, int(round(entry["count"] * pct / 100)))
+    seen = 0
+    for index, count in enumerate(entry["buckets"]):
+        seen += count
+        if seen >= rank:
+            return float(BUCKETS_MS[index]) if index < len(BUCKETS_MS) else round(entry["max_ms"], 3)
+    return round(entry["max_ms"], 3)
+
+
+_SORT_KEYS = {
+    "total": lambda item: item[1]["total_ms"],
+    "count": lambda item: item[1]["count"],
+    "max": lambda item: item[1]["max_ms"],
+    "mean": lambda item: item[1]["total_ms"] / item[1]["count"],
+}
+
+
+def get_top_queries(limit: int = 20, sort: str = "total") -> list[dict]:
+    """Heaviest statements by ``sort`` (total, count, max or mean latency)."""
+    with _lock:
+        items = [(key, {**entry, "buckets": list(entry["buckets"])}) for key, entry in _statements.items()]
+    items.sort(key=_SORT_KEYS.get(sort, _SORT_KEYS["total"]), reverse=True)
+    top = []
+    for key, entry in items[: max(0, int(limit))]:
+        top.append({
+            "sql": key,
+            "count": entry["count"],
+            "total_ms": round(entry["total_ms"], 3),
+            "mean_ms": round(entry["total_ms"] / entry["count"], 3),
+            "max_ms": round(entry["max_ms"], 3),
+            "p50_ms": _percentile_ms(entry, 50),
+            "p99_ms": _percentile_ms(entry, 99),
+            "histogram": dict(zip([str(b) for b in BUCKETS_MS] + ["+Inf"], entry["buckets"])),
+        })
+    return top
+
+
+def get_slow_queries(limit: int = 20) -> list[dict]:
+    """Most recent slow statements first."""
+    with _lock:
+        entries = list(_slow)
+    return [dict(entry) for entry in reversed(entries[-max(0, int(limit)):])] if limit else []
+
+
+def get_query_profile_stats() -> dict:
+    with _lock:
+        return {
+            "enabled": _settings["enabled"],
+            "slow_query_ms": _settings["slow_query_ms"],
+            "statements": len(_statements),
+            "queries": _stats["queries"],
+            "slow_queries": _stats["slow_queries"],
+        }
+
+
+def reset_query_profile() -> None:
+    """Forget all timings and the slow log (tests); the enabled switch is left as is."""
+    with _lock:
+        _statements.clear()
+        _slow.clear()
+        for key in _stats:
+            _stats[key] = 0
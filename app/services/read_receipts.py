@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Buffered read receipts.
+
+``message_read`` arrives constantly while a client scrolls. Positions are kept
+here per (room, user) as the highest message id seen, then written to
+``room_members.last_read_message_id`` with one ``executemany`` per flush and
+announced as one ``read_receipts`` frame per room. A report at or below the
+buffered position is dropped before any query runs.
+
+Flushes run every ``READ_RECEIPT_FLUSH_INTERVAL_SECONDS`` while anything is
+buffered, so a crash loses at most that much read progress. A failed write puts
+its positions back and is retried by the next flush. HTTP reads of unread counts
+first flush the keys they depend on: the caller's own positions for the room
+list, the room's positions for a message page.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from flask import current_app, has_app_context
+
+from app.models import update_last_read_batch
+from app.services.socket_broadcasts import emit_read_receipts, get_socketio
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+# (room_id, user_id) -> highest message id read, not yet written
+_pending: dict[tuple[int, int], int] = {}
+# (room_id, user_id) -> highest message id buffered since start (skips re-validating older reports)
+_high_water: dict[tuple[int, int], int] = {}
+_HIGH_WATER_MAX = 10000
+_flush_scheduled = False
+_stats = {
+    "reports": 0,
+    "reports_skipped": 0,
+    "rows_written": 0,
+    "write_batches": 0,
+    "write_failures": 0,
+    "frames_sent": 0,
+}
+
+
+def _settings() -> tuple[object | None, float, bool]:
+    """(app, flush interval, inline) — inline flushes synchronously (tests, no socket server)."""
+    app = current_app._get_current_object() if has_app_context() else None
+    interval = float(app.config.get("READ_RECEIPT_FLUSH_INTERVAL_SECONDS", 1) if app else 0)
+    inline = app is None or bool(app.config.get("TESTING")) or interval <= 0 or get_socketio() is None
+    return app, interval, inline
+
+
+def is_stale_read(room_id: int, user_id: int, message_id: int) -> bool:
+    """True if ``message_id`` does not advance this user's buffered position (no need to validate it)."""
+    with _lock:
+        stale = message_id <= _high_water.get((int(room_id), int(user_id)), 0)
+        _stats["reports"] += 1
+        if stale:
+            _stats["reports_skipped"] += 1
+    return stale
+
+
+def buffer_read(room_id: int, user_id: int, message_id: int) -> bool:
+    """Record a validated read position. Returns True if it advanced the buffered one."""
+    key = (int(room_id), int(user_id))
+    message_id = int(message_id)
+    with _lock:
+        if message_id <= _high_water.get(key, 0):
+            return False
+        if len(_high_water) >= _HIGH_WATER_MAX and key not in _high_water:
+            # only an optimization; the UPDATE's WHERE clause still keeps positions monotonic
+            _high_water.clear()
+        _high_water[key] = message_id
+        _pending[key] = message_id
+    _schedule_flush()
+    return True
+
+
+def _schedule_flush() -> None:
+    global _flush_scheduled
+    app, interval, inline = _settings()
+    if inline:
+        flush_read_receipts()
+        return
+    with _lock:
+        if _flush_scheduled:
+            return
+        _flush_scheduled = True
+    get_socketio().start_background_task(_flush_loop, app, max(0.05, interval))
+
+
+def _flush_loop(app, interval: float) -> None:
+    global _flush_scheduled
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                flush_read_receipts()
+            except Exception as exc:
+                logger.warning(f"Read receipt flush error: {exc}")
+        with _lock:
+            if not _pending:
+                _flush_scheduled = False
+                return
+
+
+def flush_read_receipts(*, room_id: int | None = None, user_id: int | None = None) -> int:
+    """Write buffered positions in one transaction and broadcast them per room. Returns positions flushed.
+
+    ``room_id`` / ``user_id`` restrict the flush to that room's or that user's positions.
+    """
+    with _lock:
+        if not _pending:
+            return 0
+        batch = {
+            key: message_id
+            for key, message_id in _pending.items()
+            if (room_id is None or key[0] == room_id) and (user_id is None or key[1] == user_id)
+        }
+        for key in batch:
+            del _pending[key]
+    if not batch:
+        return 0
+
+    written = update_last_read_batch((rid, uid, message_id) for (rid, uid), message_id in batch.items())
+    if written is None:
+        with _lock:
+            # a newer report may have been buffered meanwhile; keep the higher position
+            for key, message_id in batch.items():
+                _pending[key] = max(message_id, _pending.get(key, 0))
+            _stats["write_failures"] += 1
+        return 0
+    by_room: dict[int, list[dict]] = {}
+    for (rid, uid), message_id in sorted(batch.items()):
+        by_room.setdefault(rid, []).append({"user_id": uid, "message_id": message_id})
+    for rid, reads in by_room.items():
+        emit_read_receipts(rid, reads)
+
+    with _lock:
+        _stats["rows_written"] += written
+        _stats["write_batches"] += 1
+        _stats["frames_sent"] += len(by_room)
+    return len(batch)
+
+
+def get_read_receipt_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+        stats["pending"] = len(_pending)
+    return stats
+
+
+def reset_read_receipts() -> None:
+    """Forget all buffered state (tests)."""
+    global _flush_scheduled
+    with _lock:
+        _pending.clear()
+        _high_water.clear()
+        _flush_scheduled = False
+        for key in _stats:
+            _stats[key] = 0
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Deferred, per-room coalesced security pushes after room-key rotation.
+
+Account deletion rotates the keys of every room the account was in inside its
+own transaction, so a crash can never leave the deleted member's key current.
+Only the ``room_security_updated`` push to the remaining members is deferred
+here: several deletions in a short window touching the same room send one push
+per member instead of one per deletion. A push lost to a restart is harmless;
+clients pick up the new key version from the next room fetch.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from flask import current_app, has_app_context
+
+from app.models import get_room_members
+from app.services.socket_broadcasts import emit_room_security_updated, get_socketio
+
+logger = logging.getLogger(__name__)
+
+_pending_lock = threading.Lock()
+_pending_room_ids: set[int] = set()
+_flush_scheduled = False
+
+
+def defer_room_security_push(room_ids) -> None:
+    """Queue rooms whose key was rotated for one push after ``ROOM_KEY_ROTATION_DEFER_SECONDS``."""
+    global _flush_scheduled
+    targets = {int(room_id) for room_id in room_ids if int(room_id) > 0}
+    if not targets:
+        return
+
+    app = current_app._get_current_object() if has_app_context() else None
+    delay = float(app.config.get("ROOM_KEY_ROTATION_DEFER_SECONDS", 2) if app else 0)
+    socketio_instance = get_socketio()
+    inline = app is None or delay <= 0 or bool(app.config.get("TESTING")) or socketio_instance is None
+
+    with _pending_lock:
+        _pending_room_ids.update(targets)
+        if inline:
+            schedule = False
+        else:
+            schedule = not _flush_scheduled
+            _flush_scheduled = True
+
+    if inline:
+        flush_deferred_room_security_pushes()
+        return
+    if schedule:
+        socketio_instance.start_background_task(_delayed_flush, app, delay)
+
+
+def _delayed_flush(app, delay: float) -> None:
+    global _flush_scheduled
+    time.sleep(delay)
+    with _pending_lock:
+        _flush_scheduled = False
+    with app.app_context():
+        flush_deferred_room_security_pushes()
+
+
+def flush_deferred_room_security_pushes() -> int:
+    """Push the current security bundle for every queued room once. Returns the number of rooms pushed."""
+    with _pending_lock:
+        room_ids = sorted(_pending_room_ids)
+        _pending_room_ids.clear()
+
+    pushed = 0
+    for room_id in room_ids:
+        try:
+            member_ids = [member["id"] for member in get_room_members(room_id)]
+            if not member_ids:
+                continue
+            emit_room_security_updated(room_id, member_ids)
+            pushed += 1
+        except Exception as exc:
+            logger.warning(f"Deferred room security push error: room_id={room_id}, error={exc}")
+    return pushed
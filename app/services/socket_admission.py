@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Socket.IO admission control and outbound backpressure.
+
+After a restart every client reconnects at once. Connects are admitted through
+a token bucket (``SOCKET_CONNECT_RATE_PER_SECOND`` / ``SOCKET_CONNECT_BURST``)
+and a concurrency cap (``MAX_CONNECTIONS``); a refused client gets a jittered
+``retry_after`` so the retries spread out instead of arriving as a second wave.
+Connected clients receive ``connection_policy`` with the reconnect backoff to
+use the next time the server goes away.
+
+Engine.IO keeps an unbounded packet queue per connection; a consumer that stops
+reading pins memory. ``install_outbound_queue_limit`` bounds it: past
+``SOCKET_OUTBOUND_QUEUE_LIMIT`` packets the connection is closed (the client
+reconnects and resyncs) rather than buffering more.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_stats = {
+    "admitted": 0,
+    "refused_rate": 0,
+    "refused_capacity": 0,
+    "packets_dropped": 0,
+    "slow_consumers_closed": 0,
+}
+
+
+class TokenBucket:
+    """``rate`` tokens per second up to ``burst``; not thread-safe on its own."""
+
+    def __init__(self, rate: float, burst: float, now: float | None = None):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic() if now is None else now
+
+    def take(self, now: float | None = None) -> float:
+        """Take one token. Returns 0 on success, otherwise seconds until one is available."""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+_bucket: TokenBucket | None = None
+
+
+def _jittered(seconds: float) -> float:
+    """Full jitter over [seconds, 2 * seconds] so refused clients do not retry in lockstep."""
+    return round(seconds * (1 + random.random()), 2)
+
+
+def admit_connection(config, active_connections: int, *, now: float | None = None) -> dict | None:
+    """Decide on a new connection. Returns None to admit, or the refusal payload for the client."""
+    global _bucket
+    rate = float(config.get("SOCKET_CONNECT_RATE_PER_SECOND", 0) or 0)
+    burst = float(config.get("SOCKET_CONNECT_BURST", 0) or 0) or rate
+    max_connections = int(config.get("MAX_CONNECTIONS", 0) or 0)
+    retry_base = float(config.get("SOCKET_RETRY_AFTER_SECONDS", 5) or 1)
+
+    with _lock:
+        if max_connections > 0 and active_connections >= max_connections:
+            _stats["refused_capacity"] += 1
+            return {"code": "server_busy", "message": "접속자가 많습니다. 잠시 후 다시 연결합니다.", "retry_after": _jittered(retry_base)}
+        if rate > 0:
+            if _bucket is None or _bucket.rate != rate or _bucket.burst != max(1.0, burst):
+                _bucket = TokenBucket(rate, burst, now)
+            wait = _bucket.take(now)
+            if wait > 0:
+                _stats["refused_rate"] += 1
+                return {
+                    "code": "rate_limited",
+                    "message": "연결 요청이 많습니다. 잠시 후 다시 연결합니다.",
+                    "retry_after": _jittered(max(wait, 0.5)),
+                }
+        _stats["admitted"] += 1
+    return None
+
+
+def connection_policy(config) -> dict:
+    """Reconnect backoff for the client to apply to its next disconnect."""
+    return {
+        "reconnect_delay_ms": int(config.get("SOCKET_RECONNECT_DELAY_MS", 1000)),
+        "reconnect_delay_max_ms": int(config.get("SOCKET_RECONNECT_DELAY_MAX_MS", 15000)),
+        "randomization_factor": 0.5,
+    }
+
+
+def install_outbound_queue_limit(socketio, limit: int) -> bool:
+    """Bound every Engine.IO connection's outbound queue to ``limit`` packets (0 = unbounded)."""
+    eio = getattr(getattr(socketio, "server", None), "eio", None)
+    if eio is None or limit <= 0:
+        return False
+    base_class = type(eio.create_queue())
+
+    class BoundedOutboundQueue(base_class):
+        overflowed = False
+
+        def put(self, item, *args, **kwargs):
+            # None is Engine.IO's close sentinel and must always get through;
+            # once over the limit the connection is being closed, so nothing else is queued
+            if item is not None and (self.overflowed or self.qsize() >= limit):
+                _on_overflow(eio, self)
+                return
+            super().put(item, *args, **kwargs)
+
+    def create_queue(*args, **kwargs):
+        return BoundedOutboundQueue(*args, **kwargs)
+
+    eio.create_queue = create_queue
+    return True
+
+
+def _on_overflow(eio, queue) -> None:
+    with _lock:
+        _stats["packets_dropped"] += 1
+        if queue.overflowed:
+            return
+        queue.overflowed = True
+        _stats["slow_consumers_closed"] += 1
+    sid = next((sid for sid, sock in list(eio.sockets.items()) if getattr(sock, "queue", None) is queue), None)
+    if sid is None:
+        return
+    logger.warning(f"Closing slow Socket.IO consumer: sid={sid}, queued={queue.qsize()}")
+    # not from inside the sender's put(); the disconnect handlers run on close
+    eio.start_background_task(_close_slow_consumer, eio, sid, queue)
+
+
+def _close_slow_consumer(eio, sid: str, queue) -> None:
+    # release the backlog first; a graceful close would wait for the client to drain it
+    empty = eio.get_queue_empty_exception()
+    while True:
+        try:
+            queue.get(block=False)
+            queue.task_done()
+        except empty:
+            break
+    sock = eio.sockets.get(sid)
+    if sock is not None:
+        sock.close(wait=False, abort=True)
+        eio.sockets.pop(sid, None)
+
+
+def get_admission_stats() -> dict:
+    with _lock:
+        return dict(_stats)
+
+
+def reset_admission() -> None:
+    """Forget the bucket and counters (tests)."""
+    global _bucket
+    with _lock:
+        _bucket = None
+        for key in _stats:
+            _stats[key] = 0
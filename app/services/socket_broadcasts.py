@@ -7,7 +7,8 @@ from __future__ import annotations
 
 import logging
 
-from app.models import create_message, get_room_security_bundle
+from app.models import create_message, get_room_security_bundles
+from app.services.upload_access import invalidate_file_access
 from app.socket_events.state import get_active_user_sids, invalidate_user_cache
 
 logger = logging.getLogger(__name__)
@@ -33,10 +34,13 @@ def emit_room_members_updated(room_id: int) -> None:
 
 
 def _emit_to_user_rooms(event: str, user_ids: list[int] | tuple[int, ...] | set[int], payload: dict) -> None:
+    target_ids = {int(uid) for uid in user_ids if isinstance(uid, int) and uid > 0}
+    # membership changed: cached upload download decisions for these users are stale
+    invalidate_file_access(target_ids)
     socketio_instance = get_socketio()
     if not socketio_instance:
         return
-    for user_id in {int(uid) for uid in user_ids if isinstance(uid, int) and uid > 0}:
+    for user_id in target_ids:
         try:
             invalidate_user_cache(user_id)
             socketio_instance.emit(event, payload, to=f"user_{user_id}")
@@ -59,9 +63,11 @@ def emit_room_security_updated(room_id: int, user_ids: list[int] | tuple[int, ..
     socketio_instance = get_socketio()
     if not socketio_instance:
         return
-    for user_id in {int(uid) for uid in user_ids if isinstance(uid, int) and uid > 0}:
+    target_ids = {int(uid) for uid in user_ids if isinstance(uid, int) and uid > 0}
+    bundles = get_room_security_bundles(room_id, target_ids)
+    for user_id in target_ids:
         try:
-            payload = get_room_security_bundle(room_id, user_id)
+            payload = bundles.get(user_id)
             if not payload:
                 continue
             invalidate_user_cache(user_id)
@@ -144,3 +150,48 @@ def emit_pin_system_message(room_id: int, actor_user_id: int, content: str) -> N
             socketio_instance.emit("new_message", sys_msg, to=f"room_{room_id}")
     except Exception as exc:
         logger.warning(f"pin system message emit failed: room_id={room_id}, error={exc}")
+
+
+def emit_upload_scan_completed(user_id: int, payload: dict) -> None:
+    socketio_instance = get_socketio()
+    if not socketio_instance:
+        return
+    try:
+        socketio_instance.emit("upload_scan_completed", payload, to=f"user_{user_id}")
+    except Exception as exc:
+        logger.warning(f"upload_scan_completed emit failed: user_id={user_id}, error={exc}")
+
+
+def emit_presence_diff(payloads: dict[int, dict]) -> None:
+    """One ``presence_diff`` per recipient carrying every status change among their room peers."""
+    socketio_instance = get_socketio()
+    if not socketio_instance:
+        return
+    for user_id, payload in payloads.items():
+        try:
+            socketio_instance.emit("presence_diff", payload, to=f"user_{user_id}")
+        except Exception as exc:
+            logger.warning(f"presence_diff emit failed: user_id={user_id}, error={exc}")
+
+
+def emit_room_typers(room_id: int, typers: list[dict], node: str) -> None:
+    socketio_instance = get_socketio()
+    if not socketio_instance:
+        return
+    try:
+        socketio_instance.emit(
+            "room_typers", {"room_id": room_id, "node": node, "typers": typers}, to=f"room_{room_id}"
+        )
+    except Exception as exc:
+        logger.warning(f"room_typers emit failed: room_id={room_id}, error={exc}")
+
+
+def emit_read_receipts(room_id: int, reads: list[dict]) -> None:
+    """One ``read_receipts`` frame per room and flush instead of one ``read_updated`` per read event."""
+    socketio_instance = get_socketio()
+    if not socketio_instance:
+        return
+    try:
+        socketio_instance.emit("read_receipts", {"room_id": room_id, "reads": reads}, to=f"room_{room_id}")
+    except Exception as exc:
+        logger.warning(f"read_receipts emit failed: room_id={room_id}, error={exc}")
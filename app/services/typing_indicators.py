@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Per-room typing aggregation.
+
+Clients report ``typing`` on every input burst. Instead of relaying each report
+to the room, the current typers of a room are kept here with an expiry
+(``TYPING_TTL_SECONDS``) and a single ``room_typers`` snapshot is broadcast at
+most every ``TYPING_BROADCAST_INTERVAL_MS``, and only when the set of typers
+actually changed. A refresh from someone already typing costs a dict update.
+
+Each worker only sees the typers connected to it, so snapshots carry this
+worker's ``node`` id and clients merge the latest snapshot per node. While a
+room has typers its snapshot is re-sent every half ``TYPING_TTL_SECONDS``; a
+client drops a node's snapshot that stops being refreshed (a dead worker).
+"""
+
+from __future__ import annotations
+
+import logging
+import secrets
+import threading
+import time
+
+from flask import current_app, has_app_context
+
+from app.services.socket_broadcasts import emit_room_typers, get_socketio
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+# room_id -> {user_id: (expires_at, nickname)}
+_typers: dict[int, dict[int, tuple[float, str]]] = {}
+# room_id -> (user ids, sent at) of the last snapshot sent
+_last_sent: dict[int, tuple[tuple[int, ...], float]] = {}
+# tags this worker's snapshots; clients merge one snapshot per node
+_node_id = secrets.token_hex(4)
+_dirty_rooms: set[int] = set()
+_flush_scheduled = False
+_stats = {
+    "reports": 0,
+    "snapshots_sent": 0,
+    "expired": 0,
+}
+
+
+def _settings() -> tuple[object | None, float, float, bool]:
+    """(app, ttl, broadcast interval, inline) — inline flushes synchronously (tests, no socket server)."""
+    app = current_app._get_current_object() if has_app_context() else None
+    ttl = float(app.config.get("TYPING_TTL_SECONDS", 5) if app else 5)
+    interval = float(app.config.get("TYPING_BROADCAST_INTERVAL_MS", 300) if app else 0) / 1000.0
+    inline = app is None or bool(app.config.get("TESTING")) or get_socketio() is None
+    return app, ttl, interval, inline
+
+
+def record_typing(room_id: int, user_id: int, nickname: str, is_typing: bool, *, now: float | None = None) -> bool:
+    """Apply one typing report. Returns True if it changed the room's set of typers."""
+    room_id, user_id = int(room_id), int(user_id)
+    now = time.time() if now is None else now
+    _, ttl, _, inline = _settings()
+    with _lock:
+        _stats["reports"] += 1
+        room = _typers.get(room_id)
+        if is_typing:
+            if room is None:
+                room = _typers[room_id] = {}
+            changed = user_id not in room
+            room[user_id] = (now + ttl, nickname)
+        else:
+            changed = room is not None and room.pop(user_id, None) is not None
+            if room is not None and not room:
+                del _typers[room_id]
+        if changed:
+            _dirty_rooms.add(room_id)
+    if changed or is_typing:
+        # a refresh needs no snapshot, but the expiry sweep must keep running
+        _schedule_flush(inline)
+    return changed
+
+
+def clear_user_typing(user_id: int) -> None:
+    """Drop a user from every room (their last connection closed)."""
+    user_id = int(user_id)
+    changed = False
+    with _lock:
+        for room_id in list(_typers):
+            room = _typers[room_id]
+            if room.pop(user_id, None) is not None:
+                changed = True
+                _dirty_rooms.add(room_id)
+                if not room:
+                    del _typers[room_id]
+    if changed:
+        _schedule_flush(_settings()[3])
+
+
+def _schedule_flush(inline: bool) -> None:
+    global _flush_scheduled
+    if inline:
+        flush_typing()
+        return
+    app, _, interval, _ = _settings()
+    with _lock:
+        if _flush_scheduled:
+            return
+        _flush_scheduled = True
+    get_socketio().start_background_task(_flush_loop, app, max(0.05, interval))
+
+
+def _flush_loop(app, interval: float) -> None:
+    """Broadcast changed snapshots every ``interval`` while anyone is typing."""
+    global _flush_scheduled
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                flush_typing()
+            except Exception as exc:
+                logger.warning(f"Typing flush error: {exc}")
+        with _lock:
+            if not _typers and not _dirty_rooms:
+                _flush_scheduled = False
+                return
+
+
+def flush_typing(now: float | None = None) -> int:
+    """Expire stale typers and send one snapshot per changed room. Returns snapshots sent."""
+    now = time.time() if now is None else now
+    _, ttl, _, _ = _settings()
+    snapshots: list[tuple[int, list[dict]]] = []
+    with _lock:
+        for room_id in list(_typers):
+            room = _typers[room_id]
+            expired = [user_id for user_id, (expires_at, _) in room.items() if expires_at <= now]
+            for user_id in expired:
+                del room[user_id]
+            if expired:
+                _stats["expired"] += len(expired)
+                _dirty_rooms.add(room_id)
+            if not room:
+                del _typers[room_id]
+
+        # unchanged snapshots are repeated so clients can tell a live node from a dead one
+        stale = {room_id for room_id, (_, sent_at) in _last_sent.items() if now - sent_at >= ttl / 2}
+        for room_id in _dirty_rooms | stale:
+            room = _typers.get(room_id, {})
+            user_ids = tuple(sorted(room))
+            # typing then stopping within one interval nets out to no frame
+            if room_id not in stale and _last_sent.get(room_id, ((), 0.0))[0] == user_ids:
+                continue
+            if user_ids:
+                _last_sent[room_id] = (user_ids, now)
+            else:
+                _last_sent.pop(room_id, None)
+            snapshots.append((room_id, [{"user_id": uid, "nickname": room[uid][1]} for uid in user_ids]))
+        _dirty_rooms.clear()
+        _stats["snapshots_sent"] += len(snapshots)
+
+    for room_id, typers in snapshots:
+        emit_room_typers(room_id, typers, _node_id)
+    return len(snapshots)
+
+
+def get_typing_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+        stats["active_rooms"] = len(_typers)
+        stats["active_typers"] = sum(len(room) for room in _typers.values())
+    # every report used to be relayed to the room as its own frame
+    stats["frames_saved"] = max(0, stats["reports"] - stats["snapshots_sent"])
+    return stats
+
+
+def reset_typing() -> None:
+    """Forget all typing state (tests)."""
+    global _flush_scheduled
+    with _lock:
+        _typers.clear()
+        _last_sent.clear()
+        _dirty_rooms.clear()
+        _flush_scheduled = False
+        for key in _stats:
+            _stats[key] = 0
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Per-process caches and validators for the upload download path.
+
+- Authorization decisions per (user, stored file path), kept only briefly so
+  membership changes on other workers converge quickly.
+- ETags from (size, mtime, inode). Nothing is read from the file, so the
+  first request for a large upload does not hash it before the body is
+  handed to the proxy.
+
+Model functions that remove room members drop the affected users' cached
+decisions themselves, whether or not a socket event follows.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from app.services.metrics import record_cache
+
+_AUTHZ_CACHE_MAX_ENTRIES = 4096
+
+_authz_lock = threading.Lock()
+_authz_cache: "OrderedDict[tuple[int, str], tuple[float, dict]]" = OrderedDict()
+
+
+def get_cached_file_access(user_id: int, stored_path: str) -> dict | None:
+    key = (int(user_id), stored_path)
+    now = time.monotonic()
+    with _authz_lock:
+        entry = _authz_cache.get(key)
+        if not entry:
+            record_cache("upload_access", False)
+            return None
+        expires_at, row = entry
+        if expires_at <= now:
+            del _authz_cache[key]
+            record_cache("upload_access", False)
+            return None
+        _authz_cache.move_to_end(key)
+        record_cache("upload_access", True)
+        return row
+
+
+def store_file_access(user_id: int, stored_path: str, row: dict, ttl_seconds: float) -> None:
+    if ttl_seconds <= 0:
+        return
+    key = (int(user_id), stored_path)
+    with _authz_lock:
+        _authz_cache[key] = (time.monotonic() + ttl_seconds, row)
+        _authz_cache.move_to_end(key)
+        while len(_authz_cache) > _AUTHZ_CACHE_MAX_ENTRIES:
+            _authz_cache.popitem(last=False)
+
+
+def invalidate_file_access(user_ids=None) -> None:
+    """Drop cached decisions for the given users (all users when ``None``)."""
+    with _authz_lock:
+        if user_ids is None:
+            _authz_cache.clear()
+            return
+        targets = {int(uid) for uid in user_ids}
+        for key in [key for key in _authz_cache if key[0] in targets]:
+            del _authz_cache[key]
+
+
+def get_file_etag(abs_path: str) -> str:
+    """Validator from file metadata; a replaced or rewritten file changes size, mtime or inode."""
+    stat = os.stat(abs_path)
+    return f"{stat.st_size:x}-{stat.st_mtime_ns:x}-{stat.st_ino:x}"
@@ -7,102 +7,90 @@ from __future__ import annotations
 
 import logging
 
-from flask import session
-from flask_socketio import emit, join_room, leave_room
+from flask import current_app, session
+from flask_socketio import ConnectionRefusedError, emit, join_room, leave_room
 
-from app.models import is_room_member, server_stats, update_user_status
+from app.models import is_room_member, server_stats
+from app.services.presence import presence_connected, presence_disconnected
+from app.services.socket_admission import admit_connection, connection_policy
+from app.services.typing_indicators import clear_user_typing
 from app.socket_events.shared import ensure_session_token, request_sid
 from app.socket_events.state import (
-    cleanup_old_cache,
     get_user_room_ids,
     invalidate_user_cache,
     online_users,
     online_users_lock,
     stats_lock,
-    typing_last_emit,
-    typing_rate_lock,
-    user_cache,
     user_sids,
 )
-from app.state_store import state_store
 
 logger = logging.getLogger(__name__)
 
 
 def register_connection_events(socketio):
+    def _release_connection_slot():
+        with stats_lock:
+            server_stats["active_connections"] = max(0, server_stats["active_connections"] - 1)
+
     @socketio.on("connect")
     def handle_connect():
+        # admission runs before any DB work so a reconnect storm is shed cheaply;
+        # the slot is reserved under the same lock as the count it is checked against
+        with stats_lock:
+            refusal = admit_connection(current_app.config, server_stats["active_connections"])
+            if refusal is None:
+                server_stats["active_connections"] += 1
+        if refusal is not None:
+            # message + data: the client reads retry_after from connect_error.data
+            raise ConnectionRefusedError(refusal["message"], refusal)
+
         if not ensure_session_token("connect"):
+            _release_connection_slot()
             return False
 
         user_id = session.get("user_id")
         if not user_id:
+            _release_connection_slot()
             return False
 
         sid = request_sid()
         with online_users_lock:
             online_users[sid] = user_id
             user_sids.setdefault(user_id, []).append(sid)
-        was_offline = state_store.incr(f"presence:user:{user_id}") == 1
 
         try:
             join_room(f"user_{user_id}")
         except Exception:
             pass
 
-        room_ids = get_user_room_ids(user_id)
-        for room_id in room_ids:
+        for room_id in get_user_room_ids(user_id):
             try:
                 join_room(f"room_{room_id}")
             except Exception:
                 pass
 
-        if was_offline:
-            update_user_status(user_id, "online")
-            for room_id in room_ids:
-                emit("user_status", {"user_id": user_id, "status": "online"}, to=f"room_{room_id}")
+        # status write and peer notification are batched by the presence service
+        presence_connected(user_id)
+        emit("connection_policy", connection_policy(current_app.config))
 
         with stats_lock:
             server_stats["total_connections"] += 1
-            server_stats["active_connections"] += 1
-            should_cleanup = server_stats["total_connections"] % 100 == 0
-        if should_cleanup:
-            cleanup_old_cache()
 
     @socketio.on("disconnect")
     def handle_disconnect():
-        user_id = None
-        still_online = False
         sid = request_sid()
-        room_ids = []
 
         with online_users_lock:
             user_id = online_users.pop(sid, None)
             if user_id and user_id in user_sids:
                 if sid in user_sids[user_id]:
                     user_sids[user_id].remove(sid)
-                local_still_online = len(user_sids[user_id]) > 0
-                if not local_still_online:
+                if not user_sids[user_id]:
                     del user_sids[user_id]
-                    if user_id in user_cache:
-                        room_ids = user_cache[user_id].get("rooms", []).copy()
-        if user_id:
-            still_online = state_store.decr(f"presence:user:{user_id}") > 0
 
-        if user_id and not still_online:
-            update_user_status(user_id, "offline")
-            if not room_ids:
-                room_ids = get_user_room_ids(user_id)
-            try:
-                for room_id in room_ids:
-                    emit("user_status", {"user_id": user_id, "status": "offline"}, to=f"room_{room_id}")
-            except Exception as exc:
-                logger.error(f"Disconnect broadcast error: {exc}")
-
-            with typing_rate_lock:
-                keys_to_remove = [key for key in typing_last_emit if key[0] == user_id]
-                for key in keys_to_remove:
-                    del typing_last_emit[key]
+        # the offline transition is debounced; a quick reconnect cancels it
+        if user_id and presence_disconnected(user_id):
+            clear_user_typing(user_id)
 
         with stats_lock:
             server_stats["active_connections"] = max(0, server_stats["active_connections"] - 1)
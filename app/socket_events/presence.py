@@ -6,14 +6,15 @@ Presence and profile Socket.IO events.
 from __future__ import annotations
 
 import logging
-import time
 
 from flask import session
 from flask_socketio import emit
 
-from app.models import can_user_see_message, get_message_room_id, get_user_by_id, is_room_member, update_last_read
+from app.models import can_user_see_message, get_user_by_id_cached, is_room_member
+from app.services.read_receipts import buffer_read, is_stale_read
+from app.services.typing_indicators import record_typing
 from app.socket_events.shared import ensure_session_token
-from app.socket_events.state import TYPING_RATE_LIMIT, typing_last_emit, typing_rate_lock
+from app.socket_events.state import get_user_room_ids, invalidate_user_cache
 
 logger = logging.getLogger(__name__)
 
@@ -26,13 +27,17 @@ def register_presence_events(socketio):
                 return
             room_id = data.get("room_id")
             message_id = data.get("message_id")
-            if room_id and message_id:
-                if not is_room_member(room_id, session["user_id"]):
-                    return
-                if get_message_room_id(message_id) != room_id or not can_user_see_message(room_id, session["user_id"], message_id):
-                    return
-                update_last_read(room_id, session["user_id"], message_id)
-                emit("read_updated", {"room_id": room_id, "user_id": session["user_id"], "message_id": message_id}, to=f"room_{room_id}")
+            if not isinstance(room_id, int) or not isinstance(message_id, int) or room_id <= 0 or message_id <= 0:
+                return
+            user_id = session["user_id"]
+            # scrolling re-reports old positions; those never reach the DB
+            if is_stale_read(room_id, user_id, message_id):
+                return
+            # one query covers membership, the message's room and key-version visibility
+            if not can_user_see_message(room_id, user_id, message_id):
+                return
+            # written and broadcast (read_receipts) in batches
+            buffer_read(room_id, user_id, message_id)
         except Exception as exc:
             logger.error(f"Message read error: {exc}")
 
@@ -46,32 +51,19 @@ def register_presence_events(socketio):
                 return
 
             user_id = session["user_id"]
-            if not is_room_member(room_id, user_id):
-                return
-
-            current_time = time.time()
-            rate_key = (user_id, room_id)
-            with typing_rate_lock:
-                last_emit = typing_last_emit.get(rate_key, 0)
-                if current_time - last_emit < TYPING_RATE_LIMIT:
+            # membership from the per-connection room cache; the DB only on a miss
+            if room_id not in get_user_room_ids(user_id):
+                if not is_room_member(room_id, user_id):
                     return
-                typing_last_emit[rate_key] = current_time
-                if len(typing_last_emit) > 1000:
-                    expired = [key for key, value in typing_last_emit.items() if current_time - value > 300]
-                    for key in expired:
-                        del typing_last_emit[key]
+                invalidate_user_cache(user_id)
 
             nickname = session.get("nickname", "")
             if not nickname:
-                user = get_user_by_id(user_id)
+                user = get_user_by_id_cached(user_id)
                 nickname = user.get("nickname", "사용자") if user else "사용자"
 
-            emit(
-                "user_typing",
-                {"room_id": room_id, "user_id": user_id, "nickname": nickname, "is_typing": data.get("is_typing", False)},
-                to=f"room_{room_id}",
-                include_self=False,
-            )
+            # aggregated per room; a room_typers snapshot goes out only when the set changes
+            record_typing(room_id, user_id, nickname, bool(data.get("is_typing", False)))
         except Exception as exc:
             logger.error(f"Typing event error: {exc}")
 
@@ -83,7 +75,7 @@ def register_presence_events(socketio):
             user_id = session.get("user_id")
             if not user_id:
                 return
-            user = get_user_by_id(user_id)
+            user = get_user_by_id_cached(user_id)
             if not user:
                 return
 
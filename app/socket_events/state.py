@@ -9,7 +9,8 @@ import logging
 import time
 from threading import Lock
 
-from app.models import get_user_rooms
+from app.models import get_member_room_ids
+from app.services.metrics import record_cache
 
 logger = logging.getLogger(__name__)
 
@@ -23,25 +24,22 @@ cache_lock = Lock()
 MAX_CACHE_SIZE = 1000
 CACHE_TTL = 300
 
-typing_last_emit = {}
-typing_rate_lock = Lock()
-TYPING_RATE_LIMIT = 1.0
+
+def _cleanup_old_cache_locked(current_time: float) -> list:
+    expired_keys = [user_id for user_id, data in user_cache.items() if current_time - data.get("updated", 0) > 600]
+    for key in expired_keys:
+        del user_cache[key]
+    if len(user_cache) > MAX_CACHE_SIZE:
+        sorted_items = sorted(user_cache.items(), key=lambda item: item[1].get("updated", 0))
+        to_remove = len(user_cache) - MAX_CACHE_SIZE
+        for index in range(to_remove):
+            del user_cache[sorted_items[index][0]]
+    return expired_keys
 
 
 def cleanup_old_cache():
-    current_time = time.time()
-    expired_keys = []
     with cache_lock:
-        for user_id, data in user_cache.items():
-            if current_time - data.get("updated", 0) > 600:
-                expired_keys.append(user_id)
-        for key in expired_keys:
-            del user_cache[key]
-        if len(user_cache) > MAX_CACHE_SIZE:
-            sorted_items = sorted(user_cache.items(), key=lambda item: item[1].get("updated", 0))
-            to_remove = len(user_cache) - MAX_CACHE_SIZE
-            for index in range(to_remove):
-                del user_cache[sorted_items[index][0]]
+        expired_keys = _cleanup_old_cache_locked(time.time())
     if expired_keys:
         logger.debug(f"Cleaned up {len(expired_keys)} expired cache entries")
 
@@ -49,15 +47,17 @@ def cleanup_old_cache():
 def get_user_room_ids(user_id):
     with cache_lock:
         cached = user_cache.get(user_id)
-        if cached and (time.time() - cached.get("updated", 0)) < CACHE_TTL:
+        hit = bool(cached) and (time.time() - cached.get("updated", 0)) < CACHE_TTL
+        record_cache("socket_user_rooms", hit)
+        if hit:
             return cached.get("rooms", [])
 
     try:
-        rooms = get_user_rooms(user_id)
-        room_ids = [room["id"] for room in rooms]
+        room_ids = get_member_room_ids(user_id)
         with cache_lock:
+            # cache_lock is not reentrant: prune in place rather than via cleanup_old_cache()
             if len(user_cache) > MAX_CACHE_SIZE // 2:
-                cleanup_old_cache()
+                _cleanup_old_cache_locked(time.time())
             user_cache.setdefault(user_id, {})
             user_cache[user_id]["rooms"] = room_ids
             user_cache[user_id]["updated"] = time.time()
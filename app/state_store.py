@@ -9,12 +9,32 @@ import json
 import logging
 import threading
 import time
+from functools import wraps
 from importlib import import_module
 from typing import Any, Protocol, cast
 
+from app.services.metrics import STATE_STORE_OPS, STATE_STORE_SECONDS
+
 logger = logging.getLogger(__name__)
 
 
+def _instrumented(method):
+    """Count and time a StateStore operation under the backend that served it."""
+    op = method.__name__
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        backend = "redis" if self._redis is not None else "memory"
+        started = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            STATE_STORE_OPS.inc(backend, op)
+            STATE_STORE_SECONDS.observe(time.perf_counter() - started, backend)
+
+    return wrapper
+
+
 class _RedisSyncClient(Protocol):
     def ping(self) -> bool: ...
     def set(self, key: str, value: str) -> bool: ...
@@ -25,6 +45,12 @@ class _RedisSyncClient(Protocol):
     def incr(self, key: str) -> int: ...
     def decr(self, key: str) -> int: ...
     def expire(self, key: str, time: int) -> bool: ...
+    def sadd(self, key: str, *values: str) -> int: ...
+    def srem(self, key: str, *values: str) -> int: ...
+    def smembers(self, key: str) -> set[str]: ...
+    def rpush(self, key: str, *values: str) -> int: ...
+    def ltrim(self, key: str, start: int, end: int) -> bool: ...
+    def lrange(self, key: str, start: int, end: int) -> list[str]: ...
 
 
 class _InMemoryStateStore:
@@ -91,6 +117,53 @@ class _InMemoryStateStore:
             self._data[key] = (value, current[1])
             return value
 
+    def add_member(self, key: str, member: str):
+        with self._lock:
+            self._purge_if_expired(key)
+            current = self._data.get(key)
+            members = set(current[0]) if current else set()
+            members.add(member)
+            self._data[key] = (members, current[1] if current else None)
+
+    def remove_member(self, key: str, member: str):
+        with self._lock:
+            current = self._data.get(key)
+            if not current:
+                return
+            members = set(current[0])
+            members.discard(member)
+            if members:
+                self._data[key] = (members, current[1])
+            else:
+                self._data.pop(key, None)
+
+    def get_members(self, key: str) -> set[str]:
+        with self._lock:
+            self._purge_if_expired(key)
+            current = self._data.get(key)
+            return set(current[0]) if current else set()
+
+    def expire(self, key: str, ttl_seconds: int):
+        with self._lock:
+            self._purge_if_expired(key)
+            current = self._data.get(key)
+            if current:
+                self._data[key] = (current[0], time.time() + ttl_seconds)
+
+    def push_capped(self, key: str, value: str, max_length: int):
+        with self._lock:
+            self._purge_if_expired(key)
+            current = self._data.get(key)
+            items = list(current[0]) if current else []
+            items.append(value)
+            self._data[key] = (items[-max_length:], current[1] if current else None)
+
+    def get_list(self, key: str) -> list[str]:
+        with self._lock:
+            self._purge_if_expired(key)
+            current = self._data.get(key)
+            return list(current[0]) if current else []
+
 
 class StateStore:
     def __init__(self):
@@ -158,6 +231,7 @@ class StateStore:
         except Exception:
             return None
 
+    @_instrumented
     def set_value(self, key: str, value: str, ttl_seconds: int | None = None):
         store_key = self._k(key)
         if self._redis is not None:
@@ -171,6 +245,7 @@ class StateStore:
                 self._degrade_redis(exc)
         self._backend.set(store_key, value, ttl_seconds=ttl_seconds)
 
+    @_instrumented
     def get_value(self, key: str) -> str | None:
         store_key = self._k(key)
         if self._redis is not None:
@@ -180,6 +255,7 @@ class StateStore:
                 self._degrade_redis(exc)
         return self._backend.get(store_key)
 
+    @_instrumented
     def getdel_value(self, key: str) -> str | None:
         store_key = self._k(key)
         if self._redis is not None:
@@ -195,6 +271,7 @@ class StateStore:
                 self._degrade_redis(exc)
         return self._backend.getdel(store_key)
 
+    @_instrumented
     def delete(self, key: str):
         store_key = self._k(key)
         if self._redis is not None:
@@ -205,6 +282,7 @@ class StateStore:
                 self._degrade_redis(exc)
         self._backend.delete(store_key)
 
+    @_instrumented
     def incr(self, key: str, ttl_seconds: int | None = None) -> int:
         store_key = self._k(key)
         if self._redis is not None:
@@ -217,6 +295,7 @@ class StateStore:
                 self._degrade_redis(exc)
         return self._backend.incr(store_key, ttl_seconds=ttl_seconds)
 
+    @_instrumented
     def decr(self, key: str) -> int:
         store_key = self._k(key)
         if self._redis is not None:
@@ -230,5 +309,71 @@ class StateStore:
                 self._degrade_redis(exc)
         return self._backend.decr(store_key)
 
+    @_instrumented
+    def expire(self, key: str, ttl_seconds: int):
+        store_key = self._k(key)
+        if self._redis is not None:
+            try:
+                self._redis.expire(store_key, ttl_seconds)
+                return
+            except Exception as exc:
+                self._degrade_redis(exc)
+        self._backend.expire(store_key, ttl_seconds)
+
+    @_instrumented
+    def add_member(self, key: str, member: str):
+        store_key = self._k(key)
+        if self._redis is not None:
+            try:
+                self._redis.sadd(store_key, member)
+                return
+            except Exception as exc:
+                self._degrade_redis(exc)
+        self._backend.add_member(store_key, member)
+
+    @_instrumented
+    def remove_member(self, key: str, member: str):
+        store_key = self._k(key)
+        if self._redis is not None:
+            try:
+                self._redis.srem(store_key, member)
+                return
+            except Exception as exc:
+                self._degrade_redis(exc)
+        self._backend.remove_member(store_key, member)
+
+    @_instrumented
+    def get_members(self, key: str) -> set[str]:
+        store_key = self._k(key)
+        if self._redis is not None:
+            try:
+                return {str(member) for member in self._redis.smembers(store_key)}
+            except Exception as exc:
+                self._degrade_redis(exc)
+        return self._backend.get_members(store_key)
+
+    @_instrumented
+    def push_capped(self, key: str, value: str, max_length: int):
+        """Append ``value`` to the list at ``key``, keeping only the newest ``max_length`` items."""
+        store_key = self._k(key)
+        if self._redis is not None:
+            try:
+                self._redis.rpush(store_key, value)
+                self._redis.ltrim(store_key, -max_length, -1)
+                return
+            except Exception as exc:
+                self._degrade_redis(exc)
+        self._backend.push_capped(store_key, value, max_length)
+
+    @_instrumented
+    def get_list(self, key: str) -> list[str]:
+        store_key = self._k(key)
+        if self._redis is not None:
+            try:
+                return [str(item) for item in self._redis.lrange(store_key, 0, -1)]
+            except Exception as exc:
+                self._degrade_redis(exc)
+        return self._backend.get_list(store_key)
+
 
 state_store = StateStore()
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Image thumbnail pipeline (optional, Pillow-based).
+
+Thumbnails are rendered in a process pool so image decoding never blocks the
+gevent loop. Variants live under ``<UPLOAD_FOLDER>/thumbs/<variant>/`` and are
+named after the (unique, never rewritten) stored upload path, so they can be
+served with immutable cache headers.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app, has_app_context
+
+from app.models.base import safe_file_delete
+from app.services.runtime_paths import get_upload_folder
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIRNAME = "thumbs"
+THUMBNAIL_EXT = ".webp"
+# variant -> longest edge in px
+THUMBNAIL_VARIANTS = {"sm": 160, "md": 640}
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_inflight: set[str] = set()
+_inflight_lock = threading.Lock()
+
+
+def _config_value(name: str, default):
+    if has_app_context():
+        return current_app.config.get(name, default)
+    return default
+
+
+def is_thumbnail_enabled() -> bool:
+    return Image is not None and bool(_config_value("THUMBNAILS_ENABLED", True))
+
+
+def thumbnail_rel_path(file_path: str, variant: str) -> str:
+    base_name = os.path.basename(str(file_path).replace("\\", "/"))
+    return f"{THUMBNAIL_DIRNAME}/{variant}/{base_name}{THUMBNAIL_EXT}"
+
+
+def source_name_from_thumbnail(name: str) -> str | None:
+    if not name.endswith(THUMBNAIL_EXT):
+        return None
+    return name[: -len(THUMBNAIL_EXT)] or None
+
+
+def thumbnail_urls(file_path: str) -> dict[str, str]:
+    return {variant: f"/uploads/{thumbnail_rel_path(file_path, variant)}" for variant in THUMBNAIL_VARIANTS}
+
+
+def attach_thumbnail_urls(item: dict, type_key: str = "message_type") -> dict:
+    """Add ``thumbnails`` URLs to an image message/file row (in place)."""
+    if item.get(type_key) == "image" and item.get("file_path") and is_thumbnail_enabled():
+        item["thumbnails"] = thumbnail_urls(item["file_path"])
+    return item
+
+
+def _render_thumbnails(source_path: str, targets: list[tuple[str, int, str]]) -> list[str]:
+    """Worker-process entry point: decode once, write every requested variant."""
+    rendered = []
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        # largest variant first so each step downsizes the previous result
+        for variant, max_edge, dest_path in sorted(targets, key=lambda t: t[1], reverse=True):
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            tmp_path = f"{dest_path}.tmp"
+            image.save(tmp_path, "WEBP", quality=80, method=4)
+            os.replace(tmp_path, dest_path)
+            rendered.append(variant)
+    return rendered
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=workers)
+        return _executor
+
+
+def _release_inflight(file_path: str):
+    with _inflight_lock:
+        _inflight.discard(file_path)
+
+
+def _on_render_done(file_path: str, future):
+    _release_inflight(file_path)
+    try:
+        future.result()
+    except Exception as e:
+        logger.warning(f"Thumbnail render failed({file_path}): {e}")
+
+
+def schedule_thumbnails(file_path: str, upload_folder: str | None = None) -> bool:
+    """Queue missing thumbnail variants for an uploaded image. Returns True if work was queued."""
+    if not file_path or not is_thumbnail_enabled():
+        return False
+
+    upload_root = upload_folder or _config_value("UPLOAD_FOLDER", None) or get_upload_folder()
+    source_path = os.path.join(upload_root, str(file_path).replace("\\", "/"))
+    if not os.path.isfile(source_path):
+        return False
+
+    targets = []
+    for variant, max_edge in THUMBNAIL_VARIANTS.items():
+        dest_path = os.path.join(upload_root, thumbnail_rel_path(file_path, variant))
+        if not os.path.isfile(dest_path):
+            targets.append((variant, max_edge, dest_path))
+    if not targets:
+        return False
+
+    with _inflight_lock:
+        if file_path in _inflight:
+            return False
+        _inflight.add(file_path)
+
+    workers = int(_config_value("THUMBNAIL_PROCESS_WORKERS", 2) or 0)
+    if workers <= 0 or _config_value("TESTING", False):
+        try:
+            _render_thumbnails(source_path, targets)
+        except Exception as e:
+            logger.warning(f"Thumbnail render failed({file_path}): {e}")
+        finally:
+            _release_inflight(file_path)
+        return True
+
+    try:
+        future = _get_executor(workers).submit(_render_thumbnails, source_path, targets)
+    except Exception as e:
+        _release_inflight(file_path)
+        logger.warning(f"Thumbnail submit failed({file_path}): {e}")
+        return False
+    future.add_done_callback(lambda f: _on_render_done(file_path, f))
+    return True
+
+
+def purge_orphan_thumbnails(upload_folder: str | None = None) -> int:
+    """Delete thumbnails whose source upload no longer exists."""
+    upload_root = upload_folder or get_upload_folder()
+    deleted = 0
+    for variant in THUMBNAIL_VARIANTS:
+        variant_dir = os.path.join(upload_root, THUMBNAIL_DIRNAME, variant)
+        if not os.path.isdir(variant_dir):
+            continue
+        for entry in os.scandir(variant_dir):
+            if not entry.is_file():
+                continue
+            source_name = source_name_from_thumbnail(entry.name)
+            if source_name and os.path.isfile(os.path.join(upload_root, source_name)):
+                continue
+            if safe_file_delete(entry.path):
+                deleted += 1
+    return deleted
+
@@ -5,6 +5,7 @@ Asynchronous upload AV scan queue (optional, clamd-based).
 
 from __future__ import annotations
 
+import hashlib
 import logging
 import os
 import queue
@@ -12,10 +13,13 @@ import shutil
 import socket
 import struct
 import threading
+import time
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from app.models.base import get_db, close_thread_db, safe_file_delete
+from app.services.metrics import SCAN_SECONDS
+from app.services.socket_broadcasts import emit_upload_scan_completed
 from app.services.uploads import resolve_stored_path
 from app.upload_tokens import issue_upload_token
 
@@ -26,11 +30,20 @@ _worker_started = False
 _worker_lock = threading.Lock()
 _app_ref = None
 
+_signature_version_lock = threading.Lock()
+_signature_version_cache: dict[str, object] = {"value": None, "fetched_at": 0.0, "failed_at": 0.0}
+# while clamd is unreachable, uploads skip the version lookup instead of each waiting out a connect timeout
+_SIGNATURE_VERSION_FAILURE_TTL_SECONDS = 30
+
 
 def is_scan_enabled(app) -> bool:
     return bool(app.config.get("FEATURE_AV_SCAN_ENABLED"))
 
 
+def is_verdict_cache_enabled(app) -> bool:
+    return bool(app.config.get("AV_VERDICT_CACHE_ENABLED", True))
+
+
 def _now_str() -> str:
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -43,6 +56,8 @@ def create_scan_job(
     file_name: str,
     file_type: str,
     file_size: int,
+    content_sha256: str | None = None,
+    signature_version: str | None = None,
 ) -> str:
     job_id = str(uuid.uuid4())
     conn = get_db()
@@ -51,8 +66,9 @@ def create_scan_job(
         """
         INSERT INTO upload_scan_jobs (
             job_id, user_id, room_id, temp_path, final_path,
-            file_name, file_type, file_size, status, result, created_at, updated_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'pending', '', ?, ?)
+            file_name, file_type, file_size, status, result,
+            content_sha256, signature_version, created_at, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'pending', '', ?, ?, ?, ?)
         """,
         (
             job_id,
@@ -63,6 +79,8 @@ def create_scan_job(
             file_name,
             file_type,
             file_size,
+            content_sha256,
+            signature_version,
             _now_str(),
             _now_str(),
         ),
@@ -94,6 +112,133 @@ def _update_scan_job(job_id: str, status: str, result: str = "", token: str | No
     conn.commit()
 
 
+def compute_file_sha256(abs_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(abs_path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _query_clamav_version(host: str, port: int, timeout_seconds: int) -> str | None:
+    """Return ``engine/signature-db`` (e.g. ``ClamAV 1.0.1/26900``) from clamd."""
+    try:
+        with socket.create_connection((host, port), timeout=timeout_seconds) as sock:
+            sock.sendall(b"zVERSION\0")
+            response = sock.recv(1024).decode("utf-8", errors="replace")
+    except Exception as e:
+        logger.debug(f"clamav version query failed: {e}")
+        return None
+    parts = response.strip("\0 \r\n").split("/")
+    if len(parts) < 2 or not parts[0] or not parts[1]:
+        return None
+    return f"{parts[0]}/{parts[1]}"
+
+
+def get_scanner_signature_version(app) -> str | None:
+    """Current scanner signature version, cached in-process for a short TTL."""
+    ttl = max(0, int(app.config.get("AV_SIGNATURE_VERSION_TTL_SECONDS", 300)))
+    now = time.monotonic()
+    with _signature_version_lock:
+        cached = _signature_version_cache.get("value")
+        fetched_at = float(_signature_version_cache.get("fetched_at") or 0.0)
+        if cached and now - fetched_at < ttl:
+            return str(cached)
+        failed_at = float(_signature_version_cache.get("failed_at") or 0.0)
+        if failed_at and now - failed_at < min(ttl, _SIGNATURE_VERSION_FAILURE_TTL_SECONDS):
+            return None
+
+    scanner = (app.config.get("AV_SCANNER") or "clamav").lower()
+    if scanner != "clamav":
+        return None
+    version = _query_clamav_version(
+        host=app.config.get("AV_CLAMD_HOST", "127.0.0.1"),
+        port=int(app.config.get("AV_CLAMD_PORT", 3310)),
+        timeout_seconds=min(3, int(app.config.get("AV_SCAN_TIMEOUT_SECONDS", 15))),
+    )
+    with _signature_version_lock:
+        if version:
+            _signature_version_cache["value"] = version
+            _signature_version_cache["fetched_at"] = now
+            _signature_version_cache["failed_at"] = 0.0
+        else:
+            _signature_version_cache["failed_at"] = now
+    return version
+
+
+def get_scan_verdict(content_sha256: str, signature_version: str):
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT verdict, result FROM upload_scan_verdicts
+        WHERE content_sha256 = ? AND signature_version = ?
+        """,
+        (content_sha256, signature_version),
+    )
+    row = cursor.fetchone()
+    if not row:
+        return None
+    cursor.execute(
+        """
+        UPDATE upload_scan_verdicts SET hit_count = COALESCE(hit_count, 0) + 1
+        WHERE content_sha256 = ? AND signature_version = ?
+        """,
+        (content_sha256, signature_version),
+    )
+    conn.commit()
+    return dict(row)
+
+
+def record_scan_verdict(content_sha256: str, signature_version: str, verdict: str, result: str = ""):
+    if verdict not in ("clean", "infected"):
+        return
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        INSERT INTO upload_scan_verdicts (
+            content_sha256, signature_version, verdict, result, created_at, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(content_sha256, signature_version)
+        DO UPDATE SET verdict = excluded.verdict, result = excluded.result, updated_at = excluded.updated_at
+        """,
+        (content_sha256, signature_version, verdict, result, _now_str(), _now_str()),
+    )
+    conn.commit()
+
+
+def lookup_cached_scan_verdict(app, abs_path: str) -> dict:
+    """Hash a quarantined upload and return any verdict cached for the current signatures."""
+    lookup: dict = {"content_sha256": None, "signature_version": None, "verdict": None}
+    if not is_verdict_cache_enabled(app):
+        return lookup
+    try:
+        lookup["content_sha256"] = compute_file_sha256(abs_path)
+        lookup["signature_version"] = get_scanner_signature_version(app)
+        if lookup["signature_version"]:
+            lookup["verdict"] = get_scan_verdict(lookup["content_sha256"], lookup["signature_version"])
+    except Exception as e:
+        logger.warning(f"Upload scan verdict lookup failed: {e}")
+    return lookup
+
+
+def purge_stale_scan_verdicts(days_to_keep: int = 30) -> int:
+    if days_to_keep <= 0:
+        return 0
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        cutoff = (datetime.now() - timedelta(days=days_to_keep)).strftime("%Y-%m-%d %H:%M:%S")
+        cursor.execute("DELETE FROM upload_scan_verdicts WHERE updated_at < ?", (cutoff,))
+        count = cursor.rowcount
+        conn.commit()
+        return count
+    except Exception as e:
+        logger.error(f"Purge stale scan verdicts error: {e}")
+        return 0
+
+
 def _scan_with_clamav(abs_path: str, host: str, port: int, timeout_seconds: int) -> tuple[bool, str]:
     try:
         with socket.create_connection((host, port), timeout=timeout_seconds) as sock:
@@ -116,13 +261,43 @@ def _scan_with_clamav(abs_path: str, host: str, port: int, timeout_seconds: int)
         return False, f"clamav scan failed: {e}"
 
 
+def build_scan_job_payload(job: dict) -> dict:
+    """Client-facing job status shared by the polling API and the push event."""
+    status = (job.get("status") or "pending").lower()
+    payload = {"job_id": job.get("job_id"), "scan_status": status}
+    if status == "clean":
+        payload.update(
+            {
+                "upload_token": job.get("token"),
+                "file_path": job.get("final_path"),
+                "file_name": job.get("file_name"),
+            }
+        )
+    elif status in ("infected", "error"):
+        payload.update({"error": job.get("result") or "스캔 실패"})
+    return payload
+
+
+def _notify_scan_completed(job_id: str) -> None:
+    try:
+        job = get_scan_job(job_id)
+        if not job or (job.get("status") or "pending") == "pending":
+            return
+        emit_upload_scan_completed(int(job["user_id"]), build_scan_job_payload(job))
+    except Exception as e:
+        logger.warning(f"Upload scan completion notify failed({job_id}): {e}")
+
+
 def _process_job(job_id: str):
     global _app_ref
     app = _app_ref
     if app is None:
         return
 
+    started = time.perf_counter()
     with app.app_context():
+        finished = False
+        outcome = "error"
         try:
             job = get_scan_job(job_id)
             if not job:
@@ -138,19 +313,37 @@ def _process_job(job_id: str):
             scanner = (app.config.get("AV_SCANNER") or "clamav").lower()
             if scanner != "clamav":
                 _update_scan_job(job_id, "error", f"unsupported scanner: {scanner}")
+                finished = True
                 return
 
+            content_sha256 = job.get("content_sha256")
+            signature_version = None
+            if is_verdict_cache_enabled(app):
+                if not content_sha256:
+                    content_sha256 = compute_file_sha256(abs_temp)
+                # the verdict belongs to the signatures loaded when the scan started; a version
+                # read afterwards could label an old-signature "clean" as checked by newer ones
+                signature_version = get_scanner_signature_version(app) or job.get("signature_version")
+
             clean, result = _scan_with_clamav(
                 abs_temp,
                 host=app.config.get("AV_CLAMD_HOST", "127.0.0.1"),
                 port=int(app.config.get("AV_CLAMD_PORT", 3310)),
                 timeout_seconds=int(app.config.get("AV_SCAN_TIMEOUT_SECONDS", 15)),
             )
+            status = "clean" if clean else ("infected" if "FOUND" in result else "error")
+
+            if content_sha256 and signature_version and status in ("clean", "infected"):
+                try:
+                    record_scan_verdict(content_sha256, signature_version, status, result)
+                except Exception as e:
+                    logger.warning(f"Upload scan verdict cache write failed({job_id}): {e}")
 
+            outcome = status
             if not clean:
                 safe_file_delete(abs_temp)
-                status = "infected" if "FOUND" in result else "error"
                 _update_scan_job(job_id, status, result)
+                finished = True
                 return
 
             shutil.move(abs_temp, abs_final)
@@ -163,13 +356,19 @@ def _process_job(job_id: str):
                 file_size=job.get("file_size") or 0,
             )
             _update_scan_job(job_id, "clean", "clean", token=token)
+            finished = True
         except Exception as e:
             logger.error(f"Upload scan worker job error({job_id}): {e}")
+            outcome = "error"
             try:
                 _update_scan_job(job_id, "error", str(e))
+                finished = True
             except Exception:
                 pass
         finally:
+            if finished:
+                SCAN_SECONDS.observe(time.perf_counter() - started, outcome)
+                _notify_scan_completed(job_id)
             close_thread_db()
 
 
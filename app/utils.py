@@ -91,11 +91,12 @@ def _load_bcrypt() -> ModuleType | None:
         return None
 
 
-def hash_password(password: str) -> str:
-    """비밀번호를 해시한다. 가능하면 bcrypt를 사용한다."""
+def hash_password(password: str, rounds: int | None = None) -> str:
+    """비밀번호를 해시한다. 가능하면 bcrypt를 사용한다 (rounds: bcrypt work factor)."""
     bcrypt_module = _load_bcrypt()
     if bcrypt_module is not None:
-        return bcrypt_module.hashpw(password.encode("utf-8"), bcrypt_module.gensalt()).decode("utf-8")
+        salt = bcrypt_module.gensalt(rounds) if rounds else bcrypt_module.gensalt()
+        return bcrypt_module.hashpw(password.encode("utf-8"), salt).decode("utf-8")
 
     salt = _get_salt()
     salted = f"{salt}{password}{salt}"
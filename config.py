@@ -69,7 +69,7 @@ PING_INTERVAL = 25  # 핑 간격 (초)
 MAX_HTTP_BUFFER_SIZE = 10 * 1024 * 1024  # 10MB (메시지 버퍼 크기)
 
 # 동시 연결 제한 (0 = 무제한)
-MAX_CONNECTIONS = 0
+MAX_CONNECTIONS = int(os.getenv("MAX_CONNECTIONS", "0"))
 
 # 메시지 큐 설정 (대규모 배포 시 Redis 사용 권장)
 # MESSAGE_QUEUE = 'redis://localhost:6379'  # Redis 사용 시 주석 해제
@@ -105,6 +105,15 @@ STATE_STORE_REDIS_URL = os.getenv("STATE_STORE_REDIS_URL", REDIS_URL or "")
 SOCKET_SEND_MESSAGE_PER_MINUTE = int(os.getenv("SOCKET_SEND_MESSAGE_PER_MINUTE", "100"))
 # Socket pin update event rate limit (per-user)
 SOCKET_PIN_UPDATED_PER_MINUTE = int(os.getenv("SOCKET_PIN_UPDATED_PER_MINUTE", "30"))
+# Socket connect admission (per process): token bucket rate/burst (0 = off), retry hint for refused clients
+SOCKET_CONNECT_RATE_PER_SECOND = float(os.getenv("SOCKET_CONNECT_RATE_PER_SECOND", "50"))
+SOCKET_CONNECT_BURST = int(os.getenv("SOCKET_CONNECT_BURST", "100"))
+SOCKET_RETRY_AFTER_SECONDS = float(os.getenv("SOCKET_RETRY_AFTER_SECONDS", "5"))
+# Reconnect backoff sent to connected clients (randomized by the client)
+SOCKET_RECONNECT_DELAY_MS = int(os.getenv("SOCKET_RECONNECT_DELAY_MS", "1000"))
+SOCKET_RECONNECT_DELAY_MAX_MS = int(os.getenv("SOCKET_RECONNECT_DELAY_MAX_MS", "15000"))
+# Packets buffered per connection before a slow consumer is disconnected (0 = unbounded)
+SOCKET_OUTBOUND_QUEUE_LIMIT = int(os.getenv("SOCKET_OUTBOUND_QUEUE_LIMIT", "1000"))
 
 # Feature toggles
 FEATURE_OIDC_ENABLED = _env_bool("FEATURE_OIDC_ENABLED", False)
@@ -129,10 +138,67 @@ AV_SCANNER = os.getenv("AV_SCANNER", "clamav")
 AV_CLAMD_HOST = os.getenv("AV_CLAMD_HOST", "127.0.0.1")
 AV_CLAMD_PORT = int(os.getenv("AV_CLAMD_PORT", "3310"))
 AV_SCAN_TIMEOUT_SECONDS = int(os.getenv("AV_SCAN_TIMEOUT_SECONDS", "15"))
+# Reuse clean/infected verdicts for identical files (keyed by SHA-256 + signature version)
+AV_VERDICT_CACHE_ENABLED = _env_bool("AV_VERDICT_CACHE_ENABLED", True)
+AV_SIGNATURE_VERSION_TTL_SECONDS = int(os.getenv("AV_SIGNATURE_VERSION_TTL_SECONDS", "300"))
+AV_VERDICT_RETENTION_DAYS = int(os.getenv("AV_VERDICT_RETENTION_DAYS", "30"))
 UPLOAD_QUARANTINE_FOLDER = os.path.join(UPLOAD_FOLDER, "quarantine")
 
+# Image thumbnails (requires Pillow; rendered in a separate process pool)
+THUMBNAILS_ENABLED = _env_bool("THUMBNAILS_ENABLED", True)
+THUMBNAIL_PROCESS_WORKERS = int(os.getenv("THUMBNAIL_PROCESS_WORKERS", "2"))
+
+# Upload downloads: per-(user, file) authorization cache and optional proxy offload
+UPLOAD_AUTHZ_CACHE_SECONDS = int(os.getenv("UPLOAD_AUTHZ_CACHE_SECONDS", "30"))
+# "" (Flask streams the file), "x-accel" (nginx X-Accel-Redirect), "x-sendfile" (Apache/lighttpd)
+UPLOAD_SENDFILE_MODE = os.getenv("UPLOAD_SENDFILE_MODE", "").strip().lower()
+UPLOAD_ACCEL_REDIRECT_PREFIX = os.getenv("UPLOAD_ACCEL_REDIRECT_PREFIX", "/_protected_uploads/")
+
+# Frontend bundles from scripts/build_assets.py (falls back to individual scripts when not built)
+ASSET_BUNDLES_ENABLED = _env_bool("ASSET_BUNDLES_ENABLED", True)
+
+# On-the-fly response compression: minimum body size per content type.
+# Unlisted types are never compressed per request; static files use build-time .br/.gz siblings.
+COMPRESS_MIN_SIZE_BY_MIMETYPE = {
+    "application/json": 1024,
+    "text/html": 1024,
+    "text/plain": 2048,
+    "text/css": 2048,
+    "text/javascript": 2048,
+}
+
+# Password hashing: bcrypt work factor and the native-thread pool it runs in
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Coalescing window for the security push after account deletion rotates room keys
+ROOM_KEY_ROTATION_DEFER_SECONDS = float(os.getenv("ROOM_KEY_ROTATION_DEFER_SECONDS", "2"))
+
+# Presence: a reconnect within the grace window never goes offline; status writes/diffs flush in batches
+PRESENCE_OFFLINE_GRACE_SECONDS = float(os.getenv("PRESENCE_OFFLINE_GRACE_SECONDS", "5"))
+PRESENCE_FLUSH_INTERVAL_SECONDS = float(os.getenv("PRESENCE_FLUSH_INTERVAL_SECONDS", "1"))
+# Presence liveness: each worker refreshes its node key this often; a node silent for 3 intervals is swept
+PRESENCE_HEARTBEAT_SECONDS = float(os.getenv("PRESENCE_HEARTBEAT_SECONDS", "10"))
+
+# Typing indicators: typers expire without a refresh; one snapshot per room per interval at most
+TYPING_TTL_SECONDS = float(os.getenv("TYPING_TTL_SECONDS", "5"))
+TYPING_BROADCAST_INTERVAL_MS = int(os.getenv("TYPING_BROADCAST_INTERVAL_MS", "300"))
+
+# Read receipts are buffered and written in batches; also the most read progress a crash can lose
+READ_RECEIPT_FLUSH_INTERVAL_SECONDS = float(os.getenv("READ_RECEIPT_FLUSH_INTERVAL_SECONDS", "1"))
+
+# SQL profiling: per-statement latency histograms and a slow-query log with plans (GET /control/queries)
+DB_QUERY_PROFILING = _env_bool("DB_QUERY_PROFILING", False)
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+
+# In-process metrics (socket events, emit fan-out, caches, uploads, maintenance) at GET /control/metrics
+METRICS_ENABLED = _env_bool("METRICS_ENABLED", True)
+
 # Data retention (disabled by default)
 RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "0"))
 
+# Delta-sync change journal retention; clients with older watermarks reload the room
+MESSAGE_CHANGE_RETENTION_DAYS = int(os.getenv("MESSAGE_CHANGE_RETENTION_DAYS", "14"))
+
 # Maintenance worker interval
 MAINTENANCE_INTERVAL_SECONDS = int(os.getenv("MAINTENANCE_INTERVAL_SECONDS", "300"))
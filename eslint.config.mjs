@@ -8,6 +8,8 @@ const browserGlobals = {
   E2E: "readonly",
   io: "readonly",
   MessengerApp: "readonly",
+  MessengerDecryptPool: "readonly",
+  MessengerMessageWindow: "readonly",
   MessengerNotification: "readonly",
   MessengerStorage: "readonly",
   MessengerUpload: "readonly",
@@ -37,9 +39,18 @@ export default [
     },
     rules: sharedRules,
   },
+  {
+    files: ["static/js/workers/**/*.js"],
+    languageOptions: {
+      ecmaVersion: "latest",
+      sourceType: "script",
+      globals: { ...globals.worker, ...globals.es2021, CryptoJS: "readonly" },
+    },
+    rules: sharedRules,
+  },
   {
     files: ["static/js/**/*.js"],
-    ignores: ["static/js/experimental/modules/**/*.js"],
+    ignores: ["static/js/experimental/modules/**/*.js", "static/js/workers/**/*.js"],
     languageOptions: {
       ecmaVersion: "latest",
       sourceType: "script",
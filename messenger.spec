@@ -11,6 +11,8 @@ import importlib.util
 # Reviewed on 2026-04-27 for message visibility remediation. No new packaged
 # runtime modules or data files were required; app.http.*, app.socket_events.*,
 # app.services.*, app.models.*, and docs/BACKUP_RUNBOOK.md remain covered.
+# app.thumbnails is packaged, but PIL stays excluded to keep the build light;
+# the frozen server therefore serves original images without thumbnails.
 
 block_cipher = None
 
@@ -113,6 +115,7 @@ a = Analysis(
         'app.upload_tokens',
         'app.state_store',
         'app.upload_scan',
+        'app.thumbnails',
         'app.oidc',
         'app.control_api',
         'app.server_launcher',
@@ -122,6 +125,7 @@ a = Analysis(
         'app.bootstrap.hooks',
         'app.bootstrap.workers',
         'app.http',
+        'app.http.assets',
         'app.http.auth',
         'app.http.public',
         'app.http.rooms',
@@ -141,11 +145,23 @@ a = Analysis(
         'app.socket_events.rooms',
         'app.socket_events.features',
         'app.services',
+        'app.services.asset_bundles',
+        'app.services.compression_stats',
+        'app.services.hangul',
+        'app.services.metrics',
+        'app.services.password_hashing',
+        'app.services.presence',
+        'app.services.query_profiler',
+        'app.services.read_receipts',
+        'app.services.room_key_rotation',
         'app.services.runtime_config',
         'app.services.runtime_paths',
         'app.services.session_tokens',
+        'app.services.socket_admission',
         'app.services.socket_broadcasts',
         'app.services.text_hygiene',
+        'app.services.typing_indicators',
+        'app.services.upload_access',
         'app.services.uploads',
         'app.models.base',
         'app.models.users',
@@ -155,6 +171,7 @@ a = Analysis(
         'app.models.files',
         'app.models.reactions',
         'app.models.admin_audit',
+        'app.models.versions',
         'app.legacy.models_monolith',
 
         # Redis (optional runtime backend)
@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""Database micro-benchmarks for the model hot paths.
+
+Builds a synthetic SQLite database with the production schema (``init_db``):
+users, direct and group rooms with skewed traffic, messages spread over
+``--days`` with a plaintext/encrypted mix, replies, file messages with
+``room_files`` rows, reactions, rotated room key versions (members that joined
+at a later version), polls, access logs and change-journal rows. The message
+table is grown through each of ``--sizes`` in turn and at every size each model
+function is timed over ``--repeat`` calls with varying arguments:
+
+    get_user_rooms, get_room_messages, advanced_search, create_message,
+    close_expired_polls, cleanup_old_access_logs, cleanup_message_changes,
+    cleanup_empty_rooms, cleanup_retention_data
+
+The statements each function ran are captured with the connection's trace
+callback and explained with ``EXPLAIN QUERY PLAN``; plan steps that scan
+without an index are listed under ``unindexed_scans``. Maintenance functions
+are called with a retention longer than the generated history, so repeated calls
+measure the scan rather than a one-off delete.
+
+``--json`` prints machine-readable results; ``--save-baseline`` and
+``--baseline`` compare p50 latency per (size, function) and new unindexed scans
+against an earlier run; the exit status is 1 on regression.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import sqlite3
+import string
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+
+WORDS = (
+    "회의 일정 보고서 검토 배포 서버 장애 점검 공지 결재 예산 고객 요청 수정 완료 확인 "
+    "release deploy review budget meeting report incident schedule backup invoice server client"
+).split()
+EMOJIS = ("👍", "❤️", "😂", "🎉", "👀", "🙏")
+FILE_NAMES = ("보고서", "회의록", "견적서", "diagram", "screenshot", "budget", "계약서", "release-notes")
+FILE_EXTS = ("pdf", "docx", "xlsx", "png", "jpg", "zip")
+# longer than any generated history: maintenance scans run but delete nothing
+RETENTION_DAYS_NO_DELETE = 36500
+
+
+def _bootstrap(db_path: str, upload_dir: str):
+    # plain threads: the timings are for the SQL, not the event loop
+    os.environ.setdefault("SKIP_GEVENT_PATCH", "1")
+    sys.path.insert(0, str(BASE_DIR))
+    import config
+
+    config.DATABASE_PATH = db_path
+    config.UPLOAD_FOLDER = upload_dir
+    from flask import Flask
+
+    import app.models as models
+    from app.models import base
+
+    return Flask("bench_db"), models, base
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return round(ordered[index], 3)
+
+
+def _sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12)))
+
+
+def _ciphertext(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_letters + string.digits + "+/", k=rng.randint(40, 160)))
+
+
+class DatasetGenerator:
+    """Writes synthetic rows straight into the schema; ``grow_to`` can be called with increasing sizes."""
+
+    def __init__(self, db_path: str, *, users: int, rooms: int, max_messages: int, days: int,
+                 plaintext_ratio: float, file_ratio: float, reaction_ratio: float, reply_ratio: float,
+                 max_key_versions: int, seed: int):
+        from app.services.hangul import hangul_initials
+
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.rng = random.Random(seed)
+        self.days = days
+        self.max_messages = max_messages
+        self.plaintext_ratio = plaintext_ratio
+        self.file_ratio = file_ratio
+        self.reaction_ratio = reaction_ratio
+        self.reply_ratio = reply_ratio
+        self.messages = 0
+        self.now = datetime.now()
+        self._hangul_initials = hangul_initials
+        self._seed_users_and_rooms(users, rooms, max_key_versions)
+
+    def _seed_users_and_rooms(self, users: int, rooms: int, max_key_versions: int) -> None:
+        rng, cur = self.rng, self.conn.cursor()
+        nicknames = [f"사용자{i}" for i in range(users)]
+        cur.executemany(
+            "INSERT INTO users (username, password_hash, nickname, nickname_initials, status) VALUES (?, 'x', ?, ?, ?)",
+            [(f"bench_u{i}", nick, self._hangul_initials(nick), rng.choice(("online", "offline", "offline")))
+             for i, nick in enumerate(nicknames)],
+        )
+        self.user_ids = [row[0] for row in cur.execute("SELECT id FROM users ORDER BY id")]
+
+        self.room_ids: list[int] = []
+        self.room_members: dict[int, list[int]] = {}
+        self.room_versions: dict[int, int] = {}
+        member_rows, key_rows = [], []
+        for index in range(rooms):
+            direct = index % 3 == 0
+            size = 2 if direct else min(len(self.user_ids), max(3, int(rng.lognormvariate(2.2, 0.8))))
+            members = rng.sample(self.user_ids, size)
+            versions = 1 if direct else rng.randint(1, max(1, max_key_versions))
+            cur.execute(
+                "INSERT INTO rooms (name, type, created_by, encryption_key, key_version) VALUES (?, ?, ?, 'bench', ?)",
+                (None if direct else f"방{index}", "direct" if direct else "group", members[0], versions),
+            )
+            room_id = cur.lastrowid
+            self.room_ids.append(room_id)
+            self.room_members[room_id] = members
+            self.room_versions[room_id] = versions
+            key_rows.extend((room_id, version, f"bench-key-{version}") for version in range(1, versions + 1))
+            for position, user_id in enumerate(members):
+                # most members were there from the start; the rest joined after a rotation
+                joined = 1 if position == 0 or rng.random() < 0.8 else rng.randint(1, versions)
+                member_rows.append((room_id, user_id, "admin" if position == 0 else "member", joined))
+        cur.executemany("INSERT INTO room_keys (room_id, version, encryption_key) VALUES (?, ?, ?)", key_rows)
+        cur.executemany(
+            "INSERT INTO room_members (room_id, user_id, role, joined_key_version) VALUES (?, ?, ?, ?)", member_rows
+        )
+
+        # skewed traffic: a few hot rooms carry most messages
+        weights = [1 / (rank + 1) ** 1.1 for rank in range(len(self.room_ids))]
+        shuffled = list(self.room_ids)
+        rng.shuffle(shuffled)
+        total, acc = sum(weights), 0.0
+        self.traffic_rooms, self.traffic_cum = shuffled, []
+        for weight in weights:
+            acc += weight / total
+            self.traffic_cum.append(acc)
+        self.last_message_in_room: dict[int, int] = {}
+
+        cur.executemany(
+            "INSERT INTO polls (room_id, created_by, question, ends_at) VALUES (?, ?, ?, ?)",
+            [(room_id, self.room_members[room_id][0], _sentence(rng),
+              (self.now + timedelta(days=rng.randint(1, 30))).strftime("%Y-%m-%d %H:%M:%S"))
+             for room_id in rng.sample(self.room_ids, max(1, len(self.room_ids) // 5))],
+        )
+        cur.executemany(
+            "INSERT INTO access_logs (user_id, action, ip_address, user_agent, created_at) VALUES (?, ?, '127.0.0.1', 'bench', ?)",
+            [(rng.choice(self.user_ids), rng.choice(("login", "logout")), self._timestamp(rng.random()))
+             for _ in range(len(self.user_ids) * 20)],
+        )
+        self.conn.commit()
+
+    def _timestamp(self, fraction: float) -> str:
+        """Position in the generated history (0 = ``--days`` ago, 1 = now)."""
+        moment = self.now - timedelta(days=self.days * (1 - fraction))
+        return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+    def grow_to(self, target: int, batch_size: int = 20000) -> float:
+        """Add messages (and their files, reactions, journal rows) until there are ``target``. Returns seconds."""
+        started = time.perf_counter()
+        rng, cur = self.rng, self.conn.cursor()
+        while self.messages < target:
+            count = min(batch_size, target - self.messages)
+            rooms = rng.choices(self.traffic_rooms, cum_weights=self.traffic_cum, k=count)
+            cur.execute("SELECT COALESCE(MAX(id), 0) FROM messages")
+            next_id = cur.fetchone()[0] + 1
+            message_rows, file_rows, reaction_rows, change_rows = [], [], [], []
+            for offset, room_id in enumerate(rooms):
+                message_id = next_id + offset
+                fraction = (self.messages + offset) / max(1, self.max_messages)
+                members = self.room_members[room_id]
+                sender = rng.choice(members)
+                key_version = 1 + int(fraction * self.room_versions[room_id] * 0.999)
+                created_at = self._timestamp(fraction)
+                reply_to = self.last_message_in_room.get(room_id) if rng.random() < self.reply_ratio else None
+                if rng.random() < self.file_ratio:
+                    ext = rng.choice(FILE_EXTS)
+                    message_type = "image" if ext in ("png", "jpg") else "file"
+                    file_name = f"{rng.choice(FILE_NAMES)}_{message_id}.{ext}"
+                    file_path = f"bench/{message_id}.{ext}"
+                    message_rows.append((message_id, room_id, sender, file_name, 0, message_type, file_path,
+                                         file_name, reply_to, key_version, created_at))
+                    file_rows.append((room_id, message_id, file_path, file_name, rng.randint(1_000, 5_000_000),
+                                      message_type, sender, created_at))
+                else:
+                    plaintext = rng.random() < self.plaintext_ratio
+                    content = _sentence(rng) if plaintext else _ciphertext(rng)
+                    message_rows.append((message_id, room_id, sender, content, 0 if plaintext else 1, "text",
+                                         None, None, reply_to, key_version, created_at))
+                if rng.random() < self.reaction_ratio:
+                    for user_id in rng.sample(members, min(len(members), rng.randint(1, 3))):
+                        reaction_rows.append((message_id, user_id, rng.choice(EMOJIS), created_at))
+                if rng.random() < 0.01:
+                    change_rows.append((room_id, message_id, created_at))
+                self.last_message_in_room[room_id] = message_id
+
+            cur.executemany(
+                """
+                    INSERT INTO messages (id, room_id, sender_id, content, encrypted, message_type,
+                                          file_path, file_name, reply_to, key_version, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                message_rows,
+            )
+            cur.executemany(
+                """
+                    INSERT INTO room_files (room_id, message_id, file_path, file_name, file_size,
+                                            file_type, uploaded_by, uploaded_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                file_rows,
+            )
+            # the reaction triggers journal every insert; generated history is not "changed"
+            cur.executemany(
+                "INSERT OR IGNORE INTO message_reactions (message_id, user_id, emoji, created_at) VALUES (?, ?, ?, ?)",
+                reaction_rows,
+            )
+            cur.execute("DELETE FROM message_changes WHERE message_id >= ?", (next_id,))
+            cur.executemany("INSERT INTO message_changes (room_id, message_id, created_at) VALUES (?, ?, ?)", change_rows)
+            self.conn.commit()
+            self.messages += count
+
+        # members have read all but the last few messages of each room
+        cur.execute(
+            """
+                UPDATE room_members SET last_read_message_id = MAX(0, COALESCE(
+                    (SELECT MAX(id) FROM messages m WHERE m.room_id = room_members.room_id), 0
+                ) - ABS(RANDOM() % 20))
+            """
+        )
+        self.conn.commit()
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.execute("ANALYZE")
+        return time.perf_counter() - started
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class _ErrorCounter(logging.Handler):
+    """Model functions log and swallow their errors; count them so a failing path is not timed as a fast one."""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.count = 0
+        self.last = None
+
+    def emit(self, record):
+        self.count += 1
+        self.last = record.getMessage()
+
+
+def _explain(conn: sqlite3.Connection, statements: list[str]) -> list[dict]:
+    plans, seen = [], set()
+    for sql in statements:
+        text = " ".join(sql.split())
+        keyword = text.split(" ", 1)[0].upper() if text else ""
+        if keyword not in ("SELECT", "WITH", "UPDATE", "DELETE") or text.upper() == "SELECT 1" or text in seen:
+            continue
+        seen.add(text)
+        entry = {"sql": text if len(text) <= 400 else text[:400] + "…"}
+        try:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+            entry["plan"] = [row[3] for row in rows]
+            entry["unindexed_scans"] = [
+                detail for detail in entry["plan"]
+                if detail.startswith("SCAN ") and "USING" not in detail and "VIRTUAL TABLE" not in detail
+            ]
+        except sqlite3.Error as exc:
+            entry["error"] = str(exc)
+        plans.append(entry)
+    return plans
+
+
+def _time_function(base, fn, arg_sets: list[tuple], errors: _ErrorCounter) -> dict:
+    """Run ``fn`` once per argument set; the first call is traced for plans and not timed."""
+    statements: list[str] = []
+    conn = base.get_db()
+    conn.set_trace_callback(statements.append)
+    try:
+        fn(*arg_sets[0])
+    finally:
+        try:
+            conn.set_trace_callback(None)
+        except sqlite3.ProgrammingError:
+            pass  # maintenance functions close their connection
+    plans = _explain(base.get_db(), statements)
+
+    errors.count = 0
+    timings = []
+    for args in arg_sets[1:]:
+        started = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "calls": len(timings),
+        "mean_ms": round(sum(timings) / len(timings), 3) if timings else 0.0,
+        "p50_ms": _percentile(timings, 50),
+        "p99_ms": _percentile(timings, 99),
+        "max_ms": round(max(timings), 3) if timings else 0.0,
+        "errors": errors.count,
+        "last_error": errors.last if errors.count else None,
+        "statements": plans,
+    }
+
+
+def _benchmarks(models, gen: DatasetGenerator, rng: random.Random, repeat: int) -> dict:
+    """name -> (function, argument sets); one more set than ``repeat`` for the traced warm-up call."""
+    by_rooms = sorted(gen.user_ids, key=lambda uid: -sum(uid in m for m in gen.room_members.values()))
+    heavy_users = by_rooms[: max(1, len(by_rooms) // 20)]
+    hot_rooms = gen.traffic_rooms[:10]
+    n = repeat + 1
+
+    def _users():
+        return [rng.choice(heavy_users if rng.random() < 0.5 else gen.user_ids) for _ in range(n)]
+
+    def _viewer(room_id):
+        return rng.choice(gen.room_members[room_id])
+
+    page_rooms = [rng.choice(hot_rooms) for _ in range(n)]
+    deep_rooms = [rng.choice(hot_rooms) for _ in range(n)]
+    search_rooms = [rng.choice(hot_rooms) for _ in range(n)]
+    write_rooms = [rng.choice(hot_rooms) for _ in range(n)]
+    return {
+        "get_user_rooms": (models.get_user_rooms, [(uid,) for uid in _users()]),
+        "get_user_rooms.members": (models.get_user_rooms, [(uid, True) for uid in _users()]),
+        "get_room_messages.latest": (models.get_room_messages, [(rid, _viewer(rid), 50) for rid in page_rooms]),
+        "get_room_messages.before": (
+            models.get_room_messages,
+            [(rid, _viewer(rid), 50, max(1, gen.last_message_in_room.get(rid, 1) // 2)) for rid in deep_rooms],
+        ),
+        "advanced_search.text": (
+            models.advanced_search, [(uid, rng.choice(WORDS)) for uid in _users()],
+        ),
+        "advanced_search.room_sender": (
+            models.advanced_search,
+            [(_viewer(rid), rng.choice(WORDS), rid, _viewer(rid)) for rid in search_rooms],
+        ),
+        "advanced_search.files": (
+            models.advanced_search,
+            [(uid, rng.choice(FILE_NAMES), None, None, None, None, True) for uid in _users()],
+        ),
+        "create_message": (
+            models.create_message,
+            [(rid, _viewer(rid), f"bench {_sentence(rng)}", "text", None, None, None, False) for rid in write_rooms],
+        ),
+        "close_expired_polls": (models.close_expired_polls, [()] * n),
+        "cleanup_old_access_logs": (models.cleanup_old_access_logs, [(RETENTION_DAYS_NO_DELETE,)] * n),
+        "cleanup_message_changes": (models.cleanup_message_changes, [(RETENTION_DAYS_NO_DELETE,)] * n),
+        "cleanup_empty_rooms": (models.cleanup_empty_rooms, [()] * n),
+        "cleanup_retention_data": (models.cleanup_retention_data, [(RETENTION_DAYS_NO_DELETE,)] * n),
+    }
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float, min_delta_ms: float = 1.0) -> list[dict]:
+    """p50 latency up by more than ``tolerance`` (fraction) and ``min_delta_ms``, or an unindexed scan that was not there before."""
+    previous_runs = {run["messages"]: run for run in baseline.get("runs", [])}
+    regressions = []
+    for run in results["runs"]:
+        previous = previous_runs.get(run["messages"])
+        if not previous:
+            continue
+        for name, current in run["benchmarks"].items():
+            before = previous["benchmarks"].get(name)
+            if not before:
+                continue
+            delta = current["p50_ms"] - before["p50_ms"]
+            # sub-millisecond calls are mostly timer and scheduler noise
+            if before["p50_ms"] and delta > min_delta_ms and delta / before["p50_ms"] > tolerance:
+                regressions.append({
+                    "messages": run["messages"], "benchmark": name, "metric": "p50_ms",
+                    "baseline": before["p50_ms"], "current": current["p50_ms"],
+                })
+            old_scans = {scan for stmt in before["statements"] for scan in stmt.get("unindexed_scans", [])}
+            new_scans = {scan for stmt in current["statements"] for scan in stmt.get("unindexed_scans", [])} - old_scans
+            if new_scans:
+                regressions.append({
+                    "messages": run["messages"], "benchmark": name, "metric": "unindexed_scans",
+                    "baseline": sorted(old_scans), "current": sorted(new_scans),
+                })
+    return regressions
+
+
+def run_suite(args) -> dict:
+    work_dir = tempfile.mkdtemp(prefix="bench-db-")
+    db_path = args.db or os.path.join(work_dir, "bench.db")
+    if args.db and os.path.exists(db_path):
+        raise SystemExit(f"{db_path} already exists; the generator needs an empty database")
+    flask_app, models, base = _bootstrap(db_path, os.path.join(work_dir, "uploads"))
+    errors = _ErrorCounter()
+    logging.getLogger("app").addHandler(errors)
+    logging.getLogger("app").setLevel(logging.WARNING)
+
+    sizes = sorted(args.sizes)
+    results = {
+        "sqlite_version": sqlite3.sqlite_version,
+        "python": sys.version.split()[0],
+        "users": args.users,
+        "rooms": args.rooms,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "runs": [],
+    }
+    try:
+        with flask_app.app_context():
+            base.init_db()
+            gen = DatasetGenerator(
+                db_path, users=args.users, rooms=args.rooms, max_messages=sizes[-1], days=args.days,
+                plaintext_ratio=args.plaintext_ratio, file_ratio=args.file_ratio,
+                reaction_ratio=args.reaction_ratio, reply_ratio=args.reply_ratio,
+                max_key_versions=args.max_key_versions, seed=args.seed,
+            )
+            try:
+                for size in sizes:
+                    generate_s = gen.grow_to(size)
+                    base.close_thread_db()
+                    rng = random.Random(args.seed + size)
+                    run = {
+                        "messages": size,
+                        "generate_s": round(generate_s, 2),
+                        "db_mb": round(os.path.getsize(db_path) / 1048576, 1),
+                        "benchmarks": {},
+                    }
+                    for name, (fn, arg_sets) in _benchmarks(models, gen, rng, args.repeat).items():
+                        if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                            continue
+                        run["benchmarks"][name] = _time_function(base, fn, arg_sets, errors)
+                    results["runs"].append(run)
+                    if not args.json:
+                        _print_run(run)
+            finally:
+                gen.close()
+                base.close_thread_db()
+    finally:
+        logging.getLogger("app").removeHandler(errors)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def _print_run(run: dict) -> None:
+    print(f"\nmessages={run['messages']:,} db={run['db_mb']}MB generated in {run['generate_s']}s")
+    print(f"{'function':<30} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}  notes")
+    for name, bench in run["benchmarks"].items():
+        scans = sorted({scan for stmt in bench["statements"] for scan in stmt.get("unindexed_scans", [])})
+        notes = []
+        if scans:
+            notes.append("scans: " + ", ".join(scans))
+        if bench["errors"]:
+            notes.append(f"errors={bench['errors']} ({bench['last_error']})")
+        print(f"{name:<30} {bench['p50_ms']:>9} {bench['p99_ms']:>9} {bench['max_ms']:>9}  {'; '.join(notes)}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Time model functions against synthetic databases of growing size")
+    parser.add_argument("--sizes", type=lambda text: [int(s) for s in text.split(",") if s], default=[10000, 100000],
+                        help="comma-separated message counts, e.g. 100000,1000000,3000000")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--rooms", type=int, default=300)
+    parser.add_argument("--days", type=int, default=365, help="history the messages are spread over")
+    parser.add_argument("--plaintext-ratio", type=float, default=0.3, help="share of unencrypted (searchable) text")
+    parser.add_argument("--file-ratio", type=float, default=0.03)
+    parser.add_argument("--reaction-ratio", type=float, default=0.1)
+    parser.add_argument("--reply-ratio", type=float, default=0.05)
+    parser.add_argument("--max-key-versions", type=int, default=4, help="key rotations per group room, at most")
+    parser.add_argument("--repeat", type=int, default=20, help="timed calls per function and size")
+    parser.add_argument("--only", nargs="*", help="benchmark name prefixes to run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", metavar="PATH", help="build the database here and keep it (must not exist)")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results here for later comparison")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a saved baseline; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p50 regression (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore p50 changes smaller than this")
+    parser.add_argument("--json", action="store_true", help="print machine-readable output only")
+    args = parser.parse_args()
+    if not args.sizes or min(args.sizes) <= 0:
+        parser.error("--sizes needs positive message counts")
+
+    results = run_suite(args)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance, args.min_delta_ms)
+        results["regressions"] = regressions
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False))
+    else:
+        for regression in regressions:
+            print(
+                f"REGRESSION messages={regression['messages']:,} {regression['benchmark']} {regression['metric']}: "
+                f"{regression['baseline']} -> {regression['current']}"
+            )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Login-storm benchmark: event-loop stall while many logins verify passwords.
+
+A heartbeat task sleeps ``--interval-ms`` in a loop and records how late it wakes
+up; socket frames on the same worker are delayed by exactly that lag. The storm
+runs once with bcrypt inline on the request loop (PASSWORD_HASH_WORKERS=0) and
+once through the worker pool, and prints lag percentiles and login throughput.
+
+Run under gevent (the production async mode) for meaningful numbers; without it
+the heartbeat is a plain thread and both runs look alike because bcrypt releases
+the GIL.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+def _bootstrap():
+    base_dir = Path(__file__).resolve().parents[1]
+    sys.path.insert(0, str(base_dir))
+    import app  # noqa: F401  (applies the gevent monkey patch when available)
+    from flask import Flask
+
+    from app.services import password_hashing
+    from app.utils import hash_password
+
+    return Flask("bench_login_storm"), password_hashing, hash_password
+
+
+def _spawn(fn, *args):
+    try:
+        import gevent
+        from gevent import monkey
+
+        if monkey.is_module_patched("threading"):
+            return gevent.spawn(fn, *args)
+    except ImportError:
+        pass
+    thread = threading.Thread(target=fn, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return round(ordered[index], 2)
+
+
+def _run_storm(flask_app, password_hashing, stored_hash: str, *, workers: int, logins: int, concurrency: int, interval_ms: float):
+    flask_app.config["PASSWORD_HASH_WORKERS"] = workers
+    lags: list[float] = []
+    state = {"running": True, "remaining": logins}
+    interval = interval_ms / 1000
+    counter_lock = threading.Lock()
+
+    def _heartbeat():
+        while state["running"]:
+            started = time.perf_counter()
+            time.sleep(interval)
+            lags.append(max(0.0, (time.perf_counter() - started - interval) * 1000))
+
+    def _login_worker():
+        with flask_app.app_context():
+            while True:
+                with counter_lock:
+                    if state["remaining"] <= 0:
+                        return
+                    state["remaining"] -= 1
+                password_hashing.verify_password("Password123!", stored_hash)
+
+    heartbeat = _spawn(_heartbeat)
+    started_at = time.perf_counter()
+    tasks = [_spawn(_login_worker) for _ in range(concurrency)]
+    for task in tasks:
+        task.join()
+    elapsed = time.perf_counter() - started_at
+    state["running"] = False
+    heartbeat.join()
+
+    return {
+        "workers": workers,
+        "logins": logins,
+        "elapsed_s": round(elapsed, 3),
+        "logins_per_s": round(logins / elapsed, 2) if elapsed else 0.0,
+        "loop_lag_ms": {
+            "p50": _percentile(lags, 50),
+            "p99": _percentile(lags, 99),
+            "max": round(max(lags), 2) if lags else 0.0,
+            "samples": len(lags),
+        },
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure event-loop lag during a login storm")
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4, help="pool size for the pooled run")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt work factor")
+    parser.add_argument("--interval-ms", type=float, default=10.0)
+    parser.add_argument("--json", action="store_true", help="print machine-readable output only")
+    args = parser.parse_args()
+
+    flask_app, password_hashing, hash_password = _bootstrap()
+    flask_app.config["BCRYPT_ROUNDS"] = args.rounds
+    stored_hash = hash_password("Password123!", args.rounds)
+    if not stored_hash.startswith("$2"):
+        print("bcrypt is not installed; nothing to benchmark", file=sys.stderr)
+        return 1
+
+    try:
+        from gevent import monkey
+
+        mode = "gevent" if monkey.is_module_patched("threading") else "threading"
+    except ImportError:
+        mode = "threading"
+
+    results = {
+        "mode": mode,
+        "bcrypt_rounds": args.rounds,
+        "inline": _run_storm(
+            flask_app, password_hashing, stored_hash,
+            workers=0, logins=args.logins, concurrency=args.concurrency, interval_ms=args.interval_ms,
+        ),
+        "pooled": _run_storm(
+            flask_app, password_hashing, stored_hash,
+            workers=args.workers, logins=args.logins, concurrency=args.concurrency, interval_ms=args.interval_ms,
+        ),
+        "pool_stats": password_hashing.get_password_hash_stats(),
+    }
+
+    if args.json:
+        print(json.dumps(results))
+        return 0
+
+    print(f"mode={mode} bcrypt_rounds={args.rounds} logins={args.logins} concurrency={args.concurrency}")
+    for label in ("inline", "pooled"):
+        run = results[label]
+        lag = run["loop_lag_ms"]
+        print(
+            f"{label:>7}: {run['logins_per_s']:>8} logins/s  "
+            f"loop lag p50={lag['p50']}ms p99={lag['p99']}ms max={lag['max']}ms"
+        )
+    stats = results["pool_stats"]
+    print(f"   pool: max_queued={stats['max_queued']} wait_avg={stats['wait_ms_avg']}ms run_avg={stats['run_ms_avg']}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
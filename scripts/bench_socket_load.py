@@ -0,0 +1,577 @@
+#!/usr/bin/env python3
+"""Socket load test: simulated clients, chat traffic and reconnect storms.
+
+Starts the server in a child process on a free port with a throwaway data
+directory and ``--clients`` seeded users (grouped into rooms of ``--room-size``),
+then drives one raw Engine.IO/Socket.IO websocket per user: connect, send
+messages, typing start/stop around each send, ``message_read`` for every
+message received. Every ``--duration / (--waves + 1)`` seconds all clients drop
+at once and reconnect together, the way they do after a server restart; refused
+connects are retried after the server's ``retry_after``.
+
+Reports end-to-end delivery latency (send on one client to ``new_message`` on
+each recipient), connect throughput, refusals by code, wave recovery time,
+server CPU/RSS (psutil when installed, ``/proc`` otherwise) and the server's own
+``/control/stats`` counters. ``--save-baseline`` stores the result and
+``--baseline`` compares a run against it; the exit status is 1 on regression.
+
+Only the standard library and simple-websocket are needed on the client side.
+Run the server side under gevent (the production async mode) for meaningful
+numbers.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+PASSWORD = "Password123!"
+MESSAGE_PREFIX = "bench:"
+
+# (metric path, direction): +1 means higher is worse, -1 means lower is worse
+BASELINE_METRICS = (
+    ("delivery_latency_ms.p50", 1),
+    ("delivery_latency_ms.p99", 1),
+    ("connect.per_s", -1),
+    ("connect.latency_ms.p99", 1),
+    ("waves.recovery_s_max", 1),
+    ("server.cpu_percent_avg", 1),
+    ("server.rss_mb_max", 1),
+)
+
+
+def _serve(port: int, data_dir: str, users: int, room_size: int) -> None:
+    """Child process: seed a fresh data dir and run the app until killed."""
+    sys.path.insert(0, str(BASE_DIR))
+    import config
+
+    upload_dir = os.path.join(data_dir, "uploads")
+    os.makedirs(os.path.join(upload_dir, "quarantine"), exist_ok=True)
+    config.BASE_DIR = data_dir
+    config.DATABASE_PATH = os.path.join(data_dir, "messenger.db")
+    config.UPLOAD_FOLDER = upload_dir
+    config.UPLOAD_QUARANTINE_FOLDER = os.path.join(upload_dir, "quarantine")
+
+    from app import create_app
+    from app.control_api import control_bp, get_or_create_control_token
+    from app.extensions import limiter
+    from app.models import create_room
+    from app.models.users import create_user
+
+    flask_app, socketio = create_app()
+    # every simulated user logs in from 127.0.0.1
+    limiter.enabled = False
+    flask_app.register_blueprint(control_bp)
+    get_or_create_control_token(data_dir)
+
+    rooms: dict[str, int] = {}
+    with flask_app.app_context():
+        names = [f"load_u{i}" for i in range(users)]
+        ids = [create_user(name, PASSWORD, f"부하{i}") for i, name in enumerate(names)]
+        for start in range(0, users, room_size):
+            members = ids[start:start + room_size]
+            room_id = create_room(f"load-{start // room_size}", "group", members[0], members)
+            for name in names[start:start + room_size]:
+                rooms[name] = room_id
+
+    seed = {"rooms": rooms, "async_mode": socketio.async_mode}
+    seed_path = os.path.join(data_dir, "seed.json")
+    with open(seed_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(seed, f)
+    os.replace(seed_path + ".tmp", seed_path)
+
+    socketio.run(flask_app, host="127.0.0.1", port=port, debug=False, use_reloader=False,
+                 log_output=False, allow_unsafe_werkzeug=True)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return round(ordered[index], 2)
+
+
+def _summary(values: list[float]) -> dict:
+    return {
+        "p50": _percentile(values, 50),
+        "p99": _percentile(values, 99),
+        "max": round(max(values), 2) if values else 0.0,
+        "samples": len(values),
+    }
+
+
+class _ProcessSampler:
+    """Samples CPU and RSS of the server process in the background."""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.cpu: list[float] = []
+        self.rss: list[float] = []
+        self.source = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        try:
+            import psutil
+
+            self._proc = psutil.Process(pid)
+            self.source = "psutil"
+        except ImportError:
+            self._proc = None
+            if os.path.exists(f"/proc/{pid}/stat"):
+                self.source = "proc"
+
+    def _read(self) -> tuple[float, float]:
+        """(cpu seconds, rss MB)."""
+        if self._proc is not None:
+            times = self._proc.cpu_times()
+            return times.user + times.system, self._proc.memory_info().rss / 1048576
+        with open(f"/proc/{self.pid}/stat", encoding="ascii") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        rss = 0.0
+        with open(f"/proc/{self.pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) / 1024
+        return cpu, rss
+
+    def _run(self) -> None:
+        last_cpu, _ = self._read()
+        last_at = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            try:
+                cpu, rss = self._read()
+            except (OSError, ValueError):
+                return
+            now = time.perf_counter()
+            self.cpu.append(100 * (cpu - last_cpu) / max(1e-6, now - last_at))
+            self.rss.append(rss)
+            last_cpu, last_at = cpu, now
+
+    def start(self) -> None:
+        if self.source:
+            self._thread.start()
+
+    def stop(self) -> dict | None:
+        if not self.source:
+            return None
+        self._stop.set()
+        self._thread.join()
+        return {
+            "source": self.source,
+            "cpu_percent_avg": round(sum(self.cpu) / len(self.cpu), 1) if self.cpu else 0.0,
+            "cpu_percent_max": round(max(self.cpu), 1) if self.cpu else 0.0,
+            "rss_mb_max": round(max(self.rss), 1) if self.rss else 0.0,
+            "rss_mb_end": round(self.rss[-1], 1) if self.rss else 0.0,
+        }
+
+
+class _Run:
+    """Counters shared by all simulated clients."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sent_at: dict[str, float] = {}
+        self.delivery_ms: list[float] = []
+        self.connect_ms: list[float] = []
+        self.counts = {"sent": 0, "delivered": 0, "reads": 0, "typing": 0, "errors": 0, "connect_failures": 0}
+        self.refusals: dict[str, int] = {}
+
+    def add(self, key: str, amount: int = 1) -> None:
+        with self.lock:
+            self.counts[key] += amount
+
+
+class _SimClient:
+    """One browser tab: a Socket.IO v5 connection spoken directly over a websocket."""
+
+    def __init__(self, index: int, url: str, cookie: str, room_id: int, run: _Run, rate: float):
+        self.index = index
+        self.url = url
+        self.cookie = cookie
+        self.room_id = room_id
+        self.run = run
+        self.rate = rate
+        self.ws = None
+        self.seq = 0
+
+    def _send(self, event: str, payload: dict) -> None:
+        self.ws.send("42" + json.dumps([event, payload], ensure_ascii=False))
+
+    def connect(self, deadline: float) -> bool:
+        """Connect, retrying refusals after their ``retry_after``. Returns False at the deadline."""
+        from simple_websocket import Client, ConnectionClosed
+
+        started = time.perf_counter()
+        while time.perf_counter() < deadline:
+            retry_after = 1.0
+            try:
+                ws = Client.connect(self.url, headers={"Cookie": self.cookie})
+                # the Engine.IO session exists once the upgrade completes; the Socket.IO
+                # connect goes out without waiting for the open packet, which simple-websocket
+                # does not surface until more data arrives when it shares a read with the 101
+                ws.send("40")
+                while True:
+                    packet = ws.receive(timeout=10)
+                    if packet is None:
+                        raise ConnectionError("no Socket.IO connect reply")
+                    if packet == "2":
+                        ws.send("3")
+                    elif packet.startswith("0"):
+                        continue
+                    elif packet.startswith("40"):
+                        self.ws = ws
+                        with self.run.lock:
+                            self.run.connect_ms.append((time.perf_counter() - started) * 1000)
+                        return True
+                    elif packet.startswith("44"):
+                        data = json.loads(packet[2:] or "{}").get("data") or {}
+                        code = data.get("code", "refused") if isinstance(data, dict) else "refused"
+                        retry_after = float(data.get("retry_after", 1)) if isinstance(data, dict) else 1.0
+                        with self.run.lock:
+                            self.run.refusals[code] = self.run.refusals.get(code, 0) + 1
+                        ws.close()
+                        break
+            except (OSError, ConnectionError, ConnectionClosed, ValueError):
+                self.run.add("connect_failures")
+            time.sleep(min(retry_after, max(0.0, deadline - time.perf_counter())))
+        return False
+
+    def drop(self) -> None:
+        if self.ws is not None:
+            try:
+                self.ws.close()
+            except Exception:
+                pass
+            self.ws = None
+
+    def _handle(self, packet: str) -> None:
+        if packet == "2":
+            self.ws.send("3")
+            return
+        if not packet.startswith("42"):
+            return
+        event, *args = json.loads(packet[2:])
+        payload = args[0] if args else None
+        if event == "new_message" and isinstance(payload, dict):
+            content = payload.get("content") or ""
+            if content.startswith(MESSAGE_PREFIX):
+                received = time.perf_counter()
+                with self.run.lock:
+                    sent = self.run.sent_at.get(content)
+                    if sent is not None:
+                        self.run.delivery_ms.append((received - sent) * 1000)
+                        self.run.counts["delivered"] += 1
+            if payload.get("sender_id") is not None and not content.startswith(f"{MESSAGE_PREFIX}{self.index}:"):
+                self._send("message_read", {"room_id": self.room_id, "message_id": payload["id"]})
+                self.run.add("reads")
+        elif event == "error":
+            self.run.add("errors")
+
+    def _send_message(self) -> None:
+        self.seq += 1
+        content = f"{MESSAGE_PREFIX}{self.index}:{self.seq}"
+        self._send("typing", {"room_id": self.room_id, "is_typing": True})
+        with self.run.lock:
+            self.run.sent_at[content] = time.perf_counter()
+            self.run.counts["sent"] += 1
+            self.run.counts["typing"] += 2
+        self._send("send_message", {"room_id": self.room_id, "content": content, "type": "text", "encrypted": False})
+        self._send("typing", {"room_id": self.room_id, "is_typing": False})
+
+    def traffic(self, until: float) -> None:
+        """Send at ``rate`` messages/s (Poisson) and react to incoming frames until ``until``."""
+        from simple_websocket import ConnectionClosed
+
+        if self.ws is None:
+            return
+        next_send = time.perf_counter() + random.expovariate(self.rate) if self.rate > 0 else float("inf")
+        try:
+            while True:
+                now = time.perf_counter()
+                if now >= until:
+                    return
+                if now >= next_send:
+                    self._send_message()
+                    next_send += random.expovariate(self.rate)
+                    continue
+                packet = self.ws.receive(timeout=max(0.005, min(next_send, until) - now))
+                if packet is not None:
+                    self._handle(packet)
+        except (OSError, ConnectionClosed):
+            self.ws = None
+
+
+def _run_all(fn, clients: list[_SimClient], *args) -> list:
+    results = [None] * len(clients)
+
+    def _target(i):
+        results[i] = fn(clients[i], *args)
+
+    threads = [threading.Thread(target=_target, args=(i,), daemon=True) for i in range(len(clients))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def _login(base_url: str, username: str) -> str:
+    request = urllib.request.Request(
+        f"{base_url}/api/login",
+        data=json.dumps({"username": username, "password": PASSWORD}).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        cookies = SimpleCookie()
+        for header in response.headers.get_all("Set-Cookie") or []:
+            cookies.load(header)
+    return "; ".join(f"{key}={morsel.value}" for key, morsel in cookies.items())
+
+
+def _control_stats(base_url: str, data_dir: str) -> dict | None:
+    try:
+        with open(os.path.join(data_dir, ".control_token"), encoding="utf-8") as f:
+            token = f.read().strip()
+        request = urllib.request.Request(f"{base_url}/control/stats", headers={"X-Control-Token": token})
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return json.loads(response.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _start_server(args, data_dir: str, port: int):
+    env = dict(os.environ)
+    env.setdefault("BCRYPT_ROUNDS", "4")
+    env["SOCKET_SEND_MESSAGE_PER_MINUTE"] = "1000000"
+    for option, name in (
+        ("connect_rate", "SOCKET_CONNECT_RATE_PER_SECOND"),
+        ("connect_burst", "SOCKET_CONNECT_BURST"),
+        ("max_connections", "MAX_CONNECTIONS"),
+    ):
+        if getattr(args, option) is not None:
+            env[name] = str(getattr(args, option))
+    log = open(os.path.join(data_dir, "server.log"), "wb")
+    proc = subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), "--serve", "--port", str(port),
+         "--data-dir", data_dir, "--clients", str(args.clients), "--room-size", str(args.room_size)],
+        cwd=str(BASE_DIR), env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    seed_path = os.path.join(data_dir, "seed.json")
+    deadline = time.time() + args.startup_timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}; see {log.name}")
+        if os.path.exists(seed_path):
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=2):
+                    pass
+                with open(seed_path, encoding="utf-8") as f:
+                    return proc, json.load(f)
+            except OSError:
+                pass
+        time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start in time")
+
+
+def _lookup(results: dict, path: str):
+    value = results
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value if isinstance(value, (int, float)) else None
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float) -> list[dict]:
+    """Metrics that moved the wrong way by more than ``tolerance`` (a fraction) against the baseline."""
+    regressions = []
+    for path, direction in BASELINE_METRICS:
+        current, previous = _lookup(results, path), _lookup(baseline, path)
+        if current is None or not previous:
+            continue
+        change = (current - previous) / previous
+        if change * direction > tolerance:
+            regressions.append({"metric": path, "baseline": previous, "current": current, "change": round(change, 3)})
+    return regressions
+
+
+def run_load(args) -> dict:
+    data_dir = tempfile.mkdtemp(prefix="bench-socket-")
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    proc, seed = _start_server(args, data_dir, port)
+    try:
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            cookies = list(pool.map(lambda name: _login(base_url, name), seed["rooms"]))
+
+        run = _Run()
+        ws_url = f"ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket"
+        clients = [
+            _SimClient(i, ws_url, cookie, seed["rooms"][name], run, args.rate)
+            for i, (name, cookie) in enumerate(zip(seed["rooms"], cookies))
+        ]
+        sampler = _ProcessSampler(proc.pid)
+        sampler.start()
+
+        started = time.perf_counter()
+        connected = sum(_run_all(_SimClient.connect, clients, started + args.connect_timeout))
+        connect_elapsed = time.perf_counter() - started
+        connect_ms = list(run.connect_ms)
+
+        segment = args.duration / (args.waves + 1)
+        recoveries = []
+        for wave in range(args.waves + 1):
+            _run_all(_SimClient.traffic, clients, time.perf_counter() + segment)
+            if wave == args.waves:
+                break
+            for client in clients:
+                client.drop()
+            wave_started = time.perf_counter()
+            _run_all(_SimClient.connect, clients, wave_started + args.connect_timeout)
+            recoveries.append(time.perf_counter() - wave_started)
+        # stop sending and let in-flight deliveries land before reading the counters
+        for client in clients:
+            client.rate = 0
+        _run_all(_SimClient.traffic, clients, time.perf_counter() + 1.0)
+        server = sampler.stop()
+        control = _control_stats(base_url, data_dir)
+        for client in clients:
+            client.drop()
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        if not args.keep_data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    return {
+        "async_mode": seed.get("async_mode"),
+        "clients": args.clients,
+        "room_size": args.room_size,
+        "duration_s": args.duration,
+        "rate_per_client": args.rate,
+        "connect": {
+            "connected": connected,
+            "elapsed_s": round(connect_elapsed, 3),
+            "per_s": round(connected / connect_elapsed, 2) if connect_elapsed else 0.0,
+            "latency_ms": _summary(connect_ms),
+        },
+        "refusals": dict(run.refusals),
+        "waves": {
+            "count": args.waves,
+            "recovery_s": [round(r, 3) for r in recoveries],
+            "recovery_s_max": round(max(recoveries), 3) if recoveries else 0.0,
+        },
+        "delivery_latency_ms": _summary(run.delivery_ms),
+        "counts": dict(run.counts),
+        "server": server,
+        "server_stats": control,
+        "data_dir": data_dir if args.keep_data else None,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Socket.IO load test and reconnect-storm simulator")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--room-size", type=int, default=10, help="users per group room")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of traffic in total")
+    parser.add_argument("--rate", type=float, default=0.2, help="messages per second per client")
+    parser.add_argument("--waves", type=int, default=2, help="reconnect waves spread over the run")
+    parser.add_argument("--connect-timeout", type=float, default=60.0, help="give up on a client after this long")
+    parser.add_argument("--connect-rate", type=float, default=None, help="override SOCKET_CONNECT_RATE_PER_SECOND")
+    parser.add_argument("--connect-burst", type=int, default=None, help="override SOCKET_CONNECT_BURST")
+    parser.add_argument("--max-connections", type=int, default=None, help="override MAX_CONNECTIONS")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--keep-data", action="store_true", help="keep the temp data dir (server.log, DB)")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results here for later comparison")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a saved baseline; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression (0.2 = 20%%)")
+    parser.add_argument("--json", action="store_true", help="print machine-readable output only")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        _serve(args.port, args.data_dir, args.clients, max(1, args.room_size))
+        return 0
+
+    try:
+        import simple_websocket  # noqa: F401
+    except ImportError:
+        print("simple-websocket is not installed; nothing to benchmark", file=sys.stderr)
+        return 1
+
+    args.room_size = max(1, args.room_size)
+    results = run_load(args)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        results["regressions"] = regressions
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False))
+        return 1 if regressions else 0
+
+    connect, latency, counts = results["connect"], results["delivery_latency_ms"], results["counts"]
+    print(
+        f"mode={results['async_mode']} clients={args.clients} room_size={args.room_size} "
+        f"duration={args.duration}s rate={args.rate}/s waves={args.waves}"
+    )
+    print(
+        f"connect: {connect['connected']}/{args.clients} in {connect['elapsed_s']}s ({connect['per_s']}/s)  "
+        f"p50={connect['latency_ms']['p50']}ms p99={connect['latency_ms']['p99']}ms  refusals={results['refusals']}"
+    )
+    print(f"  waves: recovery {results['waves']['recovery_s']}s")
+    print(
+        f"deliver: p50={latency['p50']}ms p99={latency['p99']}ms max={latency['max']}ms  "
+        f"sent={counts['sent']} delivered={counts['delivered']} reads={counts['reads']} errors={counts['errors']}"
+    )
+    if results["server"]:
+        server = results["server"]
+        print(
+            f" server: cpu avg={server['cpu_percent_avg']}% max={server['cpu_percent_max']}%  "
+            f"rss max={server['rss_mb_max']}MB end={server['rss_mb_end']}MB ({server['source']})"
+        )
+    for regression in regressions:
+        print(
+            f"REGRESSION {regression['metric']}: {regression['baseline']} -> {regression['current']} "
+            f"({regression['change']:+.0%})"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
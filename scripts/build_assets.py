@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""Build fingerprinted, pre-compressed frontend bundles into static/dist/ and
+.br/.gz siblings for the remaining static text assets."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+
+def _import_builder():
+    base_dir = Path(__file__).resolve().parents[1]
+    sys.path.insert(0, str(base_dir))
+    from app.services.asset_bundles import build_bundles, precompress_static  # type: ignore
+
+    return base_dir, build_bundles, precompress_static
+
+
+def main() -> int:
+    base_dir, build_bundles, precompress_static = _import_builder()
+
+    parser = argparse.ArgumentParser(description="Build hashed JS bundles with .br/.gz variants")
+    parser.add_argument("--static-dir", default=str(base_dir / "static"), help="static folder to read from and write dist/ into")
+    parser.add_argument("--brotli-quality", type=int, default=11)
+    args = parser.parse_args()
+
+    manifest = build_bundles(args.static_dir, brotli_quality=args.brotli_quality)
+    for name, entry in manifest.items():
+        print(f"{name}: {entry['file']} ({entry['size']} bytes, {len(entry['sources'])} sources, {'/'.join(entry['encodings'])})")
+    written = precompress_static(args.static_dir, brotli_quality=args.brotli_quality)
+    print(f"precompressed: {written} static file(s) refreshed")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
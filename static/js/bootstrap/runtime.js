@@ -20,6 +20,9 @@ const elements = {};
 
         // 오프라인 배너 초기화 (features.js)
         if (typeof initOfflineBanner === 'function') initOfflineBanner();
+
+        // [v5.1] 서비스 워커 (번들 프리캐시, 대화방 목록/프로필 이미지 캐시)
+        registerServiceWorker();
     }
 
     if (document.readyState === 'loading') {
@@ -31,6 +34,29 @@ const elements = {};
     }
 })();
 
+/**
+ * [v5.1] 서비스 워커 등록
+ * 서버가 빌드 버전을 붙인 URL(<meta name="sw-url">)을 내려주므로 배포마다 새 워커가 설치되고
+ * 이전 버전 캐시는 activate 단계에서 삭제됨. 보안 컨텍스트(HTTPS/localhost)에서만 동작
+ */
+function registerServiceWorker() {
+    if (!('serviceWorker' in navigator) || !window.isSecureContext) return;
+    var meta = document.querySelector('meta[name="sw-url"]');
+    var swUrl = meta && meta.getAttribute('content');
+    if (!swUrl) return;
+
+    navigator.serviceWorker.addEventListener('message', function (event) {
+        var data = event.data || {};
+        if (data.type === 'api-cache-updated' && data.path === '/api/rooms' &&
+            typeof handleRoomListCacheUpdate === 'function') {
+            handleRoomListCacheUpdate(data);
+        }
+    });
+    navigator.serviceWorker.register(swUrl, { scope: '/' }).catch(function (err) {
+        console.warn('Service Worker 등록 실패:', err);
+    });
+}
+
 /**
  * 주요 DOM 요소 캐싱
  */
@@ -401,6 +427,11 @@ function initApp() {
         }
     }
 
+    // [v5.1] 오프라인 캐시(IndexedDB) 열기 - 다른 사용자가 남긴 캐시는 폐기
+    if (window.MessengerStorage && typeof currentUser !== 'undefined' && currentUser) {
+        MessengerStorage.openForUser(currentUser.id);
+    }
+
     // Socket.IO 연결 (socket-handlers.js)
     if (typeof initSocket === 'function') initSocket();
 
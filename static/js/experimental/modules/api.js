@@ -41,6 +41,10 @@ export const ConfigAPI = {
 export const UserAPI = {
     getUsers: () => api('/api/users'),
     getOnlineUsers: () => api('/api/users/online'),
+    getOnlineUsersSince: (version) => api(`/api/users/online?since=${encodeURIComponent(version || '')}`),
+    searchUsers: (q, offset = 0, limit = 50) =>
+        api(`/api/users/directory?q=${encodeURIComponent(q || '')}&offset=${offset}&limit=${limit}`),
+    getUsersByIds: (ids) => api(`/api/users/by-ids?ids=${ids.join(',')}`),
     getProfile: () => api('/api/profile'),
     updateProfile: (data) => api('/api/profile', {
         method: 'PUT',
@@ -31,8 +31,11 @@ export function initSocket() {
 
     state.socket.on('new_message', handleNewMessage);
     state.socket.on('read_updated', handleReadUpdated);
+    state.socket.on('read_receipts', handleReadUpdated);
     state.socket.on('user_typing', handleUserTyping);
+    state.socket.on('room_typers', handleRoomTypers);
     state.socket.on('user_status', handleUserStatus);
+    state.socket.on('presence_diff', handleUserStatus);
     state.socket.on('room_updated', () => loadRooms());
     state.socket.on('room_name_updated', handleRoomNameUpdated);
     state.socket.on('room_members_updated', handleRoomMembersUpdated);
@@ -158,6 +161,46 @@ function handleUserTyping(data) {
     }
 }
 
+// room_typers: latest snapshot per worker node for the current room, merged for display
+const typersByNode = new Map();
+let typersRoomId = null;
+
+function handleRoomTypers(data) {
+    if (!state.currentRoom || data.room_id !== state.currentRoom.id) return;
+    if (typersRoomId !== data.room_id) {
+        typersByNode.forEach(entry => clearTimeout(entry.timeout));
+        typersByNode.clear();
+        typersRoomId = data.room_id;
+    }
+    const node = data.node || '';
+    const previous = typersByNode.get(node);
+    if (previous) clearTimeout(previous.timeout);
+    if ((data.typers || []).length > 0) {
+        // snapshots are repeated while someone types; a silent node is dropped
+        const timeout = setTimeout(() => {
+            typersByNode.delete(node);
+            handleRoomTypers({ room_id: data.room_id, node, typers: [] });
+        }, 8000);
+        typersByNode.set(node, { typers: data.typers, timeout });
+    } else {
+        typersByNode.delete(node);
+    }
+    const selfId = state.currentUser ? state.currentUser.id : null;
+    const byUser = new Map();
+    typersByNode.forEach(entry => entry.typers.forEach(t => {
+        if (t.user_id !== selfId) byUser.set(t.user_id, t.nickname);
+    }));
+    const names = Array.from(byUser.values());
+    const indicator = getElement('typingIndicator');
+    if (!indicator) return;
+    if (names.length === 0) {
+        indicator.classList.add('hidden');
+    } else {
+        indicator.textContent = names.length === 1 ? `${names[0]}님이 입력 중...` : `${names[0]} 외 ${names.length - 1}명이 입력 중...`;
+        indicator.classList.remove('hidden');
+    }
+}
+
 function handleUserStatus(data) {
     loadRooms();
     loadOnlineUsers();
@@ -7,26 +7,40 @@
 // API 통신
 // ============================================================================
 
+/**
+ * [v5.1] ETag 재검증용 응답 캐시 (URL -> { etag, body })
+ * 서버가 304를 주면 마지막 본문을 다시 파싱해 반환 (호출자가 결과를 수정해도 캐시는 그대로)
+ */
+var apiEtagCache = new Map();
+var API_ETAG_CACHE_LIMIT = 50;
+
 /**
  * API 요청 래퍼 함수
  * @param {string} url - API URL
- * @param {Object} options - fetch 옵션
+ * @param {Object} options - fetch 옵션 (revalidate: true 이면 If-None-Match 전송, 304 시 캐시 본문 반환)
  * @returns {Promise<Object>} 응답 데이터
  */
 async function api(url, options = {}) {
     try {
+        const { revalidate, ...fetchOptions } = options;
         const csrfToken = document.querySelector('meta[name="csrf-token"]')?.getAttribute('content');
+        const cached = revalidate ? apiEtagCache.get(url) : null;
         const headers = {
             'Content-Type': 'application/json',
             ...(csrfToken && { 'X-CSRFToken': csrfToken }),
-            ...options.headers
+            ...(cached && { 'If-None-Match': cached.etag }),
+            ...fetchOptions.headers
         };
 
         const res = await fetch(url, {
-            ...options,
+            ...fetchOptions,
             headers: headers
         });
 
+        if (res.status === 304 && cached) {
+            return JSON.parse(cached.body);
+        }
+
         // 비 JSON 응답 처리
         const contentType = res.headers.get('content-type');
         if (!contentType || !contentType.includes('application/json')) {
@@ -34,6 +48,19 @@ async function api(url, options = {}) {
             return {};
         }
 
+        if (revalidate && res.ok) {
+            const body = await res.text();
+            const etag = res.headers.get('ETag');
+            apiEtagCache.delete(url);
+            if (etag) {
+                apiEtagCache.set(url, { etag: etag, body: body });
+                if (apiEtagCache.size > API_ETAG_CACHE_LIMIT) {
+                    apiEtagCache.delete(apiEtagCache.keys().next().value);
+                }
+            }
+            return JSON.parse(body);
+        }
+
         const json = await res.json();
         if (!res.ok) {
             throw new Error(json.error || `HTTP ${res.status}`);
@@ -347,6 +374,20 @@ async function logout() {
             sessionStorage.clear();
         } catch (e) { }
 
+        // [v5.1] 오프라인 메시지/대화방 캐시 삭제 (서비스 워커의 사용자 데이터 캐시 포함)
+        if (window.MessengerStorage) {
+            await MessengerStorage.clearAll();
+        }
+        try {
+            if (window.caches) {
+                var cacheNames = await caches.keys();
+                await Promise.all(cacheNames.filter(function (name) {
+                    return name.indexOf('messenger-api-') === 0 || name.indexOf('messenger-avatars-') === 0;
+                }).map(function (name) { return caches.delete(name); }));
+            }
+        } catch (e) { }
+        apiEtagCache.clear();
+
         // 캐시 방지를 위해 타임스탬프 추가
         location.href = '/?_=' + Date.now();
     }
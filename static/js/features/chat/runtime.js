@@ -18,7 +18,14 @@ function openLightbox(imageSrc) {
     var lightboxImg = document.getElementById('lightboxImage');
     if (!lightbox || !lightboxImg) return;
 
-    lightboxImages = Array.from(document.querySelectorAll('.message-image')).map(function (img) { return img.src; });
+    // [v5.1] 가상 스크롤: 렌더링된 행이 아니라 로드된 메시지 모델에서 이미지 목록 구성
+    lightboxImages = (typeof getLoadedMessages === 'function' ? getLoadedMessages() : [])
+        .filter(function (msg) { return msg.message_type === 'image' && msg.file_path; })
+        .map(function (msg) {
+            var safePath = typeof safeImagePath === 'function' ? safeImagePath(msg.file_path) : msg.file_path;
+            return safePath ? '/uploads/' + safePath : null;
+        })
+        .filter(Boolean);
     currentImageIndex = lightboxImages.indexOf(imageSrc);
     if (currentImageIndex === -1) currentImageIndex = 0;
 
@@ -376,7 +383,10 @@ function renderFileList(files) {
     container.innerHTML = files.map(function (file) {
         var isImage = file.file_type && file.file_type.startsWith('image');
         var safePath = encodeURIComponent(file.file_path || '');
-        var icon = isImage ? '<img src="/uploads/' + safePath + '" alt="">' : '📄';
+        var thumbPath = (isImage && file.thumbnails && file.thumbnails.sm && typeof safeImagePath === 'function')
+            ? safeImagePath(file.thumbnails.sm.replace(/^\/uploads\//, ''))
+            : null;
+        var icon = isImage ? '<img src="/uploads/' + (thumbPath || safePath) + '" alt="" loading="lazy">' : '📄';
         return '<div class="file-item" data-file-id="' + file.id + '">' +
             '<div class="file-item-icon">' + icon + '</div>' +
             '<div class="file-item-info">' +
@@ -529,8 +539,8 @@ async function openAdminModal() {
  */
 async function loadAdminMemberList() {
     try {
-        var roomInfo = await api('/api/rooms/' + currentRoom.id + '/info');
-        var admins = await api('/api/rooms/' + currentRoom.id + '/admins');
+        var roomInfo = await api('/api/rooms/' + currentRoom.id + '/info', { revalidate: true });
+        var admins = await api('/api/rooms/' + currentRoom.id + '/admins', { revalidate: true });
         var adminIds = admins.map(function (a) { return a.id; });
 
         var container = $('adminMemberList');
@@ -627,9 +637,7 @@ function closeChatSearch() {
     if (chatSearch) chatSearch.classList.remove('active');
 
     // 하이라이트 제거
-    document.querySelectorAll('.search-highlight').forEach(function (el) {
-        el.classList.remove('search-highlight', 'search-highlight-current');
-    });
+    if (typeof setMessageSearchHighlights === 'function') setMessageSearchHighlights([], null);
     chatSearchMatches = [];
     chatSearchCurrentIndex = 0;
 }
@@ -641,27 +649,25 @@ function doChatSearch() {
     var query = $('chatSearchInput').value.trim().toLowerCase();
     var countEl = $('chatSearchCount');
 
-    // 기존 하이라이트 제거
-    document.querySelectorAll('.search-highlight').forEach(function (el) {
-        el.classList.remove('search-highlight', 'search-highlight-current');
-    });
-
     chatSearchMatches = [];
     chatSearchCurrentIndex = 0;
 
     if (!query) {
+        if (typeof setMessageSearchHighlights === 'function') setMessageSearchHighlights([], null);
         if (countEl) countEl.textContent = '';
         return;
     }
 
-    // 메시지 검색
-    document.querySelectorAll('.message').forEach(function (msgEl) {
-        var bubble = msgEl.querySelector('.message-bubble');
-        if (bubble && bubble.textContent.toLowerCase().includes(query)) {
-            chatSearchMatches.push(msgEl);
-            msgEl.classList.add('search-highlight');
+    // [v5.1] 메시지 검색: 로드된 메시지 모델 기준 (암호화 메시지는 이미 복호화된 것만)
+    var loaded = typeof getLoadedMessages === 'function' ? getLoadedMessages() : [];
+    loaded.forEach(function (msg) {
+        if (msg.message_type === 'image' || msg.message_type === 'file') return;
+        var text = typeof getCachedMessageText === 'function' ? getCachedMessageText(msg) : msg.content;
+        if (text && text.toLowerCase().includes(query)) {
+            chatSearchMatches.push(msg.id);
         }
     });
+    if (typeof setMessageSearchHighlights === 'function') setMessageSearchHighlights(chatSearchMatches, null);
 
     if (countEl) {
         countEl.textContent = chatSearchMatches.length > 0
@@ -678,16 +684,11 @@ function doChatSearch() {
  * 현재 검색 결과 하이라이트
  */
 function highlightCurrentMatch() {
-    // 이전 현재 하이라이트 제거
-    document.querySelectorAll('.search-highlight-current').forEach(function (el) {
-        el.classList.remove('search-highlight-current');
-    });
-
     if (chatSearchMatches.length === 0) return;
 
-    var current = chatSearchMatches[chatSearchCurrentIndex];
-    current.classList.add('search-highlight-current');
-    current.scrollIntoView({ behavior: 'smooth', block: 'center' });
+    var currentId = chatSearchMatches[chatSearchCurrentIndex];
+    if (typeof setMessageSearchHighlights === 'function') setMessageSearchHighlights(chatSearchMatches, currentId);
+    if (typeof revealMessage === 'function') revealMessage(currentId);
 
     var countEl = $('chatSearchCount');
     if (countEl) {
@@ -16,10 +16,20 @@ var oldestMessageId = null;
 var lazyLoadObserver = null;
 
 // [v4.36] Lazy decrypt for E2E messages (reduce PBKDF2 jank on initial render)
+// Decryption runs in MessengerDecryptPool workers; visible messages are requested first.
 var lazyDecryptObserver = null;
-var lazyDecryptQueue = [];
-var lazyDecryptScheduled = false;
-var lazyDecryptQueuedIds = new Set();
+var DECRYPT_PRELOAD_MARGIN_PX = 600;
+var DECRYPT_PRIORITY_VISIBLE = 0;
+var DECRYPT_PRIORITY_NEAR = 1;
+var DECRYPT_FAILED_TEXT = '[\uC554\uD638\uD654\uB41C \uBA54\uC2DC\uC9C0]';
+
+// [v5.1] Virtualized message list: loaded messages live in messageModel (sorted by id) and
+// MessengerMessageWindow keeps only the rows near the viewport in the DOM. Read receipts,
+// edits, reactions and search update the model; rendered rows are patched or rebuilt from it.
+var messageModel = { roomId: null, list: [], byId: new Map(), unreadDividerId: null };
+var messageWindow = null;
+var MESSAGE_GROUP_WINDOW_MS = 180000;
+var messageSearchHighlight = { ids: new Set(), currentId: null };
 
 function getRoomKeyForVersion(version) {
     if (currentRoomKeys && typeof currentRoomKeys === 'object') {
@@ -42,12 +52,68 @@ function cleanupLazyDecryptObserver() {
         if (lazyDecryptObserver) lazyDecryptObserver.disconnect();
     } catch (e) { }
     lazyDecryptObserver = null;
-    lazyDecryptQueue = [];
-    lazyDecryptScheduled = false;
-    lazyDecryptQueuedIds = new Set();
+    if (window.MessengerDecryptPool) window.MessengerDecryptPool.clearQueue();
 }
 
-function decryptPendingInMessageEl(msgEl) {
+/**
+ * Decrypt one field of a message and hand the plaintext to render().
+ * With a priority the work goes to the worker pool; without one (a single
+ * live message) it runs inline. Either way the session cache is consulted first.
+ */
+function decryptMessageField(msg, field, payload, key, priority, render) {
+    var pool = window.MessengerDecryptPool;
+    var cached = pool ? pool.getCached(msg.id, field, payload) : undefined;
+    if (cached !== undefined) {
+        render(cached);
+        return;
+    }
+    if (pool && priority !== undefined) {
+        pool.request(msg.id, field, payload, key, priority).then(function (plaintext) {
+            if (plaintext !== undefined) render(plaintext);
+        });
+        return;
+    }
+    var plaintext = E2E.decrypt(payload, key);
+    if (pool) pool.remember(msg.id, field, payload, plaintext);
+    render(plaintext);
+}
+
+/**
+ * Decrypt a live message (and its reply preview) synchronously into the session cache,
+ * so createMessageElement renders it without a pending placeholder.
+ */
+function primeMessageDecrypt(msg) {
+    if (!msg || !window.E2E) return;
+    var noop = function () { };
+    var messageKey = getMessageKey(msg);
+    if (msg.encrypted && messageKey && msg.message_type !== 'image' && msg.message_type !== 'file') {
+        decryptMessageField(msg, 'content', msg.content, messageKey, undefined, noop);
+    }
+    var replyKey = getReplyKey(msg);
+    if (msg.reply_content && replyKey) {
+        decryptMessageField(msg, 'reply', msg.reply_content, replyKey, undefined, noop);
+    }
+}
+
+/**
+ * Plaintext of a loaded message without decrypting: null when it is encrypted and has
+ * not been decrypted yet this session.
+ */
+function getCachedMessageText(msg) {
+    if (!msg) return null;
+    if (!msg.encrypted) return msg.content || null;
+    var pool = window.MessengerDecryptPool;
+    var cached = pool ? pool.getCached(msg.id, 'content', msg.content) : undefined;
+    return typeof cached === 'string' ? cached : null;
+}
+
+function messageBubbleHtml(msg, text) {
+    var html = parseCodeBlocks(parseMentions(escapeHtml(text)));
+    if (msg && msg.edited) html += ' <span class="edited-indicator">(수정됨)</span>';
+    return html;
+}
+
+function decryptPendingInMessageEl(msgEl, priority) {
     if (!msgEl || !msgEl._messageData || !window.E2E) return;
     var msg = msgEl._messageData;
     var messageKey = getMessageKey(msg);
@@ -55,81 +121,362 @@ function decryptPendingInMessageEl(msgEl) {
 
     var bubble = msgEl.querySelector('.message-bubble[data-decrypt-pending="1"]');
     if (bubble && msg.encrypted && messageKey) {
-        var decrypted = E2E.decrypt(msg.content, messageKey);
-        if (!decrypted) decrypted = '[\uC554\uD638\uD654\uB41C \uBA54\uC2DC\uC9C0]';
-        var parsed = parseCodeBlocks(parseMentions(escapeHtml(decrypted)));
-        bubble.innerHTML = parsed;
-        bubble.removeAttribute('data-decrypt-pending');
+        decryptMessageField(msg, 'content', msg.content, messageKey, priority, function (decrypted) {
+            if (bubble.getAttribute('data-decrypt-pending') !== '1') return;
+            bubble.innerHTML = messageBubbleHtml(msg, decrypted || DECRYPT_FAILED_TEXT);
+            bubble.removeAttribute('data-decrypt-pending');
+        });
     }
 
     var replyText = msgEl.querySelector('.reply-text[data-reply-decrypt-pending="1"]');
     if (replyText && msg.reply_content && replyKey) {
-        var decryptedReply = E2E.decrypt(msg.reply_content, replyKey);
-        if (!decryptedReply) decryptedReply = '[\uC554\uD638\uD654\uB41C \uBA54\uC2DC\uC9C0]';
-        replyText.textContent = decryptedReply;
-        replyText.removeAttribute('data-reply-decrypt-pending');
-    }
-}
-
-function scheduleLazyDecrypt() {
-    if (lazyDecryptScheduled) return;
-    lazyDecryptScheduled = true;
-
-    var run = function () {
-        lazyDecryptScheduled = false;
-        var budget = 6;  // max items per tick
-        while (lazyDecryptQueue.length > 0 && budget > 0) {
-            var msgEl = lazyDecryptQueue.shift();
-            var id = msgEl && msgEl.dataset ? msgEl.dataset.messageId : null;
-            try { if (id) lazyDecryptQueuedIds.delete(id); } catch (e) { }
-            decryptPendingInMessageEl(msgEl);
-            budget--;
-        }
-        if (lazyDecryptQueue.length > 0) scheduleLazyDecrypt();
-    };
-
-    if (window.requestIdleCallback) {
-        window.requestIdleCallback(run, { timeout: 200 });
-    } else {
-        setTimeout(run, 0);
+        decryptMessageField(msg, 'reply', msg.reply_content, replyKey, priority, function (decryptedReply) {
+            if (replyText.getAttribute('data-reply-decrypt-pending') !== '1') return;
+            replyText.textContent = decryptedReply || DECRYPT_FAILED_TEXT;
+            replyText.removeAttribute('data-reply-decrypt-pending');
+        });
     }
 }
 
-function enqueueLazyDecryptFromNode(node) {
+function enqueueLazyDecryptFromNode(node, priority) {
     if (!node) return;
     var msgEl = node.closest ? node.closest('.message') : null;
     if (!msgEl || !msgEl.dataset || !msgEl.dataset.messageId) return;
-    var id = msgEl.dataset.messageId;
-    if (lazyDecryptQueuedIds.has(id)) return;
-    lazyDecryptQueuedIds.add(id);
-    lazyDecryptQueue.push(msgEl);
-    scheduleLazyDecrypt();
+    decryptPendingInMessageEl(msgEl, priority);
 }
 
-function observePendingDecrypts() {
+var PENDING_DECRYPT_SELECTOR = '.message-bubble[data-decrypt-pending="1"], .reply-text[data-reply-decrypt-pending="1"]';
+
+function collectPendingDecryptNodes(roots) {
+    var found = [];
+    roots.forEach(function (root) {
+        if (!root || root.nodeType !== 1) return;
+        if (root.matches(PENDING_DECRYPT_SELECTOR)) found.push(root);
+        root.querySelectorAll(PENDING_DECRYPT_SELECTOR).forEach(function (el) { found.push(el); });
+    });
+    return found;
+}
+
+/**
+ * Watch pending-decrypt placeholders inside `roots` (rows the message window just
+ * rendered); defaults to the whole container.
+ */
+function observePendingDecrypts(roots) {
     var container = document.getElementById('messagesContainer');
     if (!container) return;
 
-    var selector = '.message-bubble[data-decrypt-pending="1"], .reply-text[data-reply-decrypt-pending="1"]';
+    var targets = collectPendingDecryptNodes(roots || [container]);
     if (!('IntersectionObserver' in window)) {
-        container.querySelectorAll(selector).forEach(function (el) { enqueueLazyDecryptFromNode(el); });
+        targets.forEach(function (el) {
+            enqueueLazyDecryptFromNode(el, DECRYPT_PRIORITY_NEAR);
+        });
         return;
     }
 
-    try { if (lazyDecryptObserver) lazyDecryptObserver.disconnect(); } catch (e) { }
-    lazyDecryptObserver = new IntersectionObserver(function (entries) {
+    if (!lazyDecryptObserver) lazyDecryptObserver = new IntersectionObserver(function (entries) {
         entries.forEach(function (entry) {
             if (!entry.isIntersecting) return;
             try { lazyDecryptObserver.unobserve(entry.target); } catch (e) { }
-            enqueueLazyDecryptFromNode(entry.target);
+            // rootBounds include the preload margin; strip it to tell "on screen" from "about to be"
+            var bounds = entry.rootBounds;
+            var rect = entry.boundingClientRect;
+            var onScreen = !bounds ||
+                (rect.bottom > bounds.top + DECRYPT_PRELOAD_MARGIN_PX && rect.top < bounds.bottom - DECRYPT_PRELOAD_MARGIN_PX);
+            enqueueLazyDecryptFromNode(entry.target, onScreen ? DECRYPT_PRIORITY_VISIBLE : DECRYPT_PRIORITY_NEAR);
         });
-    }, { root: container, threshold: 0.1 });
+    }, { root: container, rootMargin: DECRYPT_PRELOAD_MARGIN_PX + 'px 0px', threshold: 0 });
 
-    container.querySelectorAll(selector).forEach(function (el) {
+    targets.forEach(function (el) {
         lazyDecryptObserver.observe(el);
     });
 }
 
+function unobservePendingDecrypts(roots) {
+    if (!lazyDecryptObserver) return;
+    collectPendingDecryptNodes(roots).forEach(function (el) {
+        try { lazyDecryptObserver.unobserve(el); } catch (e) { }
+    });
+}
+
+// ============================================================================
+// [v5.1] 메시지 모델 / 가상 스크롤 윈도우
+// ============================================================================
+
+function getLoadedMessages() {
+    return messageModel.list;
+}
+
+function getLoadedMessage(messageId) {
+    return messageModel.byId.get(Number(messageId)) || null;
+}
+
+/** Element of a message if its row is currently rendered, else null. */
+function getRenderedMessageEl(messageId) {
+    if (messageWindow) return messageWindow.getElement(Number(messageId));
+    return document.querySelector('.message[data-message-id="' + messageId + '"]');
+}
+
+function insertMessagesIntoModel(messages) {
+    var list = messageModel.list;
+    var needsSort = false;
+    (messages || []).forEach(function (msg) {
+        if (!msg || !msg.id || messageModel.byId.has(msg.id)) return;
+        if (list.length && list[list.length - 1].id > msg.id) needsSort = true;
+        messageModel.byId.set(msg.id, msg);
+        list.push(msg);
+    });
+    if (needsSort) list.sort(function (a, b) { return a.id - b.id; });
+}
+
+function removeMessageFromModel(messageId) {
+    var msg = getLoadedMessage(messageId);
+    if (!msg) return;
+    messageModel.byId.delete(msg.id);
+    var idx = messageModel.list.indexOf(msg);
+    if (idx >= 0) messageModel.list.splice(idx, 1);
+    syncMessageWindow();
+}
+
+function _messageDate(msg) {
+    return msg.created_at.split(' ')[0] || msg.created_at.split('T')[0];
+}
+
+function _messageTime(msg) {
+    return new Date(msg.created_at.replace(' ', 'T')).getTime();
+}
+
+/**
+ * Layout of the loaded messages as window rows: date/unread dividers and grouping
+ * flags, which depend on neighbours. `sig` changes whenever a row must be re-rendered.
+ */
+function buildMessageRows() {
+    var messages = messageModel.list;
+    var rows = new Array(messages.length);
+    var lastDate = null;
+    var todayStr = new Date().toISOString().split('T')[0];
+    var localTodayDividerShown = false;
+    var lastSenderId = null;
+    var lastMessageTime = null;
+    var nextMsgTime = messages.length ? _messageTime(messages[0]) : null;
+
+    messages.forEach(function (msg, index) {
+        var dateDivider = null;
+        var msgDate = _messageDate(msg);
+        if (msgDate !== lastDate) {
+            var isToday = msgDate === todayStr;
+            if (!isToday || !localTodayDividerShown) {
+                lastDate = msgDate;
+                dateDivider = msgDate;
+                if (isToday) localTodayDividerShown = true;
+                lastSenderId = null;
+                lastMessageTime = null;
+            }
+        }
+
+        var unreadDivider = msg.id === messageModel.unreadDividerId;
+        if (unreadDivider) {
+            lastSenderId = null;
+            lastMessageTime = null;
+        }
+
+        // 같은 발신자이고 3분 이내이면 그룹화
+        var msgTime = nextMsgTime;
+        var isGrouped = !!(lastSenderId === msg.sender_id && lastMessageTime && (msgTime - lastMessageTime) < MESSAGE_GROUP_WINDOW_MS);
+        var nextMsg = messages[index + 1];
+        var isLastInGroup = true;
+        nextMsgTime = nextMsg ? _messageTime(nextMsg) : null;
+        if (nextMsg && nextMsg.sender_id === msg.sender_id && (nextMsgTime - msgTime) < MESSAGE_GROUP_WINDOW_MS) {
+            isLastInGroup = false;
+        }
+
+        rows[index] = {
+            key: msg.id,
+            msg: msg,
+            dateDivider: dateDivider,
+            unreadDivider: unreadDivider,
+            isGrouped: isGrouped,
+            isLastInGroup: isLastInGroup,
+            sig: (dateDivider || '') + '|' + (unreadDivider ? 'u' : '') + (isGrouped ? 'g' : '') + (isLastInGroup ? 'l' : '')
+        };
+
+        lastSenderId = msg.sender_id;
+        lastMessageTime = msgTime;
+    });
+    return rows;
+}
+
+function renderMessageRow(row) {
+    var nodes = [];
+    if (row.dateDivider) {
+        var divider = document.createElement('div');
+        divider.className = 'date-divider';
+        divider.setAttribute('data-date', row.dateDivider);
+        divider.innerHTML = '<span>' + formatDateLabel(row.dateDivider) + '</span>';
+        nodes.push(divider);
+    }
+    if (row.unreadDivider) {
+        var unreadDivider = document.createElement('div');
+        unreadDivider.className = 'unread-divider';
+        unreadDivider.innerHTML = '<span>여기서부터 읽지 않음</span>';
+        nodes.push(unreadDivider);
+    }
+    var msgEl = createMessageElement(row.msg, row.isGrouped, !row.isGrouped, row.isLastInGroup);
+    if (messageSearchHighlight.ids.has(row.msg.id)) {
+        msgEl.classList.add('search-highlight');
+        if (messageSearchHighlight.currentId === row.msg.id) msgEl.classList.add('search-highlight-current');
+    }
+    nodes.push(msgEl);
+    return nodes;
+}
+
+function ensureMessageWindow() {
+    var container = document.getElementById('messagesContainer');
+    if (!container || !window.MessengerMessageWindow) return null;
+    if (messageWindow && messageWindow.container === container && container.contains(messageWindow.topSpacer)) {
+        return messageWindow;
+    }
+    if (messageWindow) messageWindow.destroy();
+    messageWindow = MessengerMessageWindow.create(container, {
+        renderRow: renderMessageRow,
+        onRowsRendered: function (nodeLists) {
+            nodeLists.forEach(function (nodes) { observePendingDecrypts(nodes); });
+        },
+        onRowRemoved: unobservePendingDecrypts
+    });
+    return messageWindow;
+}
+
+function syncMessageWindow() {
+    var win = ensureMessageWindow();
+    if (win) win.setRows(buildMessageRows());
+}
+
+/** Re-render one message row after its data changed in the model. */
+function refreshMessageRow(messageId) {
+    if (messageWindow) messageWindow.refresh(Number(messageId));
+}
+
+/**
+ * Tear down the message list (room closed / access revoked).
+ */
+function resetMessageList() {
+    if (messageWindow) messageWindow.destroy();
+    messageWindow = null;
+    messageModel = { roomId: null, list: [], byId: new Map(), unreadDividerId: null };
+    messageSearchHighlight = { ids: new Set(), currentId: null };
+    cleanupLazyDecryptObserver();
+}
+
+/**
+ * Mark search matches on the model so rows keep the highlight when re-rendered.
+ */
+function setMessageSearchHighlights(ids, currentId) {
+    messageSearchHighlight = { ids: new Set(ids || []), currentId: currentId || null };
+    var apply = function (msg, el) {
+        if (!el || !el.classList) return;
+        var matched = messageSearchHighlight.ids.has(msg.id);
+        el.classList.toggle('search-highlight', matched);
+        el.classList.toggle('search-highlight-current', matched && messageSearchHighlight.currentId === msg.id);
+    };
+    if (messageWindow) {
+        messageWindow.forEachRendered(function (row, el) { apply(row.msg, el); });
+    }
+}
+
+/** Scroll a loaded message into view (rendering its row first); returns its element. */
+function revealMessage(messageId) {
+    if (messageWindow && getLoadedMessage(messageId)) {
+        return messageWindow.scrollToKey(Number(messageId), 'center');
+    }
+    var msgEl = getRenderedMessageEl(messageId);
+    if (msgEl) msgEl.scrollIntoView({ behavior: 'smooth', block: 'center' });
+    return msgEl;
+}
+
+/**
+ * [v5.1] 서버 델타(/messages/sync)를 모델에 반영: 변경 행 교체, 삭제 행 제거, 새 메시지 추가
+ * @returns {number} 반영된 새 메시지 수
+ */
+function reconcileMessageDelta(delta) {
+    if (!delta) return 0;
+    var deletedIds = new Set((delta.removed_ids || []).map(Number));
+
+    (delta.updated || []).forEach(function (fresh) {
+        var msg = getLoadedMessage(fresh.id);
+        if (!msg) return;
+        if (fresh.content === '[삭제된 메시지]') {
+            deletedIds.add(msg.id);
+        } else if (fresh.content !== msg.content) {
+            msg.edited = true;
+        }
+        Object.keys(fresh).forEach(function (field) { msg[field] = fresh[field]; });
+        // 서버 reactions가 최신이므로 소켓으로 받은 요약은 버림
+        delete msg.reaction_summary;
+        primeMessageDecrypt(msg);
+        refreshMessageRow(msg.id);
+    });
+
+    (delta.removed_ids || []).forEach(function (id) {
+        if (getLoadedMessage(id)) removeMessageFromModel(id);
+    });
+
+    if (deletedIds.size) {
+        messageModel.list.forEach(function (msg) {
+            if (!msg.reply_to || !deletedIds.has(Number(msg.reply_to)) || msg.reply_deleted) return;
+            msg.reply_deleted = true;
+            refreshMessageRow(msg.id);
+        });
+    }
+
+    var added = (delta.messages || []).filter(function (msg) {
+        return msg && msg.id && !getLoadedMessage(msg.id);
+    });
+    if (added.length) {
+        added.forEach(primeMessageDecrypt);
+        insertMessagesIntoModel(added);
+        syncMessageWindow();
+    }
+    if (typeof rebuildReadReceiptIndex === 'function') {
+        rebuildReadReceiptIndex();
+    }
+    return added.length;
+}
+
+/**
+ * [v5.1] 멤버 읽음 위치로 모델의 안읽음 수 재계산 (캐시에서 그린 메시지 보정)
+ * 서버 include_meta 계산과 동일: 발신자/가입 이전 키 버전 멤버 제외
+ */
+function recomputeUnreadCounts(members) {
+    if (!Array.isArray(members) || !members.length) return;
+    messageModel.list.forEach(function (msg) {
+        var version = Number(msg.key_version || 1);
+        var unread = 0;
+        members.forEach(function (member) {
+            if (Number(member.joined_key_version || 1) > version) return;
+            if (member.id === msg.sender_id) return;
+            if ((member.last_read_message_id || 0) < msg.id) unread++;
+        });
+        if (msg.unread_count === unread) return;
+        msg.unread_count = unread;
+        refreshMessageRow(msg.id);
+    });
+}
+
+/**
+ * [v5.1] 읽지 않음 구분선 위치 갱신 (캐시 렌더 후 실제 읽음 위치로 보정)
+ * @returns {number|null} 구분선이 붙은 메시지 ID
+ */
+function updateUnreadDivider(lastReadId) {
+    var firstUnread = lastReadId > 0 && currentUser ? messageModel.list.find(function (msg) {
+        return msg.id > lastReadId && msg.sender_id !== currentUser.id;
+    }) : null;
+    var nextId = firstUnread ? firstUnread.id : null;
+    if (nextId !== messageModel.unreadDividerId) {
+        messageModel.unreadDividerId = nextId;
+        syncMessageWindow();
+    }
+    return nextId;
+}
 
 /**
  * [v4.21] 오래된 메시지 지연 로딩 초기화
@@ -168,29 +515,9 @@ async function loadOlderMessages() {
         var result = await api('/api/rooms/' + currentRoom.id + '/messages?before_id=' + oldestMessageId + '&limit=30&include_meta=0');
 
         if (result.messages && result.messages.length > 0) {
-            var messagesContainer = document.getElementById('messagesContainer');
-            var scrollHeight = messagesContainer.scrollHeight;
-            var scrollTop = messagesContainer.scrollTop;
-
-            // 기존 첫 메시지 앞에 새 메시지 삽입
-            var fragment = document.createDocumentFragment();
-            var firstChild = messagesContainer.firstChild;
-
-            result.messages.forEach(function (msg) {
-                var msgEl = createMessageElement(msg);
-                if (msgEl) fragment.appendChild(msgEl);
-            });
-
-            // 로더 다음에 삽입
-            if (loader) {
-                loader.after(fragment);
-            } else {
-                messagesContainer.insertBefore(fragment, firstChild);
-            }
-
-            // 스크롤 위치 유지
-            messagesContainer.scrollTop = scrollTop + (messagesContainer.scrollHeight - scrollHeight);
-            observePendingDecrypts();
+            // 모델에 추가 (스크롤 위치는 메시지 윈도우가 첫 번째 보이는 행 기준으로 유지)
+            insertMessagesIntoModel(result.messages);
+            syncMessageWindow();
             if (typeof rebuildReadReceiptIndex === 'function') {
                 rebuildReadReceiptIndex();
             }
@@ -220,105 +547,38 @@ async function loadOlderMessages() {
 
 /**
  * 메시지 목록 렌더링
+ * [v5.1] 모델을 교체하고 보이는 구간만 DOM에 렌더링 (MessengerMessageWindow)
  */
 function renderMessages(messages, lastReadId) {
     var messagesContainer = document.getElementById('messagesContainer');
     if (!messagesContainer) return;
 
-    var fragment = document.createDocumentFragment();
+    resetMessageList();
     messagesContainer.innerHTML = '';
 
     // [v4.21] 지연 로딩 초기화
     hasMoreOlderMessages = messages.length >= 50;  // 50개 미만이면 더 이상 없음
     oldestMessageId = messages.length > 0 ? messages[0].id : null;
 
-    // [v4.21] 오래된 메시지 로더 추가
+    // [v4.21] 오래된 메시지 로더 추가 (윈도우 바깥, 목록 맨 위)
     if (hasMoreOlderMessages) {
         var loader = document.createElement('div');
         loader.id = 'olderMessagesLoader';
         loader.className = 'older-messages-loader';
         loader.innerHTML = '<span class="loader-spinner"></span><span>이전 메시지 불러오는 중...</span>';
-        fragment.appendChild(loader);
+        messagesContainer.appendChild(loader);
     }
 
-    var lastDate = null;
-    var todayStr = new Date().toISOString().split('T')[0];
-    var localTodayDividerShown = false;
-    var unreadDividerShown = false;
-    var lastSenderId = null;
-    var lastMessageTime = null;
-    var groupStartIndex = -1;
-
-    messages.forEach(function (msg, index) {
-        var msgDate = msg.created_at.split(' ')[0] || msg.created_at.split('T')[0];
-
-        // 날짜 구분선
-        if (msgDate !== lastDate) {
-            var isToday = msgDate === todayStr;
-
-            if (!isToday || (isToday && !localTodayDividerShown)) {
-                lastDate = msgDate;
-                var divider = document.createElement('div');
-                divider.className = 'date-divider';
-                divider.setAttribute('data-date', msgDate);
-                divider.innerHTML = '<span>' + formatDateLabel(msgDate) + '</span>';
-                fragment.appendChild(divider);
-
-                if (isToday) localTodayDividerShown = true;
-                // 날짜 구분선 후 그룹화 초기화
-                lastSenderId = null;
-                lastMessageTime = null;
-            }
-        }
-
-        // 읽지 않은 메시지 구분선
-        if (!unreadDividerShown && lastReadId > 0 && msg.id > lastReadId && msg.sender_id !== currentUser.id) {
-            var unreadDivider = document.createElement('div');
-            unreadDivider.className = 'unread-divider';
-            unreadDivider.innerHTML = '<span>여기서부터 읽지 않음</span>';
-            fragment.appendChild(unreadDivider);
-            unreadDividerShown = true;
-            // 읽지 않음 구분선 후 그룹화 초기화
-            lastSenderId = null;
-            lastMessageTime = null;
-        }
+    messageModel.roomId = currentRoom ? currentRoom.id : null;
+    insertMessagesIntoModel(messages);
 
-        // [v4.34] 메시지 그룹화 판단
-        var msgTime = new Date(msg.created_at.replace(' ', 'T')).getTime();
-        var isGrouped = false;
-        var isFirstInGroup = false;
-        var isLastInGroup = false;
-        var nextMsg = messages[index + 1];
+    // 읽지 않은 메시지 구분선 위치는 방을 열 때 한 번만 정함
+    var firstUnread = lastReadId > 0 ? messageModel.list.find(function (msg) {
+        return msg.id > lastReadId && msg.sender_id !== currentUser.id;
+    }) : null;
+    messageModel.unreadDividerId = firstUnread ? firstUnread.id : null;
 
-        // 같은 발신자이고 3분 이내이면 그룹화
-        if (lastSenderId === msg.sender_id && lastMessageTime && (msgTime - lastMessageTime) < 180000) {
-            isGrouped = true;
-        } else {
-            isFirstInGroup = true;
-        }
-
-        // 다음 메시지와 그룹화 여부 확인
-        if (nextMsg) {
-            var nextMsgTime = new Date(nextMsg.created_at.replace(' ', 'T')).getTime();
-            if (nextMsg.sender_id !== msg.sender_id || (nextMsgTime - msgTime) >= 180000) {
-                isLastInGroup = true;
-            }
-        } else {
-            isLastInGroup = true;
-        }
-
-        var msgEl = createMessageElement(msg, isGrouped, isFirstInGroup, isLastInGroup);
-        if (msgEl) {
-            fragment.appendChild(msgEl);
-        }
-
-        lastSenderId = msg.sender_id;
-        lastMessageTime = msgTime;
-    });
-
-    messagesContainer.appendChild(fragment);
-    cleanupLazyDecryptObserver();
-    observePendingDecrypts();
+    syncMessageWindow();
     if (typeof rebuildReadReceiptIndex === 'function') {
         rebuildReadReceiptIndex();
     }
@@ -327,13 +587,7 @@ function renderMessages(messages, lastReadId) {
     setTimeout(initLazyLoadMessages, 100);
 
     // 읽지 않은 메시지 위치로 스크롤
-    if (unreadDividerShown) {
-        var unreadDiv = messagesContainer.querySelector('.unread-divider');
-        if (unreadDiv) {
-            unreadDiv.scrollIntoView({ behavior: 'smooth', block: 'center' });
-            return;
-        }
-    }
+    if (firstUnread && revealMessage(firstUnread.id)) return;
 
     scrollToBottom();
 }
@@ -342,6 +596,10 @@ function renderMessages(messages, lastReadId) {
  * 스크롤을 하단으로 이동
  */
 function scrollToBottom() {
+    if (messageWindow) {
+        messageWindow.scrollToEnd();
+        return;
+    }
     var messagesContainer = document.getElementById('messagesContainer');
     if (messagesContainer) {
         messagesContainer.scrollTop = messagesContainer.scrollHeight;
@@ -380,7 +638,11 @@ function createMessageElement(msg, isGrouped, isFirstInGroup, isLastInGroup) {
         if (msg.message_type === 'image') {
             var safeFilePathImg = (typeof safeImagePath === 'function') ? safeImagePath(msg.file_path) : msg.file_path;
             if (safeFilePathImg) {
-                content = '<img src="/uploads/' + safeFilePathImg + '" class="message-image" loading="lazy" decoding="async" onclick="openLightbox(this.src)">';
+                // 대화 목록에는 썸네일(md)을, 라이트박스에는 원본을 사용
+                var thumbPathImg = (msg.thumbnails && msg.thumbnails.md && typeof safeImagePath === 'function')
+                    ? safeImagePath(msg.thumbnails.md.replace(/^\/uploads\//, ''))
+                    : null;
+                content = '<img src="/uploads/' + (thumbPathImg || safeFilePathImg) + '" data-full-src="/uploads/' + safeFilePathImg + '" class="message-image" loading="lazy" decoding="async" onclick="openLightbox(this.dataset.fullSrc || this.src)">';
             } else {
                 content = '<div class="message-bubble">[잘못된 이미지 경로]</div>';
             }
@@ -398,12 +660,17 @@ function createMessageElement(msg, isGrouped, isFirstInGroup, isLastInGroup) {
                     : '') +
                 '</div>';
         } else {
-            if (msg.encrypted && getMessageKey(msg)) {
+            var cachedPlaintext = msg.encrypted && window.MessengerDecryptPool
+                ? window.MessengerDecryptPool.getCached(msg.id, 'content', msg.content)
+                : undefined;
+            if (cachedPlaintext) {
+                content = '<div class="message-bubble">' + messageBubbleHtml(msg, cachedPlaintext) + '</div>';
+            } else if (msg.encrypted && getMessageKey(msg)) {
                 content = '<div class="message-bubble" data-decrypt-pending="1">[\uBCF5\uD638\uD654 \uC911...]</div>';
             } else {
                 var decrypted = msg.encrypted ? '[\uC554\uD638\uD654\uB41C \uBA54\uC2DC\uC9C0]' : msg.content;
                 // [v4.34] 코드 블록과 멘션 처리
-                var parsedContent = parseCodeBlocks(parseMentions(escapeHtml(decrypted)));
+                var parsedContent = messageBubbleHtml(msg, decrypted);
                 content = '<div class="message-bubble">' + parsedContent + '</div>';
             }
         }
@@ -429,8 +696,15 @@ function createMessageElement(msg, isGrouped, isFirstInGroup, isLastInGroup) {
         if (msg.reply_to && msg.reply_content) {
             var replyText = msg.reply_content;
             var replyPending = false;
-            
-            if (getReplyKey(msg) && typeof msg.reply_content === 'string' && msg.reply_content.indexOf('v2:') === 0) {
+            var cachedReply = window.MessengerDecryptPool
+                ? window.MessengerDecryptPool.getCached(msg.id, 'reply', msg.reply_content)
+                : undefined;
+
+            if (msg.reply_deleted) {
+                replyText = '[삭제된 메시지]';
+            } else if (cachedReply) {
+                replyText = cachedReply;
+            } else if (getReplyKey(msg) && typeof msg.reply_content === 'string' && msg.reply_content.indexOf('v2:') === 0) {
                 replyText = '[\uBCF5\uD638\uD654 \uC911...]';
                 replyPending = true;
             } else if (getReplyKey(msg)) {
@@ -439,9 +713,11 @@ function createMessageElement(msg, isGrouped, isFirstInGroup, isLastInGroup) {
             
             var replyTextHtml = replyPending
                 ? '<div class="reply-text" data-reply-decrypt-pending="1">' + escapeHtml(replyText) + '</div>'
-                : '<div class="reply-text">' + escapeHtml(replyText) + '</div>';
-            
-            replyHtml = '<div class="message-reply" onclick="scrollToMessage(' + msg.reply_to + ')" style="cursor:pointer;">' +
+                : '<div class="reply-text' + (msg.reply_deleted ? ' deleted-reply' : '') + '">' + escapeHtml(replyText) + '</div>';
+
+            replyHtml = (msg.reply_deleted
+                ? '<div class="message-reply" style="cursor:default;">'
+                : '<div class="message-reply" onclick="scrollToMessage(' + msg.reply_to + ')" style="cursor:pointer;">') +
                 '<div class="reply-indicator">\u21A9 ' + escapeHtml(msg.reply_sender || '\uC54C \uC218 \uC5C6\uC74C') + '\uB2D8\uC758 \uBA54\uC2DC\uC9C0</div>' +
                 replyTextHtml +
                 '</div>';
@@ -458,7 +734,12 @@ function createMessageElement(msg, isGrouped, isFirstInGroup, isLastInGroup) {
 
         // 리액션 표시
         var reactionsHtml = '';
-        if (msg.reactions && msg.reactions.length > 0) {
+        if (msg.reaction_summary) {
+            // 실시간 reaction_updated 이후에는 요약 형식으로 보관됨
+            if (msg.reaction_summary.length > 0) {
+                reactionsHtml = '<div class="message-reactions">' + reactionSummaryHtml(msg.id, msg.reaction_summary) + '</div>';
+            }
+        } else if (msg.reactions && msg.reactions.length > 0) {
             var grouped = {};
             msg.reactions.forEach(function (r) {
                 if (!grouped[r.emoji]) {
@@ -501,9 +782,6 @@ function createMessageElement(msg, isGrouped, isFirstInGroup, isLastInGroup) {
             actionsHtml;
 
         div._messageData = msg;
-        if (isSent && typeof msg.unread_count === 'number') {
-            div._unreadCount = msg.unread_count;
-        }
         return div;
 
     } catch (err) {
@@ -519,14 +797,14 @@ function createMessageElement(msg, isGrouped, isFirstInGroup, isLastInGroup) {
  * 메시지 추가
  */
 function appendMessage(msg) {
-    var div = createMessageElement(msg);
-    decryptPendingInMessageEl(div);
-    var messagesContainer = document.getElementById('messagesContainer');
-    if (div && messagesContainer) {
-        messagesContainer.appendChild(div);
-    }
-    if (div && typeof indexSentMessageEl === 'function') {
-        indexSentMessageEl(div);
+    if (!msg || !msg.id || getLoadedMessage(msg.id)) return;
+    // 실시간 메시지는 즉시 복호화 (플레이스홀더 없이 렌더링)
+    primeMessageDecrypt(msg);
+    if (!messageModel.roomId && currentRoom) messageModel.roomId = currentRoom.id;
+    insertMessagesIntoModel([msg]);
+    syncMessageWindow();
+    if (typeof indexSentMessage === 'function') {
+        indexSentMessage(msg);
     }
 }
 
@@ -606,8 +884,8 @@ function handleTyping() {
  * 메시지 수정
  */
 function editMessage(messageId) {
-    var msgEl = document.querySelector('[data-message-id="' + messageId + '"]');
-    if (!msgEl || !msgEl._messageData) return;
+    var msg = getLoadedMessage(messageId);
+    if (!msg) return;
 
     // [v4.22] socket 연결 확인 (CLAUDE.md 가이드라인)
     if (!socket || !socket.connected) {
@@ -617,7 +895,6 @@ function editMessage(messageId) {
         return;
     }
 
-    var msg = msgEl._messageData;
     var messageKey = getMessageKey(msg);
     var currentContent = messageKey && msg.encrypted ? (E2E.decrypt(msg.content, messageKey) || '[\xec\x95\x94\xed\x98\xb8\xed\x99\x94\xeb\x90\x9c \xeb\xa9\x94\xec\x8b\x9c\xec\xa7\x80]') : msg.content;
 
@@ -660,29 +937,37 @@ function deleteMessage(messageId) {
  * [v4.35] 삭제된 메시지를 참조하는 답장 업데이트
  */
 function handleMessageDeleted(data) {
-    var msgEl = document.querySelector('[data-message-id="' + data.message_id + '"]');
+    var messageId = Number(data.message_id);
+    var msgEl = getRenderedMessageEl(messageId);
     if (msgEl) {
         // 모션 감소 모드 확인
         var reduceMotion = window.matchMedia('(prefers-reduced-motion: reduce)').matches;
 
         if (reduceMotion) {
-            msgEl.remove();
+            removeMessageFromModel(messageId);
         } else {
             msgEl.style.transition = 'opacity 0.2s ease';
             msgEl.style.opacity = '0';
             setTimeout(function () {
-                msgEl.remove();
+                removeMessageFromModel(messageId);
             }, 200);
         }
+    } else {
+        removeMessageFromModel(messageId);
     }
 
-    // [v4.35] 삭제된 메시지를 참조하는 답장들의 표시 업데이트
-    var replyElements = document.querySelectorAll('.message-reply[onclick*="scrollToMessage(' + data.message_id + ')"]');
-    replyElements.forEach(function (replyEl) {
+    // [v4.35] 삭제된 메시지를 참조하는 답장들의 표시 업데이트 (모델 기준, 렌더링된 행만 DOM 패치)
+    messageModel.list.forEach(function (msg) {
+        if (Number(msg.reply_to) !== messageId) return;
+        msg.reply_deleted = true;
+        var el = getRenderedMessageEl(msg.id);
+        var replyEl = el ? el.querySelector('.message-reply') : null;
+        if (!replyEl) return;
         var replyText = replyEl.querySelector('.reply-text');
         if (replyText) {
             replyText.textContent = '[삭제된 메시지]';
             replyText.classList.add('deleted-reply');
+            replyText.removeAttribute('data-reply-decrypt-pending');
         }
         // 클릭시 스크롤 비활성화
         replyEl.style.cursor = 'default';
@@ -709,24 +994,24 @@ function handleMessageDeleted(data) {
  * 메시지 수정 처리
  */
 function handleMessageEdited(data) {
-    var msgEl = document.querySelector('[data-message-id="' + data.message_id + '"]');
-    if (msgEl && msgEl._messageData) {
-        msgEl._messageData.content = data.content;
-        msgEl._messageData.encrypted = data.encrypted;
-        msgEl._messageData.key_version = data.key_version || msgEl._messageData.key_version;
-
-        var messageKey = getMessageKey(msgEl._messageData);
-        var decrypted = messageKey && data.encrypted ? (E2E.decrypt(data.content, messageKey) || '[\xec\x95\x94\xed\x98\xb8\xed\x99\x94\xeb\x90\x9c \xeb\xa9\x94\xec\x8b\x9c\xec\xa7\x80]') : data.content;
-
-        var bubble = msgEl.querySelector('.message-bubble');
-        if (bubble) {
-            bubble.innerHTML = parseMentions(escapeHtml(decrypted)) + ' <span class="edited-indicator">(수정됨)</span>';
+    var msg = getLoadedMessage(data.message_id);
+    if (msg) {
+        msg.content = data.content;
+        msg.encrypted = data.encrypted;
+        msg.key_version = data.key_version || msg.key_version;
+        msg.edited = true;
+
+        // 수정된 본문을 캐시에 복호화한 뒤 행을 다시 렌더링
+        primeMessageDecrypt(msg);
+        refreshMessageRow(msg.id);
+
+        var msgEl = getRenderedMessageEl(msg.id);
+        if (msgEl) {
+            msgEl.classList.add('highlight');
+            setTimeout(function () {
+                msgEl.classList.remove('highlight');
+            }, 2000);
         }
-
-        msgEl.classList.add('highlight');
-        setTimeout(function () {
-            msgEl.classList.remove('highlight');
-        }, 2000);
     }
 
     if (typeof throttledLoadRooms === 'function') {
@@ -784,17 +1069,18 @@ function updateReplyPreview() {
  * ID로 답장 설정
  */
 function setReplyToFromId(msgId) {
-    var msgEl = document.querySelector('[data-message-id="' + msgId + '"]');
-    if (msgEl && msgEl._messageData) {
-        var bubble = msgEl.querySelector('.message-bubble');
-        var content = bubble ? bubble.textContent.trim() : msgEl._messageData.content;
+    var msg = getLoadedMessage(msgId);
+    if (msg) {
+        var msgEl = getRenderedMessageEl(msgId);
+        var bubble = msgEl ? msgEl.querySelector('.message-bubble') : null;
+        var content = bubble ? bubble.textContent.trim() : getCachedMessageText(msg);
 
         var replyData = {
-            id: msgEl._messageData.id,
-            sender_name: msgEl._messageData.sender_name,
-            sender_id: msgEl._messageData.sender_id,
+            id: msg.id,
+            sender_name: msg.sender_name,
+            sender_id: msg.sender_id,
             content: content,
-            encrypted: msgEl._messageData.encrypted
+            encrypted: msg.encrypted
         };
 
         setReplyTo(replyData);
@@ -808,10 +1094,9 @@ function setReplyToFromId(msgId) {
  */
 function scrollToMessage(messageId, retryCount) {
     retryCount = retryCount || 0;
-    var msgEl = document.querySelector('[data-message-id="' + messageId + '"]');
+    var msgEl = revealMessage(messageId);
 
     if (msgEl) {
-        msgEl.scrollIntoView({ behavior: 'smooth', block: 'center' });
         msgEl.classList.add('highlight');
         setTimeout(function () {
             msgEl.classList.remove('highlight');
@@ -881,14 +1166,15 @@ function showMentionAutocomplete(query) {
         return;
     }
 
-    fetch('/api/rooms/' + currentRoom.id + '/info')
-        .then(function (r) { return r.json(); })
+    var roomId = currentRoom.id;
+    api('/api/rooms/' + roomId + '/info', { revalidate: true })
         .then(function (data) {
             if (!data.members) return;
             cachedRoomMembers = data.members;
-            cachedRoomId = currentRoom.id;
+            cachedRoomId = roomId;
             filterAndShowMentions(query, data.members, autocomplete);
-        });
+        })
+        .catch(function () { });
 }
 
 function filterAndShowMentions(query, members, autocomplete) {
@@ -1040,8 +1326,28 @@ function toggleReaction(messageId, emoji) {
 /**
  * 메시지 리액션 업데이트
  */
+function reactionSummaryHtml(messageId, reactions) {
+    return reactions.map(function (r) {
+        // [v4.21] 두 가지 데이터 구조 모두 지원: user_ids (배열) 또는 user_id (단일 값)
+        var isMine = false;
+        if (currentUser) {
+            if (r.user_ids && Array.isArray(r.user_ids)) {
+                isMine = r.user_ids.includes(currentUser.id);
+            } else if (r.user_id !== undefined) {
+                isMine = r.user_id === currentUser.id;
+            }
+        }
+        return '<span class="reaction-item' + (isMine ? ' my-reaction' : '') + '" onclick="toggleReaction(' + messageId + ', \'' + r.emoji + '\')">' +
+            '<span>' + r.emoji + '</span><span class="reaction-count">' + r.count + '</span>' +
+            '</span>';
+    }).join('');
+}
+
 function updateMessageReactions(messageId, reactions) {
-    var msgEl = document.querySelector('[data-message-id="' + messageId + '"]');
+    var msg = getLoadedMessage(messageId);
+    if (msg) msg.reaction_summary = reactions || [];
+
+    var msgEl = getRenderedMessageEl(messageId);
     if (!msgEl) return;
 
     var reactionsContainer = msgEl.querySelector('.message-reactions');
@@ -1057,20 +1363,7 @@ function updateMessageReactions(messageId, reactions) {
         return;
     }
 
-    reactionsContainer.innerHTML = reactions.map(function (r) {
-        // [v4.21] 두 가지 데이터 구조 모두 지원: user_ids (배열) 또는 user_id (단일 값)
-        var isMine = false;
-        if (currentUser) {
-            if (r.user_ids && Array.isArray(r.user_ids)) {
-                isMine = r.user_ids.includes(currentUser.id);
-            } else if (r.user_id !== undefined) {
-                isMine = r.user_id === currentUser.id;
-            }
-        }
-        return '<span class="reaction-item' + (isMine ? ' my-reaction' : '') + '" onclick="toggleReaction(' + messageId + ', \'' + r.emoji + '\')">' +
-            '<span>' + r.emoji + '</span><span class="reaction-count">' + r.count + '</span>' +
-            '</span>';
-    }).join('');
+    reactionsContainer.innerHTML = reactionSummaryHtml(messageId, reactions);
 }
 
 /**
@@ -1428,6 +1721,18 @@ window.closeAllReactionPickers = closeAllReactionPickers;
 window.initLazyLoadMessages = initLazyLoadMessages;
 window.loadOlderMessages = loadOlderMessages;
 window.cleanupLazyDecryptObserver = cleanupLazyDecryptObserver;
+// [v5.1] 메시지 모델 (가상 스크롤)
+window.getLoadedMessages = getLoadedMessages;
+window.getLoadedMessage = getLoadedMessage;
+window.getRenderedMessageEl = getRenderedMessageEl;
+window.getCachedMessageText = getCachedMessageText;
+window.resetMessageList = resetMessageList;
+window.setMessageSearchHighlights = setMessageSearchHighlights;
+window.revealMessage = revealMessage;
+// [v5.1] 오프라인 캐시 델타 동기화
+window.reconcileMessageDelta = reconcileMessageDelta;
+window.recomputeUnreadCounts = recomputeUnreadCounts;
+window.updateUnreadDivider = updateUnreadDivider;
 window.initEmojiPicker = initEmojiPicker;
 window.setupDragDrop = setupDragDrop;
 window.uploadFile = uploadFile;
@@ -7,27 +7,69 @@
 // 대화방 목록
 // ============================================================================
 
+// [v5.1] 서비스 워커 캐시 응답보다 나중에 시작한 요청 결과만 반영
+var roomListRequestedAt = 0;
+var roomListSwrUsed = false;
+
+function applyRoomList(result) {
+    rooms = result;
+    window.rooms = rooms;  // 전역 노출 (notification.js에서 사용)
+    renderRoomList();
+    if (window.MessengerStorage && Array.isArray(result)) {
+        MessengerStorage.cacheRooms(result);
+    }
+    try {
+        if (typeof safeSocketEmit === 'function' && window.socket && window.socket.connected && Array.isArray(rooms)) {
+            safeSocketEmit('subscribe_rooms', { room_ids: rooms.map(function (r) { return r.id; }) });
+        }
+    } catch (e) { }
+}
+
 /**
  * 대화방 목록 로드
+ * [v5.1] 앱 시작 첫 요청은 서비스 워커가 캐시로 즉시 응답(stale-while-revalidate),
+ *        이후 요청은 네트워크 우선. 서비스 워커가 없으면 IndexedDB 캐시를 먼저 그림
  */
 async function loadRooms() {
+    var controlled = !!(navigator.serviceWorker && navigator.serviceWorker.controller);
+    if (!controlled && (!Array.isArray(rooms) || rooms.length === 0) && window.MessengerStorage) {
+        await MessengerStorage.whenReady();
+        var cachedRooms = await MessengerStorage.getCachedRooms();
+        if (cachedRooms.length && (!Array.isArray(rooms) || rooms.length === 0)) {
+            rooms = cachedRooms;
+            window.rooms = rooms;
+            renderRoomList();
+        }
+    }
     try {
-        var result = await api('/api/rooms');
+        var headers = {};
+        if (currentUser) headers['X-Messenger-User'] = String(currentUser.id);
+        if (!roomListSwrUsed) {
+            roomListSwrUsed = true;
+            headers['X-SW-Strategy'] = 'swr';
+        }
+        var requestedAt = Date.now();
+        var result = await api('/api/rooms', { headers: headers, revalidate: true });
         if (window.DEBUG) console.log('loadRooms fetched:', result);
-        rooms = result;
-        window.rooms = rooms;  // 전역 노출 (notification.js에서 사용)
-        renderRoomList();
-        try {
-            if (typeof safeSocketEmit === 'function' && window.socket && window.socket.connected && Array.isArray(rooms)) {
-                safeSocketEmit('subscribe_rooms', { room_ids: rooms.map(function (r) { return r.id; }) });
-            }
-        } catch (e) { }
+        if (requestedAt < roomListRequestedAt) return;
+        roomListRequestedAt = requestedAt;
+        applyRoomList(result);
     } catch (err) {
         console.error('대화방 로드 실패:', err);
         showToast('대화방 목록 로드 실패: ' + (err.message || err), 'error');
     }
 }
 
+/**
+ * [v5.1] 서비스 워커가 캐시로 응답한 뒤 받은 최신 목록 반영
+ */
+function handleRoomListCacheUpdate(data) {
+    if (!data || !Array.isArray(data.body) || !currentUser) return;
+    if (data.fetchedAt < roomListRequestedAt) return;
+    roomListRequestedAt = data.fetchedAt;
+    applyRoomList(data.body);
+}
+
 // Throttled version
 var throttledLoadRooms = throttle(loadRooms, 2000);
 var throttledLoadOnlineUsers = null;
@@ -239,6 +281,120 @@ function initRoomListEvents() {
 var currentOpenRequestId = 0;
 var isOpeningRoom = false;
 
+// [v5.1] 방 키 메모리 캐시 (세션 한정, IndexedDB에는 저장하지 않음)
+var roomSecurityCache = {};
+// [v5.1] 현재 방 델타 동기화 워터마크 { message_id, change_id }
+var currentRoomSync = null;
+
+function applyRoomSecurity(room, meta) {
+    currentRoomKey = meta.encryption_key;
+    currentRoomKeys = meta.encryption_keys || {};
+    room.key_version = meta.key_version || room.key_version;
+    roomSecurityCache[room.id] = {
+        encryption_key: meta.encryption_key,
+        encryption_keys: meta.encryption_keys || {},
+        key_version: meta.key_version
+    };
+}
+
+/** 접근 권한이 없어진 방의 키/오프라인 캐시 폐기 */
+function forgetRoomCache(roomId) {
+    delete roomSecurityCache[roomId];
+    if (window.MessengerStorage) MessengerStorage.clearRoom(roomId);
+}
+
+/** 멤버 목록 반영 후 내 마지막 읽은 메시지 ID 반환 */
+function applyRoomMembers(room, members) {
+    room.members = members || [];
+    if (typeof seedReadReceiptProgress === 'function') {
+        seedReadReceiptProgress(room.members);
+    }
+    var me = room.members.find(function (m) { return m.id === currentUser.id; });
+    return me ? (me.last_read_message_id || 0) : 0;
+}
+
+function markLoadedMessagesRead(room) {
+    var loaded = typeof getLoadedMessages === 'function' ? getLoadedMessages() : [];
+    if (!loaded.length) return 0;
+    var lastId = loaded[loaded.length - 1].id;
+    if (typeof socket !== 'undefined' && socket && socket.connected) {
+        socket.emit('message_read', { room_id: room.id, message_id: lastId });
+    }
+    return lastId;
+}
+
+/**
+ * 최신 메시지 전체 로드 (캐시 없음 / 워터마크 만료)
+ */
+async function loadRoomMessages(room, requestId) {
+    var result = await api('/api/rooms/' + room.id + '/messages');
+
+    // Stale Request Check
+    if (requestId !== currentOpenRequestId) {
+        if (window.DEBUG) console.log('Ignoring stale openRoom response');
+        return;
+    }
+
+    applyRoomSecurity(currentRoom, result);
+    // 마지막 읽은 메시지 ID 찾기
+    var lastReadId = applyRoomMembers(currentRoom, result.members);
+
+    if (typeof renderMessages === 'function') {
+        renderMessages(result.messages, lastReadId);
+    }
+
+    var readId = markLoadedMessagesRead(room);
+
+    // 로컬 캐시 저장 (델타 동기화 워터마크 포함)
+    currentRoomSync = result.sync || null;
+    if (window.MessengerStorage && result.sync) {
+        MessengerStorage.replaceRoomMessages(room.id, result.messages, {
+            message_id: result.sync.message_id,
+            change_id: result.sync.change_id,
+            last_read: readId || lastReadId
+        });
+    }
+}
+
+/**
+ * [v5.1] 현재 방을 워터마크 이후 델타로 동기화 (방 재진입, 소켓 재연결)
+ * @returns {Promise<boolean>} false면 전체 재로드 필요 (워터마크 만료, 누락분 과다)
+ */
+async function syncRoomDelta(room, options) {
+    var sync = currentRoomSync;
+    if (!sync) return false;
+    var fromCache = !!(options && options.fromCache);
+
+    var delta = await api('/api/rooms/' + room.id + '/messages/sync?after_id=' + sync.message_id +
+        '&after_change=' + sync.change_id);
+    // 응답 사이에 다른 방으로 전환됨
+    if (!currentRoom || currentRoom.id !== room.id || currentRoomSync !== sync) return true;
+    if (delta.reset || delta.has_more) return false;
+
+    applyRoomSecurity(currentRoom, delta);
+    var lastReadId = applyRoomMembers(currentRoom, delta.members);
+
+    var added = typeof reconcileMessageDelta === 'function' ? reconcileMessageDelta(delta) : 0;
+    if (typeof recomputeUnreadCounts === 'function') {
+        recomputeUnreadCounts(currentRoom.members);
+    }
+    // 캐시로 그린 구분선을 서버의 실제 읽음 위치로 보정
+    var dividerId = fromCache && typeof updateUnreadDivider === 'function' ? updateUnreadDivider(lastReadId) : null;
+    if (added > 0) {
+        if (!(dividerId && typeof revealMessage === 'function' && revealMessage(dividerId)) && typeof scrollToBottom === 'function') {
+            scrollToBottom();
+        }
+        if (window.DEBUG) console.log('Synced ' + added + ' missed messages');
+    }
+
+    var readId = added > 0 ? markLoadedMessagesRead(room) : 0;
+    currentRoomSync = delta.sync;
+    if (window.MessengerStorage) {
+        MessengerStorage.applyMessageDelta(room.id, delta, { last_read: readId || lastReadId });
+    }
+    return true;
+}
+
 
 function resetActiveRoomState(roomId) {
     if (!currentRoom || (roomId && currentRoom.id !== roomId)) return;
@@ -246,12 +402,14 @@ function resetActiveRoomState(roomId) {
     currentRoom = null;
     currentRoomKey = null;
     currentRoomKeys = null;
+    currentRoomSync = null;
 
     var chatContent = document.getElementById('chatContent');
     var emptyState = document.getElementById('emptyState');
     var messagesContainer = document.getElementById('messagesContainer');
     if (chatContent) chatContent.classList.add('hidden');
     if (emptyState) emptyState.classList.remove('hidden');
+    if (typeof resetMessageList === 'function') resetMessageList();
     if (messagesContainer) messagesContainer.innerHTML = '';
 
     if (typeof clearReply === 'function') clearReply();
@@ -353,55 +511,34 @@ async function openRoom(room) {
         if (pinRoomText) pinRoomText.textContent = room.pinned ? '고정 해제' : '상단 고정';
         if (muteRoomText) muteRoomText.textContent = room.muted ? '알림 켜기' : '알림 끄기';
 
-        try {
-            var result = await api('/api/rooms/' + room.id + '/messages');
-
-            // Stale Request Check
-            if (requestId !== currentOpenRequestId) {
-                if (window.DEBUG) console.log('Ignoring stale openRoom response');
-                return;
-            }
-
-            currentRoomKey = result.encryption_key;
-            currentRoomKeys = result.encryption_keys || {};
-            currentRoom.key_version = result.key_version || currentRoom.key_version;
-
-            currentRoom.members = result.members || [];
-            if (typeof seedReadReceiptProgress === 'function') {
-                seedReadReceiptProgress(currentRoom.members);
-            }
-            // 마지막 읽은 메시지 ID 찾기
-            var lastReadId = 0;
-            if (result.members) {
-                var currentMember = result.members.find(function (m) { return m.id === currentUser.id; });
-                if (currentMember) {
-                    lastReadId = currentMember.last_read_message_id || 0;
-                }
-            }
-
+        // [v5.1] 캐시 우선 렌더링: 이 세션에서 키를 받은 방이면 IndexedDB 캐시로 즉시 그린 뒤 델타로 보정
+        currentRoomSync = null;
+        var security = roomSecurityCache[room.id];
+        var cache = null;
+        if (security && window.MessengerStorage) {
+            cache = await MessengerStorage.getRoomCache(room.id);
+            if (requestId !== currentOpenRequestId) return;
+        }
+        if (cache) {
+            applyRoomSecurity(currentRoom, security);
             if (typeof renderMessages === 'function') {
-                renderMessages(result.messages, lastReadId);
-            }
-
-            if (result.messages.length > 0 && typeof socket !== 'undefined' && socket && socket.connected) {
-                socket.emit('message_read', {
-                    room_id: room.id,
-                    message_id: result.messages[result.messages.length - 1].id
-                });
+                renderMessages(cache.messages, cache.sync.last_read || 0);
             }
+            currentRoomSync = { message_id: cache.sync.message_id, change_id: cache.sync.change_id };
+        }
 
-            // 로컬 캐시 저장
-            if (window.MessengerStorage) {
-                MessengerStorage.cacheMessages(room.id, result.messages);
-            }
+        try {
+            var synced = cache ? await syncRoomDelta(room, { fromCache: true }) : false;
+            if (requestId !== currentOpenRequestId) return;
+            if (!synced) await loadRoomMessages(room, requestId);
         } catch (err) {
             if (requestId !== currentOpenRequestId) return;
 
             console.error('메시지 로드 실패:', err);
             showToast('메시지 로드 실패: ' + (err.message || err), 'error');
 
-            // 오프라인 캐시에서 로드 시도
-            if (window.MessengerStorage) {
+            // 오프라인 캐시에서 로드 시도 (캐시로 이미 그렸으면 그대로 유지)
+            if (!cache && window.MessengerStorage) {
                 var cached = await MessengerStorage.getCachedMessages(room.id);
                 if (cached.length > 0 && typeof renderMessages === 'function') {
                     renderMessages(cached, 0);
@@ -430,42 +567,134 @@ window.openRoom = function (room) {
 
 var isCreatingRoom = false;
 
+// [v5.1] 사용자 디렉터리 선택 목록: 서버 검색(접두어/초성) + 스크롤 페이지 로드
+// 선택 상태는 picker.selected 에 보관하므로 검색어가 바뀌어도 유지됨
+var USER_DIRECTORY_PAGE_SIZE = 50;
+var userPickers = {};
+
+function renderUserPickerItem(u, picker) {
+    var initial = (u.nickname && u.nickname.length > 0) ? u.nickname[0].toUpperCase() : '?';
+    // [v4.30] XSS 방지: safeImagePath 사용
+    var safePath = u.profile_image && typeof safeImagePath === 'function' ? safeImagePath(u.profile_image) : null;
+    var avatarHtml = safePath
+        ? '<div class="user-item-avatar has-image"><img src="/uploads/' + safePath + '" alt="프로필"></div>'
+        : '<div class="user-item-avatar">' + initial + '</div>';
+    var selected = picker.selected.has(u.id);
+    // 디렉터리 응답의 status는 ETag 대상이 아니므로 접속자 목록을 받아 둔 경우 그쪽을 우선
+    var status = onlineUsersState.version ? (onlineUsersState.byId.has(u.id) ? 'online' : 'offline') : u.status;
+    var statusHtml = picker.showStatus
+        ? '<div class="user-item-status ' + escapeHtml(status || '') + '">' + (status === 'online' ? '온라인' : '오프라인') + '</div>'
+        : '';
+    return '<div class="user-item' + (selected ? ' selected' : '') + '" data-user-id="' + u.id + '">' +
+        avatarHtml +
+        '<div class="user-item-info">' +
+        '<div class="user-item-name">' + escapeHtml(u.nickname || '사용자') + '</div>' +
+        statusHtml +
+        '</div>' +
+        '<input type="checkbox" class="user-checkbox"' + (selected ? ' checked' : '') + '>' +
+        '</div>';
+}
+
+async function loadUserPickerPage(picker, reset) {
+    var seq = ++picker.seq;
+    if (reset) {
+        picker.offset = 0;
+        picker.hasMore = false;
+    }
+    picker.loading = true;
+    var page;
+    try {
+        var url = '/api/users/directory?limit=' + USER_DIRECTORY_PAGE_SIZE + '&offset=' + picker.offset +
+            (picker.query ? '&q=' + encodeURIComponent(picker.query) : '');
+        page = await api(url, { revalidate: true });
+    } finally {
+        if (seq === picker.seq) picker.loading = false;
+    }
+    if (seq !== picker.seq) return;
+
+    var users = (page.users || []).filter(function (u) { return !picker.excludeIds.has(u.id); });
+    var html = users.map(function (u) { return renderUserPickerItem(u, picker); }).join('');
+    if (reset) {
+        picker.listEl.innerHTML = html || '<div class="empty-state-small">검색 결과가 없습니다.</div>';
+        picker.listEl.scrollTop = 0;
+    } else if (html) {
+        picker.listEl.insertAdjacentHTML('beforeend', html);
+    }
+    picker.offset += (page.users || []).length;
+    picker.hasMore = !!page.has_more;
+
+    // 제외 대상이 많아 목록이 스크롤되지 않으면 스크롤 이벤트가 없으므로 바로 다음 페이지 로드
+    if (picker.hasMore && picker.listEl.offsetParent !== null &&
+        picker.listEl.scrollHeight <= picker.listEl.clientHeight + 40) {
+        await loadUserPickerPage(picker, false);
+    }
+}
+
+function openUserPicker(listId, inputId, options) {
+    var listEl = document.getElementById(listId);
+    if (!listEl) return null;
+    var inputEl = document.getElementById(inputId);
+    var picker = {
+        listEl: listEl,
+        query: '',
+        offset: 0,
+        hasMore: false,
+        loading: false,
+        seq: 0,
+        selected: new Set(),
+        excludeIds: new Set((options && options.excludeIds) || []),
+        showStatus: !!(options && options.showStatus)
+    };
+    userPickers[listId] = picker;
+    listEl.innerHTML = '';
+
+    listEl.onclick = function (e) {
+        var el = e.target.closest('.user-item');
+        if (!el) return;
+        var userId = parseInt(el.dataset.userId, 10);
+        var cb = el.querySelector('.user-checkbox');
+        var checked = !picker.selected.has(userId);
+        if (checked) picker.selected.add(userId); else picker.selected.delete(userId);
+        cb.checked = checked;
+        el.classList.toggle('selected', checked);
+    };
+    listEl.onscroll = function () {
+        if (!picker.hasMore || picker.loading) return;
+        if (listEl.scrollTop + listEl.clientHeight >= listEl.scrollHeight - 80) {
+            loadUserPickerPage(picker, false).catch(function (err) {
+                console.error('사용자 목록 로드 실패:', err);
+            });
+        }
+    };
+    if (inputEl) {
+        inputEl.value = '';
+        inputEl.oninput = debounce(function () {
+            var query = inputEl.value.trim();
+            if (query === picker.query) return;
+            picker.query = query;
+            loadUserPickerPage(picker, true).catch(function (err) {
+                console.error('사용자 검색 실패:', err);
+            });
+        }, 250);
+    }
+    return picker;
+}
+
+function getUserPickerSelection(listId) {
+    var picker = userPickers[listId];
+    return picker ? Array.from(picker.selected) : [];
+}
+
 /**
  * 새 대화 모달 열기
  */
 async function openNewChatModal() {
     try {
-        var result = await api('/api/users');
-        var userList = document.getElementById('userList');
-        if (!userList) return;
-
-        userList.innerHTML = result.map(function (u) {
-            var initial = (u.nickname && u.nickname.length > 0) ? u.nickname[0].toUpperCase() : '?';
-            // [v4.30] XSS 방지: safeImagePath 사용
-            var safePath = u.profile_image && typeof safeImagePath === 'function' ? safeImagePath(u.profile_image) : null;
-            var avatarHtml = safePath
-                ? '<div class="user-item-avatar has-image"><img src="/uploads/' + safePath + '" alt="프로필"></div>'
-                : '<div class="user-item-avatar">' + initial + '</div>';
-            return '<div class="user-item" data-user-id="' + u.id + '">' +
-                avatarHtml +
-                '<div class="user-item-info">' +
-                '<div class="user-item-name">' + escapeHtml(u.nickname || '사용자') + '</div>' +
-                '<div class="user-item-status ' + u.status + '">' + (u.status === 'online' ? '온라인' : '오프라인') + '</div>' +
-                '</div>' +
-                '<input type="checkbox" class="user-checkbox">' +
-                '</div>';
-        }).join('');
-
-        userList.querySelectorAll('.user-item').forEach(function (el) {
-            el.onclick = function () {
-                var cb = el.querySelector('.user-checkbox');
-                cb.checked = !cb.checked;
-                el.classList.toggle('selected', cb.checked);
-            };
-        });
-
+        var picker = openUserPicker('userList', 'userSearchInput', { showStatus: true });
+        if (!picker) return;
         var newChatModal = $('newChatModal');
         if (newChatModal) newChatModal.classList.add('active');
+        await loadUserPickerPage(picker, true);
     } catch (err) {
         console.error('사용자 목록 로드 실패:', err);
         showToast('사용자 목록을 불러오지 못했습니다.', 'error');
@@ -478,8 +707,7 @@ async function openNewChatModal() {
 async function createRoom() {
     if (isCreatingRoom) return;
 
-    var selected = Array.from(document.querySelectorAll('#userList .user-item.selected'))
-        .map(function (el) { return parseInt(el.dataset.userId); });
+    var selected = getUserPickerSelection('userList');
 
     if (selected.length === 0) return;
 
@@ -521,38 +749,11 @@ async function openInviteModal() {
     if (!currentRoom) return;
 
     try {
-        var result = await api('/api/users');
         var memberIds = (currentRoom.members || []).map(function (m) { return m.id; });
-        var inviteUserList = document.getElementById('inviteUserList');
-        if (!inviteUserList) return;
-
-        inviteUserList.innerHTML = result
-            .filter(function (u) { return !memberIds.includes(u.id); })
-            .map(function (u) {
-                var initial = (u.nickname && u.nickname.length > 0) ? u.nickname[0].toUpperCase() : '?';
-                // [v4.30] XSS 방지: safeImagePath 사용
-                var safePath = u.profile_image && typeof safeImagePath === 'function' ? safeImagePath(u.profile_image) : null;
-                var avatarHtml = safePath
-                    ? '<div class="user-item-avatar has-image"><img src="/uploads/' + safePath + '" alt="프로필"></div>'
-                    : '<div class="user-item-avatar">' + initial + '</div>';
-                return '<div class="user-item" data-user-id="' + u.id + '">' +
-                    avatarHtml +
-                    '<div class="user-item-info">' +
-                    '<div class="user-item-name">' + escapeHtml(u.nickname || '사용자') + '</div>' +
-                    '</div>' +
-                    '<input type="checkbox" class="user-checkbox">' +
-                    '</div>';
-            }).join('');
-
-        inviteUserList.querySelectorAll('.user-item').forEach(function (el) {
-            el.onclick = function () {
-                var cb = el.querySelector('.user-checkbox');
-                cb.checked = !cb.checked;
-                el.classList.toggle('selected', cb.checked);
-            };
-        });
-
+        var picker = openUserPicker('inviteUserList', 'inviteUserSearchInput', { excludeIds: memberIds });
+        if (!picker) return;
         $('inviteModal').classList.add('active');
+        await loadUserPickerPage(picker, true);
     } catch (err) {
         console.error('사용자 목록 로드 실패:', err);
     }
@@ -564,8 +765,7 @@ async function openInviteModal() {
  * [v4.32] 병렬 API 호출 최적화
  */
 async function confirmInvite() {
-    var selected = Array.from(document.querySelectorAll('#inviteUserList .user-item.selected'))
-        .map(function (el) { return parseInt(el.dataset.userId); });
+    var selected = getUserPickerSelection('inviteUserList');
 
     if (selected.length === 0) {
         showToast('초대할 사용자를 선택해주세요.', 'warning');
@@ -573,13 +773,11 @@ async function confirmInvite() {
     }
 
     try {
-        // [v4.32] 병렬 호출로 성능 개선
-        await Promise.all(selected.map(function (userId) {
-            return api('/api/rooms/' + currentRoom.id + '/members', {
-                method: 'POST',
-                body: JSON.stringify({ user_id: userId })
-            });
-        }));
+        // 한 번의 요청으로 일괄 초대 (서버에서 방 키를 한 번만 교체)
+        await api('/api/rooms/' + currentRoom.id + '/members', {
+            method: 'POST',
+            body: JSON.stringify({ user_ids: selected })
+        });
 
         $('inviteModal').classList.remove('active');
         showToast('멤버를 초대했습니다.', 'success');
@@ -692,7 +890,7 @@ async function viewMembers() {
     if (!currentRoom) return;
 
     try {
-        var result = await api('/api/rooms/' + currentRoom.id + '/info');
+        var result = await api('/api/rooms/' + currentRoom.id + '/info', { revalidate: true });
         if (result.members) {
             var roomName = currentRoom.name || (currentRoom.partner ? currentRoom.partner.nickname : '대화방');
             var membersCount = result.members.length;
@@ -793,9 +991,60 @@ async function leaveRoom(targetRoom) {
  */
 var isStartingChat = false;
 
-async function loadOnlineUsers() {
+// 접속자 목록 증분 동기화: 마지막 버전 토큰 이후 바뀐 사용자만 받아 반영
+var onlineUsersState = { ownerId: null, version: '', byId: new Map() };
+
+async function fetchOnlineUsers() {
+    var ownerId = (typeof currentUser !== 'undefined' && currentUser) ? currentUser.id : null;
+    if (onlineUsersState.ownerId !== ownerId) {
+        onlineUsersState = { ownerId: ownerId, version: '', byId: new Map() };
+    }
+    var data = await api('/api/users/online?since=' + encodeURIComponent(onlineUsersState.version));
+    if (!data || !Array.isArray(data.users) || !Array.isArray(data.changes)) return data;
+
+    if (data.reset) onlineUsersState.byId = new Map();
+    data.changes.forEach(function (change) {
+        if (change.status !== 'online') onlineUsersState.byId.delete(change.user_id);
+    });
+    data.users.forEach(function (u) { onlineUsersState.byId.set(u.id, u); });
+    onlineUsersState.version = data.version || '';
+    return sortedOnlineUsers();
+}
+
+function sortedOnlineUsers() {
+    return Array.from(onlineUsersState.byId.values()).sort(function (a, b) { return a.id - b.id; });
+}
+
+/**
+ * presence_diff 프레임을 접속자 목록에 바로 반영. 프레임의 base가 마지막으로 받은 버전과 같을 때만
+ * 적용하고 true, 누락(갭)·리셋·프로필 없음이면 false를 반환해 호출 측이 증분 조회로 다시 맞추게 함
+ */
+function applyPresenceDiff(data) {
+    var ownerId = (typeof currentUser !== 'undefined' && currentUser) ? currentUser.id : null;
+    if (!data || !data.base || !data.version || !Array.isArray(data.changes)) return false;
+    if (onlineUsersState.ownerId !== ownerId || !onlineUsersState.version || data.base !== onlineUsersState.version) return false;
+
+    var profiles = new Map();
+    (data.users || []).forEach(function (u) { if (u && u.id) profiles.set(u.id, u); });
+    var missingProfile = data.changes.some(function (change) {
+        return change.status === 'online' && change.user_id !== ownerId && !profiles.has(change.user_id);
+    });
+    if (missingProfile) return false;
+
+    data.changes.forEach(function (change) {
+        if (change.user_id === ownerId) return;
+        if (change.status === 'online') onlineUsersState.byId.set(change.user_id, profiles.get(change.user_id));
+        else onlineUsersState.byId.delete(change.user_id);
+    });
+    onlineUsersState.version = data.version;
+    loadOnlineUsers(sortedOnlineUsers());
+    return true;
+}
+
+// localUsers: 이미 반영된 목록(presence_diff)이면 다시 조회하지 않고 그리기만 함
+async function loadOnlineUsers(localUsers) {
     try {
-        var users = await api('/api/users/online');
+        var users = Array.isArray(localUsers) ? localUsers : await fetchOnlineUsers();
 
         var onlineUsersList = document.getElementById('onlineUsersList');
         if (!onlineUsersList) return;
@@ -1300,10 +1549,14 @@ function enableRoomDragging() {
 // 전역 노출
 // ============================================================================
 window.loadRooms = loadRooms;
+window.handleRoomListCacheUpdate = handleRoomListCacheUpdate;
 window.throttledLoadRooms = throttledLoadRooms;
 window.renderRoomList = renderRoomList;
 window.openRoom = openRoom;
 window.resetActiveRoomState = resetActiveRoomState;
+window.syncRoomDelta = syncRoomDelta;
+window.loadRoomMessages = loadRoomMessages;
+window.forgetRoomCache = forgetRoomCache;
 window.openNewChatModal = openNewChatModal;
 window.createRoom = createRoom;
 window.openInviteModal = openInviteModal;
@@ -1314,6 +1567,7 @@ window.toggleMuteRoom = toggleMuteRoom;
 window.viewMembers = viewMembers;
 window.leaveRoom = leaveRoom;
 window.loadOnlineUsers = loadOnlineUsers;
+window.applyPresenceDiff = applyPresenceDiff;
 window.startOnlineUsersPolling = startOnlineUsersPolling; // [v4.7] Export
 window.handleSearch = handleSearch;
 window.initRoomListEvents = initRoomListEvents; // [v4.30] 이벤트 위임 초기화
@@ -27,6 +27,16 @@ window.MessengerApp.features.messages = {
     initLazyLoadMessages: window.initLazyLoadMessages,
     loadOlderMessages: window.loadOlderMessages,
     cleanupLazyDecryptObserver: window.cleanupLazyDecryptObserver,
+    getLoadedMessages: window.getLoadedMessages,
+    getLoadedMessage: window.getLoadedMessage,
+    getRenderedMessageEl: window.getRenderedMessageEl,
+    getCachedMessageText: window.getCachedMessageText,
+    resetMessageList: window.resetMessageList,
+    setMessageSearchHighlights: window.setMessageSearchHighlights,
+    revealMessage: window.revealMessage,
+    reconcileMessageDelta: window.reconcileMessageDelta,
+    recomputeUnreadCounts: window.recomputeUnreadCounts,
+    updateUnreadDivider: window.updateUnreadDivider,
     initEmojiPicker: window.initEmojiPicker,
     setupDragDrop: window.setupDragDrop,
     uploadFile: window.uploadFile,
@@ -2,9 +2,12 @@ window.MessengerApp = window.MessengerApp || {};
 window.MessengerApp.features = window.MessengerApp.features || {};
 window.MessengerApp.features.rooms = {
     loadRooms: window.loadRooms,
+    handleRoomListCacheUpdate: window.handleRoomListCacheUpdate,
     throttledLoadRooms: window.throttledLoadRooms,
     renderRoomList: window.renderRoomList,
     openRoom: window.openRoom,
+    syncRoomDelta: window.syncRoomDelta,
+    loadRoomMessages: window.loadRoomMessages,
     openNewChatModal: window.openNewChatModal,
     createRoom: window.createRoom,
     openInviteModal: window.openInviteModal,
@@ -15,6 +18,7 @@ window.MessengerApp.features.rooms = {
     viewMembers: window.viewMembers,
     leaveRoom: window.leaveRoom,
     loadOnlineUsers: window.loadOnlineUsers,
+    applyPresenceDiff: window.applyPresenceDiff,
     startOnlineUsersPolling: window.startOnlineUsersPolling,
     handleSearch: window.handleSearch,
     initRoomListEvents: window.initRoomListEvents,
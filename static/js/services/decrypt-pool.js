@@ -0,0 +1,212 @@
+/**
+ * E2E decrypt worker pool
+ * - batches decrypt jobs to Web Workers (navigator.hardwareConcurrency sized)
+ * - jobs are dispatched by priority (0 = in viewport, 1 = near viewport)
+ * - plaintext is cached per message id for the session (keyed by ciphertext so edits miss)
+ * - falls back to main-thread E2E.decrypt in idle slices when workers are unavailable
+ */
+(function (global) {
+    'use strict';
+
+    var WORKER_URL = '/static/js/workers/decrypt-worker.js';
+    var BATCH_SIZE = 8;
+    var CACHE_LIMIT = 5000;
+    var MAX_WORKERS = 4;
+
+    var slots = [];
+    var queue = [];
+    var pending = new Map();   // cacheKey -> job (dedupe while queued/in flight)
+    var cache = new Map();     // cacheKey -> { payload, plaintext }
+    var workersDisabled = typeof global.Worker === 'undefined';
+    var jobSeq = 0;
+    var batchSeq = 0;
+    var flushScheduled = false;
+    var fallbackScheduled = false;
+
+    function poolSize() {
+        var cores = Number(global.navigator && global.navigator.hardwareConcurrency) || 2;
+        // leave a core for the main thread
+        return Math.max(1, Math.min(MAX_WORKERS, cores - 1));
+    }
+
+    function cacheKeyFor(messageId, field) {
+        return String(messageId) + ':' + (field || 'content');
+    }
+
+    function getCached(messageId, field, payload) {
+        var entry = cache.get(cacheKeyFor(messageId, field));
+        if (entry && entry.payload === payload) return entry.plaintext;
+        return undefined;
+    }
+
+    function remember(cacheKey, payload, plaintext) {
+        // failures are not cached: a refreshed room key may still decrypt them
+        if (typeof plaintext !== 'string' || plaintext === payload) return;
+        if (cache.has(cacheKey)) cache.delete(cacheKey);
+        cache.set(cacheKey, { payload: payload, plaintext: plaintext });
+        if (cache.size > CACHE_LIMIT) {
+            cache.delete(cache.keys().next().value);
+        }
+    }
+
+    function settle(job, plaintext) {
+        if (pending.get(job.cacheKey) === job) pending.delete(job.cacheKey);
+        remember(job.cacheKey, job.payload, plaintext);
+        job.resolve(plaintext);
+    }
+
+    function decryptOnMainThread(job) {
+        var plaintext = null;
+        try {
+            plaintext = global.E2E ? global.E2E.decrypt(job.payload, job.key) : null;
+        } catch (e) { }
+        settle(job, plaintext);
+    }
+
+    function disableWorkers(reason) {
+        if (workersDisabled) return;
+        workersDisabled = true;
+        console.warn('Decrypt workers disabled, using main thread:', reason);
+        slots.forEach(function (slot) {
+            try { slot.worker.terminate(); } catch (e) { }
+            if (slot.batch) {
+                slot.batch.forEach(function (job) { queue.push(job); });
+                slot.batch = null;
+            }
+        });
+        slots = [];
+        scheduleFlush();
+    }
+
+    function ensureWorkers() {
+        if (workersDisabled) return false;
+        if (slots.length) return true;
+        try {
+            for (var i = 0; i < poolSize(); i++) {
+                slots.push(createSlot());
+            }
+        } catch (e) {
+            disableWorkers(e);
+            return false;
+        }
+        return true;
+    }
+
+    function createSlot() {
+        var slot = { worker: new global.Worker(WORKER_URL), batch: null, batchId: null };
+        slot.worker.onmessage = function (event) {
+            var data = event.data || {};
+            if (!slot.batch || data.batchId !== slot.batchId) return;
+            var byId = new Map();
+            slot.batch.forEach(function (job) { byId.set(job.id, job); });
+            (data.results || []).forEach(function (result) {
+                var job = byId.get(result.id);
+                if (job) settle(job, result.plaintext);
+            });
+            slot.batch = null;
+            pump();
+        };
+        slot.worker.onerror = function (event) {
+            disableWorkers(event && event.message ? event.message : 'worker error');
+        };
+        return slot;
+    }
+
+    function takeBatch() {
+        queue.sort(function (a, b) { return a.priority - b.priority || a.id - b.id; });
+        return queue.splice(0, BATCH_SIZE);
+    }
+
+    function runFallbackSlice() {
+        fallbackScheduled = false;
+        var budget = 6;  // keep each idle slice short
+        queue.sort(function (a, b) { return a.priority - b.priority || a.id - b.id; });
+        while (queue.length > 0 && budget > 0) {
+            decryptOnMainThread(queue.shift());
+            budget--;
+        }
+        if (queue.length > 0) scheduleFallback();
+    }
+
+    function scheduleFallback() {
+        if (fallbackScheduled) return;
+        fallbackScheduled = true;
+        if (global.requestIdleCallback) {
+            global.requestIdleCallback(runFallbackSlice, { timeout: 200 });
+        } else {
+            setTimeout(runFallbackSlice, 0);
+        }
+    }
+
+    function pump() {
+        flushScheduled = false;
+        if (!queue.length) return;
+        if (!ensureWorkers()) {
+            scheduleFallback();
+            return;
+        }
+        slots.forEach(function (slot) {
+            if (slot.batch || !queue.length) return;
+            var batch = takeBatch();
+            slot.batch = batch;
+            slot.batchId = ++batchSeq;
+            try {
+                slot.worker.postMessage({
+                    batchId: slot.batchId,
+                    jobs: batch.map(function (job) { return { id: job.id, payload: job.payload, key: job.key }; })
+                });
+            } catch (e) {
+                disableWorkers(e);
+            }
+        });
+    }
+
+    function scheduleFlush() {
+        if (flushScheduled) return;
+        flushScheduled = true;
+        // coalesce all requests from one observer callback/render pass into sorted batches
+        setTimeout(pump, 0);
+    }
+
+    /**
+     * Decrypt `payload` for message `messageId` (`field`: 'content' | 'reply').
+     * Resolves to plaintext, or null when decryption/verification fails.
+     */
+    function request(messageId, field, payload, key, priority) {
+        var cached = getCached(messageId, field, payload);
+        if (cached !== undefined) return Promise.resolve(cached);
+
+        var cacheKey = cacheKeyFor(messageId, field);
+        var existing = pending.get(cacheKey);
+        if (existing && existing.payload === payload) {
+            existing.priority = Math.min(existing.priority, priority || 0);
+            return existing.promise;
+        }
+
+        var job = { id: ++jobSeq, cacheKey: cacheKey, payload: payload, key: key, priority: priority || 0 };
+        job.promise = new Promise(function (resolve) { job.resolve = resolve; });
+        pending.set(cacheKey, job);
+        queue.push(job);
+        scheduleFlush();
+        return job.promise;
+    }
+
+    function clearQueue() {
+        // drop not-yet-dispatched work (e.g. on room switch); in-flight batches still fill the cache
+        queue.forEach(function (job) {
+            if (pending.get(job.cacheKey) === job) pending.delete(job.cacheKey);
+            job.resolve(undefined);
+        });
+        queue = [];
+    }
+
+    global.MessengerDecryptPool = {
+        request: request,
+        getCached: getCached,
+        remember: function (messageId, field, payload, plaintext) {
+            remember(cacheKeyFor(messageId, field), payload, plaintext);
+        },
+        clearQueue: clearQueue,
+        size: function () { return workersDisabled ? 0 : poolSize(); }
+    };
+})(window);
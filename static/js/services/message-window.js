@@ -0,0 +1,345 @@
+/**
+ * Windowed (virtualized) message list
+ * - only rows around the viewport (plus overscan) are in the DOM
+ * - rows outside the window are represented by two spacers sized from measured heights
+ *   (unmeasured rows use the running average)
+ * - rows are data ({ key, sig, ... }); renderRow(row) returns that row's DOM nodes and a
+ *   rendered row is rebuilt only when its `sig` changes or refresh(key) is called
+ * - the first visible row is kept in place across re-renders (prepends, late image/decrypt
+ *   height changes); scrollToEnd() pins the view to the bottom until the user scrolls up
+ */
+(function (global) {
+    'use strict';
+
+    var ESTIMATED_ROW_HEIGHT = 72;
+    var OVERSCAN_PX = 800;
+    var PINNED_TOLERANCE_PX = 4;
+    var MAX_UPDATE_PASSES = 3;
+
+    function createSpacer() {
+        var spacer = document.createElement('div');
+        spacer.className = 'message-window-spacer';
+        spacer.setAttribute('aria-hidden', 'true');
+        spacer.style.height = '0px';
+        return spacer;
+    }
+
+    function MessageWindow(container, options) {
+        var self = this;
+        this.container = container;
+        this.renderRow = options.renderRow;
+        this.onRowsRendered = options.onRowsRendered || null;
+        this.onRowRemoved = options.onRowRemoved || null;
+
+        this.rows = [];
+        this.indexByKey = new Map();
+        this.heights = new Map();      // key -> measured px (row top to next row top)
+        this.offsets = [0];            // offsets[i] = top of row i, offsets[rows.length] = total
+        this.offsetsDirty = false;
+        this.rendered = new Map();     // key -> { row, nodes }
+        this.start = 0;
+        this.end = 0;
+        this.pinnedToEnd = false;
+        this.updateScheduled = false;
+        this.destroyed = false;
+
+        this.topSpacer = createSpacer();
+        this.bottomSpacer = createSpacer();
+        container.appendChild(this.topSpacer);
+        container.appendChild(this.bottomSpacer);
+        // anchoring is done here; the browser's own scroll anchoring would double-correct
+        container.style.overflowAnchor = 'none';
+
+        this._onScroll = function () {
+            self.pinnedToEnd = self.distanceToEnd() <= PINNED_TOLERANCE_PX;
+            self.scheduleUpdate();
+        };
+        container.addEventListener('scroll', this._onScroll, { passive: true });
+
+        this.resizeObserver = typeof global.ResizeObserver === 'function'
+            ? new global.ResizeObserver(function () { self.scheduleUpdate(); })
+            : null;
+        if (this.resizeObserver) this.resizeObserver.observe(container);
+    }
+
+    MessageWindow.prototype.distanceToEnd = function () {
+        var c = this.container;
+        return c.scrollHeight - c.scrollTop - c.clientHeight;
+    };
+
+    MessageWindow.prototype.scheduleUpdate = function () {
+        if (this.updateScheduled || this.destroyed) return;
+        this.updateScheduled = true;
+        var self = this;
+        requestAnimationFrame(function () {
+            if (self.updateScheduled) self.update();
+        });
+    };
+
+    /** Replace the row list; rendered rows whose key and sig are unchanged are kept. */
+    MessageWindow.prototype.setRows = function (rows) {
+        if (this.destroyed) return;
+        var anchor = this._captureAnchor();
+        var self = this;
+        this.rows = rows;
+        this.indexByKey = new Map();
+        for (var i = 0; i < rows.length; i++) this.indexByKey.set(rows[i].key, i);
+
+        this.rendered.forEach(function (entry, key) {
+            var idx = self.indexByKey.get(key);
+            if (idx === undefined || rows[idx].sig !== entry.row.sig) {
+                self._removeRendered(key);
+            } else {
+                entry.row = rows[idx];
+            }
+        });
+        this.heights.forEach(function (height, key) {
+            if (!self.indexByKey.has(key)) self.heights.delete(key);
+        });
+        this.offsetsDirty = true;
+        this.update(anchor);
+    };
+
+    /** Rebuild one rendered row (its data changed but its layout flags did not). */
+    MessageWindow.prototype.refresh = function (key) {
+        if (!this.rendered.has(key)) return;
+        var anchor = this._captureAnchor();
+        this._removeRendered(key);
+        this.update(anchor);
+    };
+
+    MessageWindow.prototype.getElement = function (key) {
+        var entry = this.rendered.get(key);
+        return entry ? entry.nodes[entry.nodes.length - 1] : null;
+    };
+
+    MessageWindow.prototype.forEachRendered = function (fn) {
+        this.rendered.forEach(function (entry) {
+            fn(entry.row, entry.nodes[entry.nodes.length - 1]);
+        });
+    };
+
+    MessageWindow.prototype.scrollToEnd = function () {
+        this.pinnedToEnd = true;
+        this.update(null);
+    };
+
+    /** Bring row `key` into the window and scroll to it; returns its element (or null). */
+    MessageWindow.prototype.scrollToKey = function (key, block) {
+        var idx = this.indexByKey.get(key);
+        if (idx === undefined) return null;
+        this.pinnedToEnd = false;
+        this._ensureOffsets();
+        var c = this.container;
+        var rowHeight = this.offsets[idx + 1] - this.offsets[idx];
+        var centerShift = block === 'center' ? Math.max(0, (c.clientHeight - rowHeight) / 2) : 0;
+        c.scrollTop = this.topSpacer.offsetTop + this.offsets[idx] - centerShift;
+        this.update(null);
+
+        // estimates above the row may have been corrected while rendering; aim once more
+        var el = this.getElement(key);
+        if (!el) return null;
+        var first = this.rendered.get(key).nodes[0];
+        centerShift = block === 'center' ? Math.max(0, (c.clientHeight - el.offsetHeight) / 2) : 0;
+        c.scrollTop = (block === 'center' ? el.offsetTop : first.offsetTop) - centerShift;
+        this.update(null);
+        return this.getElement(key);
+    };
+
+    MessageWindow.prototype.update = function (anchor) {
+        if (this.destroyed) return;
+        this.updateScheduled = false;
+        if (anchor === undefined) anchor = this._captureAnchor();
+        if (anchor && !this.pinnedToEnd) {
+            // position from the row model first so the range below is computed around the anchor
+            var n = this.rows.length;
+            this.start = Math.min(this.start, n);
+            this.end = Math.min(Math.max(this.end, this.start), n);
+            this._sizeSpacers();
+            this._restoreAnchor(anchor);
+        }
+
+        for (var pass = 0; pass < MAX_UPDATE_PASSES; pass++) {
+            var range = this._computeRange();
+            var rangeChanged = range[0] !== this.start || range[1] !== this.end;
+            this._renderRange(range[0], range[1]);
+            var heightsChanged = this._measure();
+            if (this.pinnedToEnd) {
+                this.container.scrollTop = this.container.scrollHeight;
+            } else {
+                this._restoreAnchor(anchor);
+            }
+            if (!heightsChanged && !rangeChanged) break;
+        }
+    };
+
+    MessageWindow.prototype.destroy = function () {
+        this.destroyed = true;
+        this.container.removeEventListener('scroll', this._onScroll);
+        if (this.resizeObserver) this.resizeObserver.disconnect();
+        var self = this;
+        this.rendered.forEach(function (entry, key) { self._removeRendered(key); });
+        this.topSpacer.remove();
+        this.bottomSpacer.remove();
+        this.container.style.overflowAnchor = '';
+    };
+
+    MessageWindow.prototype._ensureOffsets = function () {
+        if (!this.offsetsDirty && this.offsets.length === this.rows.length + 1) return;
+        var n = this.rows.length;
+        var measuredTotal = 0;
+        var measuredCount = 0;
+        this.heights.forEach(function (height) {
+            measuredTotal += height;
+            measuredCount++;
+        });
+        var estimate = measuredCount ? measuredTotal / measuredCount : ESTIMATED_ROW_HEIGHT;
+        var offsets = new Array(n + 1);
+        offsets[0] = 0;
+        for (var i = 0; i < n; i++) {
+            var height = this.heights.get(this.rows[i].key);
+            offsets[i + 1] = offsets[i] + (height === undefined ? estimate : height);
+        }
+        this.offsets = offsets;
+        this.offsetsDirty = false;
+    };
+
+    // index of the row containing list-relative y (clamped)
+    MessageWindow.prototype._rowAt = function (y) {
+        var offsets = this.offsets;
+        var lo = 0, hi = this.rows.length - 1;
+        while (lo < hi) {
+            var mid = (lo + hi + 1) >> 1;
+            if (offsets[mid] <= y) lo = mid; else hi = mid - 1;
+        }
+        return lo;
+    };
+
+    MessageWindow.prototype._computeRange = function () {
+        var n = this.rows.length;
+        if (!n) return [0, 0];
+        this._ensureOffsets();
+        var c = this.container;
+        var viewTop = c.scrollTop - this.topSpacer.offsetTop;
+        var viewBottom = viewTop + c.clientHeight;
+        if (this.pinnedToEnd) {
+            viewBottom = this.offsets[n];
+            viewTop = viewBottom - c.clientHeight;
+        }
+        var start = this._rowAt(viewTop - OVERSCAN_PX);
+        var end = this._rowAt(viewBottom + OVERSCAN_PX) + 1;
+        return [start, Math.min(n, end)];
+    };
+
+    MessageWindow.prototype._renderRange = function (start, end) {
+        var self = this;
+        this.rendered.forEach(function (entry, key) {
+            var idx = self.indexByKey.get(key);
+            if (idx === undefined || idx < start || idx >= end) self._removeRendered(key);
+        });
+
+        var added = [];
+        var ref = this.topSpacer.nextSibling;
+        for (var i = start; i < end; i++) {
+            var row = this.rows[i];
+            var entry = this.rendered.get(row.key);
+            if (!entry) {
+                var nodes = this.renderRow(row) || [];
+                entry = { row: row, nodes: Array.isArray(nodes) ? nodes : [nodes] };
+                this.rendered.set(row.key, entry);
+                if (this.resizeObserver) {
+                    entry.nodes.forEach(function (node) { self.resizeObserver.observe(node); });
+                }
+                added.push(entry.nodes);
+            }
+            for (var j = 0; j < entry.nodes.length; j++) {
+                var node = entry.nodes[j];
+                if (node === ref) {
+                    ref = ref.nextSibling;
+                } else {
+                    this.container.insertBefore(node, ref);
+                }
+            }
+        }
+        this.start = start;
+        this.end = end;
+        this._sizeSpacers();
+        if (added.length && this.onRowsRendered) this.onRowsRendered(added);
+    };
+
+    MessageWindow.prototype._removeRendered = function (key) {
+        var entry = this.rendered.get(key);
+        if (!entry) return;
+        this.rendered.delete(key);
+        var observer = this.resizeObserver;
+        entry.nodes.forEach(function (node) {
+            if (observer) observer.unobserve(node);
+            node.remove();
+        });
+        if (this.onRowRemoved) this.onRowRemoved(entry.nodes);
+    };
+
+    MessageWindow.prototype._sizeSpacers = function () {
+        this._ensureOffsets();
+        var total = this.offsets[this.rows.length];
+        this.topSpacer.style.height = this.offsets[this.start] + 'px';
+        this.bottomSpacer.style.height = (total - this.offsets[this.end]) + 'px';
+    };
+
+    // offsetTop/offsetHeight ignore the fadeIn transform, unlike getBoundingClientRect
+    MessageWindow.prototype._measure = function () {
+        var changed = false;
+        for (var i = this.start; i < this.end; i++) {
+            var key = this.rows[i].key;
+            var nodes = this.rendered.get(key).nodes;
+            var top = nodes[0].offsetTop;
+            var bottom;
+            if (i + 1 < this.end) {
+                bottom = this.rendered.get(this.rows[i + 1].key).nodes[0].offsetTop;
+            } else {
+                var last = nodes[nodes.length - 1];
+                bottom = last.offsetTop + last.offsetHeight +
+                    (parseFloat(getComputedStyle(last).marginBottom) || 0);
+            }
+            var height = bottom - top;
+            // 0 = not laid out (hidden container); keep the previous value
+            if (height > 0 && this.heights.get(key) !== height) {
+                this.heights.set(key, height);
+                changed = true;
+            }
+        }
+        if (changed) {
+            this.offsetsDirty = true;
+            this._sizeSpacers();
+        }
+        return changed;
+    };
+
+    // Anchors use row-model coordinates: with the spacers sized from `offsets`, row i's top
+    // in the DOM is topSpacer.offsetTop + offsets[i], whether or not the row is rendered.
+    MessageWindow.prototype._captureAnchor = function () {
+        if (!this.rows.length) return null;
+        this._ensureOffsets();
+        var listTop = this.topSpacer.offsetTop;
+        var scrollTop = this.container.scrollTop;
+        var idx = this._rowAt(scrollTop - listTop);
+        return { key: this.rows[idx].key, top: listTop + this.offsets[idx] - scrollTop };
+    };
+
+    MessageWindow.prototype._restoreAnchor = function (anchor) {
+        if (!anchor) return;
+        var idx = this.indexByKey.get(anchor.key);
+        if (idx === undefined) return;
+        this._ensureOffsets();
+        var target = this.topSpacer.offsetTop + this.offsets[idx] - anchor.top;
+        if (Math.abs(target - this.container.scrollTop) >= 1) {
+            this.container.scrollTop = target;
+        }
+    };
+
+    global.MessengerMessageWindow = {
+        create: function (container, options) {
+            return new MessageWindow(container, options || {});
+        }
+    };
+})(window);
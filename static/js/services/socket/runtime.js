@@ -9,6 +9,7 @@
 
 var socket = null;
 var reconnectAttempts = 0;
+var admissionRetryTimer = null;
 
 /**
  * Socket.IO 초기화
@@ -53,6 +54,25 @@ function initSocket() {
         console.error('Socket connection error:', error);
         reconnectAttempts++;
         updateConnectionStatus('reconnecting');
+        // 서버 수용 제한으로 거절된 경우: 서버가 준 지연(jitter 포함) 후 직접 재시도
+        // (서버가 거절한 연결은 socket.io가 자동 재연결하지 않음)
+        var retryAfter = error && error.data && Number(error.data.retry_after);
+        if (retryAfter > 0) {
+            clearTimeout(admissionRetryTimer);
+            admissionRetryTimer = setTimeout(function () {
+                if (socket && !socket.connected) socket.connect();
+            }, Math.round(retryAfter * 1000));
+        }
+    });
+
+    // 다음 재연결 폭주를 분산시키기 위한 서버 권장 backoff
+    socket.on('connection_policy', function (policy) {
+        if (!policy || !socket || !socket.io) return;
+        try {
+            if (policy.reconnect_delay_ms > 0) socket.io.reconnectionDelay(policy.reconnect_delay_ms);
+            if (policy.reconnect_delay_max_ms > 0) socket.io.reconnectionDelayMax(policy.reconnect_delay_max_ms);
+            if (policy.randomization_factor >= 0) socket.io.randomizationFactor(policy.randomization_factor);
+        } catch (e) { }
     });
 
     socket.on('error', function (data) {
@@ -73,28 +93,18 @@ function initSocket() {
         reconnectAttempts = 0;
         updateConnectionStatus('connected');
         if (typeof throttledLoadRooms === 'function') throttledLoadRooms(); else if (typeof loadRooms === 'function') loadRooms();
+        if (window.MessengerUpload && typeof window.MessengerUpload.refreshPendingScanJobs === 'function') {
+            window.MessengerUpload.refreshPendingScanJobs();
+        }
 
         // [v4.21] 재연결 시 현재 방의 누락된 메시지 동기화
+        // [v5.1] 워터마크 이후 델타(새 메시지 + 수정/삭제/리액션 변경)만 받아 반영, 만료 시 전체 재로드
         if (currentRoom && typeof api === 'function') {
             try {
-                var messagesContainer = document.getElementById('messagesContainer');
-                var lastMessage = messagesContainer ? messagesContainer.querySelector('.message:last-child') : null;
-                var lastMessageId = lastMessage ? parseInt(lastMessage.dataset.messageId) || 0 : 0;
-
-                var result = await api('/api/rooms/' + currentRoom.id + '/messages?include_meta=0&limit=50');
-                if (result.messages && result.messages.length > 0) {
-                    // 마지막 메시지 ID 이후의 새 메시지만 추가
-                    var newMessages = result.messages.filter(function (msg) {
-                        return msg.id > lastMessageId;
-                    });
-
-                    if (newMessages.length > 0) {
-                        newMessages.forEach(function (msg) {
-                            if (typeof appendMessage === 'function') appendMessage(msg);
-                        });
-                        if (typeof scrollToBottom === 'function') scrollToBottom();
-                        if (window.DEBUG) console.log('Synced ' + newMessages.length + ' missed messages');
-                    }
+                var room = currentRoom;
+                var synced = typeof syncRoomDelta === 'function' ? await syncRoomDelta(room) : false;
+                if (!synced && currentRoom === room && typeof loadRoomMessages === 'function') {
+                    await loadRoomMessages(room, currentOpenRequestId);
                 }
 
                 // [v4.32] 재연결 시 방 기능 재초기화 (투표, 공지 등)
@@ -154,6 +164,13 @@ function initSocket() {
         }
     });
 
+    // 서버가 주기적으로 모아 보내는 읽음 위치 (방당 1프레임)
+    socket.on('read_receipts', function (data) {
+        if (typeof handleReadReceipts === 'function') {
+            handleReadReceipts(data);
+        }
+    });
+
     // ========================================================================
     // 타이핑 이벤트
     // ========================================================================
@@ -163,6 +180,13 @@ function initSocket() {
         }
     });
 
+    // 서버가 방 단위로 모은 입력 중 사용자 스냅샷 (변경 시에만 전송)
+    socket.on('room_typers', function (data) {
+        if (typeof handleRoomTypers === 'function') {
+            handleRoomTypers(data);
+        }
+    });
+
     // ========================================================================
     // 사용자 상태 이벤트
     // ========================================================================
@@ -172,6 +196,13 @@ function initSocket() {
         }
     });
 
+    // 서버가 배치로 모은 상태 변경 (수신자당 1프레임)
+    socket.on('presence_diff', function (data) {
+        if (typeof handlePresenceDiff === 'function') {
+            handlePresenceDiff(data);
+        }
+    });
+
     socket.on('user_profile_updated', function (data) {
         if (typeof handleUserProfileUpdated === 'function') {
             handleUserProfileUpdated(data);
@@ -206,6 +237,7 @@ function initSocket() {
 
     socket.on('room_access_revoked', function (data) {
         if (!data || !data.room_id) return;
+        if (typeof forgetRoomCache === 'function') forgetRoomCache(data.room_id);
 
         if (currentRoom && currentRoom.id === data.room_id) {
             if (typeof resetActiveRoomState === 'function') {
@@ -259,6 +291,15 @@ function initSocket() {
         }
     });
 
+    // ========================================================================
+    // 업로드 스캔 이벤트
+    // ========================================================================
+    socket.on('upload_scan_completed', function (data) {
+        if (window.MessengerUpload && typeof window.MessengerUpload.handleUploadScanCompleted === 'function') {
+            window.MessengerUpload.handleUploadScanCompleted(data);
+        }
+    });
+
     // ========================================================================
     // 관리자 이벤트
     // ========================================================================
@@ -420,27 +461,8 @@ function updateRoomListFromMessage(msg) {
 }
 
 function handleNewMessage(msg) {
-    var messagesContainer = document.getElementById('messagesContainer');
-
     if (currentRoom && msg.room_id === currentRoom.id) {
-        // 날짜 구분선 처리
-        var msgDate = msg.created_at.split(' ')[0] || msg.created_at.split('T')[0];
-        var todayStr = new Date().toISOString().split('T')[0];
-        var existingDivider = messagesContainer.querySelector('.date-divider[data-date="' + msgDate + '"]');
-
-        if (!existingDivider) {
-            var isToday = msgDate === todayStr;
-            var todayDividerExists = messagesContainer.querySelector('.date-divider[data-date="' + todayStr + '"]');
-
-            if (!isToday || !todayDividerExists) {
-                var divider = document.createElement('div');
-                divider.className = 'date-divider';
-                divider.setAttribute('data-date', msgDate);
-                divider.innerHTML = '<span>' + formatDateLabel(msgDate) + '</span>';
-                messagesContainer.appendChild(divider);
-            }
-        }
-
+        // 날짜 구분선/그룹화는 메시지 모델의 행 레이아웃에서 계산됨
         if (typeof appendMessage === 'function') appendMessage(msg);
         if (typeof scrollToBottom === 'function') scrollToBottom();
         // [v4.22] socket 연결 확인 추가
@@ -514,23 +536,31 @@ function handleReadUpdated(data) {
     }
 }
 
+function handleReadReceipts(data) {
+    if (!data || !Array.isArray(data.reads)) return;
+    if (!currentRoom || data.room_id !== currentRoom.id) return;
+    data.reads.forEach(function (read) {
+        if (typeof updateUnreadCounts === 'function') {
+            updateUnreadCounts({ room_id: data.room_id, user_id: read.user_id, message_id: read.message_id });
+        }
+    });
+}
+
 // ========================================================================
 // Read Receipt UI Perf: range updates (avoid scanning all sent messages)
+// [v5.1] Driven by the message model (getLoadedMessages): unread counts live on the
+// message objects and only rows the message window has rendered are patched.
 // ========================================================================
 
 var _rr = {
     room_id: null,
     sent_ids: [],            // sorted asc
-    sent_el_by_id: {},       // id -> msgEl
-    unread_by_id: {},        // id -> unread_count (int)
     user_last_read: {}       // user_id -> last_read_message_id
 };
 
 function resetReadReceiptCache() {
     _rr.room_id = null;
     _rr.sent_ids = [];
-    _rr.sent_el_by_id = {};
-    _rr.unread_by_id = {};
     _rr.user_last_read = {};
 }
 
@@ -553,61 +583,38 @@ function _upperBound(arr, x) {
     return lo;
 }
 
+function _isOwnMessage(msg) {
+    return !!(msg && msg.id && msg.message_type !== 'system' && currentUser && msg.sender_id === currentUser.id);
+}
+
 function rebuildReadReceiptIndex() {
     try {
-        if (!currentRoom) {
-            resetReadReceiptCache();
-            return;
-        }
-        var messagesContainer = document.getElementById('messagesContainer');
-        if (!messagesContainer) {
+        if (!currentRoom || typeof getLoadedMessages !== 'function') {
             resetReadReceiptCache();
             return;
         }
 
         _rr.room_id = currentRoom.id;
         _rr.sent_ids = [];
-        _rr.sent_el_by_id = {};
-        _rr.unread_by_id = {};
-
-        var sent = messagesContainer.querySelectorAll('.message.sent[data-message-id]');
-        sent.forEach(function (msgEl) {
-            var id = parseInt(msgEl.dataset.messageId);
-            if (!id) return;
-            _rr.sent_ids.push(id);
-            _rr.sent_el_by_id[id] = msgEl;
-
-            var c = null;
-            if (typeof msgEl._unreadCount === 'number') c = msgEl._unreadCount;
-            else if (msgEl._messageData && typeof msgEl._messageData.unread_count === 'number') c = msgEl._messageData.unread_count;
-            if (typeof c === 'number') _rr.unread_by_id[id] = c;
+        // the model list is kept sorted by id
+        getLoadedMessages().forEach(function (msg) {
+            if (_isOwnMessage(msg)) _rr.sent_ids.push(msg.id);
         });
-        _rr.sent_ids.sort(function (a, b) { return a - b; });
     } catch (e) {
         resetReadReceiptCache();
     }
 }
 
-function indexSentMessageEl(msgEl) {
+function indexSentMessage(msg) {
     try {
-        if (!msgEl || !msgEl.classList || !msgEl.classList.contains('sent')) return;
-        if (!msgEl.dataset || !msgEl.dataset.messageId) return;
-        if (!currentRoom) return;
-
-        var id = parseInt(msgEl.dataset.messageId);
-        if (!id) return;
+        if (!_isOwnMessage(msg) || !currentRoom) return;
+        var id = msg.id;
 
         if (_rr.room_id !== currentRoom.id) {
             rebuildReadReceiptIndex();
             return;
         }
 
-        _rr.sent_el_by_id[id] = msgEl;
-        var c = null;
-        if (typeof msgEl._unreadCount === 'number') c = msgEl._unreadCount;
-        else if (msgEl._messageData && typeof msgEl._messageData.unread_count === 'number') c = msgEl._messageData.unread_count;
-        if (typeof c === 'number') _rr.unread_by_id[id] = c;
-
         // Usually append in increasing id order
         if (_rr.sent_ids.length === 0 || _rr.sent_ids[_rr.sent_ids.length - 1] < id) {
             _rr.sent_ids.push(id);
@@ -649,19 +656,15 @@ function updateUnreadCounts(data) {
     if (start >= end) return;
 
     for (var i = start; i < end; i++) {
-        var id = ids[i];
-        var msgEl = _rr.sent_el_by_id[id];
-        if (!msgEl) continue;
-
-        var readIndicator = msgEl.querySelector('.message-read-indicator');
-        if (!readIndicator || readIndicator.classList.contains('all-read')) continue;
+        var msg = typeof getLoadedMessage === 'function' ? getLoadedMessage(ids[i]) : null;
+        if (!msg || typeof msg.unread_count !== 'number' || msg.unread_count <= 0) continue;
+        var count = msg.unread_count - 1;
+        msg.unread_count = count;
 
-        var count = _rr.unread_by_id[id];
-        if (typeof count !== 'number') continue;
-        if (count <= 0) continue;
-        count -= 1;
-        _rr.unread_by_id[id] = count;
-        msgEl._unreadCount = count;
+        // rows outside the message window pick the new count up when rendered
+        var msgEl = typeof getRenderedMessageEl === 'function' ? getRenderedMessageEl(msg.id) : null;
+        var readIndicator = msgEl ? msgEl.querySelector('.message-read-indicator') : null;
+        if (!readIndicator) continue;
 
         if (count <= 0) {
             readIndicator.classList.add('all-read');
@@ -707,6 +710,48 @@ function handleUserTyping(data) {
     }
 }
 
+var typersByNode = {};  // {node: {typers, timeout}} 현재 방의 워커별 마지막 스냅샷
+
+/**
+ * 방 단위 입력 중 스냅샷: 워커마다 자기 연결의 입력자만 알므로 보낸 워커(node)의 목록만 교체하고
+ * 모든 워커의 목록을 합쳐 표시. 입력 중에는 서버가 주기적으로 다시 보내므로, 갱신이 끊긴 워커의
+ * 목록은 타임아웃으로 제거
+ */
+function handleRoomTypers(data) {
+    if (!data || !Array.isArray(data.typers)) return;
+    if (!currentRoom || data.room_id !== currentRoom.id) return;
+    var node = data.node || '';
+
+    if (typersByNode[node]) clearTimeout(typersByNode[node].timeout);
+    if (data.typers.length > 0) {
+        typersByNode[node] = {
+            typers: data.typers,
+            timeout: setTimeout(function () {
+                delete typersByNode[node];
+                renderRoomTypers();
+            }, 8000)
+        };
+    } else {
+        delete typersByNode[node];
+    }
+    renderRoomTypers();
+}
+
+function renderRoomTypers() {
+    var selfId = (typeof currentUser !== 'undefined' && currentUser) ? currentUser.id : null;
+    Object.values(typingUsers).forEach(function (u) {
+        if (u.timeout) clearTimeout(u.timeout);
+    });
+    typingUsers = {};
+    Object.values(typersByNode).forEach(function (snapshot) {
+        snapshot.typers.forEach(function (typer) {
+            if (!typer || typer.user_id === selfId) return;
+            typingUsers[typer.user_id] = { nickname: typer.nickname };
+        });
+    });
+    updateTypingIndicator();
+}
+
 function updateTypingIndicator() {
     var typingIndicator = document.getElementById('typingIndicator');
     if (!typingIndicator) return;
@@ -733,6 +778,10 @@ function clearTypingUsers() {
         if (u.timeout) clearTimeout(u.timeout);
     });
     typingUsers = {};
+    Object.values(typersByNode).forEach(function (snapshot) {
+        clearTimeout(snapshot.timeout);
+    });
+    typersByNode = {};
     updateTypingIndicator();
 }
 
@@ -746,6 +795,21 @@ function handleUserStatus(data) {
     if (typeof throttledLoadOnlineUsers === 'function') throttledLoadOnlineUsers(); else if (typeof loadOnlineUsers === 'function') loadOnlineUsers();
 }
 
+/**
+ * 상태 변경 묶음 처리: 마지막 버전에 이어지는 프레임은 로컬 목록에 바로 반영하고,
+ * 갭·리셋일 때만 접속자 목록을 (증분으로) 다시 불러옴
+ */
+function handlePresenceDiff(data) {
+    if (!data || !Array.isArray(data.changes)) return;
+    if (typeof applyPresenceDiff === 'function' && applyPresenceDiff(data)) return;
+    var selfId = (typeof currentUser !== 'undefined' && currentUser) ? currentUser.id : null;
+    var relevant = data.changes.some(function (change) {
+        return change && change.user_id && change.user_id !== selfId;
+    });
+    if (!relevant) return;
+    if (typeof throttledLoadOnlineUsers === 'function') throttledLoadOnlineUsers(); else if (typeof loadOnlineUsers === 'function') loadOnlineUsers();
+}
+
 /**
  * 대화방 이름 업데이트 처리
  */
@@ -780,7 +844,15 @@ function handleUserProfileUpdated(data) {
     if (typeof throttledLoadOnlineUsers === 'function') throttledLoadOnlineUsers(); else if (typeof loadOnlineUsers === 'function') loadOnlineUsers();
 
     if (currentRoom) {
-        var userMessages = document.querySelectorAll('[data-sender-id="' + data.user_id + '"]');
+        // 모델을 갱신해 윈도우 밖의 행도 다시 렌더링될 때 반영되도록 함
+        if (typeof getLoadedMessages === 'function') {
+            getLoadedMessages().forEach(function (msg) {
+                if (msg.sender_id !== data.user_id) return;
+                if (data.nickname) msg.sender_name = data.nickname;
+                if (data.profile_image !== undefined) msg.sender_image = data.profile_image;
+            });
+        }
+        var userMessages = document.querySelectorAll('.message[data-sender-id="' + data.user_id + '"]');
         userMessages.forEach(function (msgEl) {
             var senderEl = msgEl.querySelector('.message-sender');
             if (senderEl && data.nickname) {
@@ -821,9 +893,12 @@ window.initSocket = initSocket;
 window.updateConnectionStatus = updateConnectionStatus;
 window.handleNewMessage = handleNewMessage;
 window.handleReadUpdated = handleReadUpdated;
+window.handleReadReceipts = handleReadReceipts;
 window.updateUnreadCounts = updateUnreadCounts;
 window.handleUserTyping = handleUserTyping;
+window.handleRoomTypers = handleRoomTypers;
 window.handleUserStatus = handleUserStatus;
+window.handlePresenceDiff = handlePresenceDiff;
 window.handleRoomNameUpdated = handleRoomNameUpdated;
 window.handleRoomSecurityUpdated = handleRoomSecurityUpdated;
 window.handleRoomMembersUpdated = handleRoomMembersUpdated;
@@ -838,7 +913,7 @@ window.showMentionNotification = showMentionNotification;
 // Read receipt perf helpers (used by messages.js / rooms.js)
 window.resetReadReceiptCache = resetReadReceiptCache;
 window.rebuildReadReceiptIndex = rebuildReadReceiptIndex;
-window.indexSentMessageEl = indexSentMessageEl;
+window.indexSentMessage = indexSentMessage;
 window.seedReadReceiptProgress = seedReadReceiptProgress;
 
 function handleRoomSecurityUpdated(data) {
@@ -126,7 +126,10 @@ window.E2E = E2E;
 const MessengerStorage = {
     db: null,
     DB_NAME: 'MessengerDB',
-    DB_VERSION: 1,
+    DB_VERSION: 2,
+    MAX_MESSAGES_PER_ROOM: 500,
+    ownerId: null,
+    _ready: null,
 
     /**
      * IndexedDB 초기화
@@ -171,15 +174,166 @@ const MessengerStorage = {
                 if (!db.objectStoreNames.contains('settings')) {
                     db.createObjectStore('settings', { keyPath: 'key' });
                 }
+
+                // [v5.1] 방별 델타 동기화 워터마크 { room_id, message_id, change_id, last_read }
+                if (!db.objectStoreNames.contains('sync')) {
+                    db.createObjectStore('sync', { keyPath: 'room_id' });
+                }
             };
         });
     },
 
+    /**
+     * [v5.1] 로그인 사용자에 캐시 바인딩 (다른 사용자의 캐시는 폐기)
+     * 바인딩 전에는 메시지/대화방 캐시를 읽거나 쓰지 않음
+     */
+    openForUser(userId) {
+        this._ready = (async () => {
+            if (!this.db) await this.init();
+            if (!this.db) return false;
+            const owner = await this.getSetting('cache_owner', null);
+            if (owner !== userId) {
+                await this.clearAll();
+                await this.setSetting('cache_owner', userId);
+            }
+            this.ownerId = userId;
+            return true;
+        })().catch((err) => {
+            console.error('캐시 초기화 실패:', err);
+            return false;
+        });
+        return this._ready;
+    },
+
+    whenReady() {
+        return this._ready || Promise.resolve(false);
+    },
+
+    _runTransaction(storeNames, work) {
+        if (!this.db || this.ownerId === null) return Promise.resolve(false);
+        return new Promise((resolve) => {
+            try {
+                const transaction = this.db.transaction(storeNames, 'readwrite');
+                work(transaction);
+                transaction.oncomplete = () => resolve(true);
+                transaction.onerror = () => {
+                    console.error('캐시 갱신 실패:', transaction.error);
+                    resolve(false);
+                };
+            } catch (err) {
+                console.error('캐시 갱신 실패:', err);
+                resolve(false);
+            }
+        });
+    },
+
+    _deleteRoomMessages(store, roomId) {
+        const request = store.index('room_id').openKeyCursor(IDBKeyRange.only(roomId));
+        request.onsuccess = (event) => {
+            const cursor = event.target.result;
+            if (cursor) {
+                store.delete(cursor.primaryKey);
+                cursor.continue();
+            }
+        };
+    },
+
+    _trimRoomMessages(store, roomId) {
+        // index(room_id) 키 순서 = 같은 방 안에서는 primary key(id) 오름차순
+        const limit = this.MAX_MESSAGES_PER_ROOM;
+        const request = store.index('room_id').getAllKeys(IDBKeyRange.only(roomId));
+        request.onsuccess = () => {
+            const keys = request.result || [];
+            for (let i = 0; i < keys.length - limit; i++) {
+                store.delete(keys[i]);
+            }
+        };
+    },
+
+    /**
+     * [v5.1] 방 캐시 + 동기화 워터마크 조회 (캐시가 없으면 null)
+     */
+    async getRoomCache(roomId, limit = 50) {
+        if (!this.db || this.ownerId === null) return null;
+
+        const sync = await new Promise((resolve) => {
+            try {
+                const request = this.db.transaction(['sync'], 'readonly').objectStore('sync').get(roomId);
+                request.onsuccess = () => resolve(request.result || null);
+                request.onerror = () => resolve(null);
+            } catch (err) {
+                resolve(null);
+            }
+        });
+        if (!sync) return null;
+
+        const messages = await this.getCachedMessages(roomId, limit);
+        return messages.length ? { messages, sync } : null;
+    },
+
+    /**
+     * [v5.1] 전체 로드 결과로 방 캐시 교체 (워터마크 포함)
+     */
+    async replaceRoomMessages(roomId, messages, sync) {
+        return this._runTransaction(['messages', 'sync'], (transaction) => {
+            const store = transaction.objectStore('messages');
+            this._deleteRoomMessages(store, roomId);
+            messages.forEach(msg => store.put({ ...msg, room_id: roomId }));
+            if (sync) transaction.objectStore('sync').put({ ...sync, room_id: roomId });
+        });
+    },
+
+    /**
+     * [v5.1] /messages/sync 델타 반영: 새 메시지/변경 행 저장, 삭제 행 제거, 워터마크 전진
+     */
+    async applyMessageDelta(roomId, delta, extra = {}) {
+        return this._runTransaction(['messages', 'sync'], (transaction) => {
+            const store = transaction.objectStore('messages');
+            (delta.messages || []).concat(delta.updated || []).forEach(msg => {
+                store.put({ ...msg, room_id: roomId });
+            });
+            (delta.removed_ids || []).forEach(id => store.delete(id));
+            if (delta.sync) {
+                transaction.objectStore('sync').put({ ...delta.sync, ...extra, room_id: roomId });
+            }
+            this._trimRoomMessages(store, roomId);
+        });
+    },
+
+    /**
+     * [v5.1] 방 캐시 삭제 (접근 권한 해제)
+     */
+    async clearRoom(roomId) {
+        return this._runTransaction(['messages', 'sync', 'rooms'], (transaction) => {
+            this._deleteRoomMessages(transaction.objectStore('messages'), roomId);
+            transaction.objectStore('sync').delete(roomId);
+            transaction.objectStore('rooms').delete(roomId);
+        });
+    },
+
+    /**
+     * [v5.1] 메시지/대화방/워터마크 캐시 전체 삭제 (로그아웃, 사용자 전환)
+     */
+    async clearAll() {
+        if (!this.db) return false;
+        return new Promise((resolve) => {
+            try {
+                const transaction = this.db.transaction(['messages', 'rooms', 'sync'], 'readwrite');
+                ['messages', 'rooms', 'sync'].forEach(name => transaction.objectStore(name).clear());
+                transaction.oncomplete = () => resolve(true);
+                transaction.onerror = () => resolve(false);
+            } catch (err) {
+                console.error('캐시 삭제 실패:', err);
+                resolve(false);
+            }
+        });
+    },
+
     /**
      * 메시지 캐싱
      */
     async cacheMessages(roomId, messages) {
-        if (!this.db) return;
+        if (!this.db || this.ownerId === null) return;
 
         return new Promise((resolve, reject) => {
             try {
@@ -203,7 +357,7 @@ const MessengerStorage = {
      * 캐시된 메시지 조회
      */
     async getCachedMessages(roomId, limit = 50) {
-        if (!this.db) return [];
+        if (!this.db || this.ownerId === null) return [];
 
         return new Promise((resolve, reject) => {
             try {
@@ -214,8 +368,8 @@ const MessengerStorage = {
 
                 request.onsuccess = () => {
                     const messages = request.result || [];
-                    // 최신 메시지 limit개만
-                    messages.sort((a, b) => new Date(a.created_at) - new Date(b.created_at));
+                    // 최신 메시지 limit개만 (id 순 = 서버 정렬 순서)
+                    messages.sort((a, b) => a.id - b.id);
                     resolve(messages.slice(-limit));
                 };
 
@@ -232,25 +386,28 @@ const MessengerStorage = {
 
     /**
      * 대화방 캐싱
+     * [v5.1] 목록 전체 교체, 목록에서 빠진 방의 메시지 캐시도 정리
      */
     async cacheRooms(rooms) {
-        if (!this.db) return;
-
-        return new Promise((resolve, reject) => {
-            try {
-                const transaction = this.db.transaction(['rooms'], 'readwrite');
-                const store = transaction.objectStore('rooms');
+        const roomIds = new Set(rooms.map(room => room.id));
+        return this._runTransaction(['rooms', 'messages', 'sync'], (transaction) => {
+            const store = transaction.objectStore('rooms');
+            store.clear();
+            rooms.forEach(room => {
+                const cached = { ...room };
+                delete cached.encryption_key;
+                store.put(cached);
+            });
 
-                rooms.forEach(room => {
-                    store.put(room);
+            const syncStore = transaction.objectStore('sync');
+            const request = syncStore.getAllKeys();
+            request.onsuccess = () => {
+                (request.result || []).forEach(roomId => {
+                    if (roomIds.has(roomId)) return;
+                    syncStore.delete(roomId);
+                    this._deleteRoomMessages(transaction.objectStore('messages'), roomId);
                 });
-
-                transaction.oncomplete = () => resolve(true);
-                transaction.onerror = () => reject(transaction.error);
-            } catch (err) {
-                console.error('대화방 캐싱 실패:', err);
-                resolve(false);
-            }
+            };
         });
     },
 
@@ -258,7 +415,7 @@ const MessengerStorage = {
      * 캐시된 대화방 조회
      */
     async getCachedRooms() {
-        if (!this.db) return [];
+        if (!this.db || this.ownerId === null) return [];
 
         return new Promise((resolve, reject) => {
             try {
@@ -54,53 +54,114 @@
         return true;
     }
 
+    // 스캔 완료는 upload_scan_completed 소켓 이벤트로 받고, 폴링은 느린 fallback으로만 사용
+    var SCAN_FALLBACK_POLL_MS = 10000;
+    var SCAN_OFFLINE_POLL_MS = 1500;
+    var SCAN_WAIT_TIMEOUT_MS = 90000;
+    var EARLY_RESULT_TTL_MS = 60000;
+    var pendingScanJobs = {};   // job_id -> { settle, poll }
+    var earlyScanResults = {};  // job_id -> { data, at } (업로드 응답보다 push가 먼저 도착한 경우)
+
+    function pruneEarlyScanResults(now) {
+        Object.keys(earlyScanResults).forEach(function (jobId) {
+            if (now - earlyScanResults[jobId].at > EARLY_RESULT_TTL_MS) delete earlyScanResults[jobId];
+        });
+    }
+
     function pollUploadScanJob(jobId, file, replyToId, onDone) {
-        var maxAttempts = 40;
-        var intervalMs = 1500;
-        var attempts = 0;
+        var startedAt = Date.now();
+        var settled = false;
+        var timer = null;
 
         function finish() {
             if (typeof onDone === 'function') onDone();
         }
 
-        function tick() {
-            attempts += 1;
+        function settle(data) {
+            if (settled) return;
+            settled = true;
+            if (timer) clearTimeout(timer);
+            delete pendingScanJobs[jobId];
+
+            var status = (data && data.scan_status) || 'error';
+            if (status === 'clean') {
+                emitUploadedFileMessage(file, data, replyToId);
+            } else if (typeof global.showToast === 'function') {
+                global.showToast((data && data.error) || '파일 검사에 실패했습니다.', 'error');
+            }
+            finish();
+        }
+
+        function fail(message) {
+            if (settled) return;
+            settled = true;
+            if (timer) clearTimeout(timer);
+            delete pendingScanJobs[jobId];
+            if (typeof global.showToast === 'function') global.showToast(message, 'error');
+            finish();
+        }
+
+        function schedule() {
+            if (settled) return;
+            if (timer) clearTimeout(timer);
+            var connected = !!(global.socket && global.socket.connected);
+            timer = setTimeout(poll, connected ? SCAN_FALLBACK_POLL_MS : SCAN_OFFLINE_POLL_MS);
+        }
+
+        function poll() {
+            if (settled) return;
+            timer = null;
             fetch('/api/upload/jobs/' + encodeURIComponent(jobId), { credentials: 'same-origin' })
                 .then(function (res) { return res.json(); })
                 .then(function (data) {
                     var status = (data && data.scan_status) || 'pending';
-                    if (status === 'pending') {
-                        if (attempts >= maxAttempts) {
-                            if (typeof global.showToast === 'function') global.showToast('파일 검사 시간이 초과되었습니다.', 'error');
-                            finish();
-                            return;
-                        }
-                        setTimeout(tick, intervalMs);
+                    if (status !== 'pending') {
+                        settle(data);
                         return;
                     }
-
-                    if (status === 'clean') {
-                        emitUploadedFileMessage(file, data, replyToId);
-                        finish();
+                    if (Date.now() - startedAt >= SCAN_WAIT_TIMEOUT_MS) {
+                        fail('파일 검사 시간이 초과되었습니다.');
                         return;
                     }
-
-                    if (typeof global.showToast === 'function') {
-                        global.showToast((data && data.error) || '파일 검사에 실패했습니다.', 'error');
-                    }
-                    finish();
+                    schedule();
                 })
                 .catch(function () {
-                    if (attempts >= maxAttempts) {
-                        if (typeof global.showToast === 'function') global.showToast('파일 검사 상태 조회에 실패했습니다.', 'error');
-                        finish();
+                    if (Date.now() - startedAt >= SCAN_WAIT_TIMEOUT_MS) {
+                        fail('파일 검사 상태 조회에 실패했습니다.');
                         return;
                     }
-                    setTimeout(tick, intervalMs);
+                    schedule();
                 });
         }
 
-        tick();
+        pendingScanJobs[jobId] = { settle: settle, poll: poll };
+
+        var early = earlyScanResults[jobId];
+        if (early) {
+            delete earlyScanResults[jobId];
+            settle(early.data);
+            return;
+        }
+        schedule();
+    }
+
+    function handleUploadScanCompleted(data) {
+        if (!data || !data.job_id) return;
+        var pending = pendingScanJobs[data.job_id];
+        if (pending) {
+            pending.settle(data);
+            return;
+        }
+        var now = Date.now();
+        pruneEarlyScanResults(now);
+        earlyScanResults[data.job_id] = { data: data, at: now };
+    }
+
+    // 재연결 동안 놓친 push를 보정하기 위해 대기 중인 작업을 즉시 한 번 조회
+    function refreshPendingScanJobs() {
+        Object.keys(pendingScanJobs).forEach(function (jobId) {
+            pendingScanJobs[jobId].poll();
+        });
     }
 
     function handleUploadApiResult(file, result, replyToId, onDone) {
@@ -243,6 +304,8 @@
         inferMessageType: inferMessageType,
         emitUploadedFileMessage: emitUploadedFileMessage,
         pollUploadScanJob: pollUploadScanJob,
+        handleUploadScanCompleted: handleUploadScanCompleted,
+        refreshPendingScanJobs: refreshPendingScanJobs,
         handleUploadApiResult: handleUploadApiResult,
         handleFileUploadEvent: handleFileUploadEvent,
         handleDroppedFiles: handleDroppedFiles,
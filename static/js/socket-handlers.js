@@ -5,9 +5,12 @@ window.MessengerApp.services.socket = {
     updateConnectionStatus: window.updateConnectionStatus,
     handleNewMessage: window.handleNewMessage,
     handleReadUpdated: window.handleReadUpdated,
+    handleReadReceipts: window.handleReadReceipts,
     updateUnreadCounts: window.updateUnreadCounts,
     handleUserTyping: window.handleUserTyping,
+    handleRoomTypers: window.handleRoomTypers,
     handleUserStatus: window.handleUserStatus,
+    handlePresenceDiff: window.handlePresenceDiff,
     handleRoomNameUpdated: window.handleRoomNameUpdated,
     handleRoomMembersUpdated: window.handleRoomMembersUpdated,
     handleUserProfileUpdated: window.handleUserProfileUpdated,
@@ -17,7 +20,7 @@ window.MessengerApp.services.socket = {
     showMentionNotification: window.showMentionNotification,
     resetReadReceiptCache: window.resetReadReceiptCache,
     rebuildReadReceiptIndex: window.rebuildReadReceiptIndex,
-    indexSentMessageEl: window.indexSentMessageEl,
+    indexSentMessage: window.indexSentMessage,
     seedReadReceiptProgress: window.seedReadReceiptProgress
 };
 
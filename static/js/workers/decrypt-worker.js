@@ -0,0 +1,113 @@
+/**
+ * E2E decrypt worker
+ * - v2 (`v2:salt:iv:ct:hmac`): PBKDF2-SHA256 via WebCrypto deriveBits, HMAC verify, AES-CBC
+ * - v1 (CryptoJS passphrase format) and WebCrypto-less browsers: CryptoJS in the worker
+ * - request:  { batchId, jobs: [{ id, payload, key }] }
+ * - response: { batchId, results: [{ id, plaintext }] }  (plaintext null = decrypt failed)
+ */
+(function (self) {
+    'use strict';
+
+    var PBKDF2_ITERATIONS = 10000;  // must match storage-runtime.js deriveKeys()
+    var subtle = self.crypto && self.crypto.subtle ? self.crypto.subtle : null;
+    var encoder = new TextEncoder();
+    var cryptoJsLoaded = false;
+
+    function ensureCryptoJS() {
+        if (cryptoJsLoaded) return typeof self.CryptoJS !== 'undefined';
+        cryptoJsLoaded = true;
+        try {
+            importScripts('/static/js/crypto-js.min.js');
+        } catch (e) { }
+        return typeof self.CryptoJS !== 'undefined';
+    }
+
+    function base64ToBytes(value) {
+        var binary = atob(value);
+        var bytes = new Uint8Array(binary.length);
+        for (var i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+        return bytes;
+    }
+
+    function concatBytes(a, b, c) {
+        var out = new Uint8Array(a.length + b.length + c.length);
+        out.set(a, 0);
+        out.set(b, a.length);
+        out.set(c, a.length + b.length);
+        return out;
+    }
+
+    async function decryptV2WebCrypto(payload, key) {
+        var parts = payload.split(':');
+        if (parts.length !== 5) return null;
+        var salt = base64ToBytes(parts[1]);
+        var iv = base64ToBytes(parts[2]);
+        var ct = base64ToBytes(parts[3]);
+        var mac = base64ToBytes(parts[4]);
+
+        var baseKey = await subtle.importKey('raw', encoder.encode(key), 'PBKDF2', false, ['deriveBits']);
+        var bits = new Uint8Array(await subtle.deriveBits(
+            { name: 'PBKDF2', salt: salt, iterations: PBKDF2_ITERATIONS, hash: 'SHA-256' },
+            baseKey,
+            512
+        ));
+        var macKey = await subtle.importKey('raw', bits.slice(32, 64), { name: 'HMAC', hash: 'SHA-256' }, false, ['verify']);
+        // subtle.verify compares in constant time
+        var valid = await subtle.verify('HMAC', macKey, mac, concatBytes(salt, iv, ct));
+        if (!valid) return null;
+
+        var encKey = await subtle.importKey('raw', bits.slice(0, 32), { name: 'AES-CBC' }, false, ['decrypt']);
+        var plain = await subtle.decrypt({ name: 'AES-CBC', iv: iv }, encKey, ct);
+        return new TextDecoder('utf-8', { fatal: true }).decode(plain);
+    }
+
+    function decryptWithCryptoJS(payload, key) {
+        if (!ensureCryptoJS()) return null;
+        var CryptoJS = self.CryptoJS;
+        if (payload.startsWith('v2:')) {
+            var parts = payload.split(':');
+            if (parts.length !== 5) return null;
+            var salt = CryptoJS.enc.Base64.parse(parts[1]);
+            var iv = CryptoJS.enc.Base64.parse(parts[2]);
+            var ct = CryptoJS.enc.Base64.parse(parts[3]);
+            var dk = CryptoJS.PBKDF2(key, salt, { keySize: 16, iterations: PBKDF2_ITERATIONS, hasher: CryptoJS.algo.SHA256 });
+            var encKey = CryptoJS.lib.WordArray.create(dk.words.slice(0, 8), 32);
+            var macKey = CryptoJS.lib.WordArray.create(dk.words.slice(8, 16), 32);
+            var expected = CryptoJS.enc.Base64.stringify(CryptoJS.HmacSHA256(salt.clone().concat(iv).concat(ct), macKey));
+            if (expected.length !== parts[4].length) return null;
+            var diff = 0;
+            for (var i = 0; i < expected.length; i++) diff |= (expected.charCodeAt(i) ^ parts[4].charCodeAt(i));
+            if (diff !== 0) return null;
+            return CryptoJS.AES.decrypt({ ciphertext: ct }, encKey, {
+                iv: iv,
+                mode: CryptoJS.mode.CBC,
+                padding: CryptoJS.pad.Pkcs7
+            }).toString(CryptoJS.enc.Utf8) || '';
+        }
+        // v1: same fallback as E2E.decrypt (undecodable -> original payload)
+        return CryptoJS.AES.decrypt(payload, key).toString(CryptoJS.enc.Utf8) || payload;
+    }
+
+    async function decryptOne(job) {
+        try {
+            if (typeof job.payload !== 'string' || !job.key) return job.payload;
+            if (job.payload.startsWith('v2:') && subtle) {
+                return await decryptV2WebCrypto(job.payload, job.key);
+            }
+            return decryptWithCryptoJS(job.payload, job.key);
+        } catch (e) {
+            return job.payload.startsWith('v2:') ? null : job.payload;
+        }
+    }
+
+    self.onmessage = async function (event) {
+        var data = event.data || {};
+        var jobs = Array.isArray(data.jobs) ? data.jobs : [];
+        var results = [];
+        // jobs arrive in priority order; answer in that order
+        for (var i = 0; i < jobs.length; i++) {
+            results.push({ id: jobs[i].id, plaintext: await decryptOne(jobs[i]) });
+        }
+        self.postMessage({ batchId: data.batchId, results: results });
+    };
+})(self);
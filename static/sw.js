@@ -1,115 +1,245 @@
-/**
- * Service Worker for Push Notifications
- * [v4.4] 성능 최적화 업데이트
- */
-
-const CACHE_NAME = 'messenger-v4';
-const STATIC_ASSETS = [
-    '/',
-    '/static/css/style.css',
-    '/static/js/app.js',
-    '/static/js/notification.js',
-    '/static/js/storage.js',
-    '/static/js/socket.io.min.js',
-    '/static/js/crypto-js.min.js'
-];
-
-// 설치
-self.addEventListener('install', event => {
-    event.waitUntil(
-        caches.open(CACHE_NAME).then(cache => {
-            console.log('Service Worker: 캐시 저장');
-            return cache.addAll(STATIC_ASSETS);
-        })
-    );
-    self.skipWaiting();
-});
-
-// 활성화
-self.addEventListener('activate', event => {
-    event.waitUntil(
-        caches.keys().then(cacheNames => {
-            return Promise.all(
-                cacheNames
-                    .filter(name => name !== CACHE_NAME)
-                    .map(name => caches.delete(name))
-            );
-        })
-    );
-    self.clients.claim();
-});
-
-// [v4.4] 페치 - Stale-While-Revalidate 전략
-self.addEventListener('fetch', event => {
-    // API 요청은 항상 네트워크 사용
-    if (event.request.url.includes('/api/') ||
-        event.request.url.includes('/socket.io/')) {
-        return;
-    }
-
-    // 정적 자원은 stale-while-revalidate 전략
-    event.respondWith(
-        caches.match(event.request).then(cachedResponse => {
-            // 캐시가 있으면 즉시 반환하고 백그라운드에서 업데이트
-            const fetchPromise = fetch(event.request).then(networkResponse => {
-                if (networkResponse && networkResponse.status === 200) {
-                    const responseClone = networkResponse.clone();
-                    caches.open(CACHE_NAME).then(cache => {
-                        cache.put(event.request, responseClone);
-                    });
-                }
-                return networkResponse;
-            }).catch(() => cachedResponse);  // 네트워크 실패 시 캐시 반환
-
-            return cachedResponse || fetchPromise;
-        })
-    );
-});
-
-// 푸시 알림 (서버 푸시용 - 선택사항)
-self.addEventListener('push', event => {
-    if (!event.data) return;
-
-    try {
-        const data = event.data.json();
-
-        const options = {
-            body: data.body || '새 메시지가 있습니다.',
-            icon: '/static/icon.png',
-            badge: '/static/badge.png',
-            tag: data.tag || 'notification',
-            requireInteraction: false,
-            data: {
-                url: data.url || '/'
-            }
-        };
-
-        event.waitUntil(
-            self.registration.showNotification(data.title || '사내 메신저', options)
-        );
-    } catch (err) {
-        console.error('푸시 알림 오류:', err);
-    }
-});
-
-// 알림 클릭
-self.addEventListener('notificationclick', event => {
-    event.notification.close();
-
-    const notificationData = event.notification.data || {};
-    const urlToOpen = notificationData.url || '/';
-
-    event.waitUntil(
-        clients.matchAll({ type: 'window', includeUncontrolled: true })
-            .then(windowClients => {
-                // 이미 열린 창이 있으면 포커스
-                for (const client of windowClients) {
-                    if (client.url.includes(self.location.origin) && 'focus' in client) {
-                        return client.focus();
-                    }
-                }
-                // 없으면 새 창 열기
-                return clients.openWindow(urlToOpen);
-            })
-    );
-});
+/**
+ * Service Worker
+ * [v4.4] 성능 최적화 업데이트
+ * [v5.1] 매니페스트 기반 프리캐시 + 버전별 캐시 무효화
+ * - 서버가 /sw.js?v=<빌드 버전> 으로 등록: 버전이 바뀌면 새 워커 설치, 이전 버전 캐시 삭제
+ * - /static/dist/ 해시 번들: 설치 시 /sw-precache.json 목록 기준 프리캐시, cache-first (immutable)
+ * - /uploads/profiles/ 프로필 이미지: stale-while-revalidate
+ * - /api/rooms: 사용자별 캐시 (X-Messenger-User 헤더). X-SW-Strategy: swr 요청만 캐시로 즉시 응답하고
+ *   새 응답은 'api-cache-updated' 메시지로 페이지에 전달. 그 외 요청은 네트워크 우선 + 캐시 갱신, 오프라인이면 캐시
+ */
+
+const CACHE_PREFIX = 'messenger-';
+const VERSION = new URL(self.location.href).searchParams.get('v') || 'dev';
+const STATIC_CACHE = CACHE_PREFIX + 'static-' + VERSION;
+const AVATAR_CACHE = CACHE_PREFIX + 'avatars-' + VERSION;
+const API_CACHE = CACHE_PREFIX + 'api-' + VERSION;
+const CURRENT_CACHES = [STATIC_CACHE, AVATAR_CACHE, API_CACHE];
+
+const PRECACHE_URL = '/sw-precache.json';
+const STATIC_ASSETS = [
+    '/static/css/style.css'
+];
+const AVATAR_CACHE_LIMIT = 300;
+const SWR_API_PATHS = ['/api/rooms'];
+
+// 설치: 매니페스트의 해시 번들 + 공용 정적 자원 프리캐시
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(STATIC_CACHE).then(async cache => {
+            const urls = STATIC_ASSETS.slice();
+            try {
+                const res = await fetch(PRECACHE_URL, { cache: 'no-cache' });
+                if (res.ok) {
+                    const bundles = await res.json();
+                    if (Array.isArray(bundles)) {
+                        urls.push(...bundles);
+                    }
+                }
+            } catch (err) {
+                // 번들 빌드 전(개발 환경): 소스 파일은 런타임 캐시로 처리
+            }
+            return cache.addAll(urls);
+        })
+    );
+    self.skipWaiting();
+});
+
+// 활성화: 현재 버전이 아닌 캐시 삭제 (이전 'messenger-v4' 포함)
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys().then(cacheNames => {
+            return Promise.all(
+                cacheNames
+                    .filter(name => name.startsWith(CACHE_PREFIX) && !CURRENT_CACHES.includes(name))
+                    .map(name => caches.delete(name))
+            );
+        }).then(() => self.clients.claim())
+    );
+});
+
+function isCacheable(response) {
+    // 로그인 만료 리다이렉트/오류 응답은 저장하지 않음
+    return response && response.status === 200 && response.type === 'basic';
+}
+
+async function trimCache(cacheName, maxEntries) {
+    const cache = await caches.open(cacheName);
+    const keys = await cache.keys();
+    for (let i = 0; i < keys.length - maxEntries; i++) {
+        await cache.delete(keys[i]);
+    }
+}
+
+async function cacheFirst(request) {
+    const cached = await caches.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (isCacheable(response)) {
+        const copy = response.clone();
+        caches.open(STATIC_CACHE).then(cache => cache.put(request, copy));
+    }
+    return response;
+}
+
+function staleWhileRevalidate(event, cacheName, onUpdate) {
+    const request = event.request;
+    const cachedPromise = caches.open(cacheName).then(cache => cache.match(request));
+    const networkPromise = fetch(request).then(async response => {
+        if (isCacheable(response)) {
+            const cache = await caches.open(cacheName);
+            await cache.put(request, response.clone());
+            if (onUpdate) await onUpdate(response.clone());
+        }
+        return response;
+    });
+    // 캐시로 응답한 뒤에도 갱신이 끝날 때까지 워커 유지
+    event.waitUntil(networkPromise.then(() => undefined, () => undefined));
+
+    return cachedPromise.then(cached => {
+        return cached || networkPromise;
+    });
+}
+
+function apiCacheKey(request, userId) {
+    const url = new URL(request.url);
+    url.searchParams.set('__sw_user', userId);
+    return new Request(url.toString());
+}
+
+async function broadcastApiUpdate(path, response, fetchedAt) {
+    let body;
+    try {
+        body = await response.json();
+    } catch (err) {
+        return;
+    }
+    const windowClients = await self.clients.matchAll({ type: 'window' });
+    windowClients.forEach(client => {
+        client.postMessage({ type: 'api-cache-updated', path: path, fetchedAt: fetchedAt, body: body });
+    });
+}
+
+function handleApi(event, path) {
+    const request = event.request;
+    const userId = request.headers.get('X-Messenger-User');
+    // 사용자 식별이 없는 요청은 다른 사용자 응답이 섞이지 않도록 캐시하지 않음
+    if (!userId) return;
+
+    const key = apiCacheKey(request, userId);
+    const fetchedAt = Date.now();
+
+    if (request.headers.get('X-SW-Strategy') === 'swr') {
+        event.respondWith((async () => {
+            const cache = await caches.open(API_CACHE);
+            const cached = await cache.match(key);
+            const networkPromise = fetch(request).then(async response => {
+                if (isCacheable(response)) {
+                    await cache.put(key, response.clone());
+                    if (cached) await broadcastApiUpdate(path, response.clone(), fetchedAt);
+                }
+                return response;
+            });
+            event.waitUntil(networkPromise.then(() => undefined, () => undefined));
+            return cached || networkPromise;
+        })());
+        return;
+    }
+
+    event.respondWith(
+        fetch(request).then(async response => {
+            if (isCacheable(response)) {
+                const cache = await caches.open(API_CACHE);
+                await cache.put(key, response.clone());
+            }
+            return response;
+        }).catch(async err => {
+            const cached = await caches.match(key);
+            if (cached) return cached;
+            throw err;
+        })
+    );
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) return;
+    const path = url.pathname;
+
+    if (path.startsWith('/socket.io/')) return;
+
+    if (SWR_API_PATHS.includes(path)) {
+        handleApi(event, path);
+        return;
+    }
+
+    // 그 외 API는 항상 네트워크 사용
+    if (path.startsWith('/api/')) return;
+
+    if (path.startsWith('/uploads/profiles/')) {
+        event.respondWith(staleWhileRevalidate(event, AVATAR_CACHE, () => trimCache(AVATAR_CACHE, AVATAR_CACHE_LIMIT)));
+        return;
+    }
+
+    // 해시 번들은 내용이 바뀌면 파일명이 바뀜 (manifest.json 자체는 제외)
+    if (path.startsWith('/static/dist/') && !path.endsWith('.json')) {
+        event.respondWith(cacheFirst(request));
+        return;
+    }
+
+    // 나머지 정적 자원은 stale-while-revalidate
+    if (path.startsWith('/static/')) {
+        event.respondWith(staleWhileRevalidate(event, STATIC_CACHE));
+    }
+});
+
+// 푸시 알림 (서버 푸시용 - 선택사항)
+self.addEventListener('push', event => {
+    if (!event.data) return;
+
+    try {
+        const data = event.data.json();
+
+        const options = {
+            body: data.body || '새 메시지가 있습니다.',
+            icon: '/static/icon.png',
+            badge: '/static/badge.png',
+            tag: data.tag || 'notification',
+            requireInteraction: false,
+            data: {
+                url: data.url || '/'
+            }
+        };
+
+        event.waitUntil(
+            self.registration.showNotification(data.title || '사내 메신저', options)
+        );
+    } catch (err) {
+        console.error('푸시 알림 오류:', err);
+    }
+});
+
+// 알림 클릭
+self.addEventListener('notificationclick', event => {
+    event.notification.close();
+
+    const notificationData = event.notification.data || {};
+    const urlToOpen = notificationData.url || '/';
+
+    event.waitUntil(
+        clients.matchAll({ type: 'window', includeUncontrolled: true })
+            .then(windowClients => {
+                // 이미 열린 창이 있으면 포커스
+                for (const client of windowClients) {
+                    if (client.url.includes(self.location.origin) && 'focus' in client) {
+                        return client.focus();
+                    }
+                }
+                // 없으면 새 창 열기
+                return clients.openWindow(urlToOpen);
+            })
+    );
+});
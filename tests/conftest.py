@@ -43,6 +43,24 @@ def app():
             pass
         base_module._db_local.connection = None
     
+    # 프로세스 단위 업로드 권한 캐시는 DB가 바뀌면 무효 (user_id 재사용)
+    from app.services.upload_access import invalidate_file_access
+    invalidate_file_access()
+    from app.models.users import invalidate_user_cache
+    invalidate_user_cache()
+    from app.services.presence import reset_presence
+    reset_presence()
+    from app.services.typing_indicators import reset_typing
+    reset_typing()
+    from app.services.read_receipts import reset_read_receipts
+    reset_read_receipts()
+    from app.services.socket_admission import reset_admission
+    reset_admission()
+    from app.services.query_profiler import reset_query_profile
+    reset_query_profile()
+    from app.services.metrics import reset_metrics
+    reset_metrics()
+    
     from app import create_app
     flask_app, socketio = create_app()
     flask_app.config.update({
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import annotations
+
+import gzip
+import os
+import shutil
+
+import pytest
+
+
+@pytest.fixture
+def built_static(app):
+    from app.services.asset_bundles import build_bundles
+    from tests._temp_paths import make_temp_dir
+
+    static_dir = make_temp_dir(prefix="static-")
+    shutil.copytree(os.path.join(app.static_folder, "js"), os.path.join(static_dir, "js"))
+    manifest = build_bundles(static_dir, brotli_quality=5)
+    app.static_folder = static_dir
+    yield static_dir, manifest
+    shutil.rmtree(static_dir, ignore_errors=True)
+
+
+def test_index_falls_back_to_individual_scripts_without_manifest(client):
+    html = client.get("/").get_data(as_text=True)
+    assert "/static/js/core/namespace.js?v=5.0" in html
+    assert "/static/js/app.js?v=5.0" in html
+    assert "/static/js/socket.io.min.js" in html
+    assert "/static/dist/" not in html
+
+
+def test_index_uses_hashed_bundles_from_manifest(client, built_static):
+    _, manifest = built_static
+    html = client.get("/").get_data(as_text=True)
+    assert f"/static/dist/{manifest['vendor']['file']}" in html
+    assert f"/static/dist/{manifest['app']['file']}" in html
+    assert "namespace.js" not in html
+    assert html.index(manifest["vendor"]["file"]) < html.index(manifest["app"]["file"])
+
+
+def test_index_falls_back_to_sources_edited_after_the_build(client, built_static, caplog):
+    static_dir, manifest = built_static
+    source = os.path.join(static_dir, "js", "app.js")
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    with caplog.at_level("WARNING", logger="app.services.asset_bundles"):
+        html = client.get("/").get_data(as_text=True)
+        client.get("/")
+    assert "/static/js/app.js?v=5.0" in html
+    assert manifest["app"]["file"] not in html
+    # the untouched vendor bundle is still served
+    assert f"/static/dist/{manifest['vendor']['file']}" in html
+    assert [r.getMessage() for r in caplog.records].count(
+        f"Bundle {manifest['app']['file']} is older than its sources; serving them individually "
+        f"until `python scripts/build_assets.py` is rerun"
+    ) == 1
+    assert f"/static/dist/{manifest['app']['file']}" not in client.get("/sw-precache.json").json
+
+
+def test_bundle_served_precompressed_and_immutable(client, built_static):
+    static_dir, manifest = built_static
+    url = f"/static/dist/{manifest['app']['file']}"
+    with open(os.path.join(static_dir, "dist", manifest["app"]["file"]), "rb") as handle:
+        raw = handle.read()
+
+    gz = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert gz.status_code == 200
+    assert gz.headers["Content-Encoding"] == "gzip"
+    assert gz.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert "Accept-Encoding" in gz.headers["Vary"]
+    assert gzip.decompress(gz.get_data()) == raw
+
+    if "br" in manifest["app"]["encodings"]:
+        br = client.get(url, headers={"Accept-Encoding": "br, gzip"})
+        assert br.headers["Content-Encoding"] == "br"
+
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.get_data() == raw
+    assert plain.mimetype == "text/javascript"
+
+    assert client.get("/static/dist/manifest.json").status_code == 404
+    assert client.get(url + ".gz").status_code == 404
+
+    precache = client.get("/sw-precache.json")
+    assert precache.status_code == 200
+    assert url in precache.json
+
+
+def _service_worker_url(html: str) -> str:
+    import re
+
+    match = re.search(r'<meta name="sw-url" content="([^"]+)"', html)
+    assert match, "service worker url missing from index"
+    return match.group(1)
+
+
+def test_service_worker_served_from_root_scope(client):
+    url = _service_worker_url(client.get("/").get_data(as_text=True))
+    assert url.startswith("/sw.js?v=")
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.mimetype == "text/javascript"
+    assert response.headers["Service-Worker-Allowed"] == "/"
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert client.get(url, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+
+def test_service_worker_version_follows_bundle_manifest(client, built_static):
+    from app.services.asset_bundles import build_bundles
+
+    static_dir, _ = built_static
+    project_static = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+    shutil.copy(os.path.join(project_static, "sw.js"), os.path.join(static_dir, "sw.js"))
+
+    first = _service_worker_url(client.get("/").get_data(as_text=True))
+    assert _service_worker_url(client.get("/").get_data(as_text=True)) == first
+
+    with open(os.path.join(static_dir, "js", "app.js"), "a", encoding="utf-8") as handle:
+        handle.write("\n// changed\n")
+    build_bundles(static_dir, brotli_quality=5)
+    assert _service_worker_url(client.get("/").get_data(as_text=True)) != first
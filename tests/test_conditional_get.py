@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+from tests.test_feature_risk_review_plan import _create_room, _login, _register
+
+
+def _seed(client):
+    for name in ("etag_a", "etag_b", "etag_c"):
+        _register(client, name, nickname=name.upper())
+    _login(client, "etag_a")
+    users = {u["username"]: u for u in client.get("/api/users").json}
+    group_id = _create_room(client, members=[users["etag_b"]["id"], users["etag_c"]["id"]], name="etag-group")
+    direct_id = _create_room(client, members=[users["etag_b"]["id"]], name="")
+    me = client.get("/api/me").json["user"]
+    return me, users, group_id, direct_id
+
+
+def _revalidate(client, url, etag):
+    return client.get(url, headers={"If-None-Match": etag})
+
+
+def _sql(client, statement, params=()):
+    from app.models.base import get_db
+
+    with client.application.app_context():
+        conn = get_db()
+        conn.execute(statement, params)
+        conn.commit()
+
+
+def test_room_list_answers_304_until_a_visible_change(client, monkeypatch):
+    me, users, group_id, direct_id = _seed(client)
+    user_b = users["etag_b"]
+
+    first = client.get("/api/rooms")
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"') and first.headers["Cache-Control"] == "private, no-cache"
+
+    import app.http.rooms as rooms_http
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("room list query must not run on a matching tag")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(rooms_http, "get_user_rooms", _fail)
+        cached = _revalidate(client, "/api/rooms", etag)
+    assert cached.status_code == 304 and cached.data == b""
+    assert cached.headers["ETag"] == etag
+
+    # another member's read position is not part of my list
+    _sql(client, "UPDATE room_members SET last_read_message_id = 99 WHERE room_id = ? AND user_id = ?", (group_id, user_b["id"]))
+    assert _revalidate(client, "/api/rooms", etag).status_code == 304
+    # session token churn does not touch any listing
+    _sql(client, "UPDATE users SET session_token = 'rotated' WHERE id = ?", (user_b["id"],))
+    assert _revalidate(client, "/api/rooms", etag).status_code == 304
+
+    from app.models.messages import create_message
+
+    with client.application.app_context():
+        create_message(room_id=group_id, sender_id=user_b["id"], content="hi", encrypted=False)
+    fresh = _revalidate(client, "/api/rooms", etag)
+    assert fresh.status_code == 200
+    assert next(r for r in fresh.json if r["id"] == group_id)["unread_count"] == 1
+    etag = fresh.headers["ETag"]
+
+    # direct partner profile feeds the room name
+    _sql(client, "UPDATE users SET nickname = 'B2' WHERE id = ?", (user_b["id"],))
+    renamed = _revalidate(client, "/api/rooms", etag)
+    assert renamed.status_code == 200
+    assert next(r for r in renamed.json if r["id"] == direct_id)["name"] == "B2"
+    etag = renamed.headers["ETag"]
+
+    # the direct partner's status is shown too
+    _sql(client, "UPDATE users SET status = 'online' WHERE id = ?", (user_b["id"],))
+    online = _revalidate(client, "/api/rooms", etag)
+    assert online.status_code == 200
+    etag = online.headers["ETag"]
+
+    assert client.post(f"/api/rooms/{group_id}/pin", json={"pinned": True}).status_code == 200
+    assert _revalidate(client, "/api/rooms", etag).status_code == 200
+
+    members_etag = client.get("/api/rooms?include_members=1").headers["ETag"]
+    assert members_etag != client.get("/api/rooms").headers["ETag"]
+
+
+def test_user_directory_and_room_info_tags(client):
+    me, users, group_id, _ = _seed(client)
+    user_c = users["etag_c"]
+
+    listing = client.get("/api/users")
+    etag = listing.headers["ETag"]
+    assert all(u["id"] != me["id"] for u in listing.json)
+    assert _revalidate(client, "/api/users", etag).status_code == 304
+
+    _sql(client, "UPDATE users SET status = status WHERE id = ?", (user_c["id"],))
+    assert _revalidate(client, "/api/users", etag).status_code == 304
+    # presence churn is not part of the directory tag
+    _sql(client, "UPDATE users SET status = 'online' WHERE id = ?", (user_c["id"],))
+    assert _revalidate(client, "/api/users", etag).status_code == 304
+    _sql(client, "UPDATE users SET status_message = 'away' WHERE id = ?", (user_c["id"],))
+    assert _revalidate(client, "/api/users", etag).status_code == 200
+
+    info = client.get(f"/api/rooms/{group_id}/info")
+    info_etag = info.headers["ETag"]
+    assert "encryption_key" not in info.json
+    assert _revalidate(client, f"/api/rooms/{group_id}/info", info_etag).status_code == 304
+    # member status is shown in room info, so presence does revalidate it
+    _sql(client, "UPDATE users SET status = 'offline' WHERE id = ?", (user_c["id"],))
+    info = _revalidate(client, f"/api/rooms/{group_id}/info", info_etag)
+    assert info.status_code == 200
+    info_etag = info.headers["ETag"]
+
+    admins_etag = client.get(f"/api/rooms/{group_id}/admins").headers["ETag"]
+    assert _revalidate(client, f"/api/rooms/{group_id}/admins", admins_etag).status_code == 304
+
+    r = client.post(f"/api/rooms/{group_id}/admins", json={"user_id": user_c["id"], "is_admin": True})
+    assert r.status_code == 200
+    assert _revalidate(client, f"/api/rooms/{group_id}/info", info_etag).status_code == 200
+    admins = _revalidate(client, f"/api/rooms/{group_id}/admins", admins_etag)
+    assert admins.status_code == 200
+    assert user_c["id"] in [a["id"] for a in admins.json]
+
+    # tags are per viewer: another user's directory excludes them instead
+    etag = client.get("/api/users").headers["ETag"]
+    _login(client, "etag_b")
+    assert _revalidate(client, "/api/users", etag).status_code == 200
@@ -197,7 +197,9 @@ def test_message_read_ignores_foreign_message_id(app):
 
         sc_owner.get_received()
         sc_member.emit("message_read", {"room_id": room_a, "message_id": target_msg["id"]})
-        assert _first_event(sc_owner.get_received(), "read_updated") is None
+        received = sc_owner.get_received()
+        assert _first_event(received, "read_updated") is None
+        assert _first_event(received, "read_receipts") is None
     finally:
         sc_member.disconnect()
         sc_owner.disconnect()
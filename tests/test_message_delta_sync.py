@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+from tests.test_feature_risk_review_plan import _create_room, _login, _register
+
+
+def _seed_room(client, count=5):
+    _register(client, "sync_a", nickname="SyncA")
+    _register(client, "sync_b", nickname="SyncB")
+    _login(client, "sync_a")
+
+    users = client.get("/api/users").json
+    user_b = next(u for u in users if u["username"] == "sync_b")
+    room_id = _create_room(client, members=[user_b["id"]], name="sync-room")
+
+    from app.models.messages import create_message
+
+    me = client.get("/api/me").json["user"]
+    with client.application.app_context():
+        ids = [
+            create_message(room_id=room_id, sender_id=me["id"], content=f"m{i}", encrypted=False)["id"]
+            for i in range(count)
+        ]
+    return room_id, user_b, ids
+
+
+def test_messages_page_carries_sync_watermark(client):
+    room_id, _, ids = _seed_room(client)
+
+    data = client.get(f"/api/rooms/{room_id}/messages?include_meta=0").json
+    assert data["sync"]["message_id"] == ids[-1]
+    assert isinstance(data["sync"]["change_id"], int)
+
+    older = client.get(f"/api/rooms/{room_id}/messages?include_meta=0&before_id={ids[-1]}").json
+    assert "sync" not in older
+
+
+def test_sync_returns_new_edited_removed_and_reacted_messages(client):
+    room_id, user_b, ids = _seed_room(client)
+    watermark = client.get(f"/api/rooms/{room_id}/messages?include_meta=0").json["sync"]
+
+    empty = client.get(
+        f"/api/rooms/{room_id}/messages/sync?after_id={watermark['message_id']}"
+        f"&after_change={watermark['change_id']}&include_meta=0"
+    ).json
+    assert empty["messages"] == [] and empty["updated"] == [] and empty["removed_ids"] == []
+    assert empty["reset"] is False
+    assert empty["sync"] == watermark
+
+    assert client.put(f"/api/messages/{ids[0]}", json={"content": "edited"}).status_code == 200
+    assert client.delete(f"/api/messages/{ids[1]}").status_code == 200
+    assert client.post(f"/api/messages/{ids[2]}/reactions", json={"emoji": "👍"}).status_code == 200
+
+    from app.models.base import get_db
+    from app.models.messages import create_message
+
+    with client.application.app_context():
+        new_id = create_message(room_id=room_id, sender_id=user_b["id"], content="fresh", encrypted=False)["id"]
+        # hard deletes outside bulk maintenance must surface as removals
+        conn = get_db()
+        conn.execute("DELETE FROM messages WHERE id = ?", (ids[3],))
+        conn.commit()
+
+    delta = client.get(
+        f"/api/rooms/{room_id}/messages/sync?after_id={watermark['message_id']}"
+        f"&after_change={watermark['change_id']}&include_meta=1"
+    ).json
+    assert delta["reset"] is False
+    assert [m["id"] for m in delta["messages"]] == [new_id]
+    assert delta["messages"][0]["unread_count"] == 1
+
+    updated = {m["id"]: m for m in delta["updated"]}
+    assert updated[ids[0]]["content"] == "edited"
+    assert updated[ids[1]]["content"] == "[삭제된 메시지]"
+    assert [r["emoji"] for r in updated[ids[2]]["reactions"]] == ["👍"]
+    assert delta["removed_ids"] == [ids[3]]
+    assert delta["sync"]["message_id"] == new_id
+    assert delta["sync"]["change_id"] > watermark["change_id"]
+    assert "members" in delta and "encryption_key" in delta
+
+    again = client.get(
+        f"/api/rooms/{room_id}/messages/sync?after_id={delta['sync']['message_id']}"
+        f"&after_change={delta['sync']['change_id']}&include_meta=0"
+    ).json
+    assert again["messages"] == [] and again["updated"] == [] and again["removed_ids"] == []
+
+
+def test_sync_paginates_and_resets_on_pruned_journal(client):
+    room_id, _, ids = _seed_room(client, count=6)
+    watermark = client.get(f"/api/rooms/{room_id}/messages?include_meta=0").json["sync"]
+
+    page = client.get(
+        f"/api/rooms/{room_id}/messages/sync?after_id={ids[1]}&after_change={watermark['change_id']}&limit=2&include_meta=0"
+    ).json
+    assert [m["id"] for m in page["messages"]] == ids[2:4]
+    assert page["has_more"] is True
+    assert page["sync"]["message_id"] == ids[3]
+
+    assert client.put(f"/api/messages/{ids[0]}", json={"content": "edited"}).status_code == 200
+
+    from app.models.base import cleanup_message_changes, get_db
+
+    with client.application.app_context():
+        conn = get_db()
+        conn.execute("UPDATE message_changes SET created_at = '2000-01-01 00:00:00'")
+        conn.commit()
+        assert cleanup_message_changes(1) >= 1
+        plan = get_db().execute(
+            "EXPLAIN QUERY PLAN DELETE FROM message_changes WHERE created_at < ?", ("2000-01-02",)
+        ).fetchall()
+        assert any("idx_message_changes_created_at" in str(tuple(row)) for row in plan)
+
+    stale = client.get(
+        f"/api/rooms/{room_id}/messages/sync?after_id={watermark['message_id']}"
+        f"&after_change={watermark['change_id']}&include_meta=0"
+    ).json
+    assert stale["reset"] is True
+
+    bad = client.get(f"/api/rooms/{room_id}/messages/sync?after_id=1")
+    assert bad.status_code == 400
+
+
+def test_retention_purge_skips_the_journal_and_resets_clients(client):
+    room_id, _, ids = _seed_room(client, count=4)
+    watermark = client.get(f"/api/rooms/{room_id}/messages?include_meta=0").json["sync"]
+
+    from app.models.base import cleanup_retention_data, get_db
+
+    with client.application.app_context():
+        conn = get_db()
+        conn.execute(
+            f"UPDATE messages SET created_at = '2000-01-01 00:00:00' WHERE id IN ({','.join('?' * 3)})", ids[:3]
+        )
+        conn.commit()
+        assert cleanup_retention_data(1)["messages"] == 3
+        conn = get_db()
+        # no row per purged message; the journal is emptied past its head instead
+        assert conn.execute("SELECT COUNT(*) FROM message_changes").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM message_changes_paused").fetchone()[0] == 0
+
+        # later deletes are journaled again
+        conn.execute("DELETE FROM messages WHERE id = ?", (ids[3],))
+        conn.commit()
+        assert [row[0] for row in conn.execute("SELECT message_id FROM message_changes")] == [ids[3]]
+
+    stale = client.get(
+        f"/api/rooms/{room_id}/messages/sync?after_id={watermark['message_id']}"
+        f"&after_change={watermark['change_id']}&include_meta=0"
+    ).json
+    assert stale["reset"] is True
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+import shutil
+
+from flask import Flask
+
+import app.services.metrics as metrics
+from tests._temp_paths import make_temp_dir
+
+
+def _register(client, username, password="Password123!"):
+    response = client.post("/api/register", json={"username": username, "password": password, "nickname": username})
+    assert response.status_code == 200
+
+
+def _login(client, username, password="Password123!"):
+    response = client.post("/api/login", json={"username": username, "password": password})
+    assert response.status_code == 200
+
+
+def test_render_text_exposes_counters_and_cumulative_histograms():
+    requests = metrics.counter("test_metrics_requests_total", "Requests.", ("path",))
+    latency = metrics.histogram("test_metrics_latency_seconds", "Latency.", ("path",), buckets=(0.1, 1))
+    requests.clear()
+    latency.clear()
+
+    requests.inc('/a"b')
+    requests.inc('/a"b', amount=2)
+    latency.observe(0.05, "/a")
+    latency.observe(0.5, "/a")
+    latency.observe(3, "/a")
+
+    text = metrics.render_text()
+    assert "# TYPE test_metrics_requests_total counter" in text
+    assert 'test_metrics_requests_total{path="/a\\"b"} 3' in text
+    assert "# TYPE test_metrics_latency_seconds histogram" in text
+    assert 'test_metrics_latency_seconds_bucket{path="/a",le="0.1"} 1' in text
+    assert 'test_metrics_latency_seconds_bucket{path="/a",le="1"} 2' in text
+    assert 'test_metrics_latency_seconds_bucket{path="/a",le="+Inf"} 3' in text
+    assert 'test_metrics_latency_seconds_sum{path="/a"} 3.55' in text
+    assert 'test_metrics_latency_seconds_count{path="/a"} 3' in text
+    assert 'messenger_service_stat{service="socket_admission",stat="admitted"}' in text
+
+    metrics.configure(False)
+    try:
+        requests.inc('/a"b')
+    finally:
+        metrics.configure(True)
+    assert requests.value('/a"b') == 3
+
+
+def test_socket_events_and_emit_fanout_are_counted(app):
+    client = app.test_client()
+    _register(client, "metrics_socket")
+    _login(client, "metrics_socket")
+    room_id = client.post("/api/rooms", json={"name": "metrics-room", "members": []}).json["room_id"]
+
+    from app import socketio
+
+    socket_client = socketio.test_client(app, flask_test_client=client)
+    assert socket_client.is_connected()
+    try:
+        socket_client.emit(
+            "send_message",
+            {"room_id": room_id, "content": "hello", "type": "text", "encrypted": False},
+        )
+        assert any(evt["name"] == "new_message" for evt in socket_client.get_received())
+    finally:
+        socket_client.disconnect()
+
+    assert metrics.SOCKET_EVENTS.value("connect") == 1
+    assert metrics.SOCKET_EVENTS.value("send_message") == 1
+    assert metrics.SOCKET_EVENT_SECONDS.count("send_message") == 1
+    assert metrics.SOCKET_EMITS.value("new_message") == 1
+    text = metrics.render_text()
+    # the sender is the only member of the room
+    assert 'messenger_socket_emit_recipients_bucket{event="new_message",le="0"} 0' in text
+    assert 'messenger_socket_emit_recipients_bucket{event="new_message",le="1"} 1' in text
+    assert 'messenger_cache_requests_total{cache="socket_user_rooms",result="miss"}' in text
+
+
+def test_control_api_serves_metrics_to_bearer_token():
+    import config
+    from app.control_api import control_bp, get_or_create_control_token
+
+    metrics.MAINTENANCE_SECONDS.observe(0.02, "close_expired_polls")
+
+    d = make_temp_dir(prefix="control-")
+    old_base_dir = config.BASE_DIR
+    config.BASE_DIR = d
+    try:
+        token = get_or_create_control_token(d)
+        control_app = Flask("control_metrics_test")
+        control_app.register_blueprint(control_bp)
+        client = control_app.test_client()
+        local = {"REMOTE_ADDR": "127.0.0.1"}
+
+        r = client.get("/control/metrics", headers={"Authorization": f"Bearer {token}"}, environ_base=local)
+        assert r.status_code == 200
+        assert r.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert 'messenger_maintenance_job_duration_seconds_count{job="close_expired_polls"}' in r.get_data(as_text=True)
+
+        assert client.get("/control/metrics", headers={"Authorization": "Bearer nope"}, environ_base=local).status_code == 401
+        # non-ASCII tokens are compared as bytes rather than raising
+        assert client.get("/control/metrics", headers={"Authorization": "Bearer n\u00f6pe"}, environ_base=local).status_code == 401
+    finally:
+        config.BASE_DIR = old_base_dir
+        shutil.rmtree(d, ignore_errors=True)
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import annotations
+
+import pytest
+
+
+def _register(client, username, password="Password123!"):
+    response = client.post("/api/register", json={"username": username, "password": password, "nickname": username})
+    assert response.status_code == 200
+
+
+def _login(client, username, password="Password123!"):
+    return client.post("/api/login", json={"username": username, "password": password})
+
+
+def _stored_hash(app, username):
+    with app.app_context():
+        from app.models import get_db
+
+        row = get_db().execute("SELECT password_hash FROM users WHERE username = ?", (username,)).fetchone()
+        return row["password_hash"]
+
+
+def test_login_hashes_in_worker_pool_with_configured_rounds(app, client):
+    pytest.importorskip("bcrypt")
+    from app.services.password_hashing import get_password_hash_stats
+
+    app.config.update({"BCRYPT_ROUNDS": 5, "PASSWORD_HASH_WORKERS": 2})
+    before = get_password_hash_stats()["completed"]
+
+    _register(client, "pool_user")
+    assert _stored_hash(app, "pool_user").startswith("$2b$05$")
+    assert _login(client, "pool_user").status_code == 200
+    assert _login(client, "pool_user", "Wrong12345!").status_code == 401
+
+    stats = get_password_hash_stats()
+    assert stats["completed"] - before == 3
+    assert stats["queued"] == 0 and stats["running"] == 0
+    assert stats["workers"] == 2
+    assert stats["bcrypt_rounds"] == 5
+
+
+def test_login_rehashes_when_work_factor_changes(app, client):
+    pytest.importorskip("bcrypt")
+
+    app.config.update({"BCRYPT_ROUNDS": 4, "PASSWORD_HASH_WORKERS": 0})
+    _register(client, "rehash_user")
+    assert _stored_hash(app, "rehash_user").startswith("$2b$04$")
+
+    app.config["BCRYPT_ROUNDS"] = 5
+    assert _login(client, "rehash_user").status_code == 200
+    assert _stored_hash(app, "rehash_user").startswith("$2b$05$")
+    assert _login(client, "rehash_user").status_code == 200
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import pytest
+
+import app.services.presence as presence
+from tests.test_feature_risk_review_plan import _create_room, _login, _register
+
+
+@pytest.fixture
+def trio(app):
+    from app.models import create_room
+    from app.models.users import create_user
+
+    with app.app_context():
+        ids = [create_user(f"presence_u{i}", "Password123!", f"상태{i}") for i in range(3)]
+        create_room("presence-room", "group", ids[0], ids)
+    return ids
+
+
+@pytest.fixture
+def frames(monkeypatch):
+    sent = []
+    monkeypatch.setattr(presence, "emit_presence_diff", sent.append)
+    return sent
+
+
+def _status(app, user_id):
+    from app.models.users import get_user_by_id
+
+    with app.app_context():
+        return get_user_by_id(user_id)["status"]
+
+
+def test_reconnect_inside_grace_window_is_absorbed(app, trio, frames):
+    user_id = trio[0]
+    with app.app_context():
+        assert presence.presence_connected(user_id) is True
+        assert _status(app, user_id) == "online"
+
+        now = time.time()
+        assert presence.presence_disconnected(user_id, grace_seconds=5, now=now) is True
+        assert presence.flush_presence(now=now + 1) == 0
+        assert presence.presence_connected(user_id) is False
+        # two tabs: closing one is not a transition
+        presence.presence_connected(user_id)
+        assert presence.presence_disconnected(user_id, grace_seconds=5, now=now) is False
+
+    stats = presence.get_presence_stats()
+    assert stats["flaps_absorbed"] == 1
+    assert stats["status_rows_written"] == 1 and stats["online_users"] == 1
+    assert _status(app, user_id) == "online"
+
+    with app.app_context():
+        presence.presence_disconnected(user_id, grace_seconds=5, now=now)
+        assert presence.flush_presence(now=now + 6) == 1
+    assert _status(app, user_id) == "offline"
+    assert not presence.is_user_online(user_id)
+
+
+def test_transitions_flush_as_one_write_and_one_frame_per_peer(app, trio, frames):
+    a, b, c = trio
+    with app.app_context():
+        for user_id in trio:
+            presence.presence_connected(user_id)
+        frames.clear()
+        batches = presence.get_presence_stats()["write_batches"]
+        base = presence.presence_version()
+
+        now = time.time()
+        presence.presence_disconnected(a, grace_seconds=5, now=now)
+        presence.presence_disconnected(b, grace_seconds=5, now=now)
+        assert presence.flush_presence(now=now + 6) == 2
+
+    assert presence.get_presence_stats()["write_batches"] == batches + 1
+    assert len(frames) == 1
+    payloads = frames[0]
+    # a and b are offline now, so only c is told, once, about both
+    assert list(payloads) == [c]
+    assert sorted(ch["user_id"] for ch in payloads[c]["changes"]) == [a, b]
+    assert {ch["status"] for ch in payloads[c]["changes"]} == {"offline"}
+    # c got every change of the flush, so the frame continues c's last version
+    assert payloads[c]["base"] == base
+    assert payloads[c]["version"] == presence.presence_version()
+
+
+def test_socket_connect_pushes_presence_diff_to_room_peers(app):
+    from app import socketio
+
+    alice, bob = app.test_client(), app.test_client()
+    _register(alice, "presence_alice")
+    _register(bob, "presence_bob")
+    _login(bob, "presence_bob")
+    bob_id = bob.get("/api/me").json["user"]["id"]
+    _login(alice, "presence_alice")
+    alice_id = alice.get("/api/me").json["user"]["id"]
+    _create_room(alice, members=[bob_id])
+
+    bob_socket = socketio.test_client(app, flask_test_client=bob)
+    try:
+        bob_socket.get_received()
+        alice_socket = socketio.test_client(app, flask_test_client=alice)
+        diffs = [e["args"][0] for e in bob_socket.get_received() if e["name"] == "presence_diff"]
+        assert [d["changes"] for d in diffs] == [[{"user_id": alice_id, "status": "online"}]]
+        assert [u["id"] for u in diffs[0]["users"]] == [alice_id]
+        online_version = diffs[0]["version"]
+        assert _status(app, alice_id) == "online"
+
+        alice_socket.disconnect()
+        diffs = [e["args"][0] for e in bob_socket.get_received() if e["name"] == "presence_diff"]
+        assert [d["changes"] for d in diffs] == [[{"user_id": alice_id, "status": "offline"}]]
+        # consecutive frames chain, so bob applies them without refetching the list
+        assert diffs[0]["base"] == online_version and diffs[0]["users"] == []
+        assert _status(app, alice_id) == "offline"
+    finally:
+        bob_socket.disconnect()
+
+
+def test_online_list_comes_from_presence_set_with_version_diffs(app, client, frames):
+    from app.models.users import create_user, set_user_statuses
+
+    _register(client, "presence_viewer")
+    _login(client, "presence_viewer")
+    me = client.get("/api/me").json["user"]["id"]
+    with app.app_context():
+        peer, stale = (create_user(f"presence_{n}", "Password123!", n) for n in ("peer", "stale"))
+        presence.presence_connected(me)
+        presence.presence_connected(peer)
+        # a leftover status column is not presence
+        set_user_statuses({stale: "online"})
+
+    assert [u["id"] for u in client.get("/api/users/online").json] == [peer]
+
+    snapshot = client.get("/api/users/online?since=").json
+    assert snapshot["reset"] is True and [u["id"] for u in snapshot["users"]] == [peer]
+    version = snapshot["version"]
+    unchanged = client.get(f"/api/users/online?since={version}").json
+    assert unchanged == {"version": version, "reset": False, "changes": [], "users": []}
+
+    with app.app_context():
+        presence.presence_connected(stale)
+        presence.presence_disconnected(peer)
+        # several transitions since the token collapse to the latest status
+        presence.presence_connected(peer)
+        presence.presence_disconnected(peer)
+    delta = client.get(f"/api/users/online?since={version}").json
+    assert delta["reset"] is False
+    assert delta["changes"] == [{"user_id": stale, "status": "online"}, {"user_id": peer, "status": "offline"}]
+    assert [u["nickname"] for u in delta["users"]] == ["stale"]
+
+    assert client.get("/api/users/online?since=bogus.1").json["reset"] is True
+    assert client.get(f"/api/users/online?since={version}9").json["reset"] is True
+
+
+def test_startup_reconciliation_marks_stale_rows_offline_in_one_batch(app, trio, frames):
+    from app.models.users import set_user_statuses
+
+    with app.app_context():
+        set_user_statuses({user_id: "online" for user_id in trio})
+        presence.presence_connected(trio[0])
+        assert presence.reconcile_presence() == 2
+        assert presence.reconcile_presence() == 0
+    assert [_status(app, user_id) for user_id in trio] == ["online", "offline", "offline"]
+
+
+def test_dead_node_is_swept_and_its_users_go_offline(app, trio, frames):
+    from app.state_store import state_store
+
+    a, b, _ = trio
+    with app.app_context():
+        # a worker that crashed without disconnecting anyone: listed, but no heartbeat key
+        state_store.add_member("presence:nodes", "deadnode")
+        for user_id in (a, b):
+            state_store.add_member("presence:node:deadnode", str(user_id))
+        presence.presence_connected(b)
+        assert presence.get_online_user_ids() == {a, b}
+        token = presence.presence_version()
+
+        assert presence.presence_heartbeat() == 1
+        assert presence.get_online_user_ids() == {b}
+        _, changes = presence.get_presence_changes_since(token)
+    assert changes == [{"user_id": a, "status": "offline"}]
+    assert _status(app, a) == "offline" and _status(app, b) == "online"
+    assert presence.get_presence_stats()["dead_nodes_swept"] == 1
+
+
+def test_simultaneous_last_disconnects_on_two_nodes_go_offline(app, trio, frames, monkeypatch):
+    from app.state_store import state_store
+
+    user_id = trio[0]
+    # a second worker's in-process state, swapped in to act as that worker
+    node_b = {"_node_id": "nodeb", "_connections": {}, "_online": set(), "_pending_offline": {}, "_dirty": {}, "_dirty_versions": []}
+    node_a = {name: getattr(presence, name) for name in node_b}
+
+    def use(node):
+        for name, value in node.items():
+            monkeypatch.setattr(presence, name, value)
+
+    with app.app_context():
+        token = presence.presence_version()
+        now = time.time()
+        for node in (node_b, node_a):
+            use(node)
+            presence.presence_connected(user_id)
+            presence.presence_disconnected(user_id, grace_seconds=5, now=now)
+
+        # node B runs its whole flush right after node A has read B's set
+        get_members = state_store.get_members
+        interleaved = []
+
+        def get_members_then_flush_b(key):
+            members = get_members(key)
+            if key == "presence:node:nodeb" and presence._node_id == node_a["_node_id"] and not interleaved:
+                interleaved.append(key)
+                use(node_b)
+                presence.flush_presence(now=now + 6)
+                use(node_a)
+            return members
+
+        monkeypatch.setattr(state_store, "get_members", get_members_then_flush_b)
+        presence.flush_presence(now=now + 6)
+        monkeypatch.setattr(state_store, "get_members", get_members)
+
+        assert interleaved
+        assert user_id not in presence.get_online_user_ids()
+        _, changes = presence.get_presence_changes_since(token)
+    # at worst both nodes mark it offline; never neither
+    assert changes[-1] == {"user_id": user_id, "status": "offline"}
+    assert _status(app, user_id) == "offline"
+
+
+def test_change_log_holds_back_versions_still_being_appended(app, trio, frames, monkeypatch):
+    from app.state_store import state_store
+
+    with app.app_context():
+        token = presence.presence_version()
+        # another worker bumped the shared counter but has not appended its entry yet
+        state_store.incr("presence:version")
+        presence.presence_connected(trio[2])
+        assert presence.get_presence_changes_since(token) == (token, [])
+
+        monkeypatch.setattr(presence, "_LOG_GAP_GRACE_SECONDS", 0)
+        current, changes = presence.get_presence_changes_since(token)
+    assert changes == [{"user_id": trio[2], "status": "online"}]
+    assert current == presence.presence_version() != token
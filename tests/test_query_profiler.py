@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+import sqlite3
+
+from flask import Flask
+
+import app.services.query_profiler as query_profiler
+from tests._temp_paths import make_temp_dir
+
+
+def test_normalize_sql_collapses_literals_and_placeholder_lists():
+    sql = """
+        SELECT *  FROM messages
+        WHERE room_id IN (?, ?,?) AND content = 'it''s' AND id > 42
+    """
+    assert query_profiler.normalize_sql(sql) == "SELECT * FROM messages WHERE room_id IN (?…) AND content = ? AND id > ?"
+    assert query_profiler.normalize_sql("SELECT 1 FROM rm1 WHERE x IN (?)") == "SELECT ? FROM rm1 WHERE x IN (?)"
+
+
+def test_profiling_switches_connection_class_and_records_slow_queries(app):
+    from app.models import base, configure_query_profiling, get_user_rooms
+    from app.models.users import create_user
+    from app.services import metrics
+
+    with app.app_context():
+        # profiling off: only the always-on per-verb latency timer
+        assert type(base.get_db()) is base.TimedConnection
+        inserts = metrics.DB_QUERY_SECONDS.count("INSERT")
+        withs = metrics.DB_QUERY_SECONDS.count("WITH")
+        user_id = create_user("profiled_user", "Password123!", "프로필")
+        get_user_rooms(user_id)
+        assert metrics.DB_QUERY_SECONDS.count("INSERT") > inserts
+        assert metrics.DB_QUERY_SECONDS.count("WITH") == withs + 1
+        assert query_profiler.get_query_profile_stats()["queries"] == 0
+
+        configure_query_profiling(True, slow_query_ms=0)
+        try:
+            assert isinstance(base.get_db(), base.ProfiledConnection)
+            get_user_rooms(user_id)
+            get_user_rooms(user_id)
+        finally:
+            configure_query_profiling(False)
+        assert type(base.get_db()) is base.TimedConnection
+
+        metrics.configure(False)
+        try:
+            assert type(base.get_db()) is sqlite3.Connection
+        finally:
+            metrics.configure(True)
+
+    top = query_profiler.get_top_queries(limit=50, sort="count")
+    rooms_query = next(entry for entry in top if entry["sql"].startswith("WITH my_rooms AS"))
+    assert rooms_query["count"] == 2
+    assert sum(rooms_query["histogram"].values()) == 2
+    assert rooms_query["p99_ms"] >= rooms_query["p50_ms"] > 0
+    # the liveness probe in get_db() is not profiled
+    assert not any(entry["sql"] == "SELECT ?" for entry in top)
+
+    slow = next(entry for entry in query_profiler.get_slow_queries(limit=50) if entry["sql"].startswith("WITH my_rooms AS"))
+    assert slow["caller"].startswith("app/models/rooms.py:") and slow["caller"].endswith("in get_user_rooms")
+    assert slow["plan"] and not slow["plan"][0].startswith("<explain failed")
+    stats = query_profiler.get_query_profile_stats()
+    assert stats["slow_queries"] == stats["queries"] >= 2
+
+
+def test_control_api_lists_top_queries():
+    import shutil
+
+    import config
+    from app.control_api import control_bp, get_or_create_control_token
+
+    query_profiler.reset_query_profile()
+    query_profiler.record_query(None, "SELECT * FROM users WHERE id = 1", None, 0.002)
+    query_profiler.record_query(None, "SELECT * FROM users WHERE id = 2", None, 0.004)
+    query_profiler.record_query(None, "DELETE FROM access_logs WHERE created_at < ?", None, 0.001)
+
+    d = make_temp_dir(prefix="control-")
+    old_base_dir = config.BASE_DIR
+    config.BASE_DIR = d
+    try:
+        token = get_or_create_control_token(d)
+        control_app = Flask("control_queries_test")
+        control_app.register_blueprint(control_bp)
+        r = control_app.test_client().get(
+            "/control/queries?limit=1&sort=count",
+            headers={"X-Control-Token": token},
+            environ_base={"REMOTE_ADDR": "127.0.0.1"},
+        )
+        assert r.status_code == 200
+        body = r.get_json()
+        assert body["queries"] == 3 and body["statements"] == 2
+        assert [entry["sql"] for entry in body["top"]] == ["SELECT * FROM users WHERE id = ?"]
+        assert body["top"][0]["count"] == 2 and body["top"][0]["max_ms"] == 4.0
+    finally:
+        config.BASE_DIR = old_base_dir
+        shutil.rmtree(d, ignore_errors=True)
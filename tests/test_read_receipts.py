@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+import app.services.read_receipts as read_receipts
+from tests.test_feature_risk_review_plan import _create_room, _login, _register
+
+
+@pytest.fixture
+def frames(monkeypatch):
+    sent = []
+    monkeypatch.setattr(read_receipts, "emit_read_receipts", lambda room_id, reads: sent.append((room_id, reads)))
+    return sent
+
+
+def _seed(app):
+    from app.models import create_message, create_room
+    from app.models.users import create_user
+
+    with app.app_context():
+        ids = [create_user(f"receipt_u{i}", "Password123!", f"읽음{i}") for i in range(3)]
+        room_id = create_room("receipts", "group", ids[0], ids)
+        message_ids = [create_message(room_id, ids[0], f"m{i}", "text", encrypted=False)["id"] for i in range(5)]
+    return ids, room_id, message_ids
+
+
+def _last_reads(app, room_id):
+    from app.models.base import get_db
+
+    with app.app_context():
+        rows = get_db().execute("SELECT user_id, last_read_message_id FROM room_members WHERE room_id = ?", (room_id,))
+        return {row[0]: row[1] for row in rows}
+
+
+def test_buffer_keeps_max_and_flushes_one_batch_per_interval(app, frames, monkeypatch):
+    ids, room_id, message_ids = _seed(app)
+    monkeypatch.setattr(read_receipts, "_schedule_flush", lambda: None)
+    before = _last_reads(app, room_id)
+
+    assert read_receipts.buffer_read(room_id, ids[1], message_ids[2])
+    assert read_receipts.buffer_read(room_id, ids[1], message_ids[4])
+    assert not read_receipts.buffer_read(room_id, ids[1], message_ids[3])
+    assert read_receipts.is_stale_read(room_id, ids[1], message_ids[3])
+    assert read_receipts.buffer_read(room_id, ids[2], message_ids[1])
+    assert _last_reads(app, room_id) == before
+
+    with app.app_context():
+        assert read_receipts.flush_read_receipts() == 2
+        assert read_receipts.flush_read_receipts() == 0
+
+    after = _last_reads(app, room_id)
+    assert after[ids[1]] == message_ids[4] and after[ids[2]] == message_ids[1]
+    assert frames == [
+        (room_id, [{"user_id": ids[1], "message_id": message_ids[4]}, {"user_id": ids[2], "message_id": message_ids[1]}])
+    ]
+    stats = read_receipts.get_read_receipt_stats()
+    assert stats["write_batches"] == 1 and stats["rows_written"] == 2 and stats["pending"] == 0
+
+
+def test_failed_write_puts_positions_back_for_the_next_flush(app, frames, monkeypatch):
+    ids, room_id, message_ids = _seed(app)
+    monkeypatch.setattr(read_receipts, "_schedule_flush", lambda: None)
+    read_receipts.buffer_read(room_id, ids[1], message_ids[2])
+
+    with monkeypatch.context() as patch:
+        patch.setattr(read_receipts, "update_last_read_batch", lambda positions: None)
+        with app.app_context():
+            assert read_receipts.flush_read_receipts() == 0
+    # a newer report that arrived meanwhile wins over the re-queued one
+    read_receipts.buffer_read(room_id, ids[1], message_ids[3])
+    stats = read_receipts.get_read_receipt_stats()
+    assert stats["write_failures"] == 1 and stats["pending"] == 1 and frames == []
+
+    with app.app_context():
+        assert read_receipts.flush_read_receipts() == 1
+    assert _last_reads(app, room_id)[ids[1]] == message_ids[3]
+
+
+def test_http_reads_see_buffered_positions(app, client, frames, monkeypatch):
+    ids, room_id, message_ids = _seed(app)
+    monkeypatch.setattr(read_receipts, "_schedule_flush", lambda: None)
+    _login(client, "receipt_u1")
+
+    read_receipts.buffer_read(room_id, ids[1], message_ids[-1])
+    read_receipts.buffer_read(room_id, ids[2], message_ids[-1])
+    rooms = client.get("/api/rooms").json
+    assert next(r for r in rooms if r["id"] == room_id)["unread_count"] == 0
+    # only the caller's own position is flushed for the room list
+    assert read_receipts.get_read_receipt_stats()["pending"] == 1
+
+    assert client.get(f"/api/rooms/{room_id}/messages").status_code == 200
+    assert read_receipts.get_read_receipt_stats()["pending"] == 0
+
+
+def test_message_read_event_is_validated_and_broadcast_batched(app):
+    from app import socketio
+
+    owner, member = app.test_client(), app.test_client()
+    _register(owner, "receipt_owner")
+    _register(member, "receipt_member")
+    _login(member, "receipt_member")
+    member_id = member.get("/api/me").json["user"]["id"]
+    _login(owner, "receipt_owner")
+    room_id = _create_room(owner, members=[member_id])
+
+    owner_socket = socketio.test_client(app, flask_test_client=owner)
+    member_socket = socketio.test_client(app, flask_test_client=member)
+    try:
+        owner_socket.emit("send_message", {"room_id": room_id, "content": "hi", "type": "text", "encrypted": False})
+        message_id = next(e["args"][0]["id"] for e in owner_socket.get_received() if e["name"] == "new_message")
+        owner_socket.get_received()
+
+        member_socket.emit("message_read", {"room_id": room_id, "message_id": message_id})
+        member_socket.emit("message_read", {"room_id": room_id, "message_id": message_id})
+        member_socket.emit("message_read", {"room_id": room_id, "message_id": message_id + 100})
+        receipts = [e["args"][0] for e in owner_socket.get_received() if e["name"] == "read_receipts"]
+        assert receipts == [{"room_id": room_id, "reads": [{"user_id": member_id, "message_id": message_id}]}]
+        assert _last_reads(app, room_id)[member_id] == message_id
+
+        stats = read_receipts.get_read_receipt_stats()
+        assert stats["reports"] == 3 and stats["reports_skipped"] == 1
+    finally:
+        member_socket.disconnect()
+        owner_socket.disconnect()
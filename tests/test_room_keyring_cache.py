@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+
+def _seed_room(app, member_count=5):
+    from app.models import create_room, get_db
+
+    with app.app_context():
+        conn = get_db()
+        for index in range(member_count):
+            conn.execute(
+                "INSERT INTO users (username, password_hash, nickname) VALUES (?, 'x', ?)",
+                (f"keyring_user_{index}", f"keyring_user_{index}"),
+            )
+        conn.commit()
+        member_ids = [row["id"] for row in conn.execute("SELECT id FROM users ORDER BY id").fetchall()]
+        room_id = create_room("keyring-room", "group", member_ids[0], member_ids)
+    return room_id, member_ids
+
+
+def _count_decryptions(monkeypatch):
+    from app.crypto_manager import CryptoManager
+
+    calls = []
+    original = CryptoManager.decrypt_room_key
+
+    def _counting(encrypted_key_b64):
+        calls.append(encrypted_key_b64)
+        return original(encrypted_key_b64)
+
+    monkeypatch.setattr(CryptoManager, "decrypt_room_key", staticmethod(_counting))
+    return calls
+
+
+def test_keyring_decrypted_once_per_version_across_members(app, monkeypatch):
+    from app.models import get_room_security_bundle, rotate_room_key
+
+    room_id, member_ids = _seed_room(app)
+    calls = _count_decryptions(monkeypatch)
+
+    with app.app_context():
+        rotation = rotate_room_key(room_id)
+        bundles = [get_room_security_bundle(room_id, user_id) for user_id in member_ids]
+
+    assert all(bundle["key_version"] == 2 for bundle in bundles)
+    assert all(bundle["encryption_key"] == rotation["encryption_key"] for bundle in bundles)
+    assert all(set(bundle["encryption_keys"]) == {"1", "2"} for bundle in bundles)
+    # one keyring computation: versions 1 and 2 decrypted once, not once per member
+    assert len(calls) == 2
+
+
+def test_rotation_invalidates_cached_keyring(app, monkeypatch):
+    from app.models import get_room_key, get_room_keyring, rotate_room_key
+
+    room_id, member_ids = _seed_room(app, member_count=2)
+
+    with app.app_context():
+        first_key = get_room_key(room_id)
+        assert get_room_keyring(room_id, user_id=member_ids[0]) == {"1": first_key}
+
+        rotation = rotate_room_key(room_id)
+        assert get_room_key(room_id) == rotation["encryption_key"] != first_key
+        assert get_room_keyring(room_id, user_id=member_ids[0]) == {"1": first_key, "2": rotation["encryption_key"]}
+
+
+def test_keyring_respects_member_joined_version(app):
+    from app.models import get_db, get_room_keyring, rotate_room_key
+
+    room_id, member_ids = _seed_room(app, member_count=2)
+
+    with app.app_context():
+        rotation = rotate_room_key(room_id)
+        conn = get_db()
+        conn.execute(
+            "UPDATE room_members SET joined_key_version = 2 WHERE room_id = ? AND user_id = ?",
+            (room_id, member_ids[1]),
+        )
+        conn.commit()
+
+        assert set(get_room_keyring(room_id, user_id=member_ids[0])) == {"1", "2"}
+        assert get_room_keyring(room_id, user_id=member_ids[1]) == {"2": rotation["encryption_key"]}
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import annotations
+
+from tests.test_feature_risk_review_plan import (
+    _create_room,
+    _create_socket_client,
+    _login,
+    _register,
+)
+
+
+def _user_ids(client, *usernames):
+    users = client.get("/api/users").json
+    by_name = {user["username"]: user["id"] for user in users}
+    return [by_name[name] for name in usernames]
+
+
+def _events(received, name):
+    return [(evt.get("args") or [{}])[0] for evt in received if evt.get("name") == name]
+
+
+def test_multi_user_invite_rotates_room_key_once(app):
+    owner = app.test_client()
+    _register(owner, "batch_owner")
+    for name in ("batch_a", "batch_b", "batch_c"):
+        _register(owner, name)
+    _login(owner, "batch_owner")
+    room_id = _create_room(owner, name="batch-room")
+    invitee_ids = _user_ids(owner, "batch_a", "batch_b", "batch_c")
+
+    sc_owner = _create_socket_client(app, owner)
+    try:
+        sc_owner.get_received()
+        response = owner.post(f"/api/rooms/{room_id}/members", json={"user_ids": invitee_ids})
+        assert response.status_code == 200
+        assert response.json["added_count"] == 3
+
+        security_events = _events(sc_owner.get_received(), "room_security_updated")
+        assert len(security_events) == 1
+        assert security_events[0]["key_version"] == 2
+    finally:
+        sc_owner.disconnect()
+
+    history = owner.get(f"/api/rooms/{room_id}/messages")
+    assert history.json["key_version"] == 2
+
+    again = owner.post(f"/api/rooms/{room_id}/members", json={"user_ids": invitee_ids})
+    assert again.status_code == 400
+    assert owner.get(f"/api/rooms/{room_id}/messages").json["key_version"] == 2
+
+
+def test_batch_endpoint_adds_and_removes_with_single_rotation(app):
+    owner = app.test_client()
+    member = app.test_client()
+    _register(owner, "mix_owner")
+    for name in ("mix_keep", "mix_kick1", "mix_kick2", "mix_new"):
+        _register(owner, name)
+    _login(owner, "mix_owner")
+    keep_id, kick1_id, kick2_id, new_id = _user_ids(owner, "mix_keep", "mix_kick1", "mix_kick2", "mix_new")
+    room_id = _create_room(owner, members=[keep_id, kick1_id, kick2_id], name="mix-room")
+    _login(member, "mix_keep")
+
+    sc_keep = _create_socket_client(app, member)
+    try:
+        sc_keep.get_received()
+        forbidden = member.post(f"/api/rooms/{room_id}/members/batch", json={"remove_user_ids": [kick1_id]})
+        assert forbidden.status_code == 403
+
+        response = owner.post(
+            f"/api/rooms/{room_id}/members/batch",
+            json={"add_user_ids": [new_id], "remove_user_ids": [kick1_id, kick2_id]},
+        )
+        assert response.status_code == 200
+        assert response.json["added_user_ids"] == [new_id]
+        assert sorted(response.json["removed_user_ids"]) == sorted([kick1_id, kick2_id])
+        assert response.json["key_version"] == 2
+
+        security_events = _events(sc_keep.get_received(), "room_security_updated")
+        assert len(security_events) == 1
+        assert security_events[0]["key_version"] == 2
+        assert security_events[0]["member_key_version"] == 1
+    finally:
+        sc_keep.disconnect()
+
+    member_ids = {m["id"] for m in owner.get(f"/api/rooms/{room_id}/info").json["members"]}
+    assert new_id in member_ids
+    assert kick1_id not in member_ids and kick2_id not in member_ids
+
+
+def test_account_deletion_rotates_in_transaction_and_defers_only_the_push(app, monkeypatch):
+    owner = app.test_client()
+    leaver = app.test_client()
+    _register(owner, "defer_owner")
+    _register(owner, "defer_a")
+    _login(owner, "defer_owner")
+    _login(leaver, "defer_a")
+    (a_id,) = _user_ids(owner, "defer_a")
+    room_id = _create_room(owner, members=[a_id], name="defer-room")
+
+    import app.services.room_key_rotation as room_key_rotation
+
+    scheduled = []
+    pushed = []
+
+    class _FakeSocketIO:
+        def start_background_task(self, target, *args):
+            scheduled.append((target, args))
+
+    monkeypatch.setattr(room_key_rotation, "get_socketio", lambda: _FakeSocketIO())
+    monkeypatch.setattr(room_key_rotation, "emit_room_security_updated", lambda rid, ids: pushed.append((rid, ids)))
+    monkeypatch.setitem(app.config, "TESTING", False)
+    monkeypatch.setitem(app.config, "ROOM_KEY_ROTATION_DEFER_SECONDS", 5)
+
+    assert leaver.delete("/api/me", json={"password": "Password123!"}).json["success"] is True
+    # rotated before any deferred flush runs: a crash here cannot keep the old key current
+    assert owner.get(f"/api/rooms/{room_id}/messages").json["key_version"] == 2
+    assert len(scheduled) == 1 and pushed == []
+
+    with app.app_context():
+        room_key_rotation.defer_room_security_push([room_id])
+        assert len(scheduled) == 1
+        assert room_key_rotation.flush_deferred_room_security_pushes() == 1
+        assert room_key_rotation.flush_deferred_room_security_pushes() == 0
+    monkeypatch.setattr(room_key_rotation, "_flush_scheduled", False)
+
+    assert len(pushed) == 1 and pushed[0][0] == room_id
+    assert owner.get(f"/api/rooms/{room_id}/messages").json["key_version"] == 2
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+import app.services.socket_admission as admission
+from tests.test_feature_risk_review_plan import _login, _register
+
+
+def test_token_bucket_and_capacity_refusals_carry_jittered_retry():
+    config = {"SOCKET_CONNECT_RATE_PER_SECOND": 2, "SOCKET_CONNECT_BURST": 2, "MAX_CONNECTIONS": 3, "SOCKET_RETRY_AFTER_SECONDS": 5}
+
+    assert admission.admit_connection(config, 0, now=100.0) is None
+    assert admission.admit_connection(config, 1, now=100.0) is None
+    refused = admission.admit_connection(config, 2, now=100.0)
+    assert refused["code"] == "rate_limited" and 0.5 <= refused["retry_after"] <= 1.0
+    # half a second refills one token at 2/s
+    assert admission.admit_connection(config, 2, now=100.5) is None
+
+    busy = admission.admit_connection(config, 3, now=200.0)
+    assert busy["code"] == "server_busy" and 5 <= busy["retry_after"] <= 10
+
+    stats = admission.get_admission_stats()
+    assert (stats["admitted"], stats["refused_rate"], stats["refused_capacity"]) == (3, 1, 1)
+
+
+def test_connection_cap_refuses_then_admits_after_disconnect(app, monkeypatch):
+    from socketio import packet
+
+    from app import socketio
+
+    connect_errors = []
+
+    class _RecordingPacket(socketio.server.packet_class):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            if self.packet_type == packet.CONNECT_ERROR:
+                connect_errors.append(self.data)
+
+    monkeypatch.setattr(socketio.server, "packet_class", _RecordingPacket)
+
+    app.config.update(MAX_CONNECTIONS=1, SOCKET_RECONNECT_DELAY_MS=2000)
+    first, second = app.test_client(), app.test_client()
+    _register(first, "admit_first")
+    _register(second, "admit_second")
+    _login(first, "admit_first")
+    _login(second, "admit_second")
+
+    first_socket = socketio.test_client(app, flask_test_client=first)
+    assert first_socket.is_connected()
+    policy = next(e["args"][0] for e in first_socket.get_received() if e["name"] == "connection_policy")
+    assert policy["reconnect_delay_ms"] == 2000 and policy["randomization_factor"] == 0.5
+
+    refused = socketio.test_client(app, flask_test_client=second)
+    assert not refused.is_connected()
+    assert admission.get_admission_stats()["refused_capacity"] == 1
+    # the client reads the refusal from connect_error.data
+    assert len(connect_errors) == 1
+    refusal = connect_errors[0]["data"]
+    assert refusal["code"] == "server_busy" and refusal["retry_after"] >= 1
+    assert connect_errors[0]["message"] == refusal["message"]
+
+    first_socket.disconnect()
+    second_socket = socketio.test_client(app, flask_test_client=second)
+    try:
+        assert second_socket.is_connected()
+    finally:
+        second_socket.disconnect()
+
+
+def test_outbound_queue_limit_closes_slow_consumer(app, monkeypatch):
+    from app import socketio
+
+    eio = socketio.server.eio
+    monkeypatch.setattr(eio, "create_queue", eio.create_queue)
+    assert admission.install_outbound_queue_limit(socketio, 3)
+
+    closed = []
+
+    class _SlowSocket:
+        def __init__(self):
+            self.queue = eio.create_queue()
+
+        def close(self, wait=True, abort=False, reason=None):
+            closed.append((wait, abort))
+
+    slow = _SlowSocket()
+    monkeypatch.setitem(eio.sockets, "slow-sid", slow)
+    monkeypatch.setattr(eio, "start_background_task", lambda fn, *args: fn(*args))
+
+    for i in range(5):
+        slow.queue.put(f"packet-{i}")
+
+    assert closed == [(False, True)]
+    assert "slow-sid" not in eio.sockets
+    assert slow.queue.qsize() == 0
+    slow.queue.put(None)
+    assert slow.queue.qsize() == 1
+    stats = admission.get_admission_stats()
+    assert stats["packets_dropped"] == 2 and stats["slow_consumers_closed"] == 1
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import annotations
+
+import gzip
+import os
+import shutil
+
+import pytest
+
+
+@pytest.fixture
+def precompressed_static(app):
+    from app.services.asset_bundles import precompress_static
+    from app.services.compression_stats import reset_compression_stats
+    from tests._temp_paths import make_temp_dir
+
+    static_dir = make_temp_dir(prefix="static-")
+    shutil.copytree(os.path.join(app.static_folder, "css"), os.path.join(static_dir, "css"))
+    assert precompress_static(static_dir, brotli_quality=5) >= 1
+    app.static_folder = static_dir
+    reset_compression_stats()
+    yield static_dir
+    shutil.rmtree(static_dir, ignore_errors=True)
+
+
+def test_static_file_served_from_precompressed_sibling_with_strong_etag(client, precompressed_static):
+    from app.services.compression_stats import get_compression_stats
+
+    with open(os.path.join(precompressed_static, "css", "features.css"), "rb") as handle:
+        raw = handle.read()
+
+    response = client.get("/static/css/features.css", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.get_data()) == raw
+    etag = response.headers["ETag"]
+    assert not etag.startswith("W/") and etag.endswith('-gzip"')
+
+    revalidated = client.get(
+        "/static/css/features.css",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": etag},
+    )
+    assert revalidated.status_code == 304
+
+    plain = client.get("/static/css/features.css", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.get_data() == raw
+    assert plain.headers["ETag"] != etag
+
+    stats = get_compression_stats()
+    assert stats["precompressed"]["responses"] == 1
+    assert stats["precompressed"]["bytes_saved"] == len(raw) - len(response.get_data())
+    assert stats["dynamic"]["responses"] == 0
+
+
+def test_stale_sibling_is_ignored(client, precompressed_static):
+    css_path = os.path.join(precompressed_static, "css", "features.css")
+    with open(css_path, "ab") as handle:
+        handle.write(b"\n/* edited after build */\n")
+    future = os.stat(css_path + ".gz").st_mtime + 5
+    os.utime(css_path, (future, future))
+
+    response = client.get("/static/css/features.css", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert response.get_data().endswith(b"/* edited after build */\n")
+
+
+def test_dynamic_json_compression_honors_threshold_and_is_metered(app, client):
+    from app.services.compression_stats import get_compression_stats, reset_compression_stats
+
+    reset_compression_stats()
+    small = client.get("/api/config", headers={"Accept-Encoding": "gzip"})
+    assert small.status_code == 200
+    assert "Content-Encoding" not in small.headers
+
+    app.config["COMPRESS_MIN_SIZE_BY_MIMETYPE"] = {"application/json": 16}
+    large = client.get("/api/config", headers={"Accept-Encoding": "gzip"})
+    assert large.headers["Content-Encoding"] == "gzip"
+
+    stats = get_compression_stats()
+    assert stats["skipped"]["below_threshold"] >= 1
+    json_stats = stats["dynamic_by_mimetype"]["application/json"]
+    assert json_stats["responses"] == 1
+    assert json_stats["bytes_out"] == len(large.get_data())
+    assert json_stats["cpu_ms"] >= 0
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import pytest
+
+import app.services.typing_indicators as typing_indicators
+from tests.test_feature_risk_review_plan import _create_room, _login, _register
+
+
+@pytest.fixture
+def snapshots(monkeypatch):
+    sent = []
+    monkeypatch.setattr(
+        typing_indicators, "emit_room_typers", lambda room_id, typers, node: sent.append((room_id, typers))
+    )
+    return sent
+
+
+def test_reports_coalesce_into_changed_snapshots(snapshots, monkeypatch):
+    # flush only when the test says so, as the interval loop would
+    monkeypatch.setattr(typing_indicators, "_schedule_flush", lambda inline: None)
+    now = time.time()
+
+    for _ in range(10):
+        typing_indicators.record_typing(7, 1, "가", True, now=now)
+    for _ in range(5):
+        typing_indicators.record_typing(7, 2, "나", True, now=now)
+    assert typing_indicators.flush_typing(now=now) == 1
+    assert snapshots == [(7, [{"user_id": 1, "nickname": "가"}, {"user_id": 2, "nickname": "나"}])]
+
+    # refreshes and a stop/start inside one interval send nothing
+    typing_indicators.record_typing(7, 1, "가", True, now=now + 1)
+    typing_indicators.record_typing(7, 2, "나", False, now=now + 1)
+    typing_indicators.record_typing(7, 2, "나", True, now=now + 1)
+    assert typing_indicators.flush_typing(now=now + 1) == 0
+
+    # 2 was refreshed at +1, 1 at +1 too; nobody refreshes after that.
+    # Half a TTL after the last frame the unchanged snapshot is repeated as a keepalive.
+    assert typing_indicators.flush_typing(now=now + 5.5) == 1
+    assert snapshots[-1] == snapshots[0]
+    assert typing_indicators.flush_typing(now=now + 6.5) == 1
+    assert snapshots[-1] == (7, [])
+
+    stats = typing_indicators.get_typing_stats()
+    assert stats["reports"] == 18 and stats["snapshots_sent"] == 3
+    assert stats["frames_saved"] == 15 and stats["expired"] == 2
+    assert stats["active_rooms"] == 0
+
+
+def test_typing_socket_event_broadcasts_room_snapshot(app):
+    from app import socketio
+
+    alice, bob = app.test_client(), app.test_client()
+    _register(alice, "typing_alice", nickname="앨리스")
+    _register(bob, "typing_bob")
+    _login(bob, "typing_bob")
+    bob_id = bob.get("/api/me").json["user"]["id"]
+    _login(alice, "typing_alice")
+    alice_id = alice.get("/api/me").json["user"]["id"]
+    room_id = _create_room(alice, members=[bob_id])
+    other_room = _create_room(alice, members=[])
+
+    alice_socket = socketio.test_client(app, flask_test_client=alice)
+    bob_socket = socketio.test_client(app, flask_test_client=bob)
+    try:
+        bob_socket.get_received()
+
+        def _typers():
+            return [e["args"][0] for e in bob_socket.get_received() if e["name"] == "room_typers"]
+
+        alice_socket.emit("typing", {"room_id": room_id, "is_typing": True})
+        alice_socket.emit("typing", {"room_id": room_id, "is_typing": True})
+        snapshot = _typers()
+        node = typing_indicators._node_id
+        assert snapshot == [{"room_id": room_id, "node": node, "typers": [{"user_id": alice_id, "nickname": "앨리스"}]}]
+
+        # bob is not in this room: no report is accepted from him
+        bob_socket.emit("typing", {"room_id": other_room, "is_typing": True})
+        assert typing_indicators.get_typing_stats()["reports"] == 2
+
+        alice_socket.disconnect()
+        assert _typers() == [{"room_id": room_id, "node": node, "typers": []}]
+    finally:
+        bob_socket.disconnect()
+        if alice_socket.is_connected():
+            alice_socket.disconnect()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+
+def _register(client, username, password="Password123!"):
+    response = client.post("/api/register", json={"username": username, "password": password, "nickname": username})
+    assert response.status_code == 200
+
+
+def _login(client, username, password="Password123!"):
+    response = client.post("/api/login", json={"username": username, "password": password})
+    assert response.status_code == 200
+
+
+def _setup_room_file(app, client, username, payload=b"0123456789" * 100, file_path="report.pdf"):
+    from app.models import add_room_file
+
+    _register(client, username)
+    _login(client, username)
+    room = client.post("/api/rooms", json={"name": f"{username}-room", "members": []}).json
+    me = client.get("/api/me").json["user"]
+
+    with open(os.path.join(app.config["UPLOAD_FOLDER"], file_path), "wb") as handle:
+        handle.write(payload)
+    with app.app_context():
+        add_room_file(room["room_id"], uploaded_by=me["id"], file_path=file_path, file_name="보고서.pdf", file_type="file")
+    return room["room_id"], payload
+
+
+def test_download_etag_is_file_metadata_and_revalidates(app, client):
+    _room_id, _payload = _setup_room_file(app, client, "dl_etag")
+    stat = os.stat(os.path.join(app.config["UPLOAD_FOLDER"], "report.pdf"))
+
+    first = client.get("/uploads/report.pdf")
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    assert first.headers["ETag"] == f'"{stat.st_size:x}-{stat.st_mtime_ns:x}-{stat.st_ino:x}"'
+
+    second = client.get("/uploads/report.pdf", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 304
+    assert second.data == b""
+
+
+def test_download_supports_range_requests(app, client):
+    _room_id, payload = _setup_room_file(app, client, "dl_range")
+
+    response = client.get("/uploads/report.pdf", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.headers["Content-Range"] == f"bytes 10-19/{len(payload)}"
+    assert response.data == payload[10:20]
+
+
+def test_download_authorization_is_cached_and_invalidated_on_leave(app, client, monkeypatch):
+    room_id, _payload = _setup_room_file(app, client, "dl_authz")
+    assert client.get("/uploads/report.pdf").status_code == 200
+
+    import app.http.uploads as uploads_module
+
+    original_is_member = uploads_module.is_room_member
+    calls = []
+
+    def _counting_is_member(*args, **kwargs):
+        calls.append(args)
+        return original_is_member(*args, **kwargs)
+
+    monkeypatch.setattr(uploads_module, "is_room_member", _counting_is_member)
+    assert client.get("/uploads/report.pdf").status_code == 200
+    assert calls == []
+
+    assert client.post(f"/api/rooms/{room_id}/leave").json["left"] is True
+    assert client.get("/uploads/report.pdf").status_code == 403
+
+
+def test_download_authorization_is_dropped_on_kick_without_socket_event(app, client, monkeypatch):
+    room_id, _payload = _setup_room_file(app, client, "dl_kick")
+    assert client.get("/uploads/report.pdf").status_code == 200
+
+    import app.services.socket_broadcasts as socket_broadcasts
+    from app.models import kick_member
+
+    # no emit path runs; the model call alone must revoke the cached grant
+    monkeypatch.setattr(socket_broadcasts, "invalidate_file_access", lambda *args, **kwargs: None)
+    me = client.get("/api/me").json["user"]
+    with app.app_context():
+        assert kick_member(room_id, me["id"]) is True
+    assert client.get("/uploads/report.pdf").status_code == 403
+
+
+def test_download_x_accel_redirect_offload(app, client):
+    _room_id, payload = _setup_room_file(app, client, "dl_accel")
+    app.config["UPLOAD_SENDFILE_MODE"] = "x-accel"
+    app.config["UPLOAD_ACCEL_REDIRECT_PREFIX"] = "/_protected_uploads/"
+
+    response = client.get("/uploads/report.pdf")
+    assert response.status_code == 200
+    assert response.headers["X-Accel-Redirect"] == "/_protected_uploads/report.pdf"
+    assert response.data == b""
+    assert response.mimetype == "application/pdf"
+    assert response.headers["Content-Disposition"].startswith("attachment;")
+    assert "filename*=UTF-8''%EB%B3%B4%EA%B3%A0%EC%84%9C.pdf" in response.headers["Content-Disposition"]
+
+    cached = client.get("/uploads/report.pdf", headers={"If-None-Match": response.headers["ETag"]})
+    assert cached.status_code == 304
+    assert "X-Accel-Redirect" not in cached.headers
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+
+def _register(client, username, password="Password123!"):
+    response = client.post("/api/register", json={"username": username, "password": password, "nickname": username})
+    assert response.status_code == 200
+
+
+def _login(client, username, password="Password123!"):
+    response = client.post("/api/login", json={"username": username, "password": password})
+    assert response.status_code == 200
+
+
+def _create_room(client, name="scan-push-room"):
+    response = client.post("/api/rooms", json={"name": name, "members": []})
+    assert response.status_code == 200
+    return response.json["room_id"]
+
+
+def _create_job(app, room_id, file_name, payload=b"pushed payload"):
+    import app.upload_scan as upload_scan
+
+    temp_abs_path = os.path.join(app.config["UPLOAD_QUARANTINE_FOLDER"], file_name)
+    with open(temp_abs_path, "wb") as handle:
+        handle.write(payload)
+
+    with app.app_context():
+        return upload_scan.create_scan_job(
+            user_id=1,
+            room_id=room_id,
+            temp_path=f"quarantine/{file_name}",
+            final_path=file_name,
+            file_name=file_name,
+            file_type="file",
+            file_size=len(payload),
+        )
+
+
+def _scan_events(socket_client):
+    return [evt for evt in socket_client.get_received() if evt["name"] == "upload_scan_completed"]
+
+
+def test_scan_worker_pushes_clean_result_to_uploader(app, client, monkeypatch):
+    _register(client, "scan_push_clean")
+    _login(client, "scan_push_clean")
+    room_id = _create_room(client)
+
+    import app.upload_scan as upload_scan
+    from app import socketio
+
+    monkeypatch.setattr(upload_scan, "get_scanner_signature_version", lambda app: "ClamAV 1.0.1/27000")
+    monkeypatch.setattr(upload_scan, "_scan_with_clamav", lambda *args, **kwargs: (True, "clean"))
+    monkeypatch.setattr(upload_scan, "_app_ref", app)
+
+    socket_client = socketio.test_client(app, flask_test_client=client)
+    assert socket_client.is_connected()
+    try:
+        socket_client.get_received()
+        job_id = _create_job(app, room_id, "push-clean.txt")
+        upload_scan._process_job(job_id)
+
+        events = _scan_events(socket_client)
+        assert len(events) == 1
+        pushed = events[0]["args"][0]
+        assert pushed["job_id"] == job_id
+        assert pushed["scan_status"] == "clean"
+        assert pushed["upload_token"]
+        assert pushed["file_path"] == "push-clean.txt"
+
+        polled = client.get(f"/api/upload/jobs/{job_id}")
+        assert polled.status_code == 200
+        assert polled.json == pushed
+
+        # 이미 처리된 작업은 다시 push 되지 않는다.
+        upload_scan._process_job(job_id)
+        assert _scan_events(socket_client) == []
+    finally:
+        socket_client.disconnect()
+
+
+def test_scan_worker_pushes_infected_result(app, client, monkeypatch):
+    _register(client, "scan_push_infected")
+    _login(client, "scan_push_infected")
+    room_id = _create_room(client)
+
+    import app.upload_scan as upload_scan
+    from app import socketio
+
+    monkeypatch.setattr(upload_scan, "get_scanner_signature_version", lambda app: "ClamAV 1.0.1/27000")
+    monkeypatch.setattr(
+        upload_scan,
+        "_scan_with_clamav",
+        lambda *args, **kwargs: (False, "stream: Eicar-Test-Signature FOUND"),
+    )
+    monkeypatch.setattr(upload_scan, "_app_ref", app)
+
+    socket_client = socketio.test_client(app, flask_test_client=client)
+    assert socket_client.is_connected()
+    try:
+        socket_client.get_received()
+        job_id = _create_job(app, room_id, "push-infected.txt")
+        upload_scan._process_job(job_id)
+
+        events = _scan_events(socket_client)
+        assert len(events) == 1
+        pushed = events[0]["args"][0]
+        assert pushed["scan_status"] == "infected"
+        assert "upload_token" not in pushed
+        assert "FOUND" in pushed["error"]
+    finally:
+        socket_client.disconnect()
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+import io
+import os
+
+
+def _register(client, username, password="Password123!"):
+    response = client.post("/api/register", json={"username": username, "password": password, "nickname": username})
+    assert response.status_code == 200
+
+
+def _login(client, username, password="Password123!"):
+    response = client.post("/api/login", json={"username": username, "password": password})
+    assert response.status_code == 200
+
+
+def _create_room(client, name="scan-cache-room"):
+    response = client.post("/api/rooms", json={"name": name, "members": []})
+    assert response.status_code == 200
+    return response.json["room_id"]
+
+
+def _enable_scan(monkeypatch, signature_version="ClamAV 1.0.1/27000"):
+    import app.routes as routes
+    import app.upload_scan as upload_scan
+
+    monkeypatch.setattr(routes, "is_scan_enabled", lambda app: True)
+    monkeypatch.setattr(upload_scan, "get_scanner_signature_version", lambda app: signature_version)
+
+
+def _upload(client, room_id, data, filename="report.txt"):
+    return client.post(
+        "/api/upload",
+        data={"room_id": str(room_id), "file": (io.BytesIO(data), filename)},
+        content_type="multipart/form-data",
+    )
+
+
+def test_cached_clean_verdict_issues_token_without_scan_job(app, client, monkeypatch):
+    _register(client, "scan_cache_clean")
+    _login(client, "scan_cache_clean")
+    room_id = _create_room(client)
+    _enable_scan(monkeypatch)
+
+    import hashlib
+
+    import app.routes as routes
+    from app.upload_scan import record_scan_verdict
+
+    payload = b"same installer bytes"
+    with app.app_context():
+        record_scan_verdict(hashlib.sha256(payload).hexdigest(), "ClamAV 1.0.1/27000", "clean", "clean")
+
+    def _unexpected_job(**kwargs):
+        raise AssertionError("scan job must not be created for a cached clean verdict")
+
+    monkeypatch.setattr(routes, "create_scan_job", _unexpected_job)
+
+    response = _upload(client, room_id, payload)
+    assert response.status_code == 200
+    assert response.json["scan_status"] == "clean"
+    assert response.json["scan_cached"] is True
+    assert response.json["upload_token"]
+    assert os.path.isfile(os.path.join(app.config["UPLOAD_FOLDER"], response.json["file_path"]))
+
+
+def test_cached_infected_verdict_rejects_upload(app, client, monkeypatch):
+    _register(client, "scan_cache_infected")
+    _login(client, "scan_cache_infected")
+    room_id = _create_room(client)
+    _enable_scan(monkeypatch)
+
+    import hashlib
+
+    import app.routes as routes
+    from app.upload_scan import record_scan_verdict
+
+    payload = b"X5O!P%@AP[4\\PZX54(P^)7CC)7}$EICAR"
+    with app.app_context():
+        record_scan_verdict(
+            hashlib.sha256(payload).hexdigest(),
+            "ClamAV 1.0.1/27000",
+            "infected",
+            "stream: Eicar-Test-Signature FOUND",
+        )
+    monkeypatch.setattr(routes, "create_scan_job", lambda **kwargs: "job-should-not-exist")
+
+    response = _upload(client, room_id, payload)
+    assert response.status_code == 400
+    assert response.json["scan_status"] == "infected"
+    assert "job_id" not in response.json
+    assert os.listdir(app.config["UPLOAD_QUARANTINE_FOLDER"]) == []
+
+
+def test_signature_version_change_misses_cache(app, client, monkeypatch):
+    _register(client, "scan_cache_sigver")
+    _login(client, "scan_cache_sigver")
+    room_id = _create_room(client)
+    _enable_scan(monkeypatch, signature_version="ClamAV 1.0.1/27001")
+
+    import hashlib
+
+    import app.routes as routes
+    from app.upload_scan import record_scan_verdict
+
+    payload = b"report from last week"
+    with app.app_context():
+        record_scan_verdict(hashlib.sha256(payload).hexdigest(), "ClamAV 1.0.1/27000", "clean", "clean")
+
+    created = {}
+
+    def _capture_job(**kwargs):
+        created.update(kwargs)
+        return "job-new-signatures"
+
+    monkeypatch.setattr(routes, "create_scan_job", _capture_job)
+
+    response = _upload(client, room_id, payload)
+    assert response.status_code == 200
+    assert response.json["scan_status"] == "pending"
+    assert created["content_sha256"] == hashlib.sha256(payload).hexdigest()
+    assert created["signature_version"] == "ClamAV 1.0.1/27001"
+
+
+def test_scan_worker_records_verdict(app, monkeypatch):
+    import app.upload_scan as upload_scan
+
+    monkeypatch.setattr(upload_scan, "get_scanner_signature_version", lambda app: "ClamAV 1.0.1/27000")
+    monkeypatch.setattr(upload_scan, "_scan_with_clamav", lambda *args, **kwargs: (True, "clean"))
+    monkeypatch.setattr(upload_scan, "_app_ref", app)
+
+    quarantine = app.config["UPLOAD_QUARANTINE_FOLDER"]
+    temp_abs_path = os.path.join(quarantine, "worker-file.txt")
+    with open(temp_abs_path, "wb") as handle:
+        handle.write(b"worker payload")
+
+    with app.app_context():
+        from app.models import get_db
+
+        conn = get_db()
+        conn.execute("INSERT INTO users (username, password_hash, nickname) VALUES ('scan_worker', 'x', 'scan_worker')")
+        conn.execute("INSERT INTO rooms (name, type, created_by) VALUES ('worker-room', 'group', 1)")
+        conn.commit()
+
+        job_id = upload_scan.create_scan_job(
+            user_id=1,
+            room_id=1,
+            temp_path="quarantine/worker-file.txt",
+            final_path="worker-file.txt",
+            file_name="worker-file.txt",
+            file_type="file",
+            file_size=14,
+        )
+
+    upload_scan._process_job(job_id)
+
+    with app.app_context():
+        job = upload_scan.get_scan_job(job_id)
+        assert job["status"] == "clean"
+        content_sha256 = upload_scan.compute_file_sha256(os.path.join(app.config["UPLOAD_FOLDER"], "worker-file.txt"))
+        verdict = upload_scan.get_scan_verdict(content_sha256, "ClamAV 1.0.1/27000")
+        assert verdict == {"verdict": "clean", "result": "clean"}
+
+
+def test_scan_worker_records_verdict_under_pre_scan_signature_version(app, monkeypatch):
+    import app.upload_scan as upload_scan
+
+    versions = {"current": "ClamAV 1.0.1/27000"}
+
+    def _scan_during_signature_reload(*args, **kwargs):
+        # clamd finishes loading new signatures while this scan runs on the old ones
+        versions["current"] = "ClamAV 1.0.1/27001"
+        return True, "clean"
+
+    monkeypatch.setattr(upload_scan, "get_scanner_signature_version", lambda app: versions["current"])
+    monkeypatch.setattr(upload_scan, "_scan_with_clamav", _scan_during_signature_reload)
+    monkeypatch.setattr(upload_scan, "_app_ref", app)
+
+    quarantine = app.config["UPLOAD_QUARANTINE_FOLDER"]
+    with open(os.path.join(quarantine, "reload-file.txt"), "wb") as handle:
+        handle.write(b"reload payload")
+
+    with app.app_context():
+        from app.models import get_db
+
+        conn = get_db()
+        conn.execute("INSERT INTO users (username, password_hash, nickname) VALUES ('scan_reload', 'x', 'scan_reload')")
+        conn.execute("INSERT INTO rooms (name, type, created_by) VALUES ('reload-room', 'group', 1)")
+        conn.commit()
+
+        job_id = upload_scan.create_scan_job(
+            user_id=1,
+            room_id=1,
+            temp_path="quarantine/reload-file.txt",
+            final_path="reload-file.txt",
+            file_name="reload-file.txt",
+            file_type="file",
+            file_size=14,
+        )
+
+    upload_scan._process_job(job_id)
+
+    with app.app_context():
+        assert upload_scan.get_scan_job(job_id)["status"] == "clean"
+        content_sha256 = upload_scan.compute_file_sha256(os.path.join(app.config["UPLOAD_FOLDER"], "reload-file.txt"))
+        assert upload_scan.get_scan_verdict(content_sha256, "ClamAV 1.0.1/27000") == {"verdict": "clean", "result": "clean"}
+        assert upload_scan.get_scan_verdict(content_sha256, "ClamAV 1.0.1/27001") is None
+
+
+def test_signature_version_lookup_failure_is_cached_briefly(app, monkeypatch):
+    import app.upload_scan as upload_scan
+
+    calls = []
+    monkeypatch.setattr(upload_scan, "_query_clamav_version", lambda **kwargs: calls.append(kwargs) or None)
+    monkeypatch.setitem(upload_scan._signature_version_cache, "value", None)
+    monkeypatch.setitem(upload_scan._signature_version_cache, "failed_at", 0.0)
+    monkeypatch.setitem(upload_scan._signature_version_cache, "fetched_at", 0.0)
+
+    assert upload_scan.get_scanner_signature_version(app) is None
+    assert upload_scan.get_scanner_signature_version(app) is None
+    assert len(calls) == 1
+
+    # once the failure ages out, clamd is asked again
+    upload_scan._signature_version_cache["failed_at"] -= upload_scan._SIGNATURE_VERSION_FAILURE_TTL_SECONDS
+    monkeypatch.setattr(upload_scan, "_query_clamav_version", lambda **kwargs: "ClamAV 1.0.1/27001")
+    assert upload_scan.get_scanner_signature_version(app) == "ClamAV 1.0.1/27001"
+    assert upload_scan._signature_version_cache["failed_at"] == 0.0
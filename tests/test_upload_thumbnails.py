@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+import io
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+
+
+def _register(client, username, password="Password123!"):
+    response = client.post("/api/register", json={"username": username, "password": password, "nickname": username})
+    assert response.status_code == 200
+
+
+def _login(client, username, password="Password123!"):
+    response = client.post("/api/login", json={"username": username, "password": password})
+    assert response.status_code == 200
+
+
+def _create_room(client, name="thumb-room"):
+    response = client.post("/api/rooms", json={"name": name, "members": []})
+    assert response.status_code == 200
+    return response.json["room_id"]
+
+
+def _png_bytes(size=(1200, 800)):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _send_image(app, client, room_id):
+    from app import socketio
+
+    upload = client.post(
+        "/api/upload",
+        data={"room_id": str(room_id), "file": (io.BytesIO(_png_bytes()), "photo.png")},
+        content_type="multipart/form-data",
+    )
+    assert upload.status_code == 200
+    socket_client = socketio.test_client(app, flask_test_client=client)
+    try:
+        socket_client.emit(
+            "send_message",
+            {
+                "room_id": room_id,
+                "content": "photo.png",
+                "type": "image",
+                "upload_token": upload.json["upload_token"],
+                "file_path": upload.json["file_path"],
+                "file_name": "photo.png",
+                "encrypted": False,
+            },
+        )
+        events = [evt for evt in socket_client.get_received() if evt["name"] == "new_message"]
+    finally:
+        socket_client.disconnect()
+    assert len(events) == 1
+    return upload.json["file_path"], events[0]["args"][0]
+
+
+def test_image_message_gets_thumbnails_with_immutable_cache(app, client):
+    _register(client, "thumb_owner")
+    _login(client, "thumb_owner")
+    room_id = _create_room(client)
+
+    file_path, message = _send_image(app, client, room_id)
+    assert set(message["thumbnails"]) == {"sm", "md"}
+
+    thumb_abs = os.path.join(app.config["UPLOAD_FOLDER"], "thumbs", "sm", f"{file_path}.webp")
+    assert os.path.isfile(thumb_abs)
+
+    response = client.get(message["thumbnails"]["sm"])
+    assert response.status_code == 200
+    assert response.mimetype == "image/webp"
+    assert "immutable" in response.headers["Cache-Control"]
+
+    from PIL import Image
+
+    with Image.open(io.BytesIO(response.data)) as thumb:
+        assert max(thumb.size) == 160
+
+    history = client.get(f"/api/rooms/{room_id}/messages")
+    assert history.status_code == 200
+    image_messages = [m for m in history.json["messages"] if m["message_type"] == "image"]
+    assert image_messages[0]["thumbnails"] == message["thumbnails"]
+
+    files = client.get(f"/api/rooms/{room_id}/files")
+    assert files.json[0]["thumbnails"] == message["thumbnails"]
+
+
+def test_thumbnail_requires_room_membership(app, client):
+    _register(client, "thumb_member")
+    _register(client, "thumb_outsider")
+    _login(client, "thumb_member")
+    room_id = _create_room(client, name="thumb-private")
+    _file_path, message = _send_image(app, client, room_id)
+
+    client.post("/api/logout")
+    _login(client, "thumb_outsider")
+    response = client.get(message["thumbnails"]["md"])
+    assert response.status_code == 403
+
+
+def test_missing_thumbnail_falls_back_to_original_without_caching(app, client):
+    _register(client, "thumb_fallback")
+    _login(client, "thumb_fallback")
+    room_id = _create_room(client, name="thumb-fallback")
+    file_path, message = _send_image(app, client, room_id)
+
+    thumb_abs = os.path.join(app.config["UPLOAD_FOLDER"], "thumbs", "md", f"{file_path}.webp")
+    os.remove(thumb_abs)
+
+    response = client.get(message["thumbnails"]["md"])
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "private, no-store"
+    assert response.mimetype == "image/png"
+    # 누락된 썸네일은 요청 시 다시 생성된다.
+    assert os.path.isfile(thumb_abs)
+
+
+def test_purge_orphan_thumbnails_removes_variants_without_source(app, client):
+    _register(client, "thumb_purge")
+    _login(client, "thumb_purge")
+    room_id = _create_room(client, name="thumb-purge")
+    file_path, _message = _send_image(app, client, room_id)
+
+    from app.thumbnails import purge_orphan_thumbnails
+
+    upload_root = app.config["UPLOAD_FOLDER"]
+    assert purge_orphan_thumbnails(upload_root) == 0
+    os.remove(os.path.join(upload_root, file_path))
+    assert purge_orphan_thumbnails(upload_root) == 2
+    assert not os.path.exists(os.path.join(upload_root, "thumbs", "sm", f"{file_path}.webp"))
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+import app.models.users as users_model
+
+
+@pytest.fixture
+def user_ids(app):
+    with app.app_context():
+        return [users_model.create_user(f"cache_u{i}", "Password123!", f"캐시{i}") for i in range(4)]
+
+
+def _trace_user_queries(conn):
+    statements = []
+    conn.set_trace_callback(lambda sql: statements.append(sql) if "FROM users WHERE id" in sql else None)
+    return statements
+
+
+def test_batch_loads_only_misses_in_one_query(app, user_ids):
+    from app.models.base import get_db
+
+    with app.app_context():
+        conn = get_db()
+        statements = _trace_user_queries(conn)
+        try:
+            assert users_model.get_user_by_id_cached(user_ids[0])["nickname"] == "캐시0"
+            found = users_model.get_users_by_ids(user_ids + [999999])
+            assert sorted(found) == sorted(user_ids)
+            assert users_model.get_users_by_ids(user_ids)[user_ids[3]]["username"] == "cache_u3"
+        finally:
+            conn.set_trace_callback(None)
+
+    # one query for the single miss, one IN query for the other three (+ the unknown id), then none
+    assert len(statements) == 2
+    assert statements[1].endswith(f"IN ({user_ids[1]},{user_ids[2]},{user_ids[3]},999999)")
+
+
+def test_lru_eviction_ttl_and_invalidation(app, user_ids, monkeypatch):
+    monkeypatch.setattr(users_model, "USER_CACHE_MAX_SIZE", 2)
+    with app.app_context():
+        users_model.get_users_by_ids(user_ids[:2])
+        users_model.get_user_by_id_cached(user_ids[0])  # touch: user 1 is now least recent
+        users_model.get_user_by_id_cached(user_ids[2])
+        assert list(users_model._user_cache) == [user_ids[0], user_ids[2]]
+
+        # callers get copies, not the cached dict
+        users_model.get_user_by_id_cached(user_ids[0])["nickname"] = "mutated"
+        assert users_model.get_user_by_id_cached(user_ids[0])["nickname"] == "캐시0"
+
+        assert users_model.update_user_profile(user_ids[0], nickname="새이름")
+        assert user_ids[0] not in users_model._user_cache
+        assert users_model.get_user_by_id_cached(user_ids[0])["nickname"] == "새이름"
+
+        users_model.update_user_status(user_ids[2], "online")
+        assert users_model.get_user_by_id_cached(user_ids[2])["status"] == "online"
+
+        monkeypatch.setattr(users_model, "USER_CACHE_TTL", 0)
+        from app.models.base import get_db
+
+        conn = get_db()
+        conn.execute("UPDATE users SET nickname = 'direct' WHERE id = ?", (user_ids[2],))
+        conn.commit()
+        assert users_model.get_user_by_id_cached(user_ids[2])["nickname"] == "direct"
+
+
+def test_invalidation_during_load_is_not_cached(app, user_ids, monkeypatch):
+    from app.models import base
+
+    with app.app_context():
+        real_get_db = users_model.get_db
+
+        def _get_db_then_invalidate():
+            # a profile update lands between the cache miss and the query result
+            users_model.invalidate_user_cache(user_ids[1])
+            return real_get_db()
+
+        monkeypatch.setattr(users_model, "get_db", _get_db_then_invalidate)
+        assert users_model.get_user_by_id_cached(user_ids[1])["id"] == user_ids[1]
+        assert user_ids[1] not in users_model._user_cache
+        monkeypatch.setattr(users_model, "get_db", base.get_db)
+        users_model.get_user_by_id_cached(user_ids[1])
+        assert user_ids[1] in users_model._user_cache
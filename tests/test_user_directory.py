@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+from app.services.hangul import hangul_initials, is_initials_query
+from tests.test_feature_risk_review_plan import _login, _register
+
+
+def test_hangul_initials():
+    assert hangul_initials("김철수") == "ㄱㅊㅅ"
+    assert hangul_initials("빵Kim 2") == "ㅃkim 2"
+    assert is_initials_query("ㄱㅊ") and is_initials_query("ㄱ ㅊ")
+    assert not is_initials_query("김ㅊ") and not is_initials_query("")
+
+
+def _seed(client):
+    people = [
+        ("dir_me", "관리자"),
+        ("kim_cs", "김철수"),
+        ("kim_yh", "김영희"),
+        ("choi_cs", "최찬식"),
+        ("lee_js", "이지수"),
+        ("pct_user", "100%done"),
+    ]
+    _register(client, "dir_me", nickname="관리자")
+    from app.models.users import create_user
+
+    # registration is rate limited; the rest go straight to the model
+    with client.application.app_context():
+        for username, nickname in people[1:]:
+            assert create_user(username, "Password123!", nickname)
+    _login(client, "dir_me")
+    return {u["username"]: u for u in client.get("/api/users").json}
+
+
+def _names(response):
+    return [u["nickname"] for u in response.json["users"]]
+
+
+def test_directory_prefix_initials_and_paging(client):
+    users = _seed(client)
+
+    assert _names(client.get("/api/users/directory?q=kim")) == ["김영희", "김철수"]
+    assert _names(client.get("/api/users/directory?q=KIM_C")) == ["김철수"]
+    assert _names(client.get("/api/users/directory?q=김")) == ["김영희", "김철수"]
+    assert _names(client.get("/api/users/directory?q=ㄱㅊ")) == ["김철수"]
+    assert _names(client.get("/api/users/directory?q=ㅊㅊ")) == ["최찬식"]
+    # LIKE wildcards in the query are literal
+    assert _names(client.get("/api/users/directory?q=100%25")) == ["100%done"]
+    assert _names(client.get("/api/users/directory?q=%25")) == []
+    # the caller is not listed
+    assert "관리자" not in _names(client.get("/api/users/directory"))
+
+    first = client.get("/api/users/directory?limit=2").json
+    assert first["has_more"] is True and first["next_offset"] == 2
+    rest = client.get("/api/users/directory?limit=10&offset=2").json
+    assert rest["has_more"] is False and rest["next_offset"] is None
+    listed = [u["id"] for u in first["users"] + rest["users"]]
+    assert len(listed) == len(set(listed)) == len(users)
+
+    assert client.put("/api/profile", json={"nickname": "강철수"}).status_code == 200
+    _login(client, "kim_yh")
+    assert _names(client.get("/api/users/directory?q=ㄱㅊ")) == ["강철수", "김철수"]
+
+
+def test_users_by_ids_keeps_order_and_skips_unknown(client):
+    users = _seed(client)
+    ids = [users["lee_js"]["id"], 999999, users["kim_cs"]["id"], users["lee_js"]["id"]]
+
+    data = client.get("/api/users/by-ids?ids=" + ",".join(str(i) for i in ids) + ",abc").json
+    assert [u["id"] for u in data["users"]] == [users["lee_js"]["id"], users["kim_cs"]["id"]]
+    assert set(data["users"][0]) == {"id", "username", "nickname", "profile_image", "status", "status_message"}
+
+    too_many = ",".join(str(i) for i in range(1, 202))
+    assert client.get(f"/api/users/by-ids?ids={too_many}").status_code == 400
+    assert client.get("/api/users/by-ids").json == {"users": []}